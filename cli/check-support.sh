@@ -26,16 +26,35 @@ echo
 echo "🔋 배터리 장치 검색:"
 power_supply_dir="/sys/class/power_supply"
 batteries=()
+declare -A bat_capacity=() bat_status=()
+
+# 장치당 uevent 한 번만 읽기 (속성별 cat 프로세스 없음)
+read_uevent() {
+    local device="$1" key value
+    UEVENT_TYPE="" UEVENT_SCOPE="" UEVENT_CAPACITY="" UEVENT_STATUS=""
+    [[ -r "$device/uevent" ]] || return 1
+    while IFS='=' read -r key value; do
+        case "$key" in
+            POWER_SUPPLY_TYPE) UEVENT_TYPE="$value" ;;
+            POWER_SUPPLY_SCOPE) UEVENT_SCOPE="$value" ;;
+            POWER_SUPPLY_CAPACITY) UEVENT_CAPACITY="$value" ;;
+            POWER_SUPPLY_STATUS) UEVENT_STATUS="$value" ;;
+        esac
+    done < "$device/uevent"
+}
 
 if [[ -d "$power_supply_dir" ]]; then
     for device in "$power_supply_dir"/*; do
-        if [[ -f "$device/type" ]]; then
-            device_type=$(cat "$device/type" 2>/dev/null || echo "")
-            if [[ "$device_type" == "Battery" ]]; then
-                device_name=$(basename "$device")
-                batteries+=("$device_name")
-                echo "   ✓ 발견: $device_name"
-            fi
+        read_uevent "$device" || continue
+        if [[ "$UEVENT_TYPE" == "Battery" && "$UEVENT_SCOPE" != "Device" ]]; then
+            device_name="${device##*/}"
+            batteries+=("$device_name")
+            bat_capacity[$device_name]="$UEVENT_CAPACITY"
+            bat_status[$device_name]="$UEVENT_STATUS"
+            echo "   ✓ 발견: $device_name"
+        elif [[ "$UEVENT_TYPE" == "Battery" ]]; then
+            # 마우스/헤드셋 등 주변기기 배터리(SCOPE=Device)는 충전 제어 대상이 아님
+            echo "   ➖ 제외: ${device##*/} (주변기기 배터리)"
         fi
     done
 else
@@ -64,7 +83,7 @@ for bat in "${batteries[@]}"; do
     
     if [[ -f "$end_threshold_file" ]]; then
         if [[ -r "$end_threshold_file" ]]; then
-            current_end=$(cat "$end_threshold_file" 2>/dev/null || echo "읽기 실패")
+            read -r current_end 2>/dev/null < "$end_threshold_file" || current_end="읽기 실패"
             echo "      ✅ 충전 종료 임계값: 지원됨 (현재: ${current_end}%)"
             
             # 쓰기 권한 확인
@@ -85,7 +104,7 @@ for bat in "${batteries[@]}"; do
     # 시작 임계값 지원 확인 (옵션)
     if [[ -f "$start_threshold_file" ]]; then
         if [[ -r "$start_threshold_file" ]]; then
-            current_start=$(cat "$start_threshold_file" 2>/dev/null || echo "읽기 실패")
+            read -r current_start 2>/dev/null < "$start_threshold_file" || current_start="읽기 실패"
             echo "      ✅ 충전 시작 임계값: 지원됨 (현재: ${current_start}%)"
         else
             echo "      ❌ 충전 시작 임계값: 읽기 불가"
@@ -94,15 +113,13 @@ for bat in "${batteries[@]}"; do
         echo "      ➖ 충전 시작 임계값: 지원되지 않음 (선택사항)"
     fi
     
-    # 현재 배터리 상태
-    if [[ -f "$bat_path/capacity" ]]; then
-        capacity=$(cat "$bat_path/capacity" 2>/dev/null || echo "알 수 없음")
-        echo "      📊 현재 용량: ${capacity}%"
+    # 현재 배터리 상태 (uevent에서 읽은 값)
+    if [[ -n "${bat_capacity[$bat]}" ]]; then
+        echo "      📊 현재 용량: ${bat_capacity[$bat]}%"
     fi
     
-    if [[ -f "$bat_path/status" ]]; then
-        status=$(cat "$bat_path/status" 2>/dev/null || echo "알 수 없음")
-        echo "      🔌 충전 상태: $status"
+    if [[ -n "${bat_status[$bat]}" ]]; then
+        echo "      🔌 충전 상태: ${bat_status[$bat]}"
     fi
     echo
 done
@@ -163,4 +180,9 @@ fi
 
 if ! $tools_found; then
     echo "   ✅ 충돌 가능한 도구 없음"
-fi
\ No newline at end of file
+fi
+
+# 검사 결과를 a14-charge-keeper 기능 캐시에 반영 (set/clear 시 재검사 생략)
+if [[ $EUID -eq 0 ]] && command -v a14-charge-keeper >/dev/null 2>&1; then
+    a14-charge-keeper probe >/dev/null 2>&1 || true
+fi
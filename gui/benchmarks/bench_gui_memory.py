@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""GUI memory soak: peak and steady-state RSS with and without memory saver.
+
+Builds the SystemTrayApp offscreen on a synthetic replayed battery (no
+hardware or CLI needed) and runs open/close cycles: each cycle refreshes,
+opens and hides the popup, and every few cycles the detail and settings
+dialogs. In memory saver mode every hidden window is released after each
+cycle, so every open is a rebuild. Each mode runs in its own process so
+their RSS figures do not mix; the steady state is the mean RSS over the
+last quarter of the cycles. Build is the mean time to construct and show
+a window (in memory saver mode, every rebuild).
+
+Usage:
+    cd gui && python3 benchmarks/bench_gui_memory.py [cycles]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# The detail and settings dialogs open every DIALOG_EVERY cycles
+DIALOG_EVERY = 5
+INTERVAL = 30.0
+
+
+def make_records(count: int):
+    """Synthetic sysfs trace: a slow discharge from 80%."""
+    from src.core.replay import TraceRecord
+
+    records = []
+    for i in range(count):
+        energy = max(56.0 - i * INTERVAL * 8 / 3600, 3.0)
+        records.append(TraceRecord(1.7e9 + i * INTERVAL, "BAT0", "sysfs", {
+            "end_threshold": 80,
+            "start_threshold": None,
+            "uevent": {
+                "POWER_SUPPLY_STATUS": "Discharging",
+                "POWER_SUPPLY_CAPACITY": str(int(energy / 70 * 100)),
+                "POWER_SUPPLY_ENERGY_NOW": str(int(energy * 1e6)),
+                "POWER_SUPPLY_ENERGY_FULL": "70000000",
+                "POWER_SUPPLY_ENERGY_FULL_DESIGN": "73000000",
+                "POWER_SUPPLY_POWER_NOW": "8000000",
+                "POWER_SUPPLY_VOLTAGE_NOW": "15900000",
+                "POWER_SUPPLY_MODEL_NAME": "A32",
+            },
+        }))
+    return records
+
+
+def soak(cycles: int, saver: bool) -> dict:
+    """Run the cycles in this process and return the figures."""
+    from PyQt5.QtWidgets import QApplication
+
+    from src.core import memory_stats
+    from src.core.battery_manager import BatteryManager
+    from src.core.replay import ReplayCliInterface, VirtualClock
+    from src.core.sample_log import SampleLog
+    from src.gui.system_tray import SystemTrayApp
+
+    app = QApplication(sys.argv)
+    records = make_records(cycles + 2)
+    clock = VirtualClock(records[0].timestamp, speed=0)
+    manager = BatteryManager(ReplayCliInterface(records, clock))
+    manager.sample_log = SampleLog(os.path.join(os.environ['XDG_DATA_HOME'], "history"))
+    if not manager.initialize().success:
+        raise SystemExit("Replay backend failed to initialize")
+    tray = SystemTrayApp(manager)
+
+    rss, builds = [], []
+    started_rss = memory_stats.read_rss_kb()
+    for cycle in range(cycles):
+        clock.sleep(INTERVAL)
+        manager.refresh_status()
+        tray._update_tray()
+
+        building = tray.battery_popup is None
+        started = time.perf_counter()
+        popup = tray._ensure_popup()
+        popup.update_battery_info(manager.current_info)
+        popup.show()
+        app.processEvents()
+        if building:
+            builds.append(time.perf_counter() - started)
+        popup.hide()
+
+        if cycle % DIALOG_EVERY == 0:
+            building = tray.detail_dialog is None
+            started = time.perf_counter()
+            tray._show_status()
+            app.processEvents()
+            if building:
+                builds.append(time.perf_counter() - started)
+            tray.detail_dialog.hide()
+            tray._show_settings()
+            app.processEvents()
+            tray.settings_dialog.hide()
+
+        app.processEvents()
+        if saver:
+            tray.release_idle_windows(force=True)
+        rss.append(memory_stats.read_rss_kb() or 0)
+
+    steady = rss[-max(len(rss) // 4, 1):]
+    stats = memory_stats.collect()
+    tray.async_bridge.shutdown()
+    manager.command_queue.shutdown(wait=False)
+    return {
+        "start_kb": started_rss,
+        "peak_kb": stats.peak_rss_kb,
+        "steady_kb": sum(steady) / len(steady),
+        "growth_kb": steady[-1] - rss[len(rss) // 4] if len(rss) > 4 else 0,
+        "build_ms": sum(builds) / len(builds) * 1000 if builds else None,
+        "heap": stats.heap_text(),
+    }
+
+
+def run_mode(cycles: int, saver: bool) -> dict:
+    """Run one mode in a fresh process."""
+    with tempfile.TemporaryDirectory() as scratch:
+        env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'),
+                   XDG_CONFIG_HOME=scratch, XDG_DATA_HOME=scratch)
+        output = subprocess.run(
+            [sys.executable, __file__, str(cycles), "--child", "saver" if saver else "default"],
+            env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> int:
+    args = sys.argv[1:]
+    cycles = int(args[0]) if args else 200
+    if "--child" in args:
+        # Windows print their theme setup; keep only the result on stdout
+        stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+        result = soak(cycles, args[args.index("--child") + 1] == "saver")
+        print(json.dumps(result), file=stdout)
+        return 0
+
+    print(f"Cycles: {cycles} (dialogs every {DIALOG_EVERY})")
+    print(f"{'Mode':<14} {'Start':>9} {'Peak':>9} {'Steady':>9} {'Growth':>9} {'Build':>9}")
+    for label, saver in (("default", False), ("memory saver", True)):
+        result = run_mode(cycles, saver)
+        build = f"{result['build_ms']:.1f} ms" if result['build_ms'] is not None else "-"
+        print(f"{label:<14} {result['start_kb'] / 1024:7.1f}MB {result['peak_kb'] / 1024:7.1f}MB "
+              f"{result['steady_kb'] / 1024:7.1f}MB {result['growth_kb'] / 1024:7.1f}MB {build:>9}")
+        print(f"{'':<14} heap: {result['heap']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
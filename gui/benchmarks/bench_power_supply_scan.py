@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Enumeration benchmark for PowerSupplyScanner on a synthetic sysfs tree.
+
+Builds a temporary power_supply class directory with ``count`` devices
+(symlinks into a devices tree, like real sysfs; a mix of USB-PD sinks,
+mains adapters, peripheral batteries and a few system batteries) and
+compares:
+
+* per-attribute reads (``type`` plus ``status``/``capacity`` for batteries),
+  as the shell scripts do with one ``cat`` each,
+* PowerSupplyScanner.scan() (scandir + one uevent read per device),
+* PowerSupplyScanner.devices() with a valid cached index.
+
+Exits with status 1 if a full scan exceeds the budget.
+
+Usage:
+    cd gui && python3 benchmarks/bench_power_supply_scan.py [count] [budget_ms]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.power_supply_scanner import PowerSupplyScanner  # noqa: E402
+
+
+DEVICE_KINDS = [
+    ("ucsi-source-psy-{i}", "USB", None),
+    ("ADP{i}", "Mains", None),
+    ("hid-{i}-battery", "Battery", "Device"),
+    ("BAT{i}", "Battery", "System"),
+]
+
+
+def build_tree(root: str, count: int) -> str:
+    """Create a synthetic power_supply tree and return its class directory."""
+    class_dir = os.path.join(root, "class", "power_supply")
+    os.makedirs(class_dir)
+    for i in range(count):
+        pattern, device_type, scope = DEVICE_KINDS[i % len(DEVICE_KINDS)]
+        name = pattern.format(i=i)
+        device_dir = os.path.join(root, "devices", f"port{i}", "power_supply", name)
+        os.makedirs(device_dir)
+
+        lines = [f"POWER_SUPPLY_NAME={name}", f"POWER_SUPPLY_TYPE={device_type}"]
+        if scope:
+            lines.append(f"POWER_SUPPLY_SCOPE={scope}")
+        attributes = {"type": device_type}
+        if device_type == "Battery":
+            lines += ["POWER_SUPPLY_STATUS=Discharging", f"POWER_SUPPLY_CAPACITY={i % 100}"]
+            attributes.update(status="Discharging", capacity=str(i % 100))
+            if scope == "System":
+                attributes["charge_control_end_threshold"] = "80"
+        else:
+            lines.append("POWER_SUPPLY_ONLINE=1")
+            attributes["online"] = "1"
+
+        with open(os.path.join(device_dir, "uevent"), 'w') as f:
+            f.write("\n".join(lines) + "\n")
+        for attribute, value in attributes.items():
+            with open(os.path.join(device_dir, attribute), 'w') as f:
+                f.write(value + "\n")
+        os.symlink(device_dir, os.path.join(class_dir, name))
+    return class_dir
+
+
+def per_attribute_scan(class_dir: str) -> list:
+    """Baseline: one open per attribute, as the shell scripts do."""
+    batteries = []
+    for name in sorted(os.listdir(class_dir)):
+        device_dir = os.path.join(class_dir, name)
+        try:
+            with open(os.path.join(device_dir, "type")) as f:
+                device_type = f.read().strip()
+        except OSError:
+            continue
+        if device_type != "Battery":
+            continue
+        for attribute in ("status", "capacity"):
+            with open(os.path.join(device_dir, attribute)) as f:
+                f.read()
+        batteries.append(name)
+    return batteries
+
+
+def measure(func, repeat: int) -> float:
+    """Median wall time of func() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20.0
+
+    with tempfile.TemporaryDirectory() as root:
+        class_dir = build_tree(root, count)
+        scanner = PowerSupplyScanner(class_dir)
+
+        baseline_ms = measure(lambda: per_attribute_scan(class_dir), 20)
+        scan_ms = measure(scanner.scan, 20)
+        cached_ms = measure(scanner.devices, 1000)
+        devices = scanner.devices()
+        batteries = scanner.batteries()
+
+        print(f"devices: {len(devices)} (system batteries: {len(batteries)}, "
+              f"with threshold: {len(scanner.threshold_batteries())})")
+        print(f"per-attribute reads:      {baseline_ms:8.3f} ms")
+        print(f"scan (1 uevent/device):   {scan_ms:8.3f} ms")
+        print(f"cached index lookup:      {cached_ms:8.4f} ms")
+        print(f"budget:                   {budget_ms:8.3f} ms")
+
+        if len(devices) != count:
+            print(f"FAIL: expected {count} devices, indexed {len(devices)}")
+            return 1
+        if scan_ms > budget_ms:
+            print("FAIL: scan exceeds budget")
+            return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
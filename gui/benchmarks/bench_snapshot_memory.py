@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Memory benchmark: bytes per battery snapshot before and after.
+
+Compares the mutable ``BatteryInfo`` dataclass with the tuple-backed
+``BatteryInfoSnapshot`` and the column-oriented ``SnapshotHistory``.
+
+Usage:
+    cd gui && python3 benchmarks/bench_snapshot_memory.py [count]
+"""
+
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.core.battery_manager import BatteryInfo  # noqa: E402
+from src.core.snapshots import SnapshotHistory  # noqa: E402
+
+
+def make_info(i: int) -> BatteryInfo:
+    """Create a realistic, fully populated BatteryInfo."""
+    return BatteryInfo(
+        device="BAT0",
+        end_threshold=80,
+        backup_count=3,
+        vendor="ASUSTeK",
+        model="A32-K55",
+        serial="1234",
+        state="discharging" if i % 2 else "charging",
+        percentage=50 + i % 50,
+        energy_current=30.0 + (i % 100) / 10,
+        energy_full=70.1,
+        energy_full_design=73.0,
+        energy_rate=9.5 + (i % 7) / 10,
+        voltage=15.8,
+        capacity=96.0,
+        charge_cycles=120,
+        time_to_empty="3.1 hours",
+        time_to_limit=None if i % 2 else 1800.0 + i % 600,
+        time_to_empty_estimate=11000.0 + i % 1000 if i % 2 else None,
+    )
+
+
+def measure(label: str, build, count: int) -> float:
+    """Measure retained bytes per item for a builder returning a container."""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    container = build(count)
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_item = (after - before) / count
+    print(f"{label:<32} {per_item:8.1f} bytes/snapshot")
+    del container
+    return per_item
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    sources = [make_info(i) for i in range(count)]
+
+    print(f"Snapshots: {count}")
+    dataclass_bytes = measure(
+        "BatteryInfo (dataclass)",
+        lambda n: [make_info(i) for i in range(n)], count)
+    tuple_bytes = measure(
+        "BatteryInfoSnapshot (tuple)",
+        lambda n: [make_info(i).to_snapshot() for i in range(n)], count)
+
+    def build_history(n):
+        history = SnapshotHistory(capacity=n)
+        for i, info in enumerate(sources[:n]):
+            history.append(info, timestamp=float(i))
+        return history
+
+    history_bytes = measure("SnapshotHistory (columns)", build_history, count)
+
+    print()
+    print(f"tuple vs dataclass:   {dataclass_bytes / tuple_bytes:5.2f}x smaller")
+    print(f"columns vs dataclass: {dataclass_bytes / history_bytes:5.2f}x smaller")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
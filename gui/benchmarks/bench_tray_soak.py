@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""Soak test of the tray refresh loop: days of activity, checked for growth.
+
+Runs the real SystemTrayApp offscreen against a fake ``a14-charge-keeper``
+(a shell script put first on PATH that prints a status file the harness
+rewrites every step), so refreshes take the production path: the async
+bridge, a CLI subprocess, the status parse and the tray icon, tooltip and
+popup updates. Time is a replay VirtualClock, so a simulated day of 30 s
+refreshes takes a minute or two. On top of the refreshes the harness
+opens the popup and drags its slider (threshold label churn), switches
+the theme and refresh interval through the settings path (timer restart),
+and opens the detail dialog and context menu.
+
+After a warm-up (caches filling, first windows built) it takes a baseline
+census: RSS, Python objects by type, live QWidgets and QObject wrappers.
+At the end the growth over the baseline is compared with the budgets and
+the types that grew most are listed. Exit status 1 means a budget was
+exceeded.
+
+Usage:
+    cd gui && python3 benchmarks/bench_tray_soak.py [--days 1] [--interval 30]
+        [--warmup-hours 2] [--rss-budget 8] [--object-budget 2000]
+        [--widget-budget 5] [--memory-saver]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+FAKE_CLI = """#!/bin/sh
+dir=$(dirname "$0")
+case "$1" in
+status) cat "$dir/status" ;;
+set|persist) echo "$2" > "$dir/threshold" ;;
+clear) echo 100 > "$dir/threshold" ;;
+esac
+"""
+
+STATUS = """Device : BAT0
+충전 종료: {threshold}%
+백업 파일: 3개
+
+  native-path:          BAT0
+  vendor:               ASUSTeK
+  model:                A32
+  serial:               1234
+  power supply:         yes
+  battery
+    present:             yes
+    state:               {state}
+    energy:              {energy:.1f} Wh
+    energy-empty:        0 Wh
+    energy-full:         70.1 Wh
+    energy-full-design:  73 Wh
+    energy-rate:         {rate:.1f} W
+    voltage:             15.9 V
+    charge-cycles:       120
+    time to empty:       4.1 hours
+    percentage:          {percentage}%
+    capacity:            96.0274%
+"""
+
+# Seconds allowed for one refresh (a CLI spawn) to come back
+REFRESH_TIMEOUT = 10.0
+
+
+class FakeCli:
+    """The fake CLI directory: the script, its status and the threshold it was given."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        script = os.path.join(directory, "a14-charge-keeper")
+        with open(script, 'w') as f:
+            f.write(FAKE_CLI)
+        os.chmod(script, 0o755)
+        self.threshold_path = os.path.join(directory, "threshold")
+        self.status_path = os.path.join(directory, "status")
+
+    def threshold(self) -> int:
+        """Threshold last set through the CLI (80 before any)."""
+        try:
+            with open(self.threshold_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return 80
+
+    def update(self, now: float) -> None:
+        """Write the status for a virtual time: discharge 09-18h, charge 18-20h."""
+        threshold = self.threshold()
+        hour = now % 86400 / 3600
+        if hour < 9:
+            percentage, state, rate = threshold, "pending-charge", 0.0
+        elif hour < 18:
+            percentage, state, rate = threshold - (hour - 9) * 5, "discharging", 9.8
+        else:
+            level = 35 + (hour - 18) * 25
+            percentage, state, rate = ((level, "charging", 30.0) if level < threshold
+                                       else (threshold, "pending-charge", 0.0))
+        percentage = int(max(min(percentage, threshold), 5))
+        # Atomic: a refresh started by the popup may be reading it
+        with open(self.status_path + ".tmp", 'w') as f:
+            f.write(STATUS.format(threshold=threshold, state=state, rate=rate,
+                                  percentage=percentage, energy=70.1 * percentage / 100))
+        os.replace(self.status_path + ".tmp", self.status_path)
+
+
+def census(app) -> dict:
+    """RSS, Python objects by type and Qt object counts."""
+    from PyQt5.QtCore import QObject
+
+    from src.core import memory_stats
+
+    gc.collect()
+    objects = gc.get_objects()
+    types = Counter(f"{type(o).__module__}.{type(o).__qualname__}" for o in objects)
+    return {
+        'rss_kb': memory_stats.read_rss_kb() or 0,
+        'objects': len(objects),
+        'types': types,
+        'widgets': len(app.allWidgets()),
+        'qobjects': sum(1 for o in objects if isinstance(o, QObject)),
+    }
+
+
+def settle(app) -> None:
+    """Process pending events, including deleteLater() deletions.
+
+    Outside a running event loop (the harness never calls exec()) Qt does
+    not carry out deferred deletions by itself; the app's event loop would.
+    """
+    from PyQt5.QtCore import QEvent
+
+    app.processEvents()
+    app.sendPostedEvents(None, QEvent.DeferredDelete)
+
+
+def wait_for_refresh(app, manager) -> bool:
+    """Process Qt events until the manager has applied one more refresh."""
+    from PyQt5.QtCore import QEventLoop
+
+    done = manager.refresh_count
+    deadline = time.monotonic() + REFRESH_TIMEOUT
+    while manager.refresh_count == done:
+        if time.monotonic() > deadline:
+            return False
+        app.processEvents(QEventLoop.AllEvents, 5)
+        time.sleep(0.0005)
+    settle(app)
+    return True
+
+
+def exercise_popup(app, tray) -> None:
+    """Open the popup, drag the slider a few steps and close it."""
+    tray._show_popup()
+    popup = tray.battery_popup
+    start = popup.threshold_slider.value()
+    for value in (start - 2, start - 1, start):
+        popup._on_slider_changed(value)
+        settle(app)
+    popup.hide()
+    settle(app)
+
+
+def exercise_settings(tray, step: int) -> None:
+    """Switch theme and refresh interval through the settings-changed path."""
+    config = tray.config_manager
+    config.set('theme', 'light' if config.get('theme') == 'dark' else 'dark')
+    config.set('refresh_interval', 30 if step % 2 else 60)
+    tray._on_settings_changed()
+
+
+def exercise_dialogs(app, tray) -> None:
+    """Open and close the detail dialog and the context menu."""
+    tray._show_status()
+    settle(app)
+    tray.detail_dialog.hide()
+    tray._show_context_menu()
+    settle(app)
+    tray.context_menu.hide()
+    settle(app)
+
+
+def report_growth(baseline: dict, final: dict, days: float) -> None:
+    """Print growth over the baseline and the types that grew most."""
+    rss = (final['rss_kb'] - baseline['rss_kb']) / 1024
+    print()
+    print(f"Growth over {days:.2f} days after warm-up:")
+    print(f"  RSS:       {rss:+8.1f} MB ({rss / days if days else 0:+.1f} MB/day)")
+    print(f"  Objects:   {final['objects'] - baseline['objects']:+8d}")
+    print(f"  QWidgets:  {final['widgets'] - baseline['widgets']:+8d}")
+    print(f"  QObjects:  {final['qobjects'] - baseline['qobjects']:+8d} (Python wrappers)")
+    grown = (final['types'] - baseline['types']).most_common(10)
+    if grown:
+        print("  Types that grew most:")
+        for name, count in grown:
+            print(f"    {count:+7d}  {name}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument('--days', type=float, default=1.0, help="simulated days (default 1)")
+    parser.add_argument('--interval', type=float, default=30.0,
+                        help="simulated seconds between refreshes (default 30)")
+    parser.add_argument('--warmup-hours', type=float, default=2.0,
+                        help="simulated hours before the baseline census (default 2)")
+    parser.add_argument('--rss-budget', type=float, default=8.0,
+                        help="allowed RSS growth in MB (default 8)")
+    parser.add_argument('--object-budget', type=int, default=2000,
+                        help="allowed growth in Python objects (default 2000)")
+    parser.add_argument('--widget-budget', type=int, default=5,
+                        help="allowed growth in live QWidgets (default 5)")
+    parser.add_argument('--memory-saver', action='store_true',
+                        help="soak with memory saver mode releasing idle windows")
+    args = parser.parse_args(argv)
+
+    scratch = tempfile.TemporaryDirectory()
+    fake_cli = FakeCli(os.path.join(scratch.name, "bin"))
+    # Everything the app reads or writes stays in the scratch directory
+    os.environ.update(PATH=f"{fake_cli.directory}:{os.environ.get('PATH', '')}", BAT_NAME="BAT0",
+                      XDG_CONFIG_HOME=scratch.name, XDG_DATA_HOME=scratch.name,
+                      XDG_CACHE_HOME=scratch.name, XDG_RUNTIME_DIR=scratch.name)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+    from PyQt5.QtWidgets import QApplication
+
+    from src.core.battery_manager import BatteryManager
+    from src.core.cli_interface import CliInterface
+    from src.core.replay import CLOCK_MODULES, VirtualClock
+    from src.gui.system_tray import SystemTrayApp
+
+    app = QApplication(sys.argv)
+    steps = int(args.days * 86400 / args.interval)
+    warmup = int(args.warmup_hours * 3600 / args.interval)
+    hour = max(int(3600 / args.interval), 1)
+    clock = VirtualClock(1.7e9 - 1.7e9 % 86400, speed=0)
+    fake_cli.update(clock.time())
+
+    # Stdout is the app's debug prints; progress goes to stderr
+    log = sys.stderr
+    stdout, sys.stdout = sys.stdout, open(os.devnull, 'w')
+    try:
+        with clock.installed(CLOCK_MODULES + ("src.gui.system_tray",)):
+            # Every read goes through the fake CLI (no shared status, sysfs or UPower)
+            manager = BatteryManager(CliInterface(use_shared_status=False, use_threshold_engine=False,
+                                                  use_upower_dbus=False))
+            tray = SystemTrayApp(manager)
+            tray.config_manager.set('memory_saver', args.memory_saver)
+            result = tray.start()
+            if not result.success:
+                print(f"Failed to start: {result.error_message}", file=log)
+                return 1
+
+            print(f"Soak: {args.days:g} days, {steps} refreshes every {args.interval:g}s "
+                  f"(warm-up {warmup})", file=log)
+            baseline, failed, started = None, 0, time.perf_counter()
+            for step in range(steps):
+                clock.sleep(args.interval)
+                fake_cli.update(clock.time())
+                tray.refresh_battery_status()
+                if not wait_for_refresh(app, manager):
+                    failed += 1
+
+                if step % (hour // 6 or 1) == 0:
+                    exercise_popup(app, tray)
+                if step % hour == 0:
+                    exercise_settings(tray, step // hour)
+                if step % (hour * 6) == 0:
+                    exercise_dialogs(app, tray)
+                if args.memory_saver:
+                    tray.release_idle_windows()
+
+                if step + 1 == warmup:
+                    census(app)  # The first pass makes PyQt create wrappers it then keeps
+                    baseline = census(app)
+                if (step + 1) % (hour * 6) == 0:
+                    sample = census(app)
+                    print(f"  day {(step + 1) * args.interval / 86400:5.2f}: "
+                          f"RSS {sample['rss_kb'] / 1024:6.1f} MB, {sample['objects']:7d} objects, "
+                          f"{sample['widgets']:4d} widgets, {sample['qobjects']:4d} QObjects "
+                          f"({time.perf_counter() - started:.0f}s)", file=log)
+            final = census(app)
+            tray.stop()
+            tray.async_bridge.shutdown()
+            manager.command_queue.shutdown(wait=False)
+    finally:
+        sys.stdout = stdout
+
+    if baseline is None:
+        print("Soak shorter than the warm-up; nothing to compare", file=log)
+        return 1
+    print(f"Refreshes: {manager.refresh_count} ({manager.refresh_failures} failed, "
+          f"{failed} timed out), wall time {time.perf_counter() - started:.0f}s")
+    report_growth(baseline, final, (steps - warmup) * args.interval / 86400)
+
+    over = []
+    if (final['rss_kb'] - baseline['rss_kb']) / 1024 > args.rss_budget:
+        over.append(f"RSS over {args.rss_budget:g} MB")
+    if final['objects'] - baseline['objects'] > args.object_budget:
+        over.append(f"objects over {args.object_budget}")
+    if final['widgets'] - baseline['widgets'] > args.widget_budget:
+        over.append(f"widgets over {args.widget_budget}")
+    print()
+    print(f"FAIL: {', '.join(over)}" if over else "PASS: growth within budget")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
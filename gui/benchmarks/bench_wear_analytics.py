@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Wear analytics benchmark: a year of 10-second samples.
+
+Generates synthetic charge and full-energy samples (daily discharge and
+recharge under an 80% limit, integer percent readings with flicker, slow
+capacity fade) and times the vectorized analysis against the sequential
+four-point rainflow count.
+
+Usage:
+    cd gui && python3 benchmarks/bench_wear_analytics.py [days] [interval]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import numpy as np  # noqa: E402
+
+from src.core.wear_analytics import (  # noqa: E402
+    WearSamples, _rainflow_sequential, analyze, rainflow, turning_points
+)
+
+
+def make_samples(days: int, interval: int) -> WearSamples:
+    """Build a synthetic sample set."""
+    rng = np.random.default_rng(42)
+    timestamps = 1.7e9 + np.arange(0, days * 86400, interval, dtype=np.float64)
+    hour = (timestamps % 86400) / 3600
+    # Discharge 80 -> 35 from 09:00 to 18:00, recharge to the limit by 20:00
+    daily = np.where(hour < 9, 80.0,
+                     np.where(hour < 18, 80 - (hour - 9) * 5,
+                              np.minimum(80.0, 35 + (hour - 18) * 25)))
+    percentage = np.clip(np.round(daily + rng.normal(0, 0.15, timestamps.size)), 0, 100)
+    energy_full = 70.0 - 4.0 * (timestamps - timestamps[0]) / (365 * 86400)
+    energy_full = energy_full + rng.normal(0, 0.05, timestamps.size)
+    return WearSamples.from_arrays(timestamps, percentage, energy_full)
+
+
+def main() -> int:
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+    interval = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    samples = make_samples(days, interval)
+    print(f"{len(samples):,} samples ({days} days every {interval}s)")
+
+    started = time.perf_counter()
+    report = analyze(samples, energy_full_design=73.0)
+    vectorized = time.perf_counter() - started
+
+    _, percentage, _ = samples.arrays()
+    started = time.perf_counter()
+    rainflow(percentage)
+    rainflow_vectorized = time.perf_counter() - started
+    started = time.perf_counter()
+    points = turning_points(percentage)
+    _rainflow_sequential(points)
+    rainflow_sequential = time.perf_counter() - started
+
+    print(f"analyze() (vectorized)          {vectorized * 1000:8.1f} ms")
+    print(f"rainflow, vectorized passes     {rainflow_vectorized * 1000:8.1f} ms "
+          f"({points.size:,} reversals)")
+    print(f"rainflow, sequential stack      {rainflow_sequential * 1000:8.1f} ms")
+    print(f"equivalent full cycles          {report.equivalent_full_cycles:8.1f}")
+    print(f"fade                            {report.fade.fade_percent_per_year:8.2f} %/year")
+    print(f"time at >= 80%                  {report.high_soc_fraction[80] * 100:8.1f} %")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -38,6 +38,31 @@ def setup_qt_for_root():
 
 def main():
     """Main entry point with error handling."""
+    # Headless monitor: dispatch before anything imports Qt
+    if len(sys.argv) > 1 and sys.argv[1] == '--headless':
+        from src.core.headless import main as headless_main
+        return headless_main(sys.argv[2:])
+    
+    # One tray per user: later launches hand their intent to the running
+    # instance before anything imports Qt
+    from src.utils.single_instance import SingleInstance, parse_intent
+    intent = parse_intent(sys.argv[1:])
+    instance = SingleInstance()
+    try:
+        primary = instance.acquire()
+    except OSError as e:
+        print(f"Warning: Single-instance check unavailable: {e}")
+        instance, primary = None, True
+    if not primary:
+        reply = instance.forward(intent)
+        if reply is None:
+            print("Another instance holds the lock but did not answer")
+            return 1
+        if not reply.get("ok"):
+            print(f"Running instance rejected the request: {reply.get('error')}")
+            return 1
+        return 0
+    
     try:
         # Setup Qt environment for root execution
         setup_qt_for_root()
@@ -76,7 +101,7 @@ def main():
             pass
             
         # Store reference to prevent garbage collection
-        result = tray_main()
+        result = tray_main(instance=instance, intent=intent)
         
         # Explicit cleanup to prevent segfault
         if hasattr(app, 'processEvents'):
@@ -90,6 +115,9 @@ def main():
     except Exception as e:
         print(f"Unexpected error: {e}")
         return 1
+    finally:
+        if instance is not None:
+            instance.close()
 
 if __name__ == "__main__":
     # Add CLI path to environment
@@ -0,0 +1,279 @@
+"""asyncio front end for BatteryManager.
+
+State, change detection and events stay in BatteryManager; this class only
+replaces the blocking reads and writes with AsyncCliInterface calls, so the
+GUI and headless tools share one core. Every operation has a deadline;
+cancelling or timing out a read or write kills the CLI processes it
+started. Writes are serialized among themselves and return their follow-up
+reads unapplied, so a manager owned by another thread (the Qt thread) is
+only changed there.
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from src.core.async_cli_interface import AsyncCliInterface
+from src.core.battery_manager import BatteryInfo, BatteryManager
+from src.core.cli_interface import CliInterface, CliResult
+
+
+class WriteOutcome(NamedTuple):
+    """A write's result and the status read after it, not yet applied."""
+    result: CliResult
+    reads: Optional[Dict[str, CliResult]] = None  # None if the write failed
+    started: float = 0.0  # time.monotonic() when the reads started
+
+
+class AsyncBatteryManager:
+    """Non-blocking battery operations on top of a BatteryManager."""
+
+    def __init__(self, battery_manager: Optional[BatteryManager] = None,
+                 async_cli: Optional[AsyncCliInterface] = None,
+                 max_concurrency: int = 4):
+        """Initialize async battery manager.
+
+        Args:
+            battery_manager: Manager holding state and events (creates new if None)
+            async_cli: Async CLI interface (created from the manager's
+                CliInterface if None)
+            max_concurrency: Maximum number of CLI processes at once
+        """
+        self.manager = battery_manager or BatteryManager()
+        self.cli = async_cli or AsyncCliInterface(self.manager.cli_interface, max_concurrency)
+        self._write_lock: Optional[asyncio.Lock] = None  # Created on the running loop
+
+    @property
+    def current_info(self) -> Optional[BatteryInfo]:
+        """Primary battery information."""
+        return self.manager.current_info
+
+    @property
+    def batteries(self) -> Dict[str, BatteryInfo]:
+        """All managed batteries."""
+        return self.manager.batteries
+
+    @property
+    def is_initialized(self) -> bool:
+        """Whether initialize() succeeded."""
+        return self.manager.is_initialized
+
+    async def initialize(self, timeout: Optional[float] = None) -> CliResult:
+        """Discover batteries and read their initial status.
+
+        Args:
+            timeout: Deadline for the reads (defaults to the 'status' deadline)
+
+        Returns:
+            CliResult indicating initialization success or failure
+        """
+        self.manager.discover_batteries()
+        self.manager.start_watchers()
+        return self.manager.apply_initial_results(await self.read_batteries(timeout))
+
+    async def refresh_status(self, timeout: Optional[float] = None) -> CliResult:
+        """Refresh all batteries and apply the results.
+
+        Discovery and results are applied on the event loop's thread. GUI
+        code that owns the manager on another thread should await
+        read_batteries() and apply the results on its own thread.
+
+        Args:
+            timeout: Deadline for the reads (defaults to the 'status' deadline)
+
+        Returns:
+            CliResult indicating refresh success or failure
+        """
+        if not self.manager.is_initialized:
+            return CliResult.error("Manager not initialized")
+        self.manager.rediscover_if_needed()
+        started = time.monotonic()
+        return self.manager.apply_refresh_results(await self.read_batteries(timeout), started)
+
+    async def read_batteries(self, timeout: Optional[float] = None) -> Dict[str, CliResult]:
+        """Read all managed batteries concurrently without touching manager state.
+
+        Args:
+            timeout: Deadline for each read (defaults to the 'status' deadline)
+
+        Returns:
+            CliResult per battery name
+        """
+        primary = self.manager.primary_battery
+        names = self.manager.battery_names or [primary]
+        results = await asyncio.gather(*(
+            self.cli.get_status(None if name == primary else name, timeout) for name in names
+        ))
+        return dict(zip(names, results))
+
+    async def set_threshold(self, threshold: int, batteries: Optional[Iterable[str]] = None,
+                            timeout: Optional[float] = None) -> WriteOutcome:
+        """Set charge threshold and read the new status.
+
+        Args:
+            threshold: Threshold percentage (20-100)
+            batteries: Batteries to update (None for all managed batteries)
+            timeout: Deadline for the write (defaults to the 'set' deadline)
+
+        Returns:
+            WriteOutcome; apply its reads with apply_outcome() on the
+            thread that owns the manager
+        """
+        if not self.manager.is_initialized:
+            return WriteOutcome(CliResult.error("Manager not initialized"))
+        if not isinstance(threshold, int) or threshold < 20 or threshold > 100:
+            return WriteOutcome(CliResult.error("Threshold must be between 20 and 100"))
+
+        selection = self.manager.selection(batteries)
+        return await self._write_and_read('set', threshold, selection, threshold, timeout)
+
+    async def persist_threshold(self, threshold: int,
+                                timeout: Optional[float] = None) -> WriteOutcome:
+        """Set persistent charge threshold and read the new status.
+
+        Args:
+            threshold: Threshold percentage (20-100)
+            timeout: Deadline for the write (defaults to the 'persist' deadline)
+
+        Returns:
+            WriteOutcome (see set_threshold)
+        """
+        if not self.manager.is_initialized:
+            return WriteOutcome(CliResult.error("Manager not initialized"))
+        if not isinstance(threshold, int) or threshold < 20 or threshold > 100:
+            return WriteOutcome(CliResult.error("Threshold must be between 20 and 100"))
+
+        return await self._write_and_read('persist', threshold, None, threshold, timeout)
+
+    async def clear_threshold(self, batteries: Optional[Iterable[str]] = None,
+                              timeout: Optional[float] = None) -> WriteOutcome:
+        """Reset charge threshold to 100% and read the new status.
+
+        Args:
+            batteries: Batteries to reset (None for all managed batteries)
+            timeout: Deadline for the write (defaults to the 'clear' deadline)
+
+        Returns:
+            WriteOutcome (see set_threshold)
+        """
+        if not self.manager.is_initialized:
+            return WriteOutcome(CliResult.error("Manager not initialized"))
+
+        selection = self.manager.selection(batteries)
+        return await self._write_and_read('clear', None, selection, 100, timeout)
+
+    def apply_outcome(self, outcome: WriteOutcome) -> CliResult:
+        """Apply the status read after a write (call on the manager's thread).
+
+        Args:
+            outcome: Result of set_threshold, persist_threshold or clear_threshold
+
+        Returns:
+            The write's result, or the refresh error if applying failed
+        """
+        if not outcome.result.success or outcome.reads is None:
+            return outcome.result
+        refreshed = self.manager.apply_refresh_results(outcome.reads, outcome.started)
+        return outcome.result if refreshed.success else refreshed
+
+    async def restore_and_read(self, lost: Dict[str, int],
+                               timeout: Optional[float] = None) -> Dict[str, CliResult]:
+        """Re-apply lost thresholds, then read all batteries.
+
+        The resume path: verify_thresholds() finds the lost values on the
+        caller's thread, this coroutine writes them back (one write per
+        distinct value) and reads fresh status without applying it.
+
+        Args:
+            lost: Expected threshold per battery, from verify_thresholds()
+            timeout: Deadline for each write and read
+
+        Returns:
+            CliResult per battery name
+        """
+        by_value: Dict[int, list] = {}
+        for name, threshold in lost.items():
+            by_value.setdefault(threshold, []).append(name)
+
+        for threshold, names in by_value.items():
+            result = await self._write('set', threshold, self.manager.selection(names),
+                                       threshold, timeout)
+            if not result.success:
+                print(f"Failed to restore {threshold}% on {', '.join(names)}: "
+                      f"{result.error_message}")
+        return await self.read_batteries(timeout)
+
+    async def import_history(self, max_lines: Optional[int] = None) -> int:
+        """Import UPower history into the sample log on an executor thread.
+
+        Args:
+            max_lines: Stop after this many history lines (None for all)
+
+        Returns:
+            Number of samples imported
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.manager.import_history, max_lines)
+
+    def kill_children(self) -> int:
+        """Kill running CLI processes immediately (safe from any thread)."""
+        return self.cli.kill_all()
+
+    async def _write(self, command: str, value: Optional[int], selection: Optional[tuple],
+                     target: int, timeout: Optional[float]) -> CliResult:
+        """Run a write through AsyncCliInterface, one at a time.
+
+        The drift target is handled as in BatteryManager: set before the
+        write and settled afterwards on the manager's owning thread. While
+        another process holds the CLI lock the write is retried with the
+        command queue's backoff. On timeout or cancellation the CLI process
+        group is killed and the previous target restored.
+
+        Args:
+            command: 'set', 'persist' or 'clear'
+            value: Threshold for set/persist
+            selection: Batteries from BatteryManager.selection()
+            target: Threshold the batteries end up with (100 for clear)
+            timeout: Deadline in seconds (defaults to the command's deadline)
+
+        Returns:
+            CliResult of the command
+        """
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        async with self._write_lock:
+            batteries = list(selection) if selection is not None else None
+            previous = self.manager.begin_write(target, selection)
+            result = None
+            try:
+                queue = self.manager.command_queue
+                delay = queue.initial_backoff
+                result = await self._run_write(command, value, batteries, timeout)
+                for _ in range(queue.max_retries):
+                    if result.exit_code != CliInterface.LOCK_BUSY_EXIT_CODE:
+                        break
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, queue.max_backoff)
+                    result = await self._run_write(command, value, batteries, timeout)
+            finally:
+                self.manager.dispatch(self.manager.end_write, target, previous, result)
+            return result
+
+    async def _run_write(self, command: str, value: Optional[int],
+                         batteries: Optional[list], timeout: Optional[float]) -> CliResult:
+        """Run one set/persist/clear through AsyncCliInterface."""
+        if command == 'set':
+            return await self.cli.set_threshold(value, batteries, timeout)
+        if command == 'persist':
+            return await self.cli.persist_threshold(value, timeout)
+        return await self.cli.clear_threshold(batteries, timeout)
+
+    async def _write_and_read(self, command: str, value: Optional[int],
+                              selection: Optional[tuple], target: int,
+                              timeout: Optional[float]) -> WriteOutcome:
+        """Write, then read every battery without applying the results."""
+        result = await self._write(command, value, selection, target, timeout)
+        if not result.success:
+            return WriteOutcome(result)
+        started = time.monotonic()
+        return WriteOutcome(result, await self.read_batteries(), started)
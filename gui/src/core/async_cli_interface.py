@@ -0,0 +1,272 @@
+"""Non-blocking CLI interface built on asyncio subprocesses.
+
+Every CLI run has a deadline, and cancelling the awaiting task kills the
+child together with everything it spawned (the CLI runs in its own
+process group, so a stuck ``upower`` dies with it). A semaphore bounds
+the number of concurrent CLI processes.
+
+Cheap, non-spawning paths (shared status snapshot, direct sysfs writes
+through the threshold engine) are shared with the blocking CliInterface.
+"""
+
+import asyncio
+import os
+import signal
+from typing import Dict, List, Optional, Set
+
+from src.core.cli_interface import CliInterface, CliResult
+from src.core.status_parser import StatusParser
+
+
+class AsyncCliInterface:
+    """asyncio counterpart of CliInterface."""
+
+    # Default per-operation deadlines in seconds
+    DEFAULT_TIMEOUTS = {
+        'status': 10.0,
+        'set': 30.0,
+        'persist': 30.0,
+        'clear': 30.0,
+    }
+
+    def __init__(self, cli_interface: Optional[CliInterface] = None,
+                 max_concurrency: int = 4,
+                 timeouts: Optional[Dict[str, float]] = None):
+        """Initialize async CLI interface.
+
+        Args:
+            cli_interface: Blocking interface whose configuration (default
+                battery, shared status reader, engines) is reused
+            max_concurrency: Maximum number of CLI processes at once
+            timeouts: Overrides for DEFAULT_TIMEOUTS
+        """
+        self.cli = cli_interface or CliInterface()
+        self.max_concurrency = max_concurrency
+        self.timeouts = dict(self.DEFAULT_TIMEOUTS, **(timeouts or {}))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._processes: Set[asyncio.subprocess.Process] = set()
+
+    @property
+    def spawn_count(self) -> int:
+        """CLI processes started (shared with the blocking interface)."""
+        return self.cli.spawn_count
+
+    @property
+    def running_processes(self) -> int:
+        """Number of CLI processes currently alive."""
+        return len(self._processes)
+
+    async def get_status(self, battery: Optional[str] = None,
+                         timeout: Optional[float] = None) -> CliResult:
+        """Get battery status without blocking the event loop.
+
+        Args:
+            battery: Battery to read (None for the default battery)
+            timeout: Deadline in seconds (defaults to the 'status' deadline)
+
+        Returns:
+            CliResult like CliInterface.get_status
+        """
+        if battery is None:
+            snapshot = self.cli.read_shared_status()
+            if snapshot is not None:
+                return CliResult.success(snapshot)
+
+        if self.cli.upower is not None:
+            # One short D-Bus call; run it off the loop
+            snapshot = await asyncio.get_running_loop().run_in_executor(
+                None, self.cli.read_upower_status, battery or self.cli.default_battery)
+            if snapshot is not None:
+                return CliResult.success(snapshot)
+
+        result = await self._run(['status'], battery, timeout or self.timeouts['status'])
+        if not result.success:
+            return result
+        try:
+            return CliResult.success(StatusParser.parse_status(result.output), output=result.output)
+        except ValueError as e:
+            return CliResult.error(f"Failed to parse CLI output: {e}")
+
+    async def set_threshold(self, threshold: int, batteries: Optional[List[str]] = None,
+                            timeout: Optional[float] = None) -> CliResult:
+        """Set battery charge threshold.
+
+        Args:
+            threshold: Threshold percentage (20-100)
+            batteries: Batteries to update (None for the default battery)
+            timeout: Deadline in seconds (defaults to the 'set' deadline)
+
+        Returns:
+            CliResult indicating success or failure
+        """
+        if not self.cli._validate_threshold(threshold):
+            return CliResult.error("Threshold must be between 20 and 100")
+        timeout = timeout or self.timeouts['set']
+
+        names = [self.cli.default_battery] if batteries is None else list(batteries)
+        engines = [self.cli.engine_for(name) for name in names]
+        if self.cli.use_threshold_engine and engines and all(e.is_writable() for e in engines):
+            # Direct sysfs writes finish in milliseconds; run them off the loop
+            return await self._in_executor(self.cli.set_threshold, threshold, batteries,
+                                           timeout=timeout)
+
+        if batteries is None:
+            return await self._run(['set', str(threshold)], None, timeout)
+        return await self._set_many_cli(threshold, engines, timeout)
+
+    async def persist_threshold(self, threshold: int,
+                                timeout: Optional[float] = None) -> CliResult:
+        """Set persistent battery charge threshold.
+
+        Args:
+            threshold: Threshold percentage (20-100)
+            timeout: Deadline in seconds (defaults to the 'persist' deadline)
+
+        Returns:
+            CliResult indicating success or failure
+        """
+        if not self.cli._validate_threshold(threshold):
+            return CliResult.error("Threshold must be between 20 and 100")
+        timeout = timeout or self.timeouts['persist']
+
+        engine = self.cli.threshold_engine
+        if engine and engine.is_writable() and self.cli.persist_state.units_installed():
+            return await self._in_executor(self.cli.persist_threshold, threshold, timeout=timeout)
+        return await self._run(['persist', str(threshold)], None, timeout)
+
+    async def clear_threshold(self, batteries: Optional[List[str]] = None,
+                              timeout: Optional[float] = None) -> CliResult:
+        """Clear battery charge threshold (reset to 100%).
+
+        Args:
+            batteries: Batteries to reset (None for the default battery)
+            timeout: Deadline in seconds (defaults to the 'clear' deadline)
+
+        Returns:
+            CliResult indicating success or failure
+        """
+        timeout = timeout or self.timeouts['clear']
+        if batteries is None:
+            return await self._run(['clear'], None, timeout)
+
+        others = [name for name in batteries if name != self.cli.default_battery]
+        errors = []
+        if len(others) < len(batteries):
+            result = await self._run(['clear'], None, timeout)
+            if not result.success:
+                errors.append(f"{self.cli.default_battery}: {result.error_message}")
+        if others:
+            result = await self.set_threshold(100, others, timeout)
+            if not result.success:
+                errors.append(result.error_message)
+        return CliResult.error("; ".join(errors)) if errors else CliResult.success()
+
+    def kill_all(self) -> int:
+        """Kill every running CLI process group (safe from any thread).
+
+        Returns:
+            Number of processes signalled
+        """
+        killed = 0
+        for process in list(self._processes):
+            if self._kill(process):
+                killed += 1
+        return killed
+
+    async def _set_many_cli(self, threshold: int, engines: list, timeout: float) -> CliResult:
+        """CLI fallback for several batteries, undone in reverse order on failure."""
+        applied = []
+        for engine in engines:
+            try:
+                previous = engine.read_threshold()
+            except (OSError, ValueError):
+                previous = None
+            result = await self._run(['set', str(threshold)], engine.battery, timeout)
+            if not result.success:
+                for battery, value in reversed(applied):
+                    if value is not None and value != threshold:
+                        await self._run(['set', str(value)], battery, timeout)
+                rolled_back = ", ".join(battery for battery, _ in applied)
+                message = f"{engine.battery}: {result.error_message}"
+                if rolled_back:
+                    message += f" (롤백: {rolled_back})"
+                return CliResult.error(message, exit_code=result.exit_code)
+            applied.append((engine.battery, previous))
+        return CliResult.success()
+
+    async def _run(self, args: List[str], battery: Optional[str], timeout: float) -> CliResult:
+        """Run the CLI with a deadline; cancellation kills the process group.
+
+        Args:
+            args: Command arguments (without CLI command name)
+            battery: Battery to operate on (None for the default battery)
+            timeout: Deadline in seconds, including time spent waiting for
+                a concurrency slot
+
+        Returns:
+            CliResult with the raw stdout in output on success
+        """
+        try:
+            return await asyncio.wait_for(self._run_limited(args, battery), timeout)
+        except asyncio.TimeoutError:
+            return CliResult.error(f"명령 실행 시간이 초과되었습니다. ({timeout:g}초)")
+
+    async def _run_limited(self, args: List[str], battery: Optional[str]) -> CliResult:
+        """Run the CLI once a concurrency slot is free."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    self.cli.CLI_COMMAND, *args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=self.cli._battery_env(battery or self.cli.default_battery),
+                    start_new_session=True  # own process group: kill takes children along
+                )
+            except FileNotFoundError:
+                return CliResult.error(f"{self.cli.CLI_COMMAND}을 찾을 수 없습니다.")
+
+            self.cli.count_spawn()
+            self._processes.add(process)
+            try:
+                stdout, stderr = await process.communicate()
+            except BaseException:
+                # Timeout or cancellation: do not leave the CLI (or upower) behind
+                self._kill(process)
+                await asyncio.shield(process.wait())  # Reap it (immediate after SIGKILL)
+                if args[0] != 'status':
+                    self.cli.note_threshold_write()  # It may have written before dying
+                raise
+            finally:
+                self._processes.discard(process)
+
+        if process.returncode == 0 and args[0] != 'status':
+            self.cli.note_threshold_write()
+        if process.returncode != 0:
+            error_msg = stderr.decode(errors='replace').strip() or "명령 실행에 실패했습니다."
+            return CliResult.error(f"오류: {error_msg}", exit_code=process.returncode)
+        return CliResult.success(output=stdout.decode(errors='replace'))
+
+    async def _in_executor(self, func, *args, timeout: float) -> CliResult:
+        """Run a short blocking call in the default executor with a deadline."""
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(loop.run_in_executor(None, func, *args), timeout)
+        except asyncio.TimeoutError:
+            return CliResult.error(f"명령 실행 시간이 초과되었습니다. ({timeout:g}초)")
+
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process) -> bool:
+        """SIGKILL a CLI process group (True if it was still running)."""
+        if process.returncode is not None:
+            return False
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            try:
+                process.kill()
+            except ProcessLookupError:
+                return False
+        return True
@@ -0,0 +1,264 @@
+"""Append-only journal of previous threshold values.
+
+Replaces the one-file-per-set ``threshold_backup_<epoch>`` scheme with a
+single file of fixed-size text records shared with the bash CLI::
+
+    <12-digit epoch> <device, 14 chars> <value, 3 chars>\\n
+
+Because every record is exactly RECORD_SIZE bytes, the record count is
+``file size // RECORD_SIZE`` and the last value is one positioned read:
+both are O(1) regardless of how many backups were taken. Retention is
+enforced by compaction, which rewrites the newest ``max_records`` records
+once the journal has grown to twice that size. Compaction rewrites the
+file through a per-process temporary file while holding the lock shared
+with the CLI, so it never races the CLI's own compaction.
+"""
+
+import fcntl
+import os
+import re
+import time
+from typing import Iterator, List, NamedTuple, Optional
+
+
+BACKUP_DIR = "/var/lib/a14-charge-keeper"
+JOURNAL_NAME = "threshold_journal"
+LOCK_FILE = "/var/lock/a14-charge-keeper.lock"
+LEGACY_BACKUP_PREFIX = "threshold_backup_"
+
+RECORD_SIZE = 32
+DEVICE_WIDTH = 14
+LEGACY_NAME_PATTERN = re.compile(r'^threshold_backup_(\d+)$')
+LEGACY_VALUE_PATTERN = re.compile(r'^[0-9]+$')
+
+
+class BackupRecord(NamedTuple):
+    """Single journal entry."""
+    timestamp: int
+    device: str
+    value: int
+
+    def encode(self) -> bytes:
+        """Encode record into its fixed-size on-disk form."""
+        device = self.device[:DEVICE_WIDTH]
+        line = f"{self.timestamp:012d} {device:<{DEVICE_WIDTH}} {self.value:3d}\n"
+        return line.encode('ascii')
+
+    @classmethod
+    def decode(cls, raw: bytes) -> Optional['BackupRecord']:
+        """Decode a fixed-size record (None if damaged)."""
+        if len(raw) != RECORD_SIZE or not raw.endswith(b"\n"):
+            return None
+        try:
+            text = raw.decode('ascii')
+            return cls(int(text[:12]), text[13:13 + DEVICE_WIDTH].rstrip(),
+                       int(text[14 + DEVICE_WIDTH:RECORD_SIZE - 1]))
+        except ValueError:
+            return None
+
+
+class BackupJournal:
+    """Fixed-record backup journal with count-based retention."""
+
+    def __init__(self, path: Optional[str] = None, max_records: int = 1000,
+                 lock_file: Optional[str] = LOCK_FILE):
+        """Initialize backup journal.
+
+        Args:
+            path: Journal file (defaults to the CLI's journal location)
+            max_records: Records kept after compaction (retention policy)
+            lock_file: Lock shared with the CLI, held while compacting. None
+                when the caller already holds it (the threshold engine
+                writes under its own lock, and flock would deadlock on a
+                second descriptor)
+
+        Raises:
+            ValueError: If max_records is not positive
+        """
+        if max_records <= 0:
+            raise ValueError("max_records must be positive")
+        self.path = path or os.path.join(BACKUP_DIR, JOURNAL_NAME)
+        self.max_records = max_records
+        self.lock_file = lock_file
+
+    def count(self) -> int:
+        """Number of records in the journal (O(1))."""
+        try:
+            return os.stat(self.path).st_size // RECORD_SIZE
+        except FileNotFoundError:
+            return 0
+
+    def last(self) -> Optional[BackupRecord]:
+        """Most recent record (O(1)), or None if the journal is empty."""
+        count = self.count()
+        if count == 0:
+            return None
+        with open(self.path, 'rb') as f:
+            f.seek((count - 1) * RECORD_SIZE)
+            return BackupRecord.decode(f.read(RECORD_SIZE))
+
+    def last_value(self, device: Optional[str] = None) -> Optional[int]:
+        """Most recent backed-up value, optionally for a specific device.
+
+        The unfiltered lookup is O(1); a device filter scans backwards from
+        the end and stops at the first match.
+        """
+        if device is None:
+            record = self.last()
+            return record.value if record else None
+        for record in self._iter_reverse():
+            if record.device == device[:DEVICE_WIDTH]:
+                return record.value
+        return None
+
+    def append(self, device: str, value: int, timestamp: Optional[int] = None) -> BackupRecord:
+        """Append a record and apply retention.
+
+        Args:
+            device: Battery device name
+            value: Threshold value being backed up
+            timestamp: Epoch seconds (defaults to now)
+
+        Returns:
+            The appended record
+
+        Raises:
+            OSError: If the journal cannot be written
+        """
+        record = BackupRecord(int(time.time()) if timestamp is None else int(timestamp),
+                              device, int(value))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # One O_APPEND write per record keeps concurrent appends whole
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, record.encode())
+        finally:
+            os.close(fd)
+
+        if self.count() >= 2 * self.max_records:
+            self.compact()
+        return record
+
+    def records(self) -> Iterator[BackupRecord]:
+        """Iterate over records from oldest to newest."""
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            while True:
+                raw = f.read(RECORD_SIZE)
+                if len(raw) < RECORD_SIZE:
+                    return
+                record = BackupRecord.decode(raw)
+                if record:
+                    yield record
+
+    def compact(self, keep: Optional[int] = None) -> int:
+        """Rewrite the journal keeping only the newest records.
+
+        Compaction is skipped (0 dropped) while another writer holds the
+        lock; the next append past the limit tries again.
+
+        Args:
+            keep: Number of records to keep (defaults to max_records)
+
+        Returns:
+            Number of records dropped
+        """
+        keep = self.max_records if keep is None else keep
+        if self.count() <= keep:
+            return 0
+
+        lock_fd = None
+        if self.lock_file:
+            lock_fd = os.open(self.lock_file, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(lock_fd)
+                return 0
+        try:
+            # Count again under the lock: the CLI may have compacted meanwhile
+            count = self.count()
+            if count <= keep:
+                return 0
+            with open(self.path, 'rb') as f:
+                f.seek((count - keep) * RECORD_SIZE)
+                tail = f.read(keep * RECORD_SIZE)
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(tail)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+            return count - keep
+        finally:
+            if lock_fd is not None:
+                os.close(lock_fd)
+
+    def migrate_legacy_files(self, directory: Optional[str] = None,
+                             device: str = "BAT0") -> int:
+        """Import old ``threshold_backup_<epoch>`` files and delete them.
+
+        Matches the CLI's migration: the first line must be a plain number;
+        files with any other content are deleted without being imported,
+        and unreadable files are left in place.
+
+        Args:
+            directory: Directory holding legacy backups (defaults to the
+                journal's directory)
+            device: Device name recorded for imported values
+
+        Returns:
+            Number of imported files
+        """
+        directory = directory or os.path.dirname(self.path) or "."
+        legacy: List[tuple] = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    match = LEGACY_NAME_PATTERN.match(entry.name)
+                    if match and entry.is_file():
+                        legacy.append((int(match.group(1)), entry.path))
+        except FileNotFoundError:
+            return 0
+
+        imported = 0
+        for timestamp, path in sorted(legacy):
+            try:
+                with open(path, errors='replace') as f:
+                    value = f.readline().strip()
+            except OSError:
+                continue
+            if LEGACY_VALUE_PATTERN.match(value):
+                self.append(device, int(value), timestamp=timestamp)
+                imported += 1
+            os.unlink(path)
+        return imported
+
+    def _iter_reverse(self, block_records: int = 128) -> Iterator[BackupRecord]:
+        """Iterate over records from newest to oldest, reading in blocks."""
+        count = self.count()
+        if count == 0:
+            return
+        with open(self.path, 'rb') as f:
+            end = count
+            while end > 0:
+                start = max(0, end - block_records)
+                f.seek(start * RECORD_SIZE)
+                block = f.read((end - start) * RECORD_SIZE)
+                for offset in range(len(block) - RECORD_SIZE, -1, -RECORD_SIZE):
+                    record = BackupRecord.decode(block[offset:offset + RECORD_SIZE])
+                    if record:
+                        yield record
+                end = start
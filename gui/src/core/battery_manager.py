@@ -1,11 +1,21 @@
 """Battery manager for handling business logic and state management."""
 
+import dataclasses
 import re
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Optional, Callable, Any, Dict
+from typing import Optional, Callable, Any, Deque, Dict, Iterable, List, Set
+from src.core.charge_estimator import ChargeEstimator
 from src.core.cli_interface import CliInterface, CliResult
+from src.core.command_queue import AppliedCommand, CommandQueue
+from src.core.drift_monitor import DriftMonitor, DriftRecord
+from src.core.energy_ledger import EnergyLedger
+from src.core.hysteresis import HysteresisController
+from src.core.power_supply_scanner import UeventMonitor
+from src.core.sample_log import UPowerHistoryImporter, upower_history_id
 from src.core.status_parser import StatusParser
+from src.core.snapshots import BatteryInfoSnapshot, BatteryEventSnapshot
 
 
 @dataclass
@@ -37,6 +47,10 @@ class BatteryInfo:
     # Time estimates
     time_to_empty: Optional[str] = None
     time_to_full: Optional[str] = None
+    # Learned estimates in seconds (ChargeEstimator): to end_threshold, and
+    # to empty at the smoothed discharge rate
+    time_to_limit: Optional[float] = None
+    time_to_empty_estimate: Optional[float] = None
     
     @classmethod
     def from_cli_output(cls, output: str) -> 'BatteryInfo':
@@ -129,6 +143,14 @@ class BatteryInfo:
             return (self.energy_full / self.energy_full_design) * 100
         return None
     
+    def to_snapshot(self) -> BatteryInfoSnapshot:
+        """Create immutable, compact snapshot of this battery info.
+        
+        Returns:
+            BatteryInfoSnapshot with the same field values
+        """
+        return BatteryInfoSnapshot.from_info(self)
+    
     def __str__(self) -> str:
         """String representation of battery info."""
         return f"BatteryInfo(device={self.device}, threshold={self.end_threshold}%, state={self.state})"
@@ -146,6 +168,10 @@ class BatteryEvent:
         if self.timestamp is None:
             self.timestamp = time.time()
     
+    def to_snapshot(self) -> BatteryEventSnapshot:
+        """Create immutable, compact snapshot of this event."""
+        return BatteryEventSnapshot.from_event(self)
+    
     def __str__(self) -> str:
         """String representation of event."""
         return f"BatteryEvent(type={self.event_type}, data={self.data})"
@@ -154,74 +180,249 @@ class BatteryEvent:
 class BatteryManager:
     """Business logic manager for battery operations and state management."""
     
-    def __init__(self, cli_interface: Optional[CliInterface] = None):
+    # Seconds between battery re-discoveries when uevents are unavailable
+    REDISCOVER_INTERVAL = 60
+    
+    # power_supply STATUS values mapped to upower state names
+    SYSFS_STATES = {
+        'Charging': 'charging',
+        'Discharging': 'discharging',
+        'Full': 'fully-charged',
+        'Not charging': 'pending-charge',
+    }
+    
+    def __init__(self, cli_interface: Optional[CliInterface] = None,
+                 status_writer: Optional[Any] = None):
         """Initialize battery manager.
         
         Args:
             cli_interface: CLI interface instance (creates new if None)
+            status_writer: Optional SharedStatusWriter that receives every
+                refreshed BatteryInfo (makes this manager the shared producer)
         """
         self.cli_interface = cli_interface or CliInterface()
+        self.command_queue = CommandQueue(self.cli_interface)
+        self.status_writer = status_writer
         self.current_info: Optional[BatteryInfo] = None
+        # All managed batteries keyed by device name; the primary one is current_info
+        self.batteries: Dict[str, BatteryInfo] = {}
+        self.battery_names: List[str] = []
+        self.primary_battery: Optional[str] = None
+        self._read_pool: Optional[ThreadPoolExecutor] = None
+        # Set by the uevent monitor when power_supply devices come or go
+        self._devices_changed = False
+        self._last_discovery = 0.0
+        self.uevent_monitor: Optional[UeventMonitor] = None
+        # UPower PropertiesChanged listener (D-Bus backend only)
+        self.upower_subscription: Optional[Any] = None
+        # Runs a call on the thread that owns the manager's state (a queued
+        # Qt signal in the tray, the monitor loop in headless mode); UPower
+        # deltas and uevent drift checks arrive on background threads and
+        # go through it. None runs them on the calling thread.
+        self.dispatcher: Optional[Callable[[Callable[[], None]], None]] = None
+        # Optional SampleLog receiving a sample per refresh (and UPower history)
+        self.sample_log: Optional[Any] = None
+        # Learned time-to-limit / time-to-empty estimators per battery
+        self.estimators: Dict[str, ChargeEstimator] = {}
+        # Energy in/out per day and per AC session, per battery
+        self.energy_ledgers: Dict[str, EnergyLedger] = {}
+        # Refresh statistics (exported as metrics)
+        self.refresh_count = 0
+        self.refresh_failures = 0
+        self.last_refresh_duration: Optional[float] = None  # seconds
+        self.last_refresh_time: Optional[float] = None  # epoch of last successful refresh
+        # Incremented on every change to battery information or the refresh
+        # statistics (lets the metrics exporter cache its output)
+        self.state_version = 0
+        # Suspend/resume state (driven by logind's PrepareForSleep)
+        self.suspended = False
+        self._suspended_at: Optional[float] = None
+        self._pre_sleep_thresholds: Dict[str, int] = {}
+        # Drift monitor: thresholds set through this manager override the
+        # persisted target; checks run on refreshes and 'change' uevents
+        self.drift = DriftMonitor()
+        # Threshold writes submitted by the manager itself (drift re-applies,
+        # start threshold toggles) that have not completed yet
+        self._pending_writes: Set[Future] = set()
+        # Software start thresholds (end threshold toggling) per battery
+        self.start_thresholds: Dict[str, HysteresisController] = {}
         self.is_initialized = False
         self.auto_refresh_enabled = False
         self._event_callbacks: list[Callable[[BatteryEvent], None]] = []
     
+    @property
+    def drift_correction_enabled(self) -> bool:
+        """Whether drifted thresholds are re-applied (see DriftMonitor)."""
+        return self.drift.enabled
+    
+    @drift_correction_enabled.setter
+    def drift_correction_enabled(self, enabled: bool) -> None:
+        self.drift.enabled = enabled
+    
+    @property
+    def drift_log(self) -> Deque[DriftRecord]:
+        """Most recent drift records."""
+        return self.drift.log
+    
     def initialize(self) -> CliResult:
         """Initialize battery manager by fetching current status.
         
         Returns:
             CliResult indicating initialization success or failure
         """
-        result = self.cli_interface.get_status()
+        self.discover_batteries()
+        self.start_watchers()
+        return self.apply_initial_results(self._read_batteries())
+    
+    def discover_batteries(self) -> List[str]:
+        """Discover batteries with charge threshold support.
+        
+        Uses the capability record (power_supply devices of type Battery),
+        which is re-probed only when the power_supply layout changed.
+        
+        Returns:
+            Managed battery names, primary battery first
+        """
+        primary = getattr(self.cli_interface, 'default_battery', None) or 'BAT0'
+        probe = getattr(self.cli_interface, 'capability_probe', None)
+        if probe is not None and self.uevent_monitor is None:
+            probe.scanner.invalidate()
+        try:
+            supported = list(self.cli_interface.get_capabilities(refresh=True).end_supported)
+        except (AttributeError, OSError) as e:
+            print(f"Battery discovery failed: {e}")
+            supported = []
+        
+        self._last_discovery = time.monotonic()
+        self.primary_battery = primary
+        self.battery_names = [primary] + [name for name in supported if name != primary]
+        for name in list(self.batteries):
+            if name not in self.battery_names:
+                del self.batteries[name]
+        self.state_version += 1
+        return list(self.battery_names)
+    
+    def refresh_status(self) -> CliResult:
+        """Refresh current battery status from CLI.
+        
+        Returns:
+            CliResult indicating refresh success or failure
+        """
+        if not self.is_initialized:
+            return CliResult.error("Manager not initialized")
+        
+        self.rediscover_if_needed()
+        started = time.monotonic()
+        return self.apply_refresh_results(self._read_batteries(), started)
+    
+    def rediscover_if_needed(self) -> None:
+        """Re-discover batteries after a hotplug (or periodically without uevents)."""
+        if self._devices_changed or (self.uevent_monitor is None and
+                                     time.monotonic() - self._last_discovery > self.REDISCOVER_INTERVAL):
+            self._devices_changed = False
+            self.discover_batteries()
+    
+    def apply_initial_results(self, results: Dict[str, CliResult]) -> CliResult:
+        """Store the first read results and mark the manager initialized.
+        
+        Args:
+            results: CliResult per battery name
+            
+        Returns:
+            CliResult indicating initialization success or failure
+        """
+        result = results[self.primary_battery]
         
         if not result.success:
             return CliResult.error(f"Failed to initialize: {result.error_message}")
         
         # Convert to extended battery info
         try:
-            self.current_info = self._create_battery_info_from_result(result)
+            self._store_results(results)
             self.is_initialized = True
-            return CliResult.success()
         except Exception as e:
             return CliResult.error(f"Failed to process battery info: {e}")
+        
+        self.check_drift({name: info.end_threshold for name, info in self.batteries.items()})
+        self._record_samples()
+        return CliResult.success()
     
-    def refresh_status(self) -> CliResult:
-        """Refresh current battery status from CLI.
+    def apply_refresh_results(self, results: Dict[str, CliResult],
+                               started: Optional[float] = None) -> CliResult:
+        """Store refreshed read results and emit change events.
+        
+        Shared by the blocking refresh and the asyncio manager, which reads
+        without blocking and applies the results on the caller's thread.
         
+        Args:
+            results: CliResult per battery name
+            started: time.monotonic() when the reads began (records the
+                refresh latency)
+            
         Returns:
             CliResult indicating refresh success or failure
         """
-        if not self.is_initialized:
-            return CliResult.error("Manager not initialized")
-        
-        result = self.cli_interface.get_status()
+        result = results[self.primary_battery]
         
+        self.refresh_count += 1
+        self.state_version += 1
+        if started is not None:
+            self.last_refresh_duration = time.monotonic() - started
         if not result.success:
+            self.refresh_failures += 1
             return CliResult.error(f"Failed to refresh status: {result.error_message}")
+        self.last_refresh_time = time.time()
         
         # Store old values for change detection
-        old_threshold = self.current_info.end_threshold if self.current_info else None
+        old_thresholds = {name: info.end_threshold for name, info in self.batteries.items()}
         
-        # Update current info
-        self.current_info = self._create_battery_info_from_result(result)
+        # Update battery infos
+        self._store_results(results)
         
         # Trigger events for changes
-        if old_threshold and old_threshold != self.current_info.end_threshold:
-            self._trigger_event(BatteryEvent(
-                event_type="threshold_changed",
-                data={
-                    "old_threshold": old_threshold,
-                    "new_threshold": self.current_info.end_threshold
-                }
-            ))
+        for name, info in self.batteries.items():
+            old_threshold = old_thresholds.get(name)
+            if old_threshold and old_threshold != info.end_threshold:
+                self._trigger_event(BatteryEvent(
+                    event_type="threshold_changed",
+                    data={
+                        "device": name,
+                        "old_threshold": old_threshold,
+                        "new_threshold": info.end_threshold
+                    }
+                ))
         
+        self.check_drift({name: info.end_threshold for name, info in self.batteries.items()})
+        self._record_samples()
         return CliResult.success()
     
-    def set_threshold(self, threshold: int) -> CliResult:
+    def import_history(self, max_lines: Optional[int] = None) -> int:
+        """Import UPower's on-disk history into the sample log.
+        
+        Resumes where the previous import stopped, so repeated calls only
+        read what UPower added since.
+        
+        Args:
+            max_lines: Stop after this many history lines (None for all)
+            
+        Returns:
+            Number of samples imported (0 without a sample log)
+        """
+        if self.sample_log is None:
+            return 0
+        imported = UPowerHistoryImporter(self.sample_log).import_all(self._history_device, max_lines)
+        # Fold the log into the summary here rather than on the first dialog open
+        if self.primary_battery is not None:
+            self.sample_log.summary(self.primary_battery)
+        return imported
+    
+    def set_threshold(self, threshold: int, batteries: Optional[Iterable[str]] = None) -> CliResult:
         """Set battery charge threshold with validation.
         
         Args:
             threshold: Threshold percentage (20-100)
+            batteries: Batteries to update (None for all managed batteries);
+                if one fails, the others are rolled back
             
         Returns:
             CliResult indicating success or failure
@@ -232,7 +433,13 @@ class BatteryManager:
         if not isinstance(threshold, int) or threshold < 20 or threshold > 100:
             return CliResult.error("Threshold must be between 20 and 100")
         
-        result = self.cli_interface.set_threshold(threshold)
+        selection = self.selection(batteries)
+        previous = self.begin_write(threshold, selection)
+        result = None
+        try:
+            result = self.command_queue.execute('set', threshold, batteries=selection)
+        finally:
+            self.end_write(threshold, previous, result)
         
         if result.success:
             # Refresh status to get updated information
@@ -255,7 +462,12 @@ class BatteryManager:
         if not isinstance(threshold, int) or threshold < 20 or threshold > 100:
             return CliResult.error("Threshold must be between 20 and 100")
         
-        result = self.cli_interface.persist_threshold(threshold)
+        previous = self.begin_write(threshold, None)
+        result = None
+        try:
+            result = self.command_queue.execute('persist', threshold)
+        finally:
+            self.end_write(threshold, previous, result)
         
         if result.success:
             # Refresh status to get updated information
@@ -263,16 +475,26 @@ class BatteryManager:
         
         return result
     
-    def clear_threshold(self) -> CliResult:
+    def clear_threshold(self, batteries: Optional[Iterable[str]] = None) -> CliResult:
         """Clear battery charge threshold (reset to 100%).
         
+        Args:
+            batteries: Batteries to reset (None for all managed batteries)
+        
         Returns:
             CliResult indicating success or failure
         """
         if not self.is_initialized:
             return CliResult.error("Manager not initialized")
         
-        result = self.cli_interface.clear_threshold()
+        self.disable_start_threshold(batteries, restore=False)
+        selection = self.selection(batteries)
+        previous = self.begin_write(100, selection)
+        result = None
+        try:
+            result = self.command_queue.execute('clear', batteries=selection)
+        finally:
+            self.end_write(100, previous, result)
         
         if result.success:
             # Refresh status to get updated information
@@ -280,6 +502,273 @@ class BatteryManager:
         
         return result
     
+    def prepare_for_sleep(self, sleeping: bool) -> None:
+        """Track logind's PrepareForSleep signal.
+        
+        Before suspend the current thresholds are remembered so that
+        verify_thresholds() can detect values lost during sleep.
+        
+        Args:
+            sleeping: True before suspend, False after resume
+        """
+        if sleeping:
+            if self.suspended:
+                return
+            self.suspended = True
+            self._suspended_at = time.time()
+            self._pre_sleep_thresholds = {name: info.end_threshold
+                                          for name, info in self.batteries.items()}
+            self._trigger_event(BatteryEvent(
+                event_type="suspending",
+                data={"thresholds": dict(self._pre_sleep_thresholds)}
+            ))
+            return
+        
+        if not self.suspended:
+            return
+        self.suspended = False
+        slept = time.time() - self._suspended_at if self._suspended_at else None
+        self._trigger_event(BatteryEvent(
+            event_type="resumed",
+            data={"slept_seconds": round(slept, 1) if slept is not None else None}
+        ))
+    
+    def quick_refresh(self) -> CliResult:
+        """Update threshold, percentage and state straight from sysfs.
+        
+        Needs no CLI run and no upower (which is often slow right after
+        resume): one uevent read and one threshold read per battery. Used
+        as the prioritized refresh after resume; the next full refresh
+        fills in the remaining fields.
+        
+        Returns:
+            CliResult indicating success or failure
+        """
+        probe = getattr(self.cli_interface, 'capability_probe', None)
+        if not self.is_initialized or probe is None:
+            return CliResult.error("Quick refresh unavailable")
+        
+        for name, info in list(self.batteries.items()):
+            properties = probe.scanner.read_uevent(name)
+            if not properties:
+                continue
+            try:
+                end_threshold = self.cli_interface.engine_for(name).read_threshold()
+            except (OSError, ValueError):
+                end_threshold = info.end_threshold
+            capacity = properties.get('POWER_SUPPLY_CAPACITY')
+            status = properties.get('POWER_SUPPLY_STATUS')
+            updated = dataclasses.replace(
+                info,
+                end_threshold=end_threshold,
+                percentage=int(capacity) if capacity and capacity.isdigit() else info.percentage,
+                state=self.SYSFS_STATES.get(status, info.state),
+                # energy_rate is not read here; the next full refresh re-estimates
+                time_to_limit=None,
+                time_to_empty_estimate=None
+            )
+            self._run_start_threshold(name, updated)
+            
+            self._store_info(name, updated)
+            if end_threshold != info.end_threshold:
+                self._trigger_event(BatteryEvent(
+                    event_type="threshold_changed",
+                    data={
+                        "device": name,
+                        "old_threshold": info.end_threshold,
+                        "new_threshold": end_threshold
+                    }
+                ))
+        
+        self.check_drift({name: info.end_threshold for name, info in self.batteries.items()})
+        return CliResult.success()
+    
+    def verify_thresholds(self) -> Dict[str, int]:
+        """Compare thresholds after resume with what they should be.
+        
+        The expected value is the persisted threshold for its device when
+        the boot/sleep units are installed (the sleep hook re-applies it),
+        otherwise the value before suspend. Thresholds are read from sysfs,
+        not through the CLI.
+        
+        Returns:
+            Expected threshold per battery whose threshold was lost
+        """
+        expected = dict(self._pre_sleep_thresholds)
+        persist_state = getattr(self.cli_interface, 'persist_state', None)
+        if persist_state is not None and persist_state.units_installed():
+            persisted = persist_state.read()
+            if persisted is not None and persisted.device in self.batteries:
+                expected[persisted.device] = persisted.threshold
+        
+        lost = {}
+        for name, threshold in expected.items():
+            if name not in self.batteries:
+                continue
+            try:
+                actual = self.cli_interface.engine_for(name).read_threshold()
+            except (OSError, ValueError):
+                continue
+            if actual != threshold:
+                lost[name] = threshold
+                self._trigger_event(BatteryEvent(
+                    event_type="threshold_lost",
+                    data={"device": name, "actual": actual, "expected": threshold}
+                ))
+        return lost
+    
+    def drift_targets(self) -> Dict[str, int]:
+        """Threshold each battery should have.
+        
+        The persisted threshold is the target for its device; a threshold
+        set through this manager since then takes precedence.
+        
+        Returns:
+            Target threshold per managed battery (only batteries with a target)
+        """
+        targets = {}
+        persist_state = getattr(self.cli_interface, 'persist_state', None)
+        persisted = persist_state.read() if persist_state is not None else None
+        if persisted is not None:
+            targets[persisted.device] = persisted.threshold
+        targets.update(self.drift.targets())
+        return {name: value for name, value in targets.items() if name in self.batteries}
+    
+    def check_drift(self, observed: Optional[Dict[str, int]] = None) -> List[DriftRecord]:
+        """Detect thresholds that drifted from their target and re-apply them.
+        
+        Called after every refresh with the values just read, and on
+        power_supply 'change' uevents (AC plug, firmware events) with values
+        read from sysfs, so drift is caught without extra polling. The
+        DriftMonitor decides (and rate limits) re-applies; they are queued
+        on the command worker, so the owning thread never blocks on a write.
+        Uevent checks are dispatched to the owning thread like refreshes.
+        
+        Args:
+            observed: Current threshold per battery (None reads sysfs)
+            
+        Returns:
+            Drift records created by this check
+        """
+        if not self.drift.enabled or self.suspended or not self.is_initialized:
+            return []
+        targets = self.drift_targets()
+        if not targets or self.drift.writes_in_flight:
+            return []
+        
+        if observed is None:
+            observed = {name: self._read_sysfs_threshold(name) for name in targets}
+        records = self.drift.check(observed, targets, self._journal_state(), self._lock_busy())
+        for record in records:
+            if record.action == "queued":
+                self._submit_write(record.device, record.target)
+            print(f"Threshold drift on {record.device}: {record.observed}% "
+                  f"(target {record.target}%) -> {record.action}")
+            self._trigger_event(BatteryEvent(
+                event_type="threshold_drift",
+                data=record._asdict(),
+                timestamp=record.timestamp
+            ))
+        return records
+    
+    def enable_start_threshold(self, start: int, end: Optional[int] = None,
+                               batteries: Optional[Iterable[str]] = None) -> CliResult:
+        """Emulate a start threshold by toggling the end threshold.
+        
+        For firmware with only an end threshold: charging stops at the end
+        threshold and resumes only once the charge has fallen to start.
+        Decisions are taken on the readings the manager already gets
+        (refreshes, UPower changes, quick refreshes), with a bounded number
+        of writes per hour (see HysteresisController).
+        
+        Args:
+            start: Charge level at which charging resumes
+            end: Charge limit (each battery's current target or threshold if None)
+            batteries: Batteries to control (None for all managed batteries)
+            
+        Returns:
+            CliResult indicating success or failure
+        """
+        if not self.is_initialized:
+            return CliResult.error("Manager not initialized")
+        
+        names = list(batteries) if batteries is not None else list(self.battery_names)
+        targets = self.drift_targets()
+        controllers = {}
+        for name in names:
+            info = self.batteries.get(name)
+            if info is None:
+                return CliResult.error(f"Unknown battery: {name}")
+            limit = end if end is not None else targets.get(name, info.end_threshold)
+            try:
+                controllers[name] = HysteresisController(start, limit)
+            except ValueError as e:
+                return CliResult.error(f"{name}: {e}")
+        
+        self.start_thresholds.update(controllers)
+        for name, controller in controllers.items():
+            self.drift.set_target(name, controller.end)
+        for name in controllers:
+            info = self.batteries[name]
+            self._run_start_threshold(name, info)
+            if name == self.primary_battery:
+                self._set_current_info(info)
+        return CliResult.success()
+    
+    def disable_start_threshold(self, batteries: Optional[Iterable[str]] = None,
+                                restore: bool = True) -> None:
+        """Stop start threshold emulation.
+        
+        Args:
+            batteries: Batteries to release (None for all)
+            restore: Write the end threshold back where it is held at start
+        """
+        names = list(batteries) if batteries is not None else list(self.start_thresholds)
+        for name in names:
+            controller = self.start_thresholds.pop(name, None)
+            if controller is None:
+                continue
+            self.drift.set_target(name, controller.end)
+            info = self.batteries.get(name)
+            if restore and info is not None and info.end_threshold != controller.end:
+                self._submit_write(name, controller.end)
+    
+    def _run_start_threshold(self, name: str, info: BatteryInfo) -> None:
+        """Feed a reading to the battery's start threshold controller.
+        
+        The controller's current bound becomes the drift target, so drift
+        correction and the emulation never work against each other. Readings
+        taken while a write of ours is in flight are skipped (not final yet).
+        
+        Args:
+            name: Battery name
+            info: Newly read battery information
+        """
+        controller = self.start_thresholds.get(name)
+        if controller is None or self.suspended or self.drift.writes_in_flight:
+            return
+        value = controller.observe(info.percentage, info.end_threshold, time.monotonic(),
+                                   charging=info.state == "charging")
+        self.drift.set_target(name, controller.target)
+        if value is None:
+            return
+        self._submit_write(name, value)
+        
+        print(f"Start threshold emulation on {name}: {info.percentage}% -> "
+              f"end threshold {value}% (queued)")
+        old_threshold = info.end_threshold
+        self._trigger_event(BatteryEvent(
+            event_type="start_threshold_toggled",
+            data={
+                "device": name,
+                "percentage": info.percentage,
+                "old_threshold": old_threshold,
+                "new_threshold": value,
+                "state": controller.state,
+                "action": "queued"
+            }
+        ))
+    
     def register_event_callback(self, callback: Callable[[BatteryEvent], None]) -> None:
         """Register callback for battery events.
         
@@ -301,6 +790,310 @@ class BatteryManager:
         """Disable automatic status refresh."""
         self.auto_refresh_enabled = False
     
+    def start_watchers(self) -> None:
+        """Start the uevent monitor and UPower updates (once; see initialize())."""
+        self._start_uevent_monitor()
+        self._start_upower_updates()
+    
+    def selection(self, batteries: Optional[Iterable[str]]) -> Optional[tuple]:
+        """Normalize a battery selection for the command queue.
+        
+        Returns:
+            Tuple of battery names, or None when only the primary battery
+            is affected (keeps the single-battery command path)
+        """
+        names = tuple(batteries) if batteries is not None else tuple(self.battery_names)
+        if not names or names == (self.primary_battery,):
+            return None
+        return names
+    
+    def begin_write(self, threshold: int, selection: Optional[tuple]) -> Dict[str, Optional[int]]:
+        """Make a threshold about to be written the drift target.
+        
+        Drift checks are held off until end_write(). Safe from any thread.
+        
+        Args:
+            threshold: Threshold being written
+            selection: Batteries from selection() (None for the primary)
+            
+        Returns:
+            Previous target per battery (None where there was none)
+        """
+        names = list(selection) if selection is not None else [self.primary_battery]
+        return self.drift.begin_write(threshold, names)
+    
+    def end_write(self, threshold: int, previous: Dict[str, Optional[int]],
+                  result: Optional[CliResult]) -> None:
+        """Settle the drift targets of a write started with begin_write().
+        
+        Call on the owning thread (directly after a blocking write, through
+        dispatch() from elsewhere): a new limit also moves start threshold
+        controllers. When a queued command was superseded, the result is
+        its successor's, so the successor's value (not the one this caller
+        asked for) is in effect and becomes the target.
+        
+        Args:
+            threshold: Threshold that was being written
+            previous: Targets returned by begin_write()
+            result: Command result (None if the write raised or was cancelled)
+        """
+        if result is None or not result.success:
+            self.drift.end_write(threshold, previous, None, self._journal_state())
+            return
+        applied = result.data
+        if isinstance(applied, AppliedCommand):
+            names = list(applied.batteries) if applied.batteries is not None else [self.primary_battery]
+            self._record_target(applied.threshold, names)
+        else:
+            self._record_target(threshold, list(previous))
+        self.drift.write_finished(self._journal_state())
+    
+    def wait_for_writes(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the manager's own queued writes have completed.
+        
+        Their completions are dispatched to the owning thread, so with a
+        dispatcher they are applied only once that thread runs them.
+        
+        Args:
+            timeout: Seconds to wait (None waits indefinitely)
+            
+        Returns:
+            True if no write is pending any more
+        """
+        _, pending = wait(list(self._pending_writes), timeout)
+        return not pending
+    
+    def dispatch(self, func: Callable[..., Any], *args: Any) -> None:
+        """Run a call from a background thread on the manager's owning thread.
+        
+        Uses the dispatcher; without one the call runs on the calling thread.
+        
+        Args:
+            func: Manager method to run
+            *args: Its arguments
+        """
+        if self.dispatcher is None:
+            func(*args)
+        else:
+            self.dispatcher(lambda: func(*args))
+    
+    def _start_uevent_monitor(self) -> None:
+        """Watch power_supply add/remove uevents to re-discover batteries.
+        
+        Without netlink access batteries are re-discovered (with a rescan)
+        every REDISCOVER_INTERVAL seconds instead.
+        """
+        probe = getattr(self.cli_interface, 'capability_probe', None)
+        if probe is None or self.uevent_monitor is not None:
+            return
+        
+        def on_change(action: str, name: str) -> None:
+            self._devices_changed = True
+        
+        def on_values_changed(name: str) -> None:
+            # AC plug and firmware events may reset thresholds
+            self.dispatch(self.check_drift)
+        
+        monitor = UeventMonitor(probe.scanner, on_change=on_change,
+                                on_values_changed=on_values_changed)
+        if monitor.start():
+            self.uevent_monitor = monitor
+    
+    def _record_target(self, threshold: int, batteries: Optional[Iterable[str]]) -> None:
+        """Remember a threshold set through this manager as the drift target.
+        
+        Args:
+            threshold: Threshold that was applied
+            batteries: Batteries it was applied to (None for all)
+        """
+        names = list(batteries) if batteries is not None else list(self.battery_names)
+        self.drift.record_target(threshold, names)
+        for name in names:
+            # A new limit moves the emulated window's upper bound
+            controller = self.start_thresholds.get(name)
+            if controller is not None:
+                if threshold > controller.start:
+                    controller.retarget(threshold)
+                else:
+                    del self.start_thresholds[name]
+    
+    def _journal_state(self) -> Optional[tuple]:
+        """Size and last record of the threshold backup journal.
+        
+        Every threshold write (CLI or engine) appends to the journal, so a
+        change not made by us shows up here.
+        
+        Returns:
+            (count, last record), or None without a journal
+        """
+        try:
+            journal = getattr(self.cli_interface.engine_for(self.primary_battery), 'journal', None)
+            if journal is None:
+                return None
+            return journal.count(), journal.last()
+        except (AttributeError, OSError):
+            return None
+    
+    def _lock_busy(self) -> bool:
+        """Whether another writer holds the lock shared with the CLI."""
+        try:
+            return self.cli_interface.engine_for(self.primary_battery).lock_busy()
+        except (AttributeError, OSError):
+            return False
+    
+    def _read_sysfs_threshold(self, name: str) -> Optional[int]:
+        """Read a battery's end threshold directly (None if unreadable)."""
+        try:
+            return self.cli_interface.engine_for(name).read_threshold()
+        except (AttributeError, OSError, ValueError):
+            return None
+    
+    def _submit_write(self, name: str, value: int) -> Future:
+        """Queue an end threshold write of the manager's own on the command worker.
+        
+        Used for drift re-applies and start threshold toggles. The command
+        uses the threshold engine's direct sysfs write when possible; its
+        completion is dispatched back to the owning thread, which then
+        updates the battery's info. Drift checks are held off until then.
+        
+        Args:
+            name: Battery name
+            value: End threshold to write
+            
+        Returns:
+            Future of the command (see wait_for_writes)
+        """
+        self.drift.write_started()
+        try:
+            future = self.command_queue.submit(
+                'set', value, batteries=None if name == self.primary_battery else (name,))
+        except BaseException:
+            self.drift.write_finished(self._journal_state())
+            raise
+        self._pending_writes.add(future)
+        
+        def done(completed: Future) -> None:
+            self._pending_writes.discard(completed)
+            self.dispatch(self._write_completed, name, value, completed)
+        
+        future.add_done_callback(done)
+        return future
+    
+    def _write_completed(self, name: str, value: int, future: Future) -> None:
+        """Apply the outcome of a write from _submit_write() (owning thread).
+        
+        Args:
+            name: Battery that was written
+            value: Threshold that was written
+            future: Completed command future
+        """
+        result = None if future.cancelled() or future.exception() else future.result()
+        self.drift.write_finished(self._journal_state())
+        if result is None or not result.success:
+            reason = result.error_message if result is not None else "cancelled or raised"
+            print(f"Threshold write failed on {name}: {reason}")
+            return
+        applied = result.data
+        if isinstance(applied, AppliedCommand) and applied.threshold is not None:
+            value = applied.threshold  # A superseding command's value is in effect
+        info = self.batteries.get(name)
+        if info is not None and info.end_threshold != value:
+            self._store_info(name, dataclasses.replace(info, end_threshold=value))
+    
+    def _start_upower_updates(self) -> None:
+        """Apply UPower PropertiesChanged deltas as they arrive.
+        
+        Percentage, energy, rate and state then stay current between
+        refreshes without reading anything.
+        """
+        upower = getattr(self.cli_interface, 'upower', None)
+        if upower is None or self.upower_subscription is not None:
+            return
+        self.upower_subscription = upower.subscribe(
+            lambda name, fields: self.dispatch(self._apply_upower_changes, name, fields))
+    
+    def _apply_upower_changes(self, name: str, fields: Dict[str, Any]) -> None:
+        """Merge changed UPower properties into a battery's info.
+        
+        Runs on the owning thread (dispatched from the subscription thread).
+        
+        Args:
+            name: Battery name
+            fields: Changed BatteryInfo fields
+        """
+        info = self.batteries.get(name)
+        if info is None or not self.is_initialized:
+            return
+        updated = self._observe(name, dataclasses.replace(info, **fields))
+        self._store_info(name, updated)
+        self._trigger_event(BatteryEvent(
+            event_type="battery_updated",
+            data={"device": name, **fields}
+        ))
+    
+    def _record_samples(self) -> None:
+        """Append the refreshed readings to the sample log."""
+        if self.sample_log is None:
+            return
+        for name, info in self.batteries.items():
+            self.sample_log.record(name, info.percentage, info.energy_rate, info.state,
+                                   energy_full=info.energy_full)
+    
+    def _history_device(self, history_id: str) -> Optional[str]:
+        """Map a UPower history device id to a managed battery.
+        
+        UPower names history files after model, design capacity and serial;
+        an exact match is preferred, then a match on the model alone (the
+        rounded capacity can differ). Other devices (mice, replaced
+        batteries) map to None.
+        """
+        for name, info in self.batteries.items():
+            if upower_history_id(info.model, info.energy_full_design, info.serial) == history_id:
+                return name
+        for name, info in self.batteries.items():
+            model = upower_history_id(info.model, None, None)
+            if info.model and (history_id == model or history_id.startswith(f"{model}-")):
+                return name
+        return None
+    
+    def _read_batteries(self) -> Dict[str, CliResult]:
+        """Read all managed batteries concurrently.
+        
+        The primary battery is read through the default path (shared status
+        or CLI), the others with an explicit battery name. Reads run in
+        parallel, so refresh time stays close to that of a single read.
+        
+        Returns:
+            CliResult per battery name
+        """
+        names = self.battery_names or [self.primary_battery]
+        
+        def read(name: str) -> CliResult:
+            if name == self.primary_battery:
+                return self.cli_interface.get_status()
+            return self.cli_interface.get_status(name)
+        
+        if len(names) == 1:
+            return {names[0]: read(names[0])}
+        
+        if self._read_pool is None:
+            self._read_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="BatteryRead")
+        return dict(zip(names, self._read_pool.map(read, names)))
+    
+    def _store_results(self, results: Dict[str, CliResult]) -> None:
+        """Convert read results into BatteryInfo objects.
+        
+        Batteries whose read failed keep their previous information.
+        
+        Args:
+            results: CliResult per battery name (primary must be successful)
+        """
+        for name, result in results.items():
+            if name == self.primary_battery or result.success:
+                self._store_info(name, self._observe(name, self._create_battery_info_from_result(result)))
+            else:
+                print(f"Failed to read {name}: {result.error_message}")
+    
     def _create_battery_info_from_result(self, result: CliResult) -> BatteryInfo:
         """Create BatteryInfo from CLI result.
         
@@ -310,21 +1103,16 @@ class BatteryManager:
         Returns:
             BatteryInfo object with complete information
         """
-        # Get raw CLI output for full battery information parsing
-        try:
-            import subprocess
-            cli_result = subprocess.run(
-                ['a14-charge-keeper', 'status'],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if cli_result.returncode == 0:
-                # Use the full CLI output to get detailed battery info
-                return BatteryInfo.from_cli_output(cli_result.stdout)
-        except Exception as e:
-            print(f"Failed to get raw CLI output: {e}")
+        # Shared-memory snapshots already carry the full battery information
+        if isinstance(result.data, BatteryInfoSnapshot):
+            return BatteryInfo(**result.data._asdict())
+        
+        # Reuse the raw output of the status run instead of spawning it again
+        if result.output:
+            try:
+                return BatteryInfo.from_cli_output(result.output)
+            except ValueError as e:
+                print(f"Failed to parse raw CLI output: {e}")
         
         # Fallback to basic info from parsed status
         return BatteryInfo(
@@ -334,6 +1122,61 @@ class BatteryManager:
             backup_count=result.data.backup_count
         )
     
+    def _observe(self, name: str, info: BatteryInfo) -> BatteryInfo:
+        """Feed a reading to the battery's estimator and energy ledger.
+        
+        Fills in the learned estimates.
+        
+        Args:
+            name: Battery name
+            info: Newly read battery information (updated in place)
+            
+        Returns:
+            The same BatteryInfo
+        """
+        estimator = self.estimators.get(name)
+        if estimator is None:
+            estimator = self.estimators[name] = ChargeEstimator(name)
+        estimator.update(info)
+        info.time_to_limit = estimator.time_to_limit(info)
+        info.time_to_empty_estimate = estimator.time_to_empty(info)
+        ledger = self.energy_ledgers.get(name)
+        if ledger is None:
+            ledger = self.energy_ledgers[name] = EnergyLedger(name)
+        ledger.update(info)
+        self._run_start_threshold(name, info)
+        return info
+    
+    def _store_info(self, name: str, info: BatteryInfo) -> None:
+        """Store a battery's new information (current_info for the primary).
+        
+        Args:
+            name: Battery name
+            info: Newly read or updated battery information
+        """
+        if name == self.primary_battery:
+            self._set_current_info(info)
+        else:
+            self.batteries[name] = info
+            self.state_version += 1
+    
+    def _set_current_info(self, info: BatteryInfo) -> None:
+        """Store refreshed battery info and publish it to shared memory.
+        
+        Args:
+            info: Newly read battery information
+        """
+        self.current_info = info
+        self.state_version += 1
+        if self.primary_battery is not None:
+            self.batteries[self.primary_battery] = info
+        
+        if self.status_writer:
+            try:
+                self.status_writer.publish(info)
+            except (OSError, ValueError) as e:
+                print(f"Failed to publish shared status: {e}")
+    
     def _trigger_event(self, event: BatteryEvent) -> None:
         """Trigger event to all registered callbacks.
         
@@ -0,0 +1,279 @@
+"""Cached hardware capability probe and live conflict check.
+
+Probing batteries and their supported sysfs attributes walks the whole
+power_supply tree. The probe runs once and stores a capability record
+that the CLI and GUI reuse until its key changes. The key combines the
+kernel release, the DMI product name and a hash of the power_supply
+layout (device names and types), so a kernel update, a different machine
+or a docked battery triggers a fresh probe.
+
+Conflicting tools (an active TLP service, asusctl, auto-cpufreq) are not
+part of the record: they come and go independently of the key. They are
+kept in a separate file shared with the CLI and looked up again once it
+is older than CONFLICT_TTL seconds, so a threshold write spawns
+systemctl at most once a minute.
+
+The cache is a KEY=VALUE file that the bash CLI reads with builtins only;
+the layout hash is 32-bit FNV-1a so that bash can compute it without
+spawning a hashing tool.
+"""
+
+import os
+import shutil
+import subprocess
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from src.core.power_supply_scanner import PowerSupplyScanner
+
+
+SYSFS_ROOT = "/sys/class/power_supply"
+DMI_PRODUCT_FILE = "/sys/class/dmi/id/product_name"
+OSRELEASE_FILE = "/proc/sys/kernel/osrelease"
+SYSTEM_CACHE_FILE = "/var/cache/a14-charge-keeper/capabilities"
+CONFLICT_CACHE_FILE = "/var/cache/a14-charge-keeper/conflicts"
+# Seconds a conflict check is reused (matches the CLI's CONFLICT_TTL)
+CONFLICT_TTL = 60
+
+# Conflict cache key -> tool name
+CONFLICT_KEYS = (('TLP_ACTIVE', 'tlp'), ('ASUSCTL', 'asusctl'), ('AUTO_CPUFREQ', 'auto-cpufreq'))
+
+END_THRESHOLD_FILE = "charge_control_end_threshold"
+START_THRESHOLD_FILE = "charge_control_start_threshold"
+
+
+def fnv1a_32(text: str) -> int:
+    """32-bit FNV-1a hash (matches the CLI's bash implementation)."""
+    value = 0x811c9dc5
+    for char in text:
+        value ^= ord(char)
+        value = (value * 0x01000193) & 0xffffffff
+    return value
+
+
+def check_conflicts(cache_file: str = CONFLICT_CACHE_FILE, max_age: float = CONFLICT_TTL,
+                    now: Optional[float] = None) -> List[str]:
+    """Names of installed or running tools that may fight over the threshold.
+
+    A check younger than max_age seconds in the cache file (written by the
+    CLI or by this function when running as root) is reused; otherwise the
+    tools are looked up again, which spawns systemctl once.
+
+    Args:
+        cache_file: Conflict cache shared with the CLI
+        max_age: Seconds a cached check stays valid (0 to always check)
+        now: Current time (time.time() if None)
+
+    Returns:
+        Conflicting tool names, e.g. ['tlp']
+    """
+    now = time.time() if now is None else now
+    values = _read_values(cache_file)
+    try:
+        checked_at = int(values.get('CHECKED_AT', ''))
+    except ValueError:
+        checked_at = None
+    if checked_at is not None and 0 <= now - checked_at < max_age:
+        return [name for key, name in CONFLICT_KEYS if values.get(key) == '1']
+
+    found = {
+        'tlp': CapabilityProbe._service_active("tlp"),
+        'asusctl': shutil.which("asusctl") is not None,
+        'auto-cpufreq': shutil.which("auto-cpufreq") is not None,
+    }
+    if os.geteuid() == 0:
+        lines = [f"CHECKED_AT={int(now)}"] + [f"{key}={int(found[name])}" for key, name in CONFLICT_KEYS]
+        try:
+            _write_lines(cache_file, lines)
+        except OSError as e:
+            print(f"Warning: Could not write conflict cache: {e}")
+    return [name for _, name in CONFLICT_KEYS if found[name]]
+
+
+def _read_values(path: str) -> Dict[str, str]:
+    """Parse a KEY=VALUE cache file ({} if missing or unreadable)."""
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                key, sep, value = line.rstrip('\n').partition('=')
+                if sep:
+                    values[key] = value
+    except OSError:
+        pass
+    return values
+
+
+def _write_lines(path: str, lines: List[str]) -> None:
+    """Atomically replace a cache file with the given lines.
+
+    Raises:
+        OSError: If the file cannot be written
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+
+
+@dataclass
+class CapabilityRecord:
+    """Probed hardware capabilities."""
+    key: str
+    batteries: List[str] = field(default_factory=list)
+    end_supported: List[str] = field(default_factory=list)
+    start_supported: List[str] = field(default_factory=list)
+    probed_at: float = 0.0
+
+    def default_battery(self) -> Optional[str]:
+        """First battery with end threshold support, if any."""
+        return self.end_supported[0] if self.end_supported else None
+
+    def to_lines(self) -> List[str]:
+        """Serialize record into KEY=VALUE lines."""
+        return [
+            f"KEY={self.key}",
+            f"BATTERIES={' '.join(self.batteries)}",
+            f"END_SUPPORTED={' '.join(self.end_supported)}",
+            f"START_SUPPORTED={' '.join(self.start_supported)}",
+            f"PROBED_AT={int(self.probed_at)}",
+        ]
+
+    @classmethod
+    def from_values(cls, values: Dict[str, str]) -> 'CapabilityRecord':
+        """Build record from parsed KEY=VALUE pairs.
+
+        Raises:
+            KeyError: If the key is missing
+        """
+        return cls(
+            key=values['KEY'],
+            batteries=values.get('BATTERIES', '').split(),
+            end_supported=values.get('END_SUPPORTED', '').split(),
+            start_supported=values.get('START_SUPPORTED', '').split(),
+            probed_at=float(values.get('PROBED_AT') or 0),
+        )
+
+
+class CapabilityProbe:
+    """Computes the capability key and probes only when it changed."""
+
+    def __init__(self, sysfs_root: str = SYSFS_ROOT, cache_file: Optional[str] = None,
+                 dmi_product_file: str = DMI_PRODUCT_FILE,
+                 osrelease_file: str = OSRELEASE_FILE,
+                 scanner: Optional[PowerSupplyScanner] = None):
+        """Initialize capability probe.
+
+        Args:
+            sysfs_root: power_supply class directory
+            cache_file: Cache location (system cache when root, else XDG cache)
+            dmi_product_file: DMI product name attribute
+            osrelease_file: Kernel release file
+            scanner: Device index used for the layout (created if None);
+                while its index is valid, computing the key reads two files
+        """
+        self.sysfs_root = sysfs_root
+        self.scanner = scanner or PowerSupplyScanner(sysfs_root)
+        self.cache_file = cache_file or self._default_cache_file()
+        self.dmi_product_file = dmi_product_file
+        self.osrelease_file = osrelease_file
+        self._record: Optional[CapabilityRecord] = None
+
+    @staticmethod
+    def _default_cache_file() -> str:
+        """Pick the shared system cache for root, a per-user cache otherwise."""
+        if os.geteuid() == 0:
+            return SYSTEM_CACHE_FILE
+        cache_home = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+        return os.path.join(cache_home, 'a14-charge-keeper', 'capabilities')
+
+    def compute_key(self) -> str:
+        """Build the cache key from kernel, DMI product and layout hash."""
+        kernel = self._read_text(self.osrelease_file)
+        product = self._read_text(self.dmi_product_file)
+        return f"{kernel}|{product}|{fnv1a_32(self._layout()):08x}"
+
+    def get(self, force: bool = False) -> CapabilityRecord:
+        """Return capability record, probing only if the key changed.
+
+        Args:
+            force: Ignore cached record and probe again
+
+        Returns:
+            Current capability record
+        """
+        key = self.compute_key()
+        if not force:
+            if self._record and self._record.key == key:
+                return self._record
+            cached = self.load()
+            if cached and cached.key == key:
+                self._record = cached
+                return cached
+
+        record = self.probe(key)
+        try:
+            self.save(record)
+        except OSError as e:
+            print(f"Warning: Could not write capability cache: {e}")
+        self._record = record
+        return record
+
+    def probe(self, key: Optional[str] = None) -> CapabilityRecord:
+        """Probe batteries and their supported threshold attributes."""
+        record = CapabilityRecord(key=key or self.compute_key(), probed_at=time.time())
+        for name, device_type in self._devices():
+            if device_type != "Battery":
+                continue
+            record.batteries.append(name)
+            device_dir = os.path.join(self.sysfs_root, name)
+            if os.path.exists(os.path.join(device_dir, END_THRESHOLD_FILE)):
+                record.end_supported.append(name)
+            if os.path.exists(os.path.join(device_dir, START_THRESHOLD_FILE)):
+                record.start_supported.append(name)
+        return record
+
+    def load(self) -> Optional[CapabilityRecord]:
+        """Load cached record, or None if missing or unreadable."""
+        try:
+            return CapabilityRecord.from_values(_read_values(self.cache_file))
+        except (KeyError, ValueError):
+            return None
+
+    def save(self, record: CapabilityRecord) -> None:
+        """Atomically write record to the cache file.
+
+        Raises:
+            OSError: If the cache cannot be written
+        """
+        _write_lines(self.cache_file, record.to_lines())
+
+    def _devices(self) -> List[tuple]:
+        """List (name, type) of power_supply devices sorted by name."""
+        return [(device.name, device.type) for device in self.scanner.devices()]
+
+    def _layout(self) -> str:
+        """Layout signature hashed into the key ('name:type' joined by commas)."""
+        return ",".join(f"{name}:{device_type}" for name, device_type in self._devices())
+
+    @staticmethod
+    def _service_active(service: str) -> bool:
+        """Check whether a systemd service is active."""
+        try:
+            return subprocess.run(['systemctl', 'is-active', '--quiet', service],
+                                  stderr=subprocess.DEVNULL, timeout=5).returncode == 0
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+
+    @staticmethod
+    def _read_text(path: str) -> str:
+        """Read first line of a small text file ('' if unreadable)."""
+        try:
+            with open(path) as f:
+                return f.readline().strip()
+        except OSError:
+            return ""
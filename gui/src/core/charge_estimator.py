@@ -0,0 +1,211 @@
+"""Learned time-to-limit and time-to-empty estimates.
+
+upower's time to full assumes charging to 100%, so it overstates the time
+whenever a charge limit is set, and its time to empty follows the
+instantaneous rate. The estimator learns the pack's charge curve instead:
+the charge rate (percent of full energy per hour) is averaged per 2% band
+of charge, which captures the constant-current phase and the
+constant-voltage taper. Time to the configured limit is the sum over the
+bands still to be charged; time to empty divides the remaining energy by a
+smoothed discharge rate.
+
+Every refresh updates the estimator in O(1) from values already read (no
+extra reads); a prediction walks at most the 50 bands. Learned curves are
+saved per battery so estimates are good from the first charge after a
+restart.
+"""
+
+import json
+import math
+import os
+import time
+from typing import Any, List, Optional
+
+
+BAND_WIDTH = 2  # percent of charge per curve band
+BAND_COUNT = 100 // BAND_WIDTH
+
+
+def default_curve_file(device: str) -> str:
+    """Learned curve location under XDG_DATA_HOME."""
+    data_home = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    return os.path.join(data_home, 'a14-charge-keeper', f"charge-curve-{device}.json")
+
+
+class ChargeCurve:
+    """Charge rate per band of charge, learned incrementally."""
+
+    # Weight of a new observation once a band has this many samples; before
+    # that the band holds the plain mean, so early estimates settle quickly
+    MIN_ALPHA = 0.05
+
+    def __init__(self):
+        """Initialize an empty curve."""
+        self.rates: List[Optional[float]] = [None] * BAND_COUNT  # percent per hour
+        self.counts: List[int] = [0] * BAND_COUNT
+
+    @staticmethod
+    def band(percentage: float) -> int:
+        """Band index of a charge level."""
+        return min(max(int(percentage // BAND_WIDTH), 0), BAND_COUNT - 1)
+
+    def update(self, percentage: float, rate: float) -> None:
+        """Fold one observed charge rate into its band (O(1)).
+
+        Args:
+            percentage: Charge level
+            rate: Charge rate in percent per hour
+        """
+        index = self.band(percentage)
+        count = self.counts[index] + 1
+        self.counts[index] = count
+        current = self.rates[index]
+        if current is None:
+            self.rates[index] = rate
+        else:
+            self.rates[index] = current + max(1.0 / count, self.MIN_ALPHA) * (rate - current)
+
+    def seconds_between(self, start: float, end: float, fallback_rate: float,
+                        scale: float = 1.0) -> Optional[float]:
+        """Predicted charging time from one charge level to another.
+
+        Args:
+            start: Current charge level
+            end: Target charge level
+            fallback_rate: Rate (percent per hour) for bands not learned yet
+            scale: Factor applied to learned rates (charger and load differ
+                between charges)
+
+        Returns:
+            Seconds, or None without a usable rate
+        """
+        seconds = 0.0
+        level = start
+        while level < end:
+            index = self.band(level)
+            step = min((index + 1) * BAND_WIDTH, end) - level
+            learned = self.rates[index]
+            rate = learned * scale if learned is not None else fallback_rate
+            if not rate or rate <= 0:
+                return None
+            seconds += step / rate * 3600
+            level += step
+        return seconds
+
+    def to_dict(self) -> dict:
+        """Serializable form."""
+        return {"band_width": BAND_WIDTH, "rates": self.rates, "counts": self.counts}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ChargeCurve':
+        """Restore a saved curve (an empty one if the layout changed)."""
+        curve = cls()
+        if (data.get("band_width") == BAND_WIDTH and len(data.get("rates", ())) == BAND_COUNT
+                and len(data.get("counts", ())) == BAND_COUNT):
+            curve.rates = list(data["rates"])
+            curve.counts = list(data["counts"])
+        return curve
+
+
+class ChargeEstimator:
+    """Per-battery estimator fed by the refresh stream."""
+
+    # Time constant of the energy_rate smoothing (seconds)
+    SMOOTHING = 300.0
+    # Minimum seconds between saves of the learned curve
+    SAVE_INTERVAL = 600.0
+    # Bounds for scaling the learned curve to the current charge rate
+    SCALE_RANGE = (0.5, 2.0)
+
+    def __init__(self, device: str, curve_file: Optional[str] = None):
+        """Initialize estimator, loading the learned curve if present.
+
+        Args:
+            device: Battery name
+            curve_file: Learned curve location (XDG data directory if None)
+        """
+        self.device = device
+        self.curve_file = curve_file or default_curve_file(device)
+        self.curve = self._load_curve()
+        self.smoothed_rate: Optional[float] = None  # W
+        self._state: Optional[str] = None
+        self._last_update: Optional[float] = None
+        self._last_save = time.monotonic()
+        self._dirty = False
+
+    def update(self, info: Any, now: Optional[float] = None) -> None:
+        """Fold a fresh reading into the smoothed rate and the charge curve.
+
+        Args:
+            info: BatteryInfo just read
+            now: Reading time (time.monotonic() if None)
+        """
+        now = time.monotonic() if now is None else now
+        rate = info.energy_rate
+        if rate is None or info.state is None:
+            return
+
+        if info.state != self._state or self.smoothed_rate is None or self._last_update is None:
+            self.smoothed_rate = rate  # New phase: the old rate says nothing about it
+        else:
+            elapsed = max(now - self._last_update, 0.0)
+            alpha = 1.0 - math.exp(-elapsed / self.SMOOTHING)
+            self.smoothed_rate += alpha * (rate - self.smoothed_rate)
+        self._state = info.state
+        self._last_update = now
+
+        if info.state == "charging" and rate > 0 and info.energy_full and info.percentage is not None:
+            self.curve.update(info.percentage, rate / info.energy_full * 100)
+            self._dirty = True
+            if now - self._last_save >= self.SAVE_INTERVAL:
+                self.save()
+
+    def time_to_limit(self, info: Any) -> Optional[float]:
+        """Seconds until the charge reaches the end threshold.
+
+        Returns:
+            0 at or above the limit, None when not charging or without a rate
+        """
+        if info.percentage is None:
+            return None
+        if info.percentage >= info.end_threshold:
+            return 0.0
+        if info.state != "charging" or not self.smoothed_rate or not info.energy_full:
+            return None
+        current_rate = self.smoothed_rate / info.energy_full * 100
+        learned = self.curve.rates[self.curve.band(info.percentage)]
+        scale = 1.0
+        if learned:
+            scale = min(max(current_rate / learned, self.SCALE_RANGE[0]), self.SCALE_RANGE[1])
+        return self.curve.seconds_between(info.percentage, info.end_threshold, current_rate, scale)
+
+    def time_to_empty(self, info: Any) -> Optional[float]:
+        """Seconds until empty at the smoothed discharge rate (None unless discharging)."""
+        if info.state != "discharging" or not self.smoothed_rate or self.smoothed_rate <= 0:
+            return None
+        if info.energy_current is None:
+            return None
+        return info.energy_current / self.smoothed_rate * 3600
+
+    def save(self) -> None:
+        """Write the learned curve (errors are reported, not raised)."""
+        self._last_save = time.monotonic()
+        if not self._dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.curve_file), exist_ok=True)
+            tmp_path = f"{self.curve_file}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.curve.to_dict(), f)
+            os.replace(tmp_path, self.curve_file)
+            self._dirty = False
+        except OSError as e:
+            print(f"Failed to save charge curve: {e}")
+
+    def _load_curve(self) -> ChargeCurve:
+        """Load the saved curve (empty if missing or unreadable)."""
+        try:
+            with open(self.curve_file) as f:
+                return ChargeCurve.from_dict(json.load(f))
+        except (OSError, ValueError):
+            return ChargeCurve()
@@ -1,35 +1,37 @@
 """CLI interface for communicating with a14-charge-keeper command."""
 
+import functools
 import os
 import subprocess
-from dataclasses import dataclass
-from typing import Optional, Any
+import threading
+import time
+from typing import Optional, Any, Dict, List
 from src.core.status_parser import StatusParser, BatteryStatus
+from src.core.shared_status import SharedStatusReader, DEFAULT_PATH as SHARED_STATUS_PATH
+from src.core.persist_state import PersistState
+from src.core.capability_probe import CapabilityProbe, CapabilityRecord, check_conflicts
+from src.core.cli_result import CliResult
+from src.core.threshold_engine import ThresholdEngine, set_thresholds
+from src.core.upower_backend import UPowerBackend
 
 
-@dataclass
-class CliResult:
-    """Result from CLI command execution."""
-    success: bool
-    data: Optional[Any] = None
-    error_message: Optional[str] = None
-    
-    @classmethod
-    def success(cls, data: Any = None) -> 'CliResult':
-        """Create successful result."""
-        return cls(success=True, data=data)
-    
-    @classmethod  
-    def error(cls, message: str) -> 'CliResult':
-        """Create error result."""
-        return cls(success=False, error_message=message)
-    
-    def __str__(self) -> str:
-        """String representation of result."""
-        if self.success:
-            return f"SUCCESS: {self.data}"
-        else:
-            return f"ERROR: {self.error_message}"
+def _threshold_write(method):
+    """Mark a threshold-writing method: shared snapshots older than its end are stale.
+    
+    A write that failed left the threshold as it was, so the snapshots stay
+    valid; one that raised may or may not have reached sysfs.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException:
+            self.note_threshold_write()
+            raise
+        if result.success:
+            self.note_threshold_write()
+        return result
+    return wrapper
 
 
 class CliInterface:
@@ -37,19 +39,105 @@ class CliInterface:
     
     CLI_COMMAND = 'a14-charge-keeper'
     TIMEOUT_SECONDS = 30
+    LOCK_BUSY_EXIT_CODE = 4  # Another CLI instance holds the lock
+    # How long the CLI waits for its lock; well below TIMEOUT_SECONDS, so
+    # contention ends in LOCK_BUSY_EXIT_CODE (retried by the command queue)
+    # rather than in our timeout
+    LOCK_WAIT_SECONDS = 5
+    
+    def __init__(self, use_shared_status: bool = True,
+                 shared_status_path: str = SHARED_STATUS_PATH,
+                 use_threshold_engine: bool = True,
+                 use_upower_dbus: bool = True):
+        """Initialize CLI interface.
+        
+        Args:
+            use_shared_status: Read the shared-memory snapshot published by a
+                running producer before falling back to spawning the CLI
+            shared_status_path: Location of the shared status file
+            use_threshold_engine: Write thresholds directly through the
+                Python engine when sysfs is writable (skips the CLI spawn)
+            use_upower_dbus: Read battery status from UPower over D-Bus
+                (thresholds from sysfs) before falling back to the CLI
+        """
+        self.status_reader = SharedStatusReader(shared_status_path) if use_shared_status else None
+        self.capability_probe = CapabilityProbe()
+        self._capabilities: Optional[CapabilityRecord] = None
+        self.default_battery = (os.environ.get('BAT_NAME')
+                                or self.get_capabilities().default_battery() or 'BAT0')
+        self.use_threshold_engine = use_threshold_engine
+        self._engines: Dict[str, Any] = {}
+        self.threshold_engine = self.engine_for(self.default_battery) if use_threshold_engine else None
+        self.persist_state = PersistState()
+        self.upower = UPowerBackend() if use_upower_dbus and UPowerBackend.is_supported() else None
+        # CLI processes started (exported as a metric)
+        self.spawn_count = 0
+        self.shared_status_hits = 0
+        self._counter_lock = threading.Lock()
+        # End of the last local threshold write: snapshots published before
+        # it still show the old threshold
+        self._snapshot_floor: Optional[float] = None
+    
+    def get_capabilities(self, refresh: bool = False) -> CapabilityRecord:
+        """Get hardware capabilities (probed once, cached until the key changes).
+        
+        Args:
+            refresh: Re-check the key (probes again only if hardware changed)
+            
+        Returns:
+            Capability record shared with the CLI
+        """
+        if self._capabilities is None or refresh:
+            self._capabilities = self.capability_probe.get()
+        return self._capabilities
+    
+    def engine_for(self, battery: str) -> Any:
+        """Get (cached) threshold engine for a battery.
+        
+        Args:
+            battery: power_supply device name
+            
+        Returns:
+            ThresholdEngine bound to the battery
+        """
+        engine = self._engines.get(battery)
+        if engine is None:
+            engine = self._engines[battery] = ThresholdEngine(battery=battery,
+                                                              conflict_check=check_conflicts)
+        return engine
     
-    def get_status(self) -> CliResult:
+    def get_status(self, battery: Optional[str] = None) -> CliResult:
         """Get current battery status from CLI.
         
+        A fresh shared-memory snapshot is returned without spawning anything
+        when a producer is publishing one (default battery only). Calls for
+        different batteries may run concurrently.
+        
+        Args:
+            battery: Battery to read (None for the default battery)
+        
         Returns:
-            CliResult with BatteryStatus data on success
+            CliResult with BatteryStatus (or BatteryInfoSnapshot) data on
+            success; output holds the raw CLI stdout when the CLI was run
         """
+        if battery is None:
+            snapshot = self.read_shared_status()
+            if snapshot is not None:
+                return CliResult.success(snapshot)
+        
+        if self.upower is not None:
+            snapshot = self.read_upower_status(battery or self.default_battery)
+            if snapshot is not None:
+                return CliResult.success(snapshot)
+        
         try:
+            self.count_spawn()
             result = subprocess.run(
                 [self.CLI_COMMAND, 'status'],
                 capture_output=True,
                 text=True,
-                timeout=self.TIMEOUT_SECONDS
+                timeout=self.TIMEOUT_SECONDS,
+                env=self._battery_env(battery or self.default_battery)
             )
             
             if result.returncode != 0:
@@ -58,7 +146,7 @@ class CliInterface:
             
             # Parse the output
             battery_status = StatusParser.parse_status(result.stdout)
-            return CliResult.success(battery_status)
+            return CliResult.success(battery_status, output=result.stdout)
             
         except FileNotFoundError:
             return CliResult.error("a14-charge-keeper not found. Please install the CLI tool first.")
@@ -69,11 +157,14 @@ class CliInterface:
         except Exception as e:
             return CliResult.error(f"Unexpected error: {e}")
     
-    def set_threshold(self, threshold: int) -> CliResult:
+    @_threshold_write
+    def set_threshold(self, threshold: int, batteries: Optional[List[str]] = None) -> CliResult:
         """Set battery charge threshold.
         
         Args:
             threshold: Threshold percentage (20-100)
+            batteries: Batteries to update (None for the default battery);
+                if any of them fails, the others are rolled back
             
         Returns:
             CliResult indicating success or failure
@@ -81,8 +172,16 @@ class CliInterface:
         if not self._validate_threshold(threshold):
             return CliResult.error("Threshold must be between 20 and 100")
         
+        if batteries is not None:
+            return self._set_many(threshold, list(batteries))
+        
+        # Direct sysfs write when privileged: no spawn, no fixed verify sleep
+        if self.threshold_engine and self.threshold_engine.is_writable():
+            return self.threshold_engine.set_threshold(threshold)
+        
         return self._execute_sudo_command(['set', str(threshold)])
     
+    @_threshold_write
     def persist_threshold(self, threshold: int) -> CliResult:
         """Set persistent battery charge threshold.
         
@@ -95,15 +194,135 @@ class CliInterface:
         if not self._validate_threshold(threshold):
             return CliResult.error("Threshold must be between 20 and 100")
         
+        # With the static unit already installed, persisting is a sysfs write
+        # plus one atomic state file replacement
+        if (self.threshold_engine and self.threshold_engine.is_writable()
+                and self.persist_state.units_installed()):
+            result = self.threshold_engine.set_threshold(threshold)
+            if not result.success:
+                return result
+            try:
+                self.persist_state.write(self.threshold_engine.battery, threshold)
+            except OSError as e:
+                return CliResult.error(f"상태 파일 저장 실패: {e}")
+            return result
+        
         return self._execute_sudo_command(['persist', str(threshold)])
     
-    def clear_threshold(self) -> CliResult:
+    @_threshold_write
+    def clear_threshold(self, batteries: Optional[List[str]] = None) -> CliResult:
         """Clear battery charge threshold (reset to 100%).
         
+        Args:
+            batteries: Batteries to reset (None for the default battery). The
+                default battery also drops its persisted threshold.
+        
         Returns:
             CliResult indicating success or failure
         """
-        return self._execute_sudo_command(['clear'])
+        if batteries is None:
+            return self._execute_sudo_command(['clear'])
+        
+        others = [battery for battery in batteries if battery != self.default_battery]
+        errors = []
+        if len(others) < len(batteries):
+            result = self._execute_sudo_command(['clear'])
+            if not result.success:
+                errors.append(f"{self.default_battery}: {result.error_message}")
+        if others:
+            result = self._set_many(100, others)
+            if not result.success:
+                errors.append(result.error_message)
+        return CliResult.error("; ".join(errors)) if errors else CliResult.success()
+    
+    def _set_many(self, threshold: int, batteries: List[str]) -> CliResult:
+        """Set threshold on several batteries with per-device rollback.
+        
+        Args:
+            threshold: Threshold percentage (20-100)
+            batteries: Battery device names
+            
+        Returns:
+            CliResult indicating success or failure
+        """
+        if not batteries:
+            return CliResult.error("No batteries selected")
+        
+        engines = [self.engine_for(battery) for battery in batteries]
+        if self.use_threshold_engine and all(engine.is_writable() for engine in engines):
+            return set_thresholds(engines, threshold)
+        
+        # CLI fallback: one run per battery, undone in reverse order on failure
+        applied = []
+        for engine in engines:
+            try:
+                previous = engine.read_threshold()
+            except (OSError, ValueError):
+                previous = None
+            result = self._execute_sudo_command(['set', str(threshold)], battery=engine.battery)
+            if not result.success:
+                for battery, value in reversed(applied):
+                    if value is not None and value != threshold:
+                        self._execute_sudo_command(['set', str(value)], battery=battery)
+                rolled_back = ", ".join(battery for battery, _ in applied)
+                message = f"{engine.battery}: {result.error_message}"
+                if rolled_back:
+                    message += f" (롤백: {rolled_back})"
+                return CliResult.error(message, exit_code=result.exit_code)
+            applied.append((engine.battery, previous))
+        return CliResult.success()
+    
+    def read_upower_status(self, battery: str) -> Optional[Any]:
+        """Read battery status from UPower (one GetAll) and sysfs, without the CLI.
+        
+        Args:
+            battery: Battery to read
+            
+        Returns:
+            BatteryInfoSnapshot, or None if sysfs or UPower cannot be read
+        """
+        engine = self.engine_for(battery)
+        try:
+            end_threshold = engine.read_threshold()
+        except (OSError, ValueError):
+            return None
+        journal = getattr(engine, 'journal', None)
+        return self.upower.read_snapshot(battery, end_threshold, engine.read_start_threshold(),
+                                         journal.count() if journal else 0)
+    
+    def read_shared_status(self) -> Optional[Any]:
+        """Read the producer's fresh snapshot of the default battery, if any.
+        
+        Snapshots published before the last local threshold write are
+        skipped. Hits are counted (thread-safe).
+        
+        Returns:
+            BatteryInfoSnapshot, or None without a fresh snapshot
+        """
+        if self.status_reader is None:
+            return None
+        snapshot = self.status_reader.read_fresh(newer_than=self._snapshot_floor)
+        if snapshot is not None:
+            with self._counter_lock:
+                self.shared_status_hits += 1
+        return snapshot
+    
+    def note_threshold_write(self) -> None:
+        """Note that a threshold was just written from this process.
+        
+        Until the producer publishes again, its snapshot predates the write
+        and is skipped in favour of a direct read.
+        """
+        self._snapshot_floor = time.time()
+    
+    def count_spawn(self) -> None:
+        """Count one CLI process start (thread-safe)."""
+        with self._counter_lock:
+            self.spawn_count += 1
+    
+    def _battery_env(self, battery: str) -> Dict[str, str]:
+        """Environment selecting a battery (and the lock wait) for the CLI."""
+        return dict(os.environ, BAT_NAME=battery, LOCK_TIMEOUT=str(self.LOCK_WAIT_SECONDS))
     
     def _validate_threshold(self, threshold: int) -> bool:
         """Validate threshold value range.
@@ -116,11 +335,12 @@ class CliInterface:
         """
         return isinstance(threshold, int) and 20 <= threshold <= 100
     
-    def _execute_sudo_command(self, args: list[str]) -> CliResult:
+    def _execute_sudo_command(self, args: list[str], battery: Optional[str] = None) -> CliResult:
         """Execute CLI command directly (assuming app is run with sudo).
         
         Args:
             args: Command arguments (without CLI command name)
+            battery: Battery to operate on (None for the default battery)
             
         Returns:
             CliResult indicating success or failure
@@ -131,11 +351,13 @@ class CliInterface:
             
             print(f"Executing: {' '.join(cmd)}")  # Debug print
             
+            self.count_spawn()
             result = subprocess.run(
                 cmd,
                 capture_output=True,
                 text=True,
-                timeout=self.TIMEOUT_SECONDS
+                timeout=self.TIMEOUT_SECONDS,
+                env=self._battery_env(battery or self.default_battery)
             )
             
             print(f"Return code: {result.returncode}")  # Debug print
@@ -148,7 +370,7 @@ class CliInterface:
                 return CliResult.success()
             else:
                 error_msg = result.stderr.strip() or "명령 실행에 실패했습니다."
-                return CliResult.error(f"오류: {error_msg}")
+                return CliResult.error(f"오류: {error_msg}", exit_code=result.returncode)
                     
         except subprocess.TimeoutExpired:
             return CliResult.error("명령 실행 시간이 초과되었습니다.")
@@ -0,0 +1,35 @@
+"""Result type shared by the CLI interface, the threshold engine and the queues.
+
+Kept in its own module so the threshold engine (run as a subprocess by the
+CLI for every write) does not import the whole CLI interface.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Optional
+
+
+@dataclass
+class CliResult:
+    """Result from CLI command execution."""
+    success: bool
+    data: Optional[Any] = None
+    error_message: Optional[str] = None
+    exit_code: Optional[int] = None
+    output: Optional[str] = None  # Raw stdout of the CLI run, if any
+    
+    @classmethod
+    def success(cls, data: Any = None, output: Optional[str] = None) -> 'CliResult':
+        """Create successful result."""
+        return cls(success=True, data=data, output=output)
+    
+    @classmethod  
+    def error(cls, message: str, exit_code: Optional[int] = None) -> 'CliResult':
+        """Create error result."""
+        return cls(success=False, error_message=message, exit_code=exit_code)
+    
+    def __str__(self) -> str:
+        """String representation of result."""
+        if self.success:
+            return f"SUCCESS: {self.data}"
+        else:
+            return f"ERROR: {self.error_message}"
@@ -0,0 +1,225 @@
+"""Serialized queue for privileged threshold commands."""
+
+import dataclasses
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, List, NamedTuple, Optional, Tuple
+
+from src.core.cli_interface import CliInterface, CliResult
+
+
+class AppliedCommand(NamedTuple):
+    """Command that actually ran, carried as the data of a successful result.
+
+    A caller whose command was superseded receives the successor's result,
+    so this (not the caller's own arguments) says what is now in effect.
+    """
+    command: str
+    value: Optional[int]
+    batteries: Optional[Tuple[str, ...]]  # None: default battery
+    data: Any = None  # The backend's own result data
+
+    @property
+    def threshold(self) -> int:
+        """End threshold the command applied (clear resets to 100)."""
+        return 100 if self.command == 'clear' else self.value
+
+
+@dataclass
+class PendingCommand:
+    """Command waiting in the queue together with everyone awaiting its result."""
+    command: str
+    value: Optional[int] = None
+    futures: List[Future] = field(default_factory=list)
+    batteries: Optional[Tuple[str, ...]] = None  # None: default battery
+
+
+class CommandQueue:
+    """Runs set/persist/clear one at a time with last-write-wins coalescing.
+
+    Commands are executed by a single worker thread, so two callers in this
+    process never race for the CLI lock. A newly submitted command replaces
+    pending commands it makes redundant (a set replaces pending sets, a
+    persist also replaces pending persists, a clear replaces everything)
+    as long as it targets at least the same batteries; callers of a
+    replaced command receive the result of its replacement. A successful
+    result's data is the AppliedCommand that ran.
+    When the CLI reports lock contention from another process the command
+    is retried with exponential backoff.
+    """
+
+    COMMANDS = ('set', 'persist', 'clear')
+
+    # Pending commands that a new command of the given type supersedes
+    SUPERSEDES = {
+        'set': ('set',),
+        'persist': ('set', 'persist'),
+        'clear': ('set', 'persist', 'clear'),
+    }
+
+    def __init__(self, cli_interface: CliInterface, max_retries: int = 5,
+                 initial_backoff: float = 0.2, max_backoff: float = 3.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        """Initialize command queue.
+
+        Args:
+            cli_interface: CLI interface used to run commands
+            max_retries: Retries on lock contention before giving up
+            initial_backoff: First retry delay in seconds (doubled each retry)
+            max_backoff: Upper bound for a single retry delay in seconds
+            sleep: Sleep function (injectable for testing)
+        """
+        self.cli_interface = cli_interface
+        self.max_retries = max_retries
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+
+        self._pending: Deque[PendingCommand] = deque()
+        self._condition = threading.Condition()
+        self._worker: Optional[threading.Thread] = None
+        self._running = False
+
+    def submit(self, command: str, value: Optional[int] = None,
+               batteries: Optional[Tuple[str, ...]] = None) -> Future:
+        """Queue a command.
+
+        Args:
+            command: One of 'set', 'persist' or 'clear'
+            value: Threshold value for set/persist
+            batteries: Batteries for set/clear (None for the default battery)
+
+        Returns:
+            Future resolving to the CliResult of the command (or of the
+            command that superseded it); on success its data is the
+            AppliedCommand
+
+        Raises:
+            ValueError: If command is unknown
+        """
+        if command not in self.COMMANDS:
+            raise ValueError(f"Unknown command: {command}")
+
+        future: Future = Future()
+        with self._condition:
+            superseded = self.SUPERSEDES[command]
+            inherited: List[Future] = []
+            kept: Deque[PendingCommand] = deque()
+            for pending in self._pending:
+                if pending.command in superseded and self._covers(batteries, pending.batteries):
+                    inherited.extend(pending.futures)
+                else:
+                    kept.append(pending)
+            self._pending = kept
+            self._pending.append(PendingCommand(command, value, inherited + [future], batteries))
+
+            self._ensure_worker()
+            self._condition.notify()
+        return future
+
+    def execute(self, command: str, value: Optional[int] = None,
+                timeout: Optional[float] = None,
+                batteries: Optional[Tuple[str, ...]] = None) -> CliResult:
+        """Queue a command and wait for its result.
+
+        Args:
+            command: One of 'set', 'persist' or 'clear'
+            value: Threshold value for set/persist
+            timeout: Maximum seconds to wait (None waits indefinitely)
+            batteries: Batteries for set/clear (None for the default battery)
+
+        Returns:
+            CliResult of the command
+        """
+        try:
+            return self.submit(command, value, batteries).result(timeout=timeout)
+        except FutureTimeoutError:
+            return CliResult.error("명령 대기 시간이 초과되었습니다.")
+
+    def pending_count(self) -> int:
+        """Number of commands waiting to run."""
+        with self._condition:
+            return len(self._pending)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker; commands still pending are cancelled.
+
+        Args:
+            wait: Wait for the command currently running to finish
+        """
+        with self._condition:
+            self._running = False
+            cancelled = list(self._pending)
+            self._pending.clear()
+            self._condition.notify_all()
+            worker = self._worker
+
+        for pending in cancelled:
+            for future in pending.futures:
+                future.set_result(CliResult.error("명령이 취소되었습니다."))
+
+        if wait and worker and worker is not threading.current_thread():
+            worker.join()
+
+    @staticmethod
+    def _covers(new: Optional[Tuple[str, ...]], old: Optional[Tuple[str, ...]]) -> bool:
+        """Check whether a command for `new` batteries makes one for `old` redundant."""
+        if new is None or old is None:
+            return new == old
+        return set(old) <= set(new)
+
+    def _ensure_worker(self) -> None:
+        """Start worker thread if not running (caller holds the condition)."""
+        if self._worker is None or not self._worker.is_alive():
+            self._running = True
+            self._worker = threading.Thread(target=self._run, name="CommandQueue",
+                                            daemon=True)
+            self._worker.start()
+
+    def _run(self) -> None:
+        """Worker loop executing pending commands in order."""
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                pending = self._pending.popleft()
+
+            try:
+                result = self._execute_with_retry(pending)
+            except Exception as e:
+                result = CliResult.error(f"예상치 못한 오류: {e}")
+            if result.success:
+                result = dataclasses.replace(result, data=AppliedCommand(
+                    pending.command, pending.value, pending.batteries, result.data))
+
+            for future in pending.futures:
+                future.set_result(result)
+
+    def _execute_with_retry(self, pending: PendingCommand) -> CliResult:
+        """Run command, retrying with backoff while the CLI lock is busy."""
+        delay = self.initial_backoff
+        result = self._dispatch(pending)
+        for _ in range(self.max_retries):
+            if result.exit_code != CliInterface.LOCK_BUSY_EXIT_CODE:
+                break
+            self._sleep(delay)
+            delay = min(delay * 2, self.max_backoff)
+            result = self._dispatch(pending)
+        return result
+
+    def _dispatch(self, pending: PendingCommand) -> CliResult:
+        """Run a single command through the CLI interface."""
+        if pending.command == 'set':
+            if pending.batteries is not None:
+                return self.cli_interface.set_threshold(pending.value, list(pending.batteries))
+            return self.cli_interface.set_threshold(pending.value)
+        if pending.command == 'persist':
+            return self.cli_interface.persist_threshold(pending.value)
+        if pending.batteries is not None:
+            return self.cli_interface.clear_threshold(list(pending.batteries))
+        return self.cli_interface.clear_threshold()
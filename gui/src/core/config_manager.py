@@ -15,7 +15,12 @@ class ConfigManager:
         'default_threshold': 80,
         'theme': 'dark',
         'refresh_interval': 30,
-        'show_notifications': True
+        'show_notifications': True,
+        # Emulated start threshold for end-only firmware (None: off)
+        'software_start_threshold': None,
+        # Destroy hidden windows after memory_saver_idle seconds unused
+        'memory_saver': False,
+        'memory_saver_idle': 120
     }
     
     # Validation rules
@@ -24,7 +29,10 @@ class ConfigManager:
         'theme': lambda x: x in ['dark', 'light'],
         'refresh_interval': lambda x: 5 <= x <= 300,
         'auto_start': lambda x: isinstance(x, bool),
-        'show_notifications': lambda x: isinstance(x, bool)
+        'show_notifications': lambda x: isinstance(x, bool),
+        'software_start_threshold': lambda x: x is None or (isinstance(x, int) and 20 <= x <= 99),
+        'memory_saver': lambda x: isinstance(x, bool),
+        'memory_saver_idle': lambda x: isinstance(x, int) and 10 <= x <= 3600
     }
     
     # Validation error messages
@@ -33,7 +41,10 @@ class ConfigManager:
         'theme': "Theme must be 'dark' or 'light'",
         'refresh_interval': "Refresh interval must be between 5 and 300",
         'auto_start': "Auto start must be a boolean value",
-        'show_notifications': "Show notifications must be a boolean value"
+        'show_notifications': "Show notifications must be a boolean value",
+        'software_start_threshold': "Software start threshold must be off or between 20 and 99",
+        'memory_saver': "Memory saver must be a boolean value",
+        'memory_saver_idle': "Memory saver idle time must be between 10 and 3600 seconds"
     }
     
     def __init__(self, config_dir: Optional[str] = None):
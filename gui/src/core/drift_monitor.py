@@ -0,0 +1,193 @@
+"""Threshold drift detection and correction policy.
+
+Firmware events, AC plugs and other tools can change a battery's end
+threshold behind the manager's back. DriftMonitor keeps the threshold each
+battery should have (its target), compares readings with it and decides
+what to do about a difference:
+
+- adopted: the backup journal has a record this process did not write, so
+  someone (the CLI, another tool) changed the threshold on purpose and
+  the observed value becomes the target
+- queued: the target is written again (the caller submits the write)
+- rate_limited: too many re-applies for this battery; only recorded
+
+While a write of ours is in flight, or another process holds the lock
+shared with the CLI, readings are not final and checks are skipped.
+
+The monitor does no I/O: the caller passes readings, the journal state and
+the lock state in and performs the writes. That keeps every decision on
+the thread that owns the battery state and makes the policy testable
+without hardware.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, List, NamedTuple, Optional
+
+
+class DriftRecord(NamedTuple):
+    """Threshold found different from its target, and what was done about it."""
+    timestamp: float
+    device: str
+    observed: int
+    target: int
+    action: str  # queued, rate_limited or adopted (set by another writer)
+
+
+class DriftMonitor:
+    """Targets, write tracking and rate-limited re-apply decisions."""
+
+    # Re-apply limits per battery: minimum seconds between re-applies, and
+    # re-applies per hour after which drift is only recorded
+    MIN_INTERVAL = 30
+    MAX_PER_HOUR = 6
+    LOG_SIZE = 100
+
+    def __init__(self, clock: Optional[Callable[[], float]] = None):
+        """Initialize drift monitor.
+
+        Args:
+            clock: Monotonic clock for the rate limit (time.monotonic if None)
+        """
+        self.enabled = True
+        self.log: Deque[DriftRecord] = deque(maxlen=self.LOG_SIZE)
+        self._clock = clock
+        self._targets: Dict[str, int] = {}
+        self._reapplies: Dict[str, Deque[float]] = {}
+        self._writes_in_flight = 0
+        # Journal state after our last write (a newer one is someone else's)
+        self._journal_mark: Optional[tuple] = None
+        # State is changed on the owning thread; the lock only protects
+        # callers that have no dispatcher and finish writes on a worker
+        self._lock = threading.Lock()
+
+    @property
+    def writes_in_flight(self) -> int:
+        """Writes started with write_started() and not finished yet."""
+        return self._writes_in_flight
+
+    def targets(self) -> Dict[str, int]:
+        """Targets recorded through this monitor (copy)."""
+        with self._lock:
+            return dict(self._targets)
+
+    def set_target(self, name: str, value: int) -> None:
+        """Make a value a battery's target without touching the rate limit."""
+        with self._lock:
+            self._targets[name] = value
+
+    def record_target(self, threshold: int, names: Iterable[str]) -> None:
+        """Record a threshold applied on purpose; the re-apply budget starts over."""
+        with self._lock:
+            for name in names:
+                self._targets[name] = threshold
+                self._reapplies.pop(name, None)
+
+    def write_started(self) -> None:
+        """Count a write of ours as in flight (checks are skipped until it ends)."""
+        with self._lock:
+            self._writes_in_flight += 1
+
+    def write_finished(self, journal: Optional[tuple]) -> None:
+        """Count a write as finished and remember the journal state it left."""
+        with self._lock:
+            self._journal_mark = journal
+            self._writes_in_flight = max(self._writes_in_flight - 1, 0)
+
+    def begin_write(self, threshold: int, names: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Make a threshold about to be written the target of its batteries.
+
+        Recorded before the write, so a check that sees the new value (e.g.
+        on the uevent the write itself causes) does not revert it.
+
+        Args:
+            threshold: Threshold being written
+            names: Batteries it is written to
+
+        Returns:
+            Previous target per battery (None where there was none), for
+            end_write()
+        """
+        with self._lock:
+            previous = {name: self._targets.get(name) for name in names}
+            for name in previous:
+                self._targets[name] = threshold
+            self._writes_in_flight += 1
+        return previous
+
+    def end_write(self, threshold: int, previous: Dict[str, Optional[int]],
+                  applied: Optional[tuple], journal: Optional[tuple]) -> None:
+        """Settle the targets of a write started with begin_write().
+
+        Args:
+            threshold: Threshold that was being written
+            previous: Targets returned by begin_write()
+            applied: (threshold, batteries) actually applied if the write
+                succeeded (a superseding command may have applied another
+                value), None if it failed
+            journal: Journal state after the write
+        """
+        if applied is not None:
+            self.record_target(*applied)
+        else:
+            with self._lock:
+                for name, target in previous.items():
+                    if self._targets.get(name) != threshold:
+                        continue  # A later write owns the target now
+                    if target is None:
+                        self._targets.pop(name, None)
+                    else:
+                        self._targets[name] = target
+        self.write_finished(journal)
+
+    def check(self, observed: Dict[str, Optional[int]], targets: Dict[str, int],
+              journal: Optional[tuple], lock_busy: bool = False) -> List[DriftRecord]:
+        """Compare readings with their targets and decide on each difference.
+
+        Args:
+            observed: Current threshold per battery (None if unreadable)
+            targets: Target per battery (see BatteryManager.drift_targets)
+            journal: Current backup journal state
+            lock_busy: Whether another process holds the CLI lock
+
+        Returns:
+            Records created by this check (also appended to the log); the
+            caller writes the target for every 'queued' record
+        """
+        if not self.enabled or not targets or lock_busy:
+            return []
+
+        records = []
+        with self._lock:
+            if self._writes_in_flight:
+                return []
+            external = self._journal_mark is not None and journal != self._journal_mark
+            self._journal_mark = journal
+            now = self._clock() if self._clock is not None else time.monotonic()
+            for name, target in targets.items():
+                actual = observed.get(name)
+                if actual is None or actual == target:
+                    continue
+                if external:
+                    self._targets[name] = actual
+                    self._reapplies.pop(name, None)
+                    action = "adopted"
+                elif self._take_budget(name, now):
+                    action = "queued"
+                else:
+                    action = "rate_limited"
+                record = DriftRecord(time.time(), name, actual, target, action)
+                self.log.append(record)
+                records.append(record)
+        return records
+
+    def _take_budget(self, name: str, now: float) -> bool:
+        """Record a re-apply at now if the battery's budget allows it (lock held)."""
+        history = self._reapplies.setdefault(name, deque())
+        while history and now - history[0] > 3600:
+            history.popleft()
+        if (history and now - history[-1] < self.MIN_INTERVAL) or len(history) >= self.MAX_PER_HOUR:
+            return False
+        history.append(now)
+        return True
@@ -0,0 +1,371 @@
+"""Energy throughput ledger: energy in and out per day and per AC session.
+
+Every refresh reads ``energy_rate`` and ``energy_current``; the ledger folds
+each reading into running totals instead of discarding it. Energy is the
+trapezoidal integral of the rate over the interval since the previous
+reading, kept in two channels (into the battery while charging, out of it
+otherwise) and split at local midnight so each day gets its own share.
+
+Intervals longer than ``MAX_GAP`` (suspend, the app not running, a missed
+refresh) are not integrated: the rate at either end says nothing about what
+happened in between. The change in ``energy_current`` across the gap is
+booked instead, as bridged energy in or out, so daily totals stay close to
+the truth without pretending the gap was observed.
+
+Only rollups are stored: one line of totals per day and one line per AC
+session, in small TSV files the CLI can read without Python
+(``a14-charge-keeper stats``). Queries never touch raw samples, and an
+update is O(1).
+
+    python3 -m src.core.energy_ledger [BATTERY] [--days N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+from src.core.sample_log import AC_STATES, BATTERY_STATES
+
+
+def default_ledger_dir() -> str:
+    """Ledger location under XDG_DATA_HOME."""
+    data_home = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    return os.path.join(data_home, 'a14-charge-keeper')
+
+
+def local_day(timestamp: float) -> str:
+    """Local calendar day of an epoch timestamp (YYYY-MM-DD)."""
+    return time.strftime('%Y-%m-%d', time.localtime(timestamp))
+
+
+def next_midnight(timestamp: float) -> float:
+    """Epoch of the first local midnight after a timestamp (DST aware)."""
+    t = time.localtime(timestamp)
+    return time.mktime((t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0, 0, 0, -1))
+
+
+class DayTotals(NamedTuple):
+    """Energy totals of one local day (Wh, seconds)."""
+    day: str
+    energy_in: float = 0.0
+    energy_out: float = 0.0
+    bridged_in: float = 0.0  # Included in energy_in
+    bridged_out: float = 0.0  # Included in energy_out
+    charging_seconds: int = 0
+    discharging_seconds: int = 0
+    observed_seconds: int = 0  # Time covered by integrated intervals
+
+    @property
+    def net(self) -> float:
+        """Energy stored minus energy drawn (Wh)."""
+        return self.energy_in - self.energy_out
+
+
+class AcSession(NamedTuple):
+    """One period on external power."""
+    start: int
+    end: Optional[int]  # None while the session is open
+    energy_in: float
+    energy_out: float
+    start_percentage: Optional[int]
+    end_percentage: Optional[int]
+
+
+class _Reading(NamedTuple):
+    """The parts of a reading the next interval needs."""
+    timestamp: float
+    state: Optional[str]
+    rate: Optional[float]
+    energy: Optional[float]
+    percentage: Optional[int]
+
+
+_DAY_HEADER = ("# date\tin_wh\tout_wh\tbridged_in_wh\tbridged_out_wh"
+               "\tcharging_s\tdischarging_s\tobserved_s\n")
+_SESSION_HEADER = "# start\tend\tin_wh\tout_wh\tstart_pct\tend_pct\n"
+
+
+class EnergyLedger:
+    """Per-battery ledger fed by the refresh stream."""
+
+    # Longer intervals between readings are bridged from energy_current
+    MAX_GAP = 900.0
+    # Minimum seconds between saves of the rollups
+    SAVE_INTERVAL = 300.0
+    # Closed AC sessions kept
+    SESSION_LIMIT = 200
+
+    def __init__(self, device: str, directory: Optional[str] = None):
+        """Initialize ledger, loading stored rollups if present.
+
+        Args:
+            device: Battery name
+            directory: Ledger location (XDG data directory if None)
+        """
+        self.device = device
+        self.directory = directory or default_ledger_dir()
+        self.days_file = os.path.join(self.directory, f"energy-{device}.tsv")
+        self.sessions_file = os.path.join(self.directory, f"energy-{device}-sessions.tsv")
+        self.state_file = os.path.join(self.directory, f"energy-{device}.json")
+        self._lock = threading.Lock()
+        self._days: Dict[str, List[float]] = {}
+        self._sessions: Deque[AcSession] = deque(maxlen=self.SESSION_LIMIT)
+        self._session: Optional[List[Any]] = None  # Open session, as AcSession fields
+        self._last: Optional[_Reading] = None
+        self._last_save = time.monotonic()
+        self._dirty = False
+        self._load()
+
+    def update(self, info: Any, now: Optional[float] = None) -> None:
+        """Fold a fresh reading into the daily and session totals (O(1)).
+
+        Args:
+            info: BatteryInfo just read
+            now: Reading time as an epoch (time.time() if None)
+        """
+        now = time.time() if now is None else now
+        reading = _Reading(now, info.state, info.energy_rate, info.energy_current, info.percentage)
+        with self._lock:
+            last = self._last
+            self._last = reading
+            if last is None or now <= last.timestamp:
+                # First reading, or the clock went back: nothing to integrate
+                self._track_session(None, reading, False)
+                return
+            bridged = now - last.timestamp > self.MAX_GAP
+            if bridged:
+                self._bridge(last, reading)
+            else:
+                self._integrate(last, reading)
+            self._track_session(last, reading, bridged)
+            self._dirty = True
+        if time.monotonic() - self._last_save >= self.SAVE_INTERVAL:
+            self.save()
+
+    def _integrate(self, last: _Reading, reading: _Reading) -> None:
+        """Trapezoidal integral of both channels, split at local midnight."""
+        rate_in = self._channel_rates(last, reading, charging=True)
+        rate_out = self._channel_rates(last, reading, charging=False)
+        t0, t1 = last.timestamp, reading.timestamp
+        start = t0
+        while start < t1:
+            end = min(next_midnight(start), t1)
+            totals = self._day(local_day(start))
+            energy_in = self._trapezoid(rate_in, t0, t1, start, end)
+            energy_out = self._trapezoid(rate_out, t0, t1, start, end)
+            totals[0] += energy_in
+            totals[1] += energy_out
+            seconds = end - start
+            if last.state == "charging":
+                totals[4] += seconds
+            elif last.state in BATTERY_STATES:
+                totals[5] += seconds
+            totals[6] += seconds
+            if self._session is not None and last.state in AC_STATES:
+                self._session[2] += energy_in
+                self._session[3] += energy_out
+            start = end
+
+    @staticmethod
+    def _channel_rates(last: _Reading, reading: _Reading, charging: bool) -> Tuple[float, float]:
+        """Rate of one channel (W) at both ends of an interval."""
+        def rate(r: _Reading) -> float:
+            if not r.rate or r.rate <= 0:
+                return 0.0
+            return r.rate if (r.state == "charging") == charging else 0.0
+        return rate(last), rate(reading)
+
+    @staticmethod
+    def _trapezoid(rates: Tuple[float, float], t0: float, t1: float,
+                   start: float, end: float) -> float:
+        """Energy (Wh) of the linear rate between (t0, t1) over [start, end]."""
+        slope = (rates[1] - rates[0]) / (t1 - t0)
+        at_start = rates[0] + slope * (start - t0)
+        at_end = rates[0] + slope * (end - t0)
+        return (at_start + at_end) / 2 * (end - start) / 3600
+
+    def _bridge(self, last: _Reading, reading: _Reading) -> None:
+        """Book the energy_current change across a gap on the day it ends."""
+        if last.energy is None or reading.energy is None:
+            return
+        delta = reading.energy - last.energy
+        totals = self._day(local_day(reading.timestamp))
+        if delta > 0:
+            totals[0] += delta
+            totals[2] += delta
+        else:
+            totals[1] -= delta
+            totals[3] -= delta
+        if self._session is not None and last.state in AC_STATES and reading.state in AC_STATES:
+            if delta > 0:
+                self._session[2] += delta
+            else:
+                self._session[3] -= delta
+
+    def _track_session(self, last: Optional[_Reading], reading: _Reading, bridged: bool) -> None:
+        """Open or close the AC session on charger transitions."""
+        on_ac = reading.state in AC_STATES
+        if on_ac and self._session is None:
+            self._session = [int(reading.timestamp), None, 0.0, 0.0, reading.percentage, None]
+        elif not on_ac and self._session is not None and reading.state is not None:
+            # After a gap the unplug time is unknown; the last reading on AC bounds it
+            end = last if (bridged or last is None) else reading
+            self._session[1] = int(end.timestamp)
+            self._session[5] = (last or reading).percentage
+            self._sessions.append(AcSession(*self._session))
+            self._session = None
+
+    def _day(self, day: str) -> List[float]:
+        """Mutable totals of a day (created empty)."""
+        totals = self._days.get(day)
+        if totals is None:
+            totals = self._days[day] = [0.0] * 7
+        return totals
+
+    def daily(self, days: int = 7, now: Optional[float] = None) -> List[DayTotals]:
+        """Totals of the most recent days, newest first (days without data omitted).
+
+        Args:
+            days: Number of calendar days, including today
+            now: Reference time (time.time() if None)
+        """
+        now = time.time() if now is None else now
+        first = local_day(now - (days - 1) * 86400)
+        with self._lock:
+            rows = [self._day_totals(day, totals) for day, totals in self._days.items()
+                    if day >= first]
+        return sorted(rows, reverse=True)
+
+    def totals(self, days: Optional[int] = None, now: Optional[float] = None) -> DayTotals:
+        """Sum of the daily rollups (all stored days if days is None)."""
+        if days is None:
+            with self._lock:
+                rows = [self._day_totals(day, totals) for day, totals in self._days.items()]
+        else:
+            rows = self.daily(days, now)
+        sums = [sum(row[i] for row in rows) for i in range(1, len(DayTotals._fields))]
+        return self._day_totals("", sums)
+
+    def sessions(self, limit: int = 10) -> List[AcSession]:
+        """Most recent AC sessions, newest first (the open one included)."""
+        with self._lock:
+            result = list(self._sessions)[-limit:]
+            if self._session is not None:
+                result.append(AcSession(*self._session))
+        return result[::-1][:limit]
+
+    @staticmethod
+    def _day_totals(day: str, totals: List[float]) -> DayTotals:
+        """Stored totals as a DayTotals."""
+        return DayTotals(day, *totals[:4], *(int(v) for v in totals[4:]))
+
+    def save(self) -> None:
+        """Write the rollups (errors are reported, not raised)."""
+        self._last_save = time.monotonic()
+        with self._lock:
+            if not self._dirty:
+                return
+            day_lines = [_DAY_HEADER] + [
+                f"{row.day}\t{row.energy_in:.3f}\t{row.energy_out:.3f}\t{row.bridged_in:.3f}"
+                f"\t{row.bridged_out:.3f}\t{row.charging_seconds}\t{row.discharging_seconds}"
+                f"\t{row.observed_seconds}\n"
+                for row in sorted(self._day_totals(day, totals) for day, totals in self._days.items())]
+            session_lines = [_SESSION_HEADER] + [
+                f"{s.start}\t{s.end}\t{s.energy_in:.3f}\t{s.energy_out:.3f}"
+                f"\t{self._field(s.start_percentage)}\t{self._field(s.end_percentage)}\n"
+                for s in self._sessions]
+            state = {"last": list(self._last) if self._last else None, "session": self._session}
+            self._dirty = False
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._write(self.days_file, "".join(day_lines))
+            self._write(self.sessions_file, "".join(session_lines))
+            self._write(self.state_file, json.dumps(state))
+        except OSError as e:
+            print(f"Failed to save energy ledger: {e}")
+
+    @staticmethod
+    def _field(value: Optional[int]) -> str:
+        """TSV form of an optional value."""
+        return "-" if value is None else str(value)
+
+    @staticmethod
+    def _write(path: str, content: str) -> None:
+        """Replace a file atomically."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _load(self) -> None:
+        """Load stored rollups and the pending interval (missing files are empty)."""
+        for fields in self._read_tsv(self.days_file):
+            try:
+                self._days[fields[0]] = [float(v) for v in fields[1:8]]
+            except (IndexError, ValueError):
+                continue
+        for fields in self._read_tsv(self.sessions_file):
+            try:
+                pct = [None if v == "-" else int(v) for v in fields[4:6]]
+                self._sessions.append(AcSession(int(fields[0]), int(fields[1]), float(fields[2]),
+                                                float(fields[3]), *pct))
+            except (IndexError, ValueError):
+                continue
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+            if state.get("last"):
+                self._last = _Reading(*state["last"])
+            self._session = state.get("session")
+        except (OSError, ValueError, TypeError):
+            pass
+
+    @staticmethod
+    def _read_tsv(path: str) -> List[List[str]]:
+        """Data lines of a ledger TSV file."""
+        try:
+            with open(path) as f:
+                return [line.rstrip("\n").split("\t") for line in f
+                        if line.strip() and not line.startswith("#")]
+        except OSError:
+            return []
+
+
+def format_duration(seconds: float) -> str:
+    """Compact h:mm form of a duration."""
+    minutes = int(seconds) // 60
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Print a battery's daily energy totals and recent AC sessions."""
+    parser = argparse.ArgumentParser(prog="python3 -m src.core.energy_ledger",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("battery", nargs="?", default="BAT0")
+    parser.add_argument("--days", type=int, default=7, help="Calendar days to show")
+    args = parser.parse_args(argv)
+
+    ledger = EnergyLedger(args.battery)
+    print(f"{'date':<12}{'in Wh':>9}{'out Wh':>9}{'bridged':>9}{'charging':>10}{'on battery':>12}")
+    for row in ledger.daily(args.days) + [ledger.totals(args.days)]:
+        print(f"{row.day or 'total':<12}{row.energy_in:>9.1f}{row.energy_out:>9.1f}"
+              f"{row.bridged_in + row.bridged_out:>9.1f}{format_duration(row.charging_seconds):>10}"
+              f"{format_duration(row.discharging_seconds):>12}")
+    sessions = ledger.sessions(5)
+    if sessions:
+        print("\nAC sessions")
+        for session in sessions:
+            end = time.strftime('%m-%d %H:%M', time.localtime(session.end)) if session.end else "now"
+            print(f"  {time.strftime('%m-%d %H:%M', time.localtime(session.start))} - {end}"
+                  f"  +{session.energy_in:.1f} Wh"
+                  f"  {session.start_percentage}% -> {session.end_percentage or '-'}%")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,601 @@
+"""Headless battery monitor: the BatteryManager refresh loop without Qt.
+
+For servers and kiosks without a system tray. The monitor refreshes the
+batteries on a fixed interval and emits samples and manager events as
+JSON lines to stdout, to journald (native protocol, no extra packages)
+or to clients of a unix socket. It can apply the configured threshold
+at startup and act as the shared-memory status producer.
+
+Nothing here imports PyQt5. Resource figures (startup time, CPU per
+sample, RSS) are written to a small stats file that the ``stats``
+command prints:
+
+    python3 main.py --headless [run] [--interval 30] [--sink stdout|journal|socket:PATH]
+                                     [--apply-threshold [VALUE]] [--start-threshold VALUE]
+                                     [--publish]
+                                     [--metrics-textfile PATH] [--metrics-listen [HOST:]PORT]
+    python3 main.py --headless stats
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.core.battery_manager import BatteryEvent, BatteryInfo, BatteryManager
+from src.core.cli_interface import CliInterface
+from src.core.config_manager import ConfigManager
+from src.core.memory_stats import read_rss_kb
+
+
+JOURNAL_SOCKET = "/run/systemd/journal/socket"
+SYSLOG_IDENTIFIER = "a14-charge-keeper"
+
+# Fields of a battery included in every sample
+SAMPLE_FIELDS = ('percentage', 'state', 'end_threshold', 'energy_rate', 'time_to_empty', 'time_to_full',
+                 'time_to_limit', 'time_to_empty_estimate')
+
+
+def runtime_dir() -> str:
+    """Directory for runtime files (stats, default socket)."""
+    if os.geteuid() == 0:
+        return "/run/a14-charge-keeper"
+    return os.path.join(os.environ.get('XDG_RUNTIME_DIR') or "/tmp", "a14-charge-keeper")
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was started (from /proc)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime) follows the parenthesized command name
+            started_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(0.0, uptime - started_ticks / os.sysconf('SC_CLK_TCK'))
+
+
+class StdoutSink:
+    """Writes records as JSON lines to a stream."""
+
+    def __init__(self, stream=None):
+        """Initialize sink.
+
+        Args:
+            stream: Text stream (defaults to sys.stdout)
+        """
+        self.stream = stream or sys.stdout
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        """Write one record."""
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class JournalSink:
+    """Sends records to journald over its native datagram socket.
+
+    Every record becomes one journal entry with a readable MESSAGE and the
+    record fields as A14_* fields (e.g. ``journalctl A14_EVENT=sample``).
+    """
+
+    def __init__(self, path: str = JOURNAL_SOCKET):
+        """Initialize sink.
+
+        Args:
+            path: journald native socket
+
+        Raises:
+            OSError: If the socket cannot be created
+        """
+        self.path = path
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._warned = False
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        """Send one record (dropped if journald is unavailable)."""
+        event = record.get('event', 'sample')
+        fields = [
+            f"MESSAGE={event} " + " ".join(f"{k}={v}" for k, v in record.items() if k not in ('event', 'time')),
+            "PRIORITY=4" if event == "error" else "PRIORITY=6",
+            f"SYSLOG_IDENTIFIER={SYSLOG_IDENTIFIER}",
+        ]
+        for key, value in record.items():
+            if not isinstance(value, (dict, list)):
+                fields.append(f"A14_{key.upper()}={value}")
+        # Single-line values only: the simple KEY=VALUE form cannot carry newlines
+        data = "\n".join(field.replace("\n", " ") for field in fields) + "\n"
+        try:
+            self._socket.sendto(data.encode('utf-8'), self.path)
+        except OSError as e:
+            if not self._warned:
+                self._warned = True
+                print(f"Failed to write to journal: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        """Close the socket."""
+        self._socket.close()
+
+
+class SocketSink:
+    """Broadcasts records as JSON lines to clients of a unix stream socket.
+
+    Clients (e.g. ``socat - UNIX-CONNECT:PATH``) are accepted when the
+    next record is emitted; slow or closed clients are dropped.
+    """
+
+    def __init__(self, path: str):
+        """Create the listening socket.
+
+        Args:
+            path: Socket path (a stale socket file is replaced)
+
+        Raises:
+            OSError: If the socket cannot be bound
+        """
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o755, exist_ok=True)
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(8)
+        self._server.setblocking(False)
+        self._clients: List[socket.socket] = []
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        """Send one record to every connected client."""
+        self._accept_pending()
+        data = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        for client in list(self._clients):
+            try:
+                client.sendall(data)
+            except OSError:
+                self._clients.remove(client)
+                client.close()
+
+    def close(self) -> None:
+        """Close all clients and remove the socket."""
+        for client in self._clients:
+            client.close()
+        self._clients.clear()
+        self._server.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _accept_pending(self) -> None:
+        """Accept queued connections without blocking."""
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client.settimeout(1.0)
+            self._clients.append(client)
+
+
+class MonitorStats:
+    """Startup time, per-sample CPU and wall time, and RSS of the monitor."""
+
+    def __init__(self):
+        """Start measuring from now."""
+        self.started_at = time.time()
+        self.startup_seconds: Optional[float] = None
+        self.samples = 0
+        self.failures = 0
+        self.last_cpu = 0.0
+        self.total_cpu = 0.0
+        self.max_cpu = 0.0
+        self.last_wall = 0.0
+        self.rss_kb: Optional[int] = None
+        self.max_rss_kb: Optional[int] = None
+
+    def mark_started(self) -> None:
+        """Record startup time (process start until the first sample)."""
+        age = process_age()
+        self.startup_seconds = age if age is not None else time.time() - self.started_at
+
+    def record_sample(self, cpu: float, wall: float, success: bool) -> None:
+        """Record one refresh.
+
+        Args:
+            cpu: CPU seconds spent by this process for the sample
+            wall: Wall seconds of the sample
+            success: Whether the refresh succeeded
+        """
+        self.samples += 1
+        if not success:
+            self.failures += 1
+        self.last_cpu = cpu
+        self.total_cpu += cpu
+        self.max_cpu = max(self.max_cpu, cpu)
+        self.last_wall = wall
+        self.rss_kb = read_rss_kb()
+        if self.rss_kb is not None:
+            self.max_rss_kb = max(self.max_rss_kb or 0, self.rss_kb)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Stats as a JSON-serializable dictionary."""
+        return {
+            'pid': os.getpid(),
+            'started_at': round(self.started_at, 3),
+            'startup_ms': round(self.startup_seconds * 1000, 1) if self.startup_seconds is not None else None,
+            'samples': self.samples,
+            'failures': self.failures,
+            'cpu_ms_last': round(self.last_cpu * 1000, 2),
+            'cpu_ms_avg': round(self.total_cpu / self.samples * 1000, 2) if self.samples else None,
+            'cpu_ms_max': round(self.max_cpu * 1000, 2),
+            'wall_ms_last': round(self.last_wall * 1000, 1),
+            'rss_kb': self.rss_kb,
+            'max_rss_kb': self.max_rss_kb,
+            'qt_loaded': 'PyQt5' in sys.modules,
+        }
+
+    def save(self, path: str) -> None:
+        """Write stats atomically (errors are logged, not raised)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to write monitor stats: {e}", file=sys.stderr)
+
+
+class HeadlessMonitor:
+    """Runs the BatteryManager refresh loop and forwards samples and events."""
+
+    def __init__(self, manager: BatteryManager, sinks: List[Any], interval: float = 30.0,
+                 threshold: Optional[int] = None, stats_file: Optional[str] = None,
+                 metrics_textfile: Optional[str] = None, start_threshold: Optional[int] = None):
+        """Initialize monitor.
+
+        Args:
+            manager: Battery manager to drive
+            sinks: Objects with emit(record) and close()
+            interval: Seconds between samples
+            threshold: Threshold applied to all batteries at startup (None
+                leaves the current thresholds alone)
+            stats_file: Where resource stats are written after every sample
+            metrics_textfile: Prometheus textfile rewritten after every sample
+            start_threshold: Emulated start threshold (end threshold toggling,
+                for firmware without one); None disables it
+        """
+        self.manager = manager
+        self.sinks = sinks
+        self.interval = interval
+        self.threshold = threshold
+        self.start_threshold = start_threshold
+        self.stats_file = stats_file
+        self.stats = MonitorStats()
+        self._exporter = None
+        self.metrics_textfile = metrics_textfile
+        self._stop = threading.Event()
+        self._emit_lock = threading.Lock()
+        # Manager calls queued by background threads, run by the loop
+        # (SimpleQueue: put() is safe from signal handlers)
+        self._calls: queue.SimpleQueue = queue.SimpleQueue()
+        self.manager.dispatcher = self._calls.put
+        self.manager.register_event_callback(self._on_event)
+
+    @property
+    def exporter(self):
+        """MetricsExporter of the manager (imported on first use)."""
+        if self._exporter is None:
+            from src.core.metrics import MetricsExporter
+            self._exporter = MetricsExporter(self.manager)
+        return self._exporter
+
+    def run(self) -> int:
+        """Initialize, apply the threshold and sample until stop() is called.
+
+        Returns:
+            Exit status (1 if the manager could not be initialized)
+        """
+        result = self._timed(self.manager.initialize)
+        if not result.success:
+            self.emit({'event': 'error', 'message': result.error_message})
+            return 1
+        self.stats.mark_started()
+        self._apply_threshold()
+        self._enable_start_threshold()
+        self._emit_sample()
+
+        deadline = time.monotonic() + self.interval
+        while not self._stop.is_set():
+            try:
+                call = self._calls.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                call = None
+            if self._stop.is_set():
+                break
+            if call is not None:
+                # UPower changes and uevent drift checks: manager state is
+                # only touched on this thread
+                try:
+                    call()
+                except Exception as e:
+                    print(f"Error in queued manager call: {e}", file=sys.stderr)
+                continue
+
+            result = self._timed(self.manager.refresh_status)
+            if result.success:
+                self._emit_sample()
+            else:
+                self.emit({'event': 'error', 'message': result.error_message})
+            deadline = time.monotonic() + self.interval
+        return 0
+
+    def stop(self) -> None:
+        """Stop the loop (safe from signal handlers and other threads)."""
+        self._stop.set()
+        self._calls.put(lambda: None)  # Wake the loop
+
+    def close(self) -> None:
+        """Release sinks and background resources."""
+        for sink in self.sinks:
+            sink.close()
+        if self.manager.uevent_monitor:
+            self.manager.uevent_monitor.stop()
+        if self.manager.upower_subscription:
+            self.manager.upower_subscription.stop()
+        for estimator in self.manager.estimators.values():
+            estimator.save()
+        for ledger in self.manager.energy_ledgers.values():
+            ledger.save()
+        self.manager.command_queue.shutdown(wait=False)
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        """Send a record to every sink.
+
+        Args:
+            record: Record with an 'event' key; 'time' is added
+        """
+        record = {'time': round(time.time(), 3), **record}
+        # Events may come from other threads; sinks are not thread-safe
+        with self._emit_lock:
+            for sink in self.sinks:
+                try:
+                    sink.emit(record)
+                except Exception as e:
+                    print(f"Error in sink {type(sink).__name__}: {e}", file=sys.stderr)
+
+    def _timed(self, operation):
+        """Run a manager operation and record its CPU and wall time."""
+        cpu_started, wall_started = time.process_time(), time.monotonic()
+        result = operation()
+        self.stats.record_sample(time.process_time() - cpu_started,
+                                 time.monotonic() - wall_started, result.success)
+        if self.stats_file:
+            self.stats.save(self.stats_file)
+        if self.metrics_textfile:
+            try:
+                self.exporter.write_textfile(self.metrics_textfile)
+            except OSError as e:
+                print(f"Failed to write metrics textfile: {e}", file=sys.stderr)
+        return result
+
+    def _apply_threshold(self) -> None:
+        """Apply the configured threshold where it differs."""
+        if self.threshold is None:
+            return
+        outdated = [name for name, info in self.manager.batteries.items()
+                    if info.end_threshold != self.threshold]
+        if not outdated:
+            return
+        result = self.manager.set_threshold(self.threshold, outdated)
+        if result.success:
+            self.emit({'event': 'threshold_applied', 'threshold': self.threshold, 'devices': outdated})
+        else:
+            self.emit({'event': 'error', 'message': result.error_message})
+
+    def _enable_start_threshold(self) -> None:
+        """Start the start threshold emulation on batteries without a hardware one."""
+        if self.start_threshold is None:
+            return
+        devices = [name for name, info in self.manager.batteries.items()
+                   if info.start_threshold is None]
+        if not devices:
+            return
+        result = self.manager.enable_start_threshold(self.start_threshold, batteries=devices)
+        if result.success:
+            self.emit({'event': 'start_threshold_enabled', 'start_threshold': self.start_threshold,
+                       'devices': devices})
+        else:
+            self.emit({'event': 'error', 'message': result.error_message})
+
+    def _emit_sample(self) -> None:
+        """Emit the current state of every battery."""
+        self.emit({
+            'event': 'sample',
+            'batteries': {name: self._battery_fields(info) for name, info in self.manager.batteries.items()},
+        })
+
+    @staticmethod
+    def _battery_fields(info: BatteryInfo) -> Dict[str, Any]:
+        """Sample fields of one battery."""
+        return {field: getattr(info, field) for field in SAMPLE_FIELDS
+                if getattr(info, field) is not None}
+
+    def _on_event(self, event: BatteryEvent) -> None:
+        """Forward a manager event."""
+        self.emit({'event': event.event_type, **event.data})
+
+
+def create_sink(spec: str) -> Any:
+    """Create a sink from its command line form.
+
+    Args:
+        spec: 'stdout', 'journal' or 'socket[:PATH]'
+
+    Returns:
+        Sink instance
+
+    Raises:
+        ValueError: If the sink type is unknown
+        OSError: If the sink cannot be opened
+    """
+    kind, _, argument = spec.partition(':')
+    if kind == 'stdout':
+        return StdoutSink()
+    if kind == 'journal':
+        return JournalSink(argument or JOURNAL_SOCKET)
+    if kind == 'socket':
+        return SocketSink(argument or os.path.join(runtime_dir(), "monitor.sock"))
+    raise ValueError(f"Unknown sink: {spec}")
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    """'run' command: monitor until SIGINT/SIGTERM."""
+    config = ConfigManager()
+    config.load()
+    interval = args.interval or config.get('refresh_interval')
+    threshold = args.apply_threshold
+    if threshold == -1:
+        threshold = config.get('default_threshold')
+    start_threshold = args.start_threshold or config.get('software_start_threshold')
+
+    try:
+        sinks = [create_sink(spec) for spec in (args.sink or ['stdout'])]
+    except (ValueError, OSError) as e:
+        print(f"Cannot open sink: {e}", file=sys.stderr)
+        return 64
+
+    status_writer = None
+    if args.publish:
+        from src.core.shared_status import DEFAULT_PATH, SharedStatusWriter
+        try:
+            status_writer = SharedStatusWriter(os.environ.get('A14_SHARED_STATUS', DEFAULT_PATH),
+                                               interval=interval)
+        except OSError as e:
+            print(f"Cannot publish shared status: {e}", file=sys.stderr)
+            return 1
+
+    manager = BatteryManager(CliInterface(use_shared_status=status_writer is None),
+                             status_writer=status_writer)
+    monitor = HeadlessMonitor(manager, sinks, interval=interval, threshold=threshold,
+                              stats_file=args.stats_file, metrics_textfile=args.metrics_textfile,
+                              start_threshold=start_threshold)
+
+    metrics_server = None
+    if args.metrics_listen:
+        from src.core.metrics import MetricsServer, parse_listen_address
+        try:
+            metrics_server = MetricsServer(monitor.exporter, parse_listen_address(args.metrics_listen))
+        except (ValueError, OSError) as e:
+            print(f"Cannot serve metrics on {args.metrics_listen}: {e}", file=sys.stderr)
+            monitor.close()
+            return 64
+        metrics_server.start()
+
+    signal.signal(signal.SIGTERM, lambda *_: monitor.stop())
+    signal.signal(signal.SIGINT, lambda *_: monitor.stop())
+    try:
+        return monitor.run()
+    finally:
+        if metrics_server:
+            metrics_server.stop()
+        monitor.close()
+        if status_writer:
+            status_writer.close()
+
+
+def _stats_command(args: argparse.Namespace) -> int:
+    """'stats' command: print the running monitor's resource stats."""
+    try:
+        with open(args.stats_file) as f:
+            stats = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"No monitor stats available ({args.stats_file}): {e}", file=sys.stderr)
+        return 1
+
+    running = os.path.exists(f"/proc/{stats.get('pid')}")
+    print(f"PID:            {stats.get('pid')} ({'running' if running else 'not running'})")
+    print(f"Startup:        {stats.get('startup_ms')} ms")
+    print(f"Samples:        {stats.get('samples')} ({stats.get('failures')} failed)")
+    print(f"CPU/sample:     last {stats.get('cpu_ms_last')} ms, avg {stats.get('cpu_ms_avg')} ms, "
+          f"max {stats.get('cpu_ms_max')} ms")
+    print(f"Wall/sample:    {stats.get('wall_ms_last')} ms")
+    rss, max_rss = stats.get('rss_kb'), stats.get('max_rss_kb')
+    print(f"RSS:            {rss / 1024:.1f} MB (max {max_rss / 1024:.1f} MB)" if rss and max_rss
+          else "RSS:            unknown")
+    print(f"Qt loaded:      {'yes' if stats.get('qt_loaded') else 'no'}")
+    return 0
+
+
+def _with_default_command(argv: List[str], commands) -> List[str]:
+    """Insert 'run' where the command is missing (``--headless --interval 5``).
+
+    Args:
+        argv: Arguments after --headless
+        commands: Known command names
+
+    Returns:
+        Arguments with a command after the global options
+    """
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        if arg == '--stats-file':
+            index += 2
+        elif arg.startswith('--stats-file='):
+            index += 1
+        else:
+            break
+    if index < len(argv) and (argv[index] in commands or argv[index] in ('-h', '--help')):
+        return argv
+    return argv[:index] + ['run'] + argv[index:]
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command line entry point for the headless monitor."""
+    parser = argparse.ArgumentParser(prog="a14-charge-keeper-gui --headless",
+                                     description="Battery monitor without the tray GUI")
+    parser.add_argument('--stats-file', default=os.path.join(runtime_dir(), "monitor-stats.json"),
+                        help="resource stats file")
+    commands = parser.add_subparsers(dest='command')
+
+    run = commands.add_parser('run', help="monitor batteries until interrupted")
+    run.add_argument('--interval', type=float, help="seconds between samples (default: config)")
+    run.add_argument('--sink', action='append',
+                     help="stdout, journal or socket[:PATH] (repeatable, default: stdout)")
+    run.add_argument('--apply-threshold', type=int, nargs='?', const=-1, metavar='VALUE',
+                     help="apply VALUE (default: configured threshold) at startup")
+    run.add_argument('--start-threshold', type=int, metavar='VALUE',
+                     help="emulate a start threshold by toggling the end threshold "
+                          "(default: configured software_start_threshold)")
+    run.add_argument('--publish', action='store_true',
+                     help="publish status to shared memory for other consumers")
+    run.add_argument('--metrics-textfile', metavar='PATH',
+                     help="write Prometheus metrics for node_exporter's textfile collector")
+    run.add_argument('--metrics-listen', metavar='[HOST:]PORT',
+                     help="serve OpenMetrics on http://HOST:PORT/metrics (host defaults to 127.0.0.1)")
+
+    commands.add_parser('stats', help="show startup time, CPU per sample and RSS")
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    args = parser.parse_args(_with_default_command(argv, commands.choices))
+    if args.command == 'stats':
+        return _stats_command(args)
+    return _run_command(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""Software start threshold for firmware that only has an end threshold.
+
+Batteries like the A14's expose ``charge_control_end_threshold`` alone, so
+on AC the charge hovers at the limit: every small drop below it starts a
+top-up. With a start threshold the charger waits until the charge has
+fallen to the lower bound instead. This controller emulates that by
+toggling the end threshold between two values:
+
+    charging: end threshold = end; on reaching end -> holding
+    holding:  end threshold = start (the firmware does not charge above
+              it); on falling to start -> charging
+
+Holding writes the start value rather than anything lower, so if nothing
+switches back (the app is not running) the battery still never drops
+below the start threshold on AC.
+
+The controller is a pure state machine: it is fed readings (percentage,
+current end threshold, time) and returns the threshold to write, if any.
+It performs no I/O and reads no clock, which keeps it testable without
+hardware; BatteryManager feeds it the readings it already receives
+(refreshes, UPower changes) and does the writes. Writes are rate limited:
+a write that would exceed the budget is dropped and the same decision is
+retried on the next reading.
+"""
+
+from collections import deque
+from typing import Deque, Optional
+
+
+CHARGING = "charging"
+HOLDING = "holding"
+
+
+class HysteresisController:
+    """Start/end threshold emulation for one battery."""
+
+    # Write budget: minimum seconds between writes, and writes per hour
+    MIN_INTERVAL = 60.0
+    MAX_WRITES_PER_HOUR = 6
+
+    def __init__(self, start: int, end: int, min_interval: Optional[float] = None,
+                 max_writes_per_hour: Optional[int] = None):
+        """Initialize controller.
+
+        Args:
+            start: Charge level at which charging resumes (20-99)
+            end: Charge level at which charging stops (above start, up to 100)
+            min_interval: Minimum seconds between writes (class default if None)
+            max_writes_per_hour: Write budget per hour (class default if None)
+
+        Raises:
+            ValueError: If the bounds are out of range
+        """
+        self.start = start
+        self.end = end
+        self.retarget(end)
+        self.min_interval = self.MIN_INTERVAL if min_interval is None else min_interval
+        self.max_writes_per_hour = (self.MAX_WRITES_PER_HOUR if max_writes_per_hour is None
+                                    else max_writes_per_hour)
+        self.state: Optional[str] = None  # Decided by the first reading
+        self.writes = 0
+        self.deferred = 0  # Writes postponed by the budget
+        self._write_times: Deque[float] = deque()
+
+    def retarget(self, end: int) -> None:
+        """Change the end threshold (the start threshold stays).
+
+        Raises:
+            ValueError: If end is not above the start threshold
+        """
+        if not 20 <= self.start < end <= 100:
+            raise ValueError(f"Need 20 <= start < end <= 100 (start {self.start}, end {end})")
+        self.end = end
+
+    @property
+    def target(self) -> int:
+        """End threshold the current state calls for."""
+        return self.start if self.state == HOLDING else self.end
+
+    def observe(self, percentage: Optional[int], threshold: Optional[int], now: float,
+                charging: bool = False) -> Optional[int]:
+        """Advance on a reading.
+
+        Args:
+            percentage: Current charge level
+            threshold: Current end threshold
+            now: Monotonic time of the reading (seconds)
+            charging: Whether the battery is charging (only decides the
+                initial state between the bounds: a charge in progress runs
+                to the end threshold, otherwise the charge is held)
+
+        Returns:
+            End threshold to write, or None
+        """
+        if percentage is None:
+            return None
+        if self.state is None:
+            self.state = CHARGING if percentage <= self.start or (
+                charging and percentage < self.end) else HOLDING
+        elif self.state == CHARGING and percentage >= self.end:
+            self.state = HOLDING
+        elif self.state == HOLDING and percentage <= self.start:
+            self.state = CHARGING
+
+        target = self.target
+        if threshold == target:
+            return None
+        if not self._take_budget(now):
+            self.deferred += 1
+            return None
+        self.writes += 1
+        return target
+
+    def _take_budget(self, now: float) -> bool:
+        """Record a write at now if the budget allows it."""
+        times = self._write_times
+        while times and now - times[0] >= 3600:
+            times.popleft()
+        if (times and now - times[-1] < self.min_interval) or len(times) >= self.max_writes_per_hour:
+            return False
+        times.append(now)
+        return True
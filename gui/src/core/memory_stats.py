@@ -0,0 +1,117 @@
+"""Process memory statistics and trimming.
+
+RSS figures come from /proc/self/status (VmRSS, and VmHWM for the peak).
+Python heap figures are what the interpreter can report cheaply: allocated
+memory blocks, objects tracked by the garbage collector and, when
+tracemalloc is tracing, the traced size. ``trim()`` runs a full garbage
+collection and then asks glibc to return free heap pages to the system,
+which is what actually lowers RSS after windows have been destroyed; on
+other C libraries only the collection happens.
+"""
+
+import gc
+import sys
+from dataclasses import dataclass
+from typing import Optional
+
+
+def _read_status_kb(field: str) -> Optional[int]:
+    """Read a kB field (e.g. "VmRSS") of this process from /proc."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def read_rss_kb() -> Optional[int]:
+    """Resident set size of this process in kB (from /proc)."""
+    return _read_status_kb("VmRSS")
+
+
+def read_peak_rss_kb() -> Optional[int]:
+    """Peak resident set size of this process in kB (from /proc)."""
+    return _read_status_kb("VmHWM")
+
+
+@dataclass
+class MemoryStats:
+    """Memory figures of this process at one point in time."""
+    rss_kb: Optional[int]
+    peak_rss_kb: Optional[int]
+    python_blocks: int  # Memory blocks allocated by the interpreter
+    gc_objects: int  # Objects tracked by the garbage collector
+    traced_kb: Optional[int] = None  # Set while tracemalloc is tracing
+
+    def rss_text(self) -> str:
+        """Format RSS and peak, e.g. "52.3 MB (peak 61.0 MB)"."""
+        if self.rss_kb is None:
+            return "Unknown"
+        text = format_kb(self.rss_kb)
+        if self.peak_rss_kb is not None:
+            text += f" (peak {format_kb(self.peak_rss_kb)})"
+        return text
+
+    def heap_text(self) -> str:
+        """Format the Python heap figures."""
+        text = f"{self.python_blocks:,} blocks, {self.gc_objects:,} objects"
+        if self.traced_kb is not None:
+            text += f", {format_kb(self.traced_kb)} traced"
+        return text
+
+
+def format_kb(kb: float) -> str:
+    """Format a kB figure as MB."""
+    return f"{kb / 1024:.1f} MB"
+
+
+def collect() -> MemoryStats:
+    """Take the current memory figures."""
+    import tracemalloc  # Not at module level: the headless monitor only reads RSS
+
+    traced_kb = None
+    if tracemalloc.is_tracing():
+        traced_kb = tracemalloc.get_traced_memory()[0] // 1024
+    return MemoryStats(read_rss_kb(), read_peak_rss_kb(), sys.getallocatedblocks(),
+                       len(gc.get_objects()), traced_kb)
+
+
+_malloc_trim = None
+
+
+def _load_malloc_trim():
+    """Get glibc's malloc_trim, or None where it is not available."""
+    global _malloc_trim
+    if _malloc_trim is None:
+        import ctypes
+        import ctypes.util
+
+        _malloc_trim = False
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+            _malloc_trim = libc.malloc_trim
+            _malloc_trim.argtypes = [ctypes.c_size_t]
+            _malloc_trim.restype = ctypes.c_int
+        except (OSError, AttributeError):
+            pass  # Not glibc
+    return _malloc_trim or None
+
+
+def trim() -> Optional[int]:
+    """Collect garbage and return free heap memory to the system.
+
+    Returns:
+        kB of RSS released, or None if RSS cannot be read
+    """
+    before = read_rss_kb()
+    gc.collect()
+    malloc_trim = _load_malloc_trim()
+    if malloc_trim is not None:
+        malloc_trim(0)
+    after = read_rss_kb()
+    if before is None or after is None:
+        return None
+    return max(before - after, 0)
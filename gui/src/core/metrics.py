@@ -0,0 +1,231 @@
+"""OpenMetrics / Prometheus exporter for battery telemetry.
+
+Metrics are rendered from the BatteryManager's cached state (the last
+refresh), never by running the CLI, so scraping is cheap at any rate.
+The rendered text is cached until the manager's state version (bumped by
+every change to battery state or refresh statistics) or a CLI counter
+changes. Two outputs are supported:
+
+* a node_exporter textfile (Prometheus text format), rewritten atomically
+  after every refresh;
+* a local HTTP endpoint (``/metrics``) answering in OpenMetrics when the
+  scraper asks for it and in the Prometheus text format otherwise
+  (``http.server`` is imported only when one is started).
+"""
+
+import os
+import threading
+from typing import Any, List, Optional, Tuple
+
+
+PREFIX = "a14_charge_keeper"
+DEFAULT_LISTEN = ("127.0.0.1", 9788)
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (metric name, BatteryInfo attribute, help text)
+BATTERY_GAUGES = (
+    ("battery_end_threshold_percent", "end_threshold", "Charge end threshold"),
+    ("battery_percentage_percent", "percentage", "State of charge"),
+    ("battery_energy_rate_watts", "energy_rate", "Charge or discharge power"),
+    ("battery_capacity_percent", "capacity", "Capacity reported by upower"),
+    ("battery_charge_cycles", "charge_cycles", "Charge cycle count"),
+    ("battery_health_percent", "health_percentage", "Full capacity relative to design capacity"),
+)
+
+
+def _format_value(value: Any) -> str:
+    """Render a sample value."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+def _escape_label(value: str) -> str:
+    """Escape a label value."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class MetricsExporter:
+    """Renders a BatteryManager's cached state as metrics text."""
+
+    def __init__(self, manager: Any):
+        """Initialize exporter.
+
+        Args:
+            manager: BatteryManager whose cached state is exported
+        """
+        self.manager = manager
+        self._lock = threading.Lock()
+        self._cache: dict = {}
+        self.render_count = 0
+
+    def render(self, openmetrics: bool = True) -> str:
+        """Return the metrics text, re-rendering only when the inputs changed.
+
+        Args:
+            openmetrics: OpenMetrics format (counter families without the
+                _total suffix, # EOF terminator) instead of Prometheus text
+
+        Returns:
+            Exposition text
+        """
+        key = self._state_key()
+        with self._lock:
+            cached = self._cache.get(openmetrics)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            text = self._render(openmetrics)
+            self._cache[openmetrics] = (key, text)
+            self.render_count += 1
+            return text
+
+    def write_textfile(self, path: str) -> None:
+        """Write Prometheus text atomically for node_exporter's textfile collector.
+
+        Args:
+            path: Target file (node_exporter only reads ``*.prom``)
+
+        Raises:
+            OSError: If the file cannot be written
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.render(openmetrics=False))
+        os.replace(tmp_path, path)
+
+    def _state_key(self) -> Tuple:
+        """Values whose change invalidates the rendered text."""
+        manager = self.manager
+        cli = manager.cli_interface
+        return (manager.state_version, getattr(cli, 'spawn_count', 0),
+                getattr(cli, 'shared_status_hits', 0))
+
+    def _render(self, openmetrics: bool) -> str:
+        """Render all metric families."""
+        lines: List[str] = []
+        batteries = list(self.manager.batteries.items())
+
+        for name, attribute, help_text in BATTERY_GAUGES:
+            samples = []
+            for device, info in batteries:
+                value = getattr(info, attribute, None)
+                if value is not None:
+                    samples.append((f'{{device="{_escape_label(device)}"}}', value))
+            self._family(lines, name, "gauge", help_text, samples, openmetrics)
+
+        manager = self.manager
+        cli = manager.cli_interface
+        self._family(lines, "refresh_duration_seconds", "gauge", "Duration of the last refresh",
+                     [("", manager.last_refresh_duration)], openmetrics)
+        self._family(lines, "last_refresh_timestamp_seconds", "gauge",
+                     "Time of the last successful refresh",
+                     [("", manager.last_refresh_time)], openmetrics)
+        self._family(lines, "refreshes", "counter", "Battery refreshes",
+                     [("", manager.refresh_count)], openmetrics)
+        self._family(lines, "refresh_failures", "counter", "Failed battery refreshes",
+                     [("", manager.refresh_failures)], openmetrics)
+        self._family(lines, "cli_spawns", "counter", "CLI processes started",
+                     [("", getattr(cli, 'spawn_count', 0))], openmetrics)
+        self._family(lines, "shared_status_hits", "counter",
+                     "Status reads answered from shared memory",
+                     [("", getattr(cli, 'shared_status_hits', 0))], openmetrics)
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _family(lines: List[str], name: str, metric_type: str, help_text: str,
+                samples: List[Tuple[str, Any]], openmetrics: bool) -> None:
+        """Append one metric family (skipped when it has no values)."""
+        samples = [(labels, value) for labels, value in samples if value is not None]
+        if not samples:
+            return
+        family = f"{PREFIX}_{name}"
+        sample_name = f"{family}_total" if metric_type == "counter" else family
+        if not openmetrics:
+            family = sample_name  # Prometheus text names counter families with _total
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {metric_type}")
+        if openmetrics and name.endswith("_seconds"):
+            lines.append(f"# UNIT {family} seconds")
+        for labels, value in samples:
+            lines.append(f"{sample_name}{labels} {_format_value(value)}")
+
+
+def _handler_class():
+    """Build the request handler class (imports http.server on first use)."""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        """Serves /metrics from the server's exporter."""
+
+        def do_GET(self):
+            """Answer a scrape."""
+            if self.path.split('?', 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            openmetrics = "application/openmetrics-text" in self.headers.get('Accept', '')
+            body = self.server.exporter.render(openmetrics).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            """Keep scrapes out of the log."""
+
+    return MetricsHandler
+
+
+class MetricsServer:
+    """Local HTTP endpoint for a MetricsExporter on a daemon thread."""
+
+    def __init__(self, exporter: MetricsExporter, address: Tuple[str, int] = DEFAULT_LISTEN):
+        """Bind the server.
+
+        Args:
+            exporter: Exporter to serve
+            address: (host, port) to listen on (localhost by default)
+
+        Raises:
+            OSError: If the address cannot be bound
+        """
+        from http.server import ThreadingHTTPServer
+
+        self._server = ThreadingHTTPServer(address, _handler_class())
+        self._server.daemon_threads = True
+        self._server.exporter = exporter
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Bound (host, port)."""
+        return self._server.server_address[:2]
+
+    def start(self) -> None:
+        """Serve on a daemon thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop serving and close the socket."""
+        if self._thread:
+            self._server.shutdown()
+        self._server.server_close()
+
+
+def parse_listen_address(spec: str) -> Tuple[str, int]:
+    """Parse '[HOST:]PORT' (host defaults to localhost).
+
+    Raises:
+        ValueError: If the port is not a number
+    """
+    host, _, port = spec.rpartition(':')
+    return (host or DEFAULT_LISTEN[0], int(port))
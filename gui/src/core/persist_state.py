@@ -0,0 +1,90 @@
+"""Persisted threshold state shared with the CLI's static systemd unit.
+
+The boot service and sleep hook installed by 'a14-charge-keeper persist'
+contain no value; they run 'a14-charge-keeper apply-persisted', which
+reads the threshold from a small state file. Changing the persisted value
+is therefore a single atomic file replacement, with no unit regeneration
+or 'systemctl daemon-reload'.
+"""
+
+import os
+from typing import NamedTuple, Optional
+
+
+STATE_FILE = "/etc/a14-charge-keeper/persist.conf"
+SERVICE_FILE = "/etc/systemd/system/a14-charge-keeper.service"
+SLEEP_HOOK = "/lib/systemd/system-sleep/a14-charge-keeper"
+UNIT_MARKER = "# a14-charge-keeper static unit v1"
+
+
+class PersistedThreshold(NamedTuple):
+    """Threshold the boot service and sleep hook re-apply."""
+    device: str
+    threshold: int
+
+
+class PersistState:
+    """Reads and atomically writes the persisted threshold state file."""
+
+    def __init__(self, state_file: str = STATE_FILE, service_file: str = SERVICE_FILE,
+                 sleep_hook: str = SLEEP_HOOK):
+        """Initialize persist state.
+
+        Args:
+            state_file: KEY=VALUE state file read by 'apply-persisted'
+            service_file: Static boot unit location
+            sleep_hook: Static system-sleep hook location
+        """
+        self.state_file = state_file
+        self.service_file = service_file
+        self.sleep_hook = sleep_hook
+
+    def read(self) -> Optional[PersistedThreshold]:
+        """Read persisted threshold, or None if nothing is persisted."""
+        values = {}
+        try:
+            with open(self.state_file) as f:
+                for line in f:
+                    key, sep, value = line.strip().partition('=')
+                    if sep:
+                        values[key] = value
+        except OSError:
+            return None
+
+        try:
+            return PersistedThreshold(values.get('BAT_NAME', 'BAT0'), int(values['THRESHOLD']))
+        except (KeyError, ValueError):
+            return None
+
+    def write(self, device: str, threshold: int) -> None:
+        """Atomically replace the persisted threshold.
+
+        Raises:
+            OSError: If the state file cannot be written
+        """
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp.{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            f.write(f"BAT_NAME={device}\nTHRESHOLD={threshold}\n")
+        os.replace(tmp_path, self.state_file)
+
+    def clear(self) -> None:
+        """Remove persisted threshold (service and hook become no-ops)."""
+        try:
+            os.unlink(self.state_file)
+        except FileNotFoundError:
+            pass
+
+    def units_installed(self) -> bool:
+        """Check whether the static service and sleep hook are installed."""
+        try:
+            with open(self.service_file) as f:
+                if f.readline().strip() != UNIT_MARKER:
+                    return False
+            with open(self.sleep_hook) as f:
+                f.readline()  # shebang
+                return f.readline().strip() == UNIT_MARKER
+        except OSError:
+            return False
@@ -0,0 +1,311 @@
+"""Scalable scanner for /sys/class/power_supply.
+
+Test racks expose hundreds of USB-PD sinks and peripheral batteries under
+power_supply. The scanner enumerates the class directory with a single
+``os.scandir`` and reads exactly one file per device (``uevent``, which
+carries the type, scope and all standard properties), and keeps the
+result as a device index. The index is reused until a kernel add/remove
+uevent for the power_supply subsystem invalidates it, so steady-state
+lookups cost no filesystem access at all.
+"""
+
+import os
+import select
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+SYSFS_ROOT = "/sys/class/power_supply"
+END_THRESHOLD_FILE = "charge_control_end_threshold"
+
+# Kernel uevent multicast group of NETLINK_KOBJECT_UEVENT
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_KERNEL_GROUP = 1
+UEVENT_BUFFER_SIZE = 16384
+
+
+class PowerSupplyDevice(NamedTuple):
+    """Indexed power_supply device."""
+    name: str
+    type: str  # Battery, Mains, USB, ...
+    scope: Optional[str]  # System, Device (peripherals) or None
+    path: str
+
+    @property
+    def is_system_battery(self) -> bool:
+        """Battery powering the machine (not a mouse or headset)."""
+        return self.type == "Battery" and self.scope != "Device"
+
+
+def parse_uevent(data: str) -> Dict[str, str]:
+    """Parse KEY=VALUE lines of a uevent file.
+
+    Args:
+        data: uevent file contents
+
+    Returns:
+        Property dictionary (POWER_SUPPLY_ prefix kept)
+    """
+    properties = {}
+    for line in data.splitlines():
+        key, sep, value = line.partition('=')
+        if sep:
+            properties[key] = value
+    return properties
+
+
+class PowerSupplyScanner:
+    """Cached power_supply device index."""
+
+    def __init__(self, sysfs_root: str = SYSFS_ROOT,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize scanner.
+
+        Args:
+            sysfs_root: power_supply class directory (a fake tree for testing)
+            clock: Monotonic clock (injectable for testing)
+        """
+        self.sysfs_root = sysfs_root
+        self._clock = clock
+        self._index: Optional[List[PowerSupplyDevice]] = None
+        self._lock = threading.Lock()
+        self.scan_count = 0
+        self.last_scan_duration = 0.0  # seconds
+
+    def scan(self) -> List[PowerSupplyDevice]:
+        """Enumerate devices now and rebuild the index.
+
+        Returns:
+            Devices sorted by name
+        """
+        started = self._clock()
+        devices = []
+        try:
+            with os.scandir(self.sysfs_root) as entries:
+                for entry in entries:
+                    data = self._read_raw_uevent(entry.path)
+                    device_type = self._raw_property(data, b"\nPOWER_SUPPLY_TYPE=")
+                    if device_type:
+                        devices.append(PowerSupplyDevice(
+                            entry.name, device_type,
+                            self._raw_property(data, b"\nPOWER_SUPPLY_SCOPE="), entry.path))
+        except FileNotFoundError:
+            pass
+        devices.sort()
+
+        with self._lock:
+            self._index = devices
+            self.scan_count += 1
+            self.last_scan_duration = self._clock() - started
+        return devices
+
+    def devices(self) -> List[PowerSupplyDevice]:
+        """Return the device index, scanning only if it was invalidated."""
+        with self._lock:
+            index = self._index
+        return index if index is not None else self.scan()
+
+    def batteries(self, include_peripherals: bool = False) -> List[PowerSupplyDevice]:
+        """Return indexed batteries.
+
+        Args:
+            include_peripherals: Also return Device-scope batteries (mice,
+                headsets, ...)
+        """
+        return [device for device in self.devices()
+                if device.type == "Battery" and (include_peripherals or device.scope != "Device")]
+
+    def threshold_batteries(self) -> List[str]:
+        """Names of batteries exposing an end threshold (one stat per battery)."""
+        return [device.name for device in self.batteries()
+                if os.path.exists(os.path.join(device.path, END_THRESHOLD_FILE))]
+
+    def read_uevent(self, name: str) -> Dict[str, str]:
+        """Read current properties of a device (one read)."""
+        return self.read_uevent_path(os.path.join(self.sysfs_root, name))
+
+    def invalidate(self) -> None:
+        """Drop the index; the next lookup rescans."""
+        with self._lock:
+            self._index = None
+
+    @property
+    def is_cached(self) -> bool:
+        """Whether an index is currently held."""
+        return self._index is not None
+
+    @classmethod
+    def read_uevent_path(cls, device_path: str) -> Dict[str, str]:
+        """Read and parse a device's uevent file ({} if unreadable)."""
+        return parse_uevent(cls._read_raw_uevent(device_path).decode('utf-8', 'replace'))
+
+    @staticmethod
+    def _read_raw_uevent(device_path: str) -> bytes:
+        """Read a uevent file with a single read (b'' if unreadable).
+
+        The result is prefixed with a newline so every property can be
+        found as b'\\nKEY='.
+        """
+        try:
+            fd = os.open(device_path + "/uevent", os.O_RDONLY)
+        except OSError:
+            return b""
+        try:
+            return b"\n" + os.read(fd, UEVENT_BUFFER_SIZE)
+        except OSError:
+            return b""
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _raw_property(data: bytes, marker: bytes) -> Optional[str]:
+        """Extract one property value from raw uevent data."""
+        start = data.find(marker)
+        if start < 0:
+            return None
+        start += len(marker)
+        end = data.find(b"\n", start)
+        return data[start:end if end >= 0 else len(data)].decode('utf-8', 'replace')
+
+
+class UeventMonitor:
+    """Invalidates a scanner's index on power_supply add/remove uevents.
+
+    Listens on the kernel uevent netlink group. The socket is non-blocking:
+    call process_pending() when fileno() is readable (e.g. from a
+    QSocketNotifier) or start() a background thread.
+    """
+
+    ACTIONS = ("add", "remove", "move")
+
+    def __init__(self, scanner: PowerSupplyScanner,
+                 on_change: Optional[Callable[[str, str], None]] = None,
+                 on_values_changed: Optional[Callable[[str], None]] = None):
+        """Initialize monitor.
+
+        Args:
+            scanner: Scanner whose index is invalidated
+            on_change: Optional callback(action, device_name) after invalidation
+            on_values_changed: Optional callback(device_name) for 'change'
+                uevents (AC plug, capacity steps); the index is kept
+        """
+        self.scanner = scanner
+        self.on_change = on_change
+        self.on_values_changed = on_values_changed
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+    def open(self) -> bool:
+        """Open the netlink socket.
+
+        Returns:
+            True if listening; False if netlink is unavailable (the caller
+            should then rescan periodically)
+        """
+        if self._socket:
+            return True
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, UEVENT_KERNEL_GROUP))  # port 0: kernel assigns
+            sock.setblocking(False)
+        except (OSError, AttributeError) as e:
+            print(f"Uevent monitor unavailable: {e}")
+            return False
+        self._socket = sock
+        return True
+
+    def fileno(self) -> int:
+        """File descriptor to watch for readability (-1 if closed)."""
+        return self._socket.fileno() if self._socket else -1
+
+    def process_pending(self) -> int:
+        """Handle all queued uevents without blocking.
+
+        Returns:
+            Number of power_supply add/remove events handled
+        """
+        handled = 0
+        while self._socket:
+            try:
+                data = self._socket.recv(UEVENT_BUFFER_SIZE)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError as e:
+                # Receive buffer overrun: events were lost, rescan to be safe
+                print(f"Uevent receive failed: {e}")
+                self.scanner.invalidate()
+                break
+            event = self.handle_message(data)
+            if event:
+                handled += 1
+        return handled
+
+    def handle_message(self, data: bytes) -> Optional[tuple]:
+        """Handle one raw kernel uevent message.
+
+        Args:
+            data: Message as received from netlink
+
+        Returns:
+            (action, device name) if the index was invalidated, else None
+        """
+        fields = data.split(b'\0')
+        properties = {}
+        for field in fields[1:]:
+            key, sep, value = field.partition(b'=')
+            if sep:
+                properties[key] = value
+        if properties.get(b'SUBSYSTEM') != b'power_supply':
+            return None
+        action = properties.get(b'ACTION', b'').decode('ascii', 'replace')
+        name = os.path.basename(properties.get(b'DEVPATH', b'').decode('utf-8', 'replace'))
+        if action == 'change' and self.on_values_changed:
+            try:
+                self.on_values_changed(name)
+            except Exception as e:
+                print(f"Error in uevent callback: {e}")
+        if action not in self.ACTIONS:
+            return None  # 'change' events update values, not the device set
+
+        self.scanner.invalidate()
+        if self.on_change:
+            try:
+                self.on_change(action, name)
+            except Exception as e:
+                print(f"Error in uevent callback: {e}")
+        return action, name
+
+    def start(self) -> bool:
+        """Process uevents on a daemon thread.
+
+        Returns:
+            True if the monitor is running
+        """
+        if not self.open():
+            return False
+        if self._thread and self._thread.is_alive():
+            return True
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="UeventMonitor", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Stop the thread and close the socket."""
+        self._running = False
+        sock, self._socket = self._socket, None
+        if sock:
+            sock.close()
+
+    def _run(self) -> None:
+        """Thread loop: wait for readability, then drain the socket."""
+        while self._running and self._socket:
+            try:
+                readable, _, _ = select.select([self._socket], [], [], 1.0)
+            except (OSError, ValueError):
+                return
+            if readable:
+                self.process_pending()
@@ -0,0 +1,607 @@
+"""Record battery traces and replay them into BatteryManager on a virtual clock.
+
+The recorder captures what the manager would read, with timestamps: the raw
+stdout of ``a14-charge-keeper status`` or a sysfs snapshot (the battery's
+uevent properties and threshold attributes), one JSON object per line. The
+replay backend serves those records to an unmodified BatteryManager through
+the CliInterface methods it uses, always returning the newest record at or
+before the virtual time. Threshold writes (set_threshold, drift re-applies)
+are kept as an overlay on the recorded values until the trace itself
+changes the threshold, so policies see the effect of their own writes.
+
+VirtualClock provides ``time``/``monotonic``/``sleep`` callables like the
+injectable clocks of ThresholdEngine and PowerSupplyScanner; while a replay
+runs it also stands in for the ``time`` module of the core modules that
+read the clock directly (refresh scheduling, drift rate limits, estimator
+and ledger timing). At the default 1000x a day of 30-second refreshes
+replays in under 90 seconds; speed 0 runs as fast as possible. The report
+covers behaviour (events, drift records, writes, final state) and the cost
+of refresh, parse and event dispatch measured with the real clock.
+
+    python3 -m src.core.replay record TRACE [--source status|sysfs] [--interval S] [--duration S]
+    python3 -m src.core.replay run TRACE [--interval S] [--speed X] [--target N]
+                                         [--start-threshold N]
+"""
+
+import argparse
+import bisect
+import contextlib
+import json
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+from src.core.capability_probe import CapabilityRecord
+from src.core.cli_interface import CliInterface, CliResult
+from src.core.power_supply_scanner import SYSFS_ROOT, PowerSupplyScanner
+from src.core.snapshots import BatteryInfoSnapshot
+from src.core.status_parser import StatusParser
+
+
+TRACE_KINDS = ("status", "sysfs")
+
+# Modules whose ``time`` is replaced by the virtual clock during a replay
+CLOCK_MODULES = (
+    "src.core.battery_manager",
+    "src.core.charge_estimator",
+    "src.core.drift_monitor",
+    "src.core.energy_ledger",
+    "src.core.sample_log",
+)
+
+# power_supply STATUS values mapped to upower state names (as BatteryManager)
+_SYSFS_STATES = {
+    'Charging': 'charging',
+    'Discharging': 'discharging',
+    'Full': 'fully-charged',
+    'Not charging': 'pending-charge',
+}
+
+
+class TraceRecord(NamedTuple):
+    """One recorded read of one battery."""
+    timestamp: float
+    battery: str
+    kind: str  # status or sysfs
+    data: Dict[str, Any]
+
+
+def _micro(properties: Dict[str, str], key: str) -> Optional[float]:
+    """A micro-unit uevent property in base units (None if absent)."""
+    value = properties.get(f"POWER_SUPPLY_{key}")
+    try:
+        return int(value) / 1e6 if value is not None else None
+    except ValueError:
+        return None
+
+
+def snapshot_from_uevent(battery: str, properties: Dict[str, str], end_threshold: int,
+                         start_threshold: Optional[int] = None) -> BatteryInfoSnapshot:
+    """Build a battery snapshot from sysfs uevent properties.
+
+    Charge-based batteries (µAh) are converted with the present voltage.
+
+    Args:
+        battery: power_supply device name
+        properties: uevent properties (POWER_SUPPLY_ prefix kept)
+        end_threshold: End threshold read alongside
+        start_threshold: Start threshold, if the model has one
+
+    Returns:
+        BatteryInfoSnapshot with the fields sysfs provides
+    """
+    voltage = _micro(properties, "VOLTAGE_NOW")
+    energy, full, design = (_micro(properties, key) for key in
+                            ("ENERGY_NOW", "ENERGY_FULL", "ENERGY_FULL_DESIGN"))
+    rate = _micro(properties, "POWER_NOW")
+    if energy is None and voltage:
+        charge = [_micro(properties, key) for key in
+                  ("CHARGE_NOW", "CHARGE_FULL", "CHARGE_FULL_DESIGN", "CURRENT_NOW")]
+        energy, full, design, rate = (value * voltage if value is not None else None
+                                      for value in charge)
+    capacity = properties.get("POWER_SUPPLY_CAPACITY")
+    cycles = properties.get("POWER_SUPPLY_CYCLE_COUNT")
+    return BatteryInfoSnapshot(
+        device=battery,
+        end_threshold=end_threshold,
+        start_threshold=start_threshold,
+        vendor=properties.get("POWER_SUPPLY_MANUFACTURER"),
+        model=properties.get("POWER_SUPPLY_MODEL_NAME"),
+        serial=properties.get("POWER_SUPPLY_SERIAL_NUMBER"),
+        state=_SYSFS_STATES.get(properties.get("POWER_SUPPLY_STATUS", ""), "unknown"),
+        percentage=int(capacity) if capacity and capacity.isdigit() else None,
+        energy_current=energy,
+        energy_full=full,
+        energy_full_design=design,
+        energy_rate=abs(rate) if rate is not None else None,
+        voltage=voltage,
+        capacity=full / design * 100 if full and design else None,
+        charge_cycles=int(cycles) if cycles and cycles.isdigit() and int(cycles) > 0 else None
+    )
+
+
+class TraceRecorder:
+    """Append timestamped status outputs or sysfs snapshots to a trace file."""
+
+    def __init__(self, path: str, sysfs_root: str = SYSFS_ROOT):
+        """Initialize recorder.
+
+        Args:
+            path: Trace file (appended to)
+            sysfs_root: power_supply class directory
+        """
+        self.path = path
+        self.sysfs_root = sysfs_root
+        self.scanner = PowerSupplyScanner(sysfs_root)
+
+    def record_status(self, battery: str) -> TraceRecord:
+        """Run ``a14-charge-keeper status`` once and record its raw output."""
+        timestamp = time.time()
+        try:
+            result = subprocess.run([CliInterface.CLI_COMMAND, 'status'], capture_output=True,
+                                    text=True, timeout=CliInterface.TIMEOUT_SECONDS,
+                                    env=dict(os.environ, BAT_NAME=battery))
+            data = {"exit": result.returncode, "output": result.stdout,
+                    "stderr": result.stderr.strip()}
+        except (OSError, subprocess.TimeoutExpired) as e:
+            data = {"exit": None, "output": "", "stderr": str(e)}
+        return self._append(TraceRecord(timestamp, battery, "status", data))
+
+    def record_sysfs(self, battery: str) -> TraceRecord:
+        """Record the battery's uevent properties and threshold attributes."""
+        timestamp = time.time()
+        data = {"uevent": self.scanner.read_uevent(battery)}
+        for key, attribute in (("end_threshold", "charge_control_end_threshold"),
+                               ("start_threshold", "charge_control_start_threshold")):
+            try:
+                with open(os.path.join(self.sysfs_root, battery, attribute)) as f:
+                    data[key] = int(f.read().strip())
+            except (OSError, ValueError):
+                data[key] = None
+        return self._append(TraceRecord(timestamp, battery, "sysfs", data))
+
+    def run(self, batteries: Sequence[str], source: str = "sysfs", interval: float = 30.0,
+            duration: Optional[float] = None) -> int:
+        """Record every battery each interval until the duration has passed.
+
+        Returns:
+            Number of records written
+        """
+        record = self.record_status if source == "status" else self.record_sysfs
+        started = time.monotonic()
+        count = 0
+        while duration is None or time.monotonic() - started < duration:
+            cycle = time.monotonic()
+            for battery in batteries:
+                record(battery)
+                count += 1
+            time.sleep(max(interval - (time.monotonic() - cycle), 0.0))
+        return count
+
+    def _append(self, record: TraceRecord) -> TraceRecord:
+        """Write one record as a JSON line."""
+        with open(self.path, 'a') as f:
+            f.write(json.dumps({"t": record.timestamp, "battery": record.battery,
+                                "kind": record.kind, **record.data}) + "\n")
+        return record
+
+
+def load_trace(path: str) -> List[TraceRecord]:
+    """Read a trace file, ordered by time (unreadable lines are skipped)."""
+    records = []
+    with open(path) as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+                timestamp, battery, kind = entry.pop("t"), entry.pop("battery"), entry.pop("kind")
+            except (ValueError, KeyError):
+                continue
+            if kind in TRACE_KINDS:
+                records.append(TraceRecord(float(timestamp), battery, kind, entry))
+    records.sort(key=lambda record: record.timestamp)
+    return records
+
+
+class _ClockModule:
+    """Stand-in for the time module: clock functions from a VirtualClock."""
+
+    def __init__(self, clock: 'VirtualClock'):
+        self.time = clock.time
+        self.monotonic = clock.monotonic
+        self.sleep = clock.sleep
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(time, name)
+
+
+class VirtualClock:
+    """Wall and monotonic time advanced by sleep() instead of by waiting."""
+
+    def __init__(self, start: float, speed: float = 1000.0):
+        """Initialize clock.
+
+        Args:
+            start: Initial wall time (epoch)
+            speed: Virtual seconds per real second while sleeping (0 does not wait)
+        """
+        self._now = start
+        self._start = start
+        self.speed = speed
+
+    def time(self) -> float:
+        """Virtual epoch time."""
+        return self._now
+
+    def monotonic(self) -> float:
+        """Virtual seconds since the clock was created."""
+        return self._now - self._start
+
+    def sleep(self, seconds: float) -> None:
+        """Advance the clock, waiting seconds / speed of real time."""
+        if seconds <= 0:
+            return
+        if self.speed:
+            time.sleep(seconds / self.speed)
+        self._now += seconds
+
+    @contextlib.contextmanager
+    def installed(self, modules: Iterable[str] = CLOCK_MODULES) -> Iterator['VirtualClock']:
+        """Let modules that read the time module directly see this clock."""
+        proxy = _ClockModule(self)
+        patched = []
+        try:
+            for name in modules:
+                module = sys.modules.get(name) or __import__(name, fromlist=["time"])
+                patched.append((module, module.time))
+                module.time = proxy
+            yield self
+        finally:
+            for module, original in patched:
+                module.time = original
+
+
+class _ReplayEngine:
+    """Threshold engine over the replayed values with a write overlay."""
+
+    def __init__(self, interface: 'ReplayCliInterface', battery: str):
+        self.interface = interface
+        self.battery = battery
+        self.journal = None
+        self._written: Optional[int] = None
+        self._written_over: Optional[int] = None  # Recorded value the write replaced
+
+    def threshold(self, recorded: int) -> int:
+        """Effective end threshold given the recorded one."""
+        if self._written is not None and recorded == self._written_over:
+            return self._written
+        self._written = None  # The trace moved on (firmware reset, another tool)
+        return recorded
+
+    def read_threshold(self) -> int:
+        """Read the current end threshold.
+
+        Raises:
+            OSError: If the trace has no readable record yet
+        """
+        record = self.interface.record_at(self.battery)
+        if record is None:
+            raise OSError(f"No replayed record for {self.battery}")
+        return self.threshold(self.interface.recorded_threshold(record))
+
+    def read_start_threshold(self) -> Optional[int]:
+        """Read the start threshold, or None if the model has none."""
+        record = self.interface.record_at(self.battery)
+        return record.data.get("start_threshold") if record is not None else None
+
+    def is_writable(self) -> bool:
+        """Replayed thresholds are always writable."""
+        return True
+
+    def set_threshold(self, value: int) -> CliResult:
+        """Overlay a written threshold on the replayed values."""
+        record = self.interface.record_at(self.battery)
+        self._written_over = self.interface.recorded_threshold(record) if record else None
+        self._written = value
+        self.interface.writes.append((self.interface.clock.time(), self.battery, value))
+        return CliResult.success()
+
+
+class ReplayCliInterface:
+    """CliInterface backend serving recorded reads at the virtual time.
+
+    Implements the parts of CliInterface that BatteryManager and
+    CommandQueue use; capability probing, shared status, UPower and the
+    persist state are absent, as on a system without them.
+    """
+
+    def __init__(self, records: Sequence[TraceRecord], clock: VirtualClock):
+        """Initialize replay backend.
+
+        Args:
+            records: Trace records ordered by time
+            clock: Virtual clock selecting the current record
+        """
+        self.clock = clock
+        self._records: Dict[str, List[TraceRecord]] = {}
+        for record in records:
+            self._records.setdefault(record.battery, []).append(record)
+        self._times = {battery: [record.timestamp for record in battery_records]
+                       for battery, battery_records in self._records.items()}
+        batteries = list(self._records)
+        self.default_battery = batteries[0] if batteries else 'BAT0'
+        self.capabilities = CapabilityRecord(key="replay", batteries=batteries,
+                                             end_supported=batteries)
+        self.use_threshold_engine = True
+        self.capability_probe = None
+        self.status_reader = None
+        self.upower = None
+        self.persist_state = None
+        self._engines: Dict[str, _ReplayEngine] = {}
+        self.writes: List[tuple] = []  # (virtual time, battery, threshold)
+        self.spawn_count = 0
+        self.shared_status_hits = 0
+
+    def record_at(self, battery: str) -> Optional[TraceRecord]:
+        """Newest record of a battery at or before the virtual time."""
+        times = self._times.get(battery)
+        if not times:
+            return None
+        index = bisect.bisect_right(times, self.clock.time()) - 1
+        return self._records[battery][index] if index >= 0 else None
+
+    @staticmethod
+    def recorded_threshold(record: TraceRecord) -> Optional[int]:
+        """End threshold as recorded."""
+        if record.kind == "sysfs":
+            return record.data.get("end_threshold")
+        match = StatusParser.END_THRESHOLD_PATTERN.search(record.data.get("output", ""))
+        return int(match.group(1)) if match else None
+
+    def get_capabilities(self, refresh: bool = False) -> CapabilityRecord:
+        """Batteries present in the trace."""
+        return self.capabilities
+
+    def engine_for(self, battery: str) -> _ReplayEngine:
+        """Get (cached) replay engine for a battery."""
+        engine = self._engines.get(battery)
+        if engine is None:
+            engine = self._engines[battery] = _ReplayEngine(self, battery)
+        return engine
+
+    def get_status(self, battery: Optional[str] = None) -> CliResult:
+        """Serve the record current at the virtual time.
+
+        Status records go through the same parse as a CLI run; sysfs
+        records become snapshots like the UPower path.
+        """
+        battery = battery or self.default_battery
+        record = self.record_at(battery)
+        if record is None:
+            return CliResult.error(f"No replayed record for {battery} yet")
+        engine = self.engine_for(battery)
+
+        if record.kind == "sysfs":
+            end_threshold = record.data.get("end_threshold")
+            if end_threshold is None:
+                return CliResult.error(f"{battery}: end threshold not recorded")
+            return CliResult.success(snapshot_from_uevent(
+                battery, record.data.get("uevent", {}), engine.threshold(end_threshold),
+                record.data.get("start_threshold")))
+
+        self.count_spawn()
+        if record.data.get("exit") != 0:
+            return CliResult.error(record.data.get("stderr") or "Unknown CLI error")
+        output = record.data.get("output", "")
+        recorded = self.recorded_threshold(record)
+        if recorded is not None and engine.threshold(recorded) != recorded:
+            output = StatusParser.END_THRESHOLD_PATTERN.sub(
+                f"충전 종료: {engine.threshold(recorded)}%", output, count=1)
+        try:
+            return CliResult.success(StatusParser.parse_status(output), output=output)
+        except ValueError as e:
+            return CliResult.error(f"Failed to parse CLI output: {e}")
+
+    def set_threshold(self, threshold: int, batteries: Optional[List[str]] = None) -> CliResult:
+        """Overlay a threshold on the given batteries (default battery if None)."""
+        for battery in batteries or [self.default_battery]:
+            self.engine_for(battery).set_threshold(threshold)
+        return CliResult.success()
+
+    def persist_threshold(self, threshold: int) -> CliResult:
+        """Overlay a threshold on the default battery."""
+        return self.set_threshold(threshold)
+
+    def clear_threshold(self, batteries: Optional[List[str]] = None) -> CliResult:
+        """Overlay 100% on the given batteries."""
+        return self.set_threshold(100, batteries)
+
+    def read_shared_status(self) -> None:
+        """No shared status producer during a replay."""
+        return None
+
+    def count_spawn(self) -> None:
+        """Count one (replayed) CLI process start."""
+        self.spawn_count += 1
+
+
+class ReplayReport(NamedTuple):
+    """Outcome and cost of one replay."""
+    virtual_seconds: float
+    wall_seconds: float
+    refreshes: int
+    refresh_failures: int
+    events: Dict[str, int]
+    drift_records: int
+    writes: int
+    refresh_us: float  # Mean real time per refresh
+    refresh_p95_us: float
+    parse_us: float  # Mean per battery read
+    dispatch_us: float  # Mean per event
+    final: Optional[Dict[str, Any]]
+
+
+def _mean(values: Sequence[float]) -> float:
+    """Mean in microseconds (0 without values)."""
+    return sum(values) / len(values) * 1e6 if values else 0.0
+
+
+def _timed(function: Any, durations: List[float]) -> Any:
+    """Wrap a function to append its real duration to a list."""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - started)
+    return wrapper
+
+
+def _settle_writes(manager: Any, calls: queue.SimpleQueue) -> None:
+    """Wait for the manager's queued writes and apply their completions."""
+    while True:
+        manager.wait_for_writes()
+        try:
+            calls.get_nowait()()
+        except queue.Empty:
+            return
+
+
+def replay(records: Sequence[TraceRecord], interval: float = 30.0, speed: float = 1000.0,
+           target: Optional[int] = None, data_dir: Optional[str] = None,
+           manager_setup: Optional[Any] = None,
+           start_threshold: Optional[int] = None) -> ReplayReport:
+    """Drive a BatteryManager through a trace on a virtual clock.
+
+    Args:
+        records: Trace records ordered by time
+        interval: Virtual seconds between refreshes
+        speed: Virtual seconds per real second (0 runs unthrottled)
+        target: Threshold set through the manager after initializing (makes
+            it a drift target)
+        data_dir: Directory for the estimators' and ledgers' files (a
+            temporary directory if None, so user data is never touched)
+        manager_setup: Optional callback(manager) run before initializing
+        start_threshold: Emulated start threshold enabled after initializing
+
+    Returns:
+        ReplayReport
+    """
+    # Local import: battery_manager must be imported before its clock is replaced
+    from src.core.battery_manager import BatteryManager
+    from src.core.charge_estimator import ChargeEstimator
+    from src.core.energy_ledger import EnergyLedger
+
+    if not records:
+        raise ValueError("Empty trace")
+    clock = VirtualClock(records[0].timestamp, speed)
+    interface = ReplayCliInterface(records, clock)
+    end = records[-1].timestamp
+    refresh_times: List[float] = []
+    parse_times: List[float] = []
+    dispatch_times: List[float] = []
+    events: Counter = Counter()
+    wall_started = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as scratch, clock.installed():
+        directory = data_dir or scratch
+        manager = BatteryManager(interface)
+        # Write completions are applied between refreshes, in order
+        calls: queue.SimpleQueue = queue.SimpleQueue()
+        manager.dispatcher = calls.put
+        for battery in interface.capabilities.batteries:
+            manager.estimators[battery] = ChargeEstimator(
+                battery, os.path.join(directory, f"charge-curve-{battery}.json"))
+            manager.energy_ledgers[battery] = EnergyLedger(battery, directory)
+        manager._create_battery_info_from_result = _timed(manager._create_battery_info_from_result,
+                                                          parse_times)
+        manager._trigger_event = _timed(manager._trigger_event, dispatch_times)
+        manager.register_event_callback(lambda event: events.update((event.event_type,)))
+        if manager_setup is not None:
+            manager_setup(manager)
+
+        try:
+            result = manager.initialize()
+            if not result.success:
+                raise ValueError(result.error_message)
+            _settle_writes(manager, calls)
+            if target is not None:
+                manager.set_threshold(target)
+            if start_threshold is not None:
+                result = manager.enable_start_threshold(start_threshold)
+                if not result.success:
+                    raise ValueError(result.error_message)
+            while clock.time() + interval <= end:
+                clock.sleep(interval)
+                started = time.perf_counter()
+                manager.refresh_status()
+                refresh_times.append(time.perf_counter() - started)
+                _settle_writes(manager, calls)
+        finally:
+            manager.command_queue.shutdown(wait=True)
+            for ledger in manager.energy_ledgers.values():
+                ledger.save()
+
+    refresh_times.sort()
+    current = manager.current_info
+    return ReplayReport(
+        virtual_seconds=clock.time() - records[0].timestamp,
+        wall_seconds=time.perf_counter() - wall_started,
+        refreshes=manager.refresh_count,
+        refresh_failures=manager.refresh_failures,
+        events=dict(events),
+        drift_records=len(manager.drift_log),
+        writes=len(interface.writes),
+        refresh_us=_mean(refresh_times),
+        refresh_p95_us=refresh_times[int(len(refresh_times) * 0.95)] * 1e6 if refresh_times else 0.0,
+        parse_us=_mean(parse_times),
+        dispatch_us=_mean(dispatch_times),
+        final=current.to_snapshot()._asdict() if current is not None else None
+    )
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Record a trace, or replay one and print the report."""
+    parser = argparse.ArgumentParser(prog="python3 -m src.core.replay",
+                                     description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="Record reads of this machine's batteries")
+    record.add_argument("trace")
+    record.add_argument("--source", choices=TRACE_KINDS, default="sysfs")
+    record.add_argument("--interval", type=float, default=30.0)
+    record.add_argument("--duration", type=float, help="Seconds to record (until interrupted if omitted)")
+    record.add_argument("--battery", action="append", help="Battery to record (repeatable)")
+    run = commands.add_parser("run", help="Replay a trace into BatteryManager")
+    run.add_argument("trace")
+    run.add_argument("--interval", type=float, default=30.0, help="Virtual seconds between refreshes")
+    run.add_argument("--speed", type=float, default=1000.0, help="Time acceleration (0: unthrottled)")
+    run.add_argument("--target", type=int, help="Threshold to set before replaying (drift target)")
+    run.add_argument("--start-threshold", type=int, help="Emulated start threshold to enable")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        recorder = TraceRecorder(args.trace)
+        batteries = args.battery or recorder.scanner.threshold_batteries() or ['BAT0']
+        try:
+            count = recorder.run(batteries, args.source, args.interval, args.duration)
+        except KeyboardInterrupt:
+            return 0
+        print(f"Recorded {count} reads of {', '.join(batteries)} to {args.trace}")
+        return 0
+
+    try:
+        report = replay(load_trace(args.trace), args.interval, args.speed, args.target,
+                        start_threshold=args.start_threshold)
+    except (OSError, ValueError) as e:
+        print(f"Replay failed: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(report._asdict(), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
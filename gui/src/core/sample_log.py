@@ -0,0 +1,496 @@
+"""Local battery sample log, bootstrapped from UPower's history files.
+
+UPower records charge and rate history for every battery it has seen in
+``/var/lib/upower/history-<kind>-<id>.dat`` (one ``timestamp<TAB>value<TAB>
+state`` line per sample). The importer streams those files into the
+charge-keeper sample log line by line, so memory stays bounded whatever
+their size, and remembers how far it got in each file: the next run (or a
+run after an interruption) continues from that offset instead of starting
+over. UPower rewrites the files when it saves them; a replaced or shortened
+file is re-read from the start, skipping samples that were already
+imported.
+
+The sample log keeps one file per battery with ``timestamp<TAB>kind<TAB>
+value<TAB>state`` lines; live samples are appended by BatteryManager after
+refreshes. Lines are appended in arrival order, which is not necessarily
+time order (a first import adds months of older samples), so readers never
+assume sorted input.
+
+    python3 -m src.core.sample_log import [HISTORY_DIR]
+    python3 -m src.core.sample_log show [BATTERY]
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+
+UPOWER_HISTORY_DIR = "/var/lib/upower"
+HISTORY_KINDS = ("charge", "rate")
+
+# upower states recorded while the charger was connected / disconnected
+AC_STATES = frozenset(("charging", "fully-charged", "pending-charge"))
+BATTERY_STATES = frozenset(("discharging", "empty", "pending-discharge"))
+
+# Characters UPower replaces with '_' when building a device id
+_ID_DELIMITERS = "\\\t\"?' /,."
+
+
+class Sample(NamedTuple):
+    """One history sample."""
+
+    timestamp: int
+    kind: str  # charge (%), rate (W) or energy_full (Wh)
+    value: float
+    state: str  # upower state name (charging, discharging, fully-charged, ...)
+
+
+class HistorySummary(NamedTuple):
+    """Aggregates over a battery's sample log."""
+
+    sample_count: int
+    first_timestamp: Optional[int]
+    last_timestamp: Optional[int]
+    discharge_rate: Optional[float]  # mean W while discharging, within the window
+    charge_rate: Optional[float]  # mean W while charging, within the window
+    charge_min: Optional[float]  # lowest charge % within the window
+    charge_max: Optional[float]  # highest charge % within the window
+
+
+def default_log_dir() -> str:
+    """Sample log directory under XDG_DATA_HOME."""
+    data_home = os.environ.get('XDG_DATA_HOME', os.path.expanduser('~/.local/share'))
+    return os.path.join(data_home, 'a14-charge-keeper', 'samples')
+
+
+def upower_history_id(model: Optional[str], energy_full_design: Optional[float],
+                      serial: Optional[str]) -> str:
+    """Build the device id UPower uses in its history file names.
+
+    Args:
+        model: Battery model
+        energy_full_design: Design energy in Wh
+        serial: Battery serial number
+
+    Returns:
+        ``model-capacity-serial`` with the parts UPower would skip left out
+    """
+    parts = []
+    if model and len(model) > 2:
+        parts.append(model)
+    if energy_full_design and energy_full_design > 0:
+        parts.append(str(int(energy_full_design)))
+    if serial and len(serial) > 2:
+        parts.append(serial)
+    history_id = "-".join(parts) or "generic_id"
+    for char in _ID_DELIMITERS:
+        history_id = history_id.replace(char, '_')
+    return history_id
+
+
+def parse_history_line(line: str, kind: str) -> Optional[Sample]:
+    """Parse one UPower history line (None for malformed lines)."""
+    fields = line.rstrip('\n').split('\t')
+    if len(fields) != 3:
+        return None
+    try:
+        return Sample(int(fields[0]), kind, float(fields[1]), fields[2])
+    except ValueError:
+        return None
+
+
+class _DailyAggregates:
+    """Incrementally maintained per-day statistics of one sample log file."""
+
+    def __init__(self):
+        self.offset = 0
+        self.count = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        # day -> [discharge W sum, count, charge W sum, count, min %, max %]
+        self.days: Dict[int, list] = {}
+
+    def update(self, path: str) -> None:
+        """Fold in the lines appended since the last update."""
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            return
+        with f:
+            if os.fstat(f.fileno()).st_size < self.offset:
+                self.__init__()  # Log was replaced
+            f.seek(self.offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break
+                self.offset += len(raw)
+                fields = raw.decode('utf-8', 'replace').rstrip('\n').split('\t')
+                if len(fields) != 4:
+                    continue
+                try:
+                    timestamp, value = int(fields[0]), float(fields[2])
+                except ValueError:
+                    continue
+                self._add(timestamp, fields[1], value, fields[3])
+
+    def _add(self, timestamp: int, kind: str, value: float, state: str) -> None:
+        """Fold in one sample."""
+        self.count += 1
+        self.first = timestamp if self.first is None else min(self.first, timestamp)
+        self.last = timestamp if self.last is None else max(self.last, timestamp)
+        day = self.days.setdefault(timestamp // 86400, [0.0, 0, 0.0, 0, None, None])
+        if kind == "rate" and value > 0:
+            if state == "discharging":
+                day[0] += value
+                day[1] += 1
+            elif state == "charging":
+                day[2] += value
+                day[3] += 1
+        elif kind == "charge" and value > 0:
+            day[4] = value if day[4] is None else min(day[4], value)
+            day[5] = value if day[5] is None else max(day[5], value)
+
+    def summary(self, since: int) -> HistorySummary:
+        """Combine the days from ``since`` (whole days) on."""
+        window = [stats for day, stats in self.days.items() if day >= since // 86400]
+        discharge = sum(s[0] for s in window), sum(s[1] for s in window)
+        charge = sum(s[2] for s in window), sum(s[3] for s in window)
+        lows = [s[4] for s in window if s[4] is not None]
+        highs = [s[5] for s in window if s[5] is not None]
+        return HistorySummary(self.count, self.first, self.last,
+                              discharge[0] / discharge[1] if discharge[1] else None,
+                              charge[0] / charge[1] if charge[1] else None,
+                              min(lows) if lows else None, max(highs) if highs else None)
+
+
+class SampleLog:
+    """Append-only per-battery sample files."""
+
+    # Live samples are recorded when the value changes, and at least this
+    # often (seconds) while it does not
+    RECORD_INTERVAL = 600
+    # Rate changes smaller than this (W) are not recorded
+    RATE_RESOLUTION = 0.1
+
+    def __init__(self, directory: Optional[str] = None):
+        """Initialize sample log.
+
+        Args:
+            directory: Log directory (XDG data directory if None)
+        """
+        self.directory = directory or default_log_dir()
+        self._lock = threading.Lock()
+        self._last_recorded: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._aggregates: Dict[str, _DailyAggregates] = {}
+
+    def path(self, device: str) -> str:
+        """Log file of a battery."""
+        return os.path.join(self.directory, f"{device}.tsv")
+
+    def append(self, device: str, samples: Iterable[Sample]) -> int:
+        """Append samples to a battery's log.
+
+        Args:
+            device: Battery name
+            samples: Samples to append
+
+        Returns:
+            Number of samples written
+
+        Raises:
+            OSError: If the log cannot be written
+        """
+        lines = [f"{s.timestamp}\t{s.kind}\t{s.value:.3f}\t{s.state}\n" for s in samples]
+        if not lines:
+            return 0
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path(device), 'a') as f:
+                f.writelines(lines)
+        return len(lines)
+
+    def record(self, device: str, percentage: Optional[float], energy_rate: Optional[float],
+               state: Optional[str], now: Optional[float] = None,
+               energy_full: Optional[float] = None) -> int:
+        """Record a live reading, skipping values that have not changed.
+
+        Args:
+            device: Battery name
+            percentage: Charge in percent
+            energy_rate: Charge or discharge power in W
+            state: upower state name
+            now: Sample time (current time if None)
+            energy_full: Full-charge energy in Wh (capacity-fade input)
+
+        Returns:
+            Number of samples written
+        """
+        timestamp = int(now if now is not None else time.time())
+        state = state or "unknown"
+        samples = []
+        for kind, value, resolution in (("charge", percentage, 0.5),
+                                        ("rate", energy_rate, self.RATE_RESOLUTION),
+                                        ("energy_full", energy_full, 0.01)):
+            if value is None:
+                continue
+            last = self._last_recorded.get((device, kind))
+            if (last is None or abs(value - last[1]) >= resolution
+                    or timestamp - last[0] >= self.RECORD_INTERVAL):
+                self._last_recorded[(device, kind)] = (timestamp, value)
+                samples.append(Sample(timestamp, kind, float(value), state))
+        try:
+            return self.append(device, samples)
+        except OSError as e:
+            print(f"Failed to record battery sample: {e}")
+            return 0
+
+    def iter_samples(self, device: str, kind: Optional[str] = None,
+                     since: Optional[int] = None) -> Iterator[Sample]:
+        """Stream a battery's samples in file order.
+
+        Args:
+            device: Battery name
+            kind: Only samples of this kind (all kinds if None)
+            since: Only samples at or after this epoch time
+
+        Yields:
+            Samples (malformed lines are skipped)
+        """
+        try:
+            f = open(self.path(device))
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) != 4 or (kind is not None and fields[1] != kind):
+                    continue
+                try:
+                    sample = Sample(int(fields[0]), fields[1], float(fields[2]), fields[3])
+                except ValueError:
+                    continue
+                if since is None or sample.timestamp >= since:
+                    yield sample
+
+    def series(self, device: str, kind: str, since: int, points: int = 120,
+               until: Optional[int] = None) -> List[Tuple[int, float]]:
+        """Bucket-averaged samples for charting.
+
+        Args:
+            device: Battery name
+            kind: Sample kind
+            since: Start of the range (epoch)
+            points: Number of buckets (bounds the result size)
+            until: End of the range (now if None)
+
+        Returns:
+            (bucket start, mean value) for every non-empty bucket, in time order
+        """
+        until = int(until if until is not None else time.time())
+        width = max(1, (until - since) // max(1, points))
+        buckets: Dict[int, List[float]] = {}
+        for sample in self.iter_samples(device, kind, since):
+            if sample.timestamp > until:
+                continue
+            bucket = buckets.setdefault((sample.timestamp - since) // width, [0.0, 0])
+            bucket[0] += sample.value
+            bucket[1] += 1
+        return [(since + index * width, total / count)
+                for index, (total, count) in sorted(buckets.items())]
+
+    def summary(self, device: str, window_days: int = 7) -> HistorySummary:
+        """Summarize a battery's log.
+
+        Per-day aggregates are kept in memory and only the lines appended
+        since the previous call are read, so repeated calls after refreshes
+        stay cheap however long the history is.
+
+        Args:
+            device: Battery name
+            window_days: Days covered by the rate and charge range figures
+
+        Returns:
+            HistorySummary (empty when nothing was recorded)
+        """
+        with self._lock:
+            aggregates = self._aggregates.setdefault(device, _DailyAggregates())
+            aggregates.update(self.path(device))
+            return aggregates.summary(int(time.time()) - window_days * 86400)
+
+    def trim_cache(self) -> None:
+        """Drop the in-memory per-day aggregates.
+
+        The next summary() rebuilds them by reading the whole log once.
+        """
+        with self._lock:
+            self._aggregates.clear()
+
+
+class UPowerHistoryImporter:
+    """Streams UPower history files into a SampleLog with resumable offsets."""
+
+    # Lines parsed before they are written out and the offset is saved
+    BATCH_LINES = 1000
+
+    def __init__(self, sample_log: SampleLog, history_dir: str = UPOWER_HISTORY_DIR,
+                 state_file: Optional[str] = None):
+        """Initialize importer.
+
+        Args:
+            sample_log: Log receiving the samples
+            history_dir: UPower history directory
+            state_file: Import offsets (next to the sample log if None)
+        """
+        self.sample_log = sample_log
+        self.history_dir = history_dir
+        self.state_file = state_file or os.path.join(sample_log.directory, "upower-import.json")
+        self._state: Optional[Dict[str, Dict[str, int]]] = None
+
+    def history_files(self) -> List[Tuple[str, str, str]]:
+        """List importable history files.
+
+        Returns:
+            (kind, UPower device id, path) tuples
+        """
+        try:
+            names = sorted(os.listdir(self.history_dir))
+        except OSError:
+            return []
+        files = []
+        for name in names:
+            if not (name.startswith("history-") and name.endswith(".dat")):
+                continue
+            for kind in HISTORY_KINDS:
+                prefix = f"history-{kind}-"
+                if name.startswith(prefix):
+                    files.append((kind, name[len(prefix):-len(".dat")],
+                                  os.path.join(self.history_dir, name)))
+        return files
+
+    def import_all(self, device_for_id: Callable[[str], Optional[str]],
+                   max_lines: Optional[int] = None) -> int:
+        """Import new samples from every history file of a known battery.
+
+        Args:
+            device_for_id: Maps a UPower device id to a battery name (None
+                skips the file, e.g. a mouse or a battery no longer present)
+            max_lines: Stop after this many lines (resumes on the next call)
+
+        Returns:
+            Number of samples imported
+        """
+        imported = 0
+        for kind, history_id, path in self.history_files():
+            device = device_for_id(history_id)
+            if device is None:
+                continue
+            budget = None if max_lines is None else max_lines - imported
+            if budget is not None and budget <= 0:
+                break
+            try:
+                imported += self.import_file(path, kind, device, budget)
+            except OSError as e:
+                print(f"Failed to import {path}: {e}")
+        return imported
+
+    def import_file(self, path: str, kind: str, device: str,
+                    max_lines: Optional[int] = None) -> int:
+        """Import new samples from one history file.
+
+        Args:
+            path: UPower history file
+            kind: Sample kind stored in the file
+            device: Battery the samples belong to
+            max_lines: Stop after this many lines
+
+        Returns:
+            Number of samples imported
+
+        Raises:
+            OSError: If the file cannot be read or the log written
+        """
+        state = self._load_state()
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            entry = state.get(path, {})
+            offset = entry.get("offset", 0)
+            last_timestamp = entry.get("last", 0)
+            if entry.get("inode") != stat.st_ino or stat.st_size < offset:
+                offset = 0  # Rewritten by UPower: rescan, skipping imported samples
+            f.seek(offset)
+
+            imported = lines = 0
+            batch: List[Sample] = []
+            newest = last_timestamp
+            while max_lines is None or lines < max_lines:
+                raw = f.readline()
+                if not raw.endswith(b'\n'):
+                    break  # End of file or a line UPower is still writing
+                lines += 1
+                offset += len(raw)
+                sample = parse_history_line(raw.decode('utf-8', 'replace'), kind)
+                if sample is not None and sample.timestamp > last_timestamp:
+                    batch.append(sample)
+                    newest = max(newest, sample.timestamp)
+                if len(batch) >= self.BATCH_LINES:
+                    imported += self.sample_log.append(device, batch)
+                    batch = []
+                    self._save_offset(path, stat.st_ino, offset, newest)
+            imported += self.sample_log.append(device, batch)
+            self._save_offset(path, stat.st_ino, offset, newest)
+        return imported
+
+    def _load_state(self) -> Dict[str, Dict[str, int]]:
+        """Import offsets per history file."""
+        if self._state is None:
+            try:
+                with open(self.state_file) as f:
+                    self._state = json.load(f)
+            except (OSError, ValueError):
+                self._state = {}
+        return self._state
+
+    def _save_offset(self, path: str, inode: int, offset: int, last_timestamp: int) -> None:
+        """Persist the import position of a file."""
+        state = self._load_state()
+        state[path] = {"inode": inode, "offset": offset, "last": last_timestamp}
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_file)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Import UPower history or show a battery's log summary."""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "show"
+    log = SampleLog()
+
+    if command == "import":
+        importer = UPowerHistoryImporter(log, argv[1] if len(argv) > 1 else UPOWER_HISTORY_DIR)
+        ids = sorted({history_id for _, history_id, _ in importer.history_files()})
+        if len(ids) != 1:
+            print(f"Found {len(ids)} UPower devices; the tray maps them to batteries by model",
+                  file=sys.stderr)
+            return 1
+        started = time.monotonic()
+        imported = importer.import_all(lambda history_id: 'BAT0')
+        print(f"Imported {imported} samples from {ids[0]} in {time.monotonic() - started:.2f}s")
+        return 0
+
+    if command == "show":
+        device = argv[1] if len(argv) > 1 else 'BAT0'
+        summary = log.summary(device)
+        print(json.dumps(summary._asdict(), indent=2))
+        return 0
+
+    print(f"Unknown command: {command}", file=sys.stderr)
+    return 64
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""Shared-memory battery status snapshot for multiple local consumers.
+
+A single producer publishes the latest battery information into a
+fixed-layout, memory-mapped file (by default under ``/run``). Readers map
+the same file read-only and copy a consistent snapshot using a
+seqlock-style version counter: the writer makes the counter odd while it
+updates the payload and even again when done, and readers retry (with a
+short, bounded backoff) when the counter is odd or changed during the
+copy. A fresh read touches only the mapping; the file is stat()ed again
+only when its snapshot looks stale, which is how a producer that replaced
+the file is picked up. Reading never spawns a process.
+
+The producer holds an exclusive flock on the file, so a second producer
+(the tray and a headless monitor, say) fails to open it instead of
+corrupting the sequence counter.
+"""
+
+import fcntl
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from src.core.snapshots import BatteryInfoSnapshot
+
+
+DEFAULT_PATH = "/run/a14-charge-keeper/status"
+
+MAGIC = b"A14CKSHM"
+LAYOUT_VERSION = 1
+
+# magic, layout version, reserved, sequence, published_at, publish interval
+HEADER = struct.Struct("<8sIIQdd")
+SEQ_OFFSET = struct.calcsize("<8sII")
+SEQ = struct.Struct("<Q")
+
+# Integer fields use -1 and float fields NaN for "missing"
+INT_FIELDS = ('end_threshold', 'start_threshold', 'backup_count',
+              'percentage', 'charge_cycles')
+FLOAT_FIELDS = ('energy_current', 'energy_full', 'energy_full_design',
+                'energy_rate', 'voltage', 'capacity')
+STRING_FIELDS = (('device', 16), ('vendor', 32), ('model', 32), ('serial', 32),
+                 ('state', 24), ('time_to_empty', 24), ('time_to_full', 24))
+
+PAYLOAD = struct.Struct(
+    "<" + "i" * len(INT_FIELDS) + "d" * len(FLOAT_FIELDS)
+    + "".join(f"{size}s" for _, size in STRING_FIELDS)
+)
+PAYLOAD_OFFSET = HEADER.size
+TOTAL_SIZE = HEADER.size + PAYLOAD.size
+
+MISSING_INT = -1
+
+
+def _encode(info: Any) -> bytes:
+    """Pack battery information into the fixed payload layout."""
+    values = []
+    for name in INT_FIELDS:
+        value = getattr(info, name)
+        values.append(MISSING_INT if value is None else int(value))
+    for name in FLOAT_FIELDS:
+        value = getattr(info, name)
+        values.append(math.nan if value is None else float(value))
+    for name, size in STRING_FIELDS:
+        value = getattr(info, name)
+        values.append(b"" if value is None else value.encode('utf-8')[:size])
+    return PAYLOAD.pack(*values)
+
+
+def _decode(payload: bytes) -> BatteryInfoSnapshot:
+    """Unpack fixed payload layout into a battery snapshot."""
+    raw = PAYLOAD.unpack(payload)
+    values = {}
+    index = 0
+    for name in INT_FIELDS:
+        values[name] = None if raw[index] == MISSING_INT else raw[index]
+        index += 1
+    for name in FLOAT_FIELDS:
+        values[name] = None if math.isnan(raw[index]) else raw[index]
+        index += 1
+    for name, _ in STRING_FIELDS:
+        text = raw[index].rstrip(b"\0").decode('utf-8', errors='replace')
+        values[name] = text or None
+        index += 1
+    values['device'] = values['device'] or ""
+    values['backup_count'] = values['backup_count'] or 0
+    return BatteryInfoSnapshot(**values)
+
+
+class SharedStatusWriter:
+    """Single producer that publishes battery snapshots into shared memory."""
+
+    def __init__(self, path: str = DEFAULT_PATH, interval: float = 30.0):
+        """Open (or create) the shared status file for writing.
+
+        Args:
+            path: Shared status file location
+            interval: Expected publish interval in seconds (lets readers
+                judge freshness)
+
+        Raises:
+            BlockingIOError: If another producer is publishing to the file
+            OSError: If the file cannot be created or mapped
+        """
+        self.path = path
+        self.interval = float(interval)
+        self._fd = self._open_file(path)
+        try:
+            fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            # A producer starting at the same time may have renamed its file over ours
+            if os.fstat(self._fd).st_ino != os.stat(path).st_ino:
+                raise BlockingIOError(f"Another producer replaced {path}")
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._map = mmap.mmap(self._fd, TOTAL_SIZE, mmap.MAP_SHARED,
+                              mmap.PROT_READ | mmap.PROT_WRITE)
+        self._seq = SEQ.unpack_from(self._map, SEQ_OFFSET)[0]
+        if self._seq % 2:
+            # Previous producer died mid-update; make the counter even again
+            self._seq += 1
+            SEQ.pack_into(self._map, SEQ_OFFSET, self._seq)
+
+    @staticmethod
+    def _open_file(path: str) -> int:
+        """Open existing file with matching layout or atomically create a new one."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, mode=0o755, exist_ok=True)
+
+        try:
+            fd = os.open(path, os.O_RDWR)
+            header = os.pread(fd, HEADER.size, 0)
+            if (os.fstat(fd).st_size == TOTAL_SIZE and len(header) == HEADER.size
+                    and HEADER.unpack(header)[:2] == (MAGIC, LAYOUT_VERSION)):
+                return fd
+            os.close(fd)
+        except FileNotFoundError:
+            pass
+
+        # Build the file beside the target and rename it into place so that
+        # readers never observe a half-initialized header
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, HEADER.pack(MAGIC, LAYOUT_VERSION, 0, 0, 0.0, 0.0)
+                     + bytes(PAYLOAD.size))
+            os.rename(tmp_path, path)
+        except OSError:
+            os.close(fd)
+            os.unlink(tmp_path)
+            raise
+        return fd
+
+    def publish(self, info: Any, timestamp: Optional[float] = None) -> None:
+        """Publish battery information as the latest snapshot.
+
+        Args:
+            info: BatteryInfo or BatteryInfoSnapshot to publish
+            timestamp: Publish time (defaults to now)
+        """
+        payload = _encode(info)
+        published_at = time.time() if timestamp is None else timestamp
+
+        # Odd sequence marks the payload as being updated
+        self._seq += 1
+        SEQ.pack_into(self._map, SEQ_OFFSET, self._seq)
+        self._map[PAYLOAD_OFFSET:TOTAL_SIZE] = payload
+        struct.pack_into("<dd", self._map, SEQ_OFFSET + SEQ.size,
+                         published_at, self.interval)
+        self._seq += 1
+        SEQ.pack_into(self._map, SEQ_OFFSET, self._seq)
+
+    def close(self) -> None:
+        """Unmap and close the shared status file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class SharedStatusReader:
+    """Lock-free reader for the shared battery status snapshot."""
+
+    # Copies attempted while the producer is mid-update, with the sleep
+    # between them doubling from RETRY_DELAY_INITIAL up to RETRY_DELAY_MAX
+    # (at most about 13 ms in total before giving up)
+    MAX_RETRIES = 12
+    RETRY_DELAY_INITIAL = 0.00005
+    RETRY_DELAY_MAX = 0.002
+
+    def __init__(self, path: str = DEFAULT_PATH,
+                 sleep: Callable[[float], None] = time.sleep):
+        """Initialize reader (the file is mapped lazily on first read).
+
+        Args:
+            path: Shared status file location
+            sleep: Sleep function (injectable for testing)
+        """
+        self.path = path
+        self._sleep = sleep
+        self._map: Optional[mmap.mmap] = None
+        self._identity: Optional[Tuple[int, int]] = None  # (st_dev, st_ino) of the mapped file
+
+    def _ensure_mapped(self) -> bool:
+        """Map the shared status file if it exists and has the right layout."""
+        if self._map is not None:
+            return True
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size != TOTAL_SIZE:
+                    return False
+                self._map = mmap.mmap(f.fileno(), TOTAL_SIZE, mmap.MAP_SHARED,
+                                      mmap.PROT_READ)
+                self._identity = (stat.st_dev, stat.st_ino)
+        except (OSError, ValueError):
+            return False
+
+        magic, version = HEADER.unpack_from(self._map, 0)[:2]
+        if (magic, version) != (MAGIC, LAYOUT_VERSION):
+            self.close()
+            return False
+        return True
+
+    def _replaced(self) -> bool:
+        """Whether the mapped file was removed or replaced by a new producer."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return True
+        return (stat.st_dev, stat.st_ino) != self._identity
+
+    def read(self) -> Optional[Tuple[BatteryInfoSnapshot, float, float]]:
+        """Read a consistent snapshot from the mapped file.
+
+        Returns:
+            Tuple of (snapshot, published_at, publish interval), or None if
+            no producer has published yet or the producer stayed mid-update
+            for all retries
+        """
+        if not self._ensure_mapped():
+            return None
+
+        shm = self._map
+        delay = self.RETRY_DELAY_INITIAL
+        for attempt in range(self.MAX_RETRIES):
+            if attempt:
+                self._sleep(delay)
+                delay = min(delay * 2, self.RETRY_DELAY_MAX)
+            seq_before = SEQ.unpack_from(shm, SEQ_OFFSET)[0]
+            if seq_before % 2:
+                continue
+            published_at, interval = struct.unpack_from("<dd", shm, SEQ_OFFSET + SEQ.size)
+            payload = shm[PAYLOAD_OFFSET:TOTAL_SIZE]
+            if SEQ.unpack_from(shm, SEQ_OFFSET)[0] == seq_before:
+                if seq_before == 0:
+                    return None  # Never published
+                return _decode(payload), published_at, interval
+        return None
+
+    def read_fresh(self, now: Optional[float] = None,
+                   newer_than: Optional[float] = None) -> Optional[BatteryInfoSnapshot]:
+        """Read snapshot only if the producer is still publishing on schedule.
+
+        A snapshot is fresh when it is younger than twice the producer's
+        publish interval (plus one second of slack).
+
+        Args:
+            now: Current time (defaults to now)
+            newer_than: Also reject snapshots published at or before this
+                time (e.g. before a local threshold write they cannot show)
+
+        Returns:
+            Snapshot or None if missing or stale
+        """
+        now = time.time() if now is None else now
+        result = self.read()
+        if not self._is_fresh(result, now) and self._map is not None and self._replaced():
+            # The producer went away or a new one replaced the file
+            self.close()
+            result = self.read()
+        if not self._is_fresh(result, now):
+            return None
+        snapshot, published_at, _ = result
+        if newer_than is not None and published_at <= newer_than:
+            return None
+        return snapshot
+
+    @staticmethod
+    def _is_fresh(result: Optional[tuple], now: float) -> bool:
+        """Whether a read result is younger than twice its publish interval (plus 1 s)."""
+        return result is not None and now - result[1] <= 2 * result[2] + 1
+
+    def close(self) -> None:
+        """Unmap the shared status file."""
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            self._identity = None
+
+
+def format_status(snapshot: BatteryInfoSnapshot) -> str:
+    """Render snapshot in the same format as 'a14-charge-keeper status'.
+
+    Args:
+        snapshot: Battery snapshot to render
+
+    Returns:
+        Text parseable by StatusParser and BatteryInfo.from_cli_output
+    """
+    lines = [f"Device : {snapshot.device}", f"충전 종료: {snapshot.end_threshold}%"]
+    if snapshot.start_threshold is not None:
+        lines.append(f"충전 시작: {snapshot.start_threshold}%")
+    lines.append(f"백업 파일: {snapshot.backup_count}개")
+    lines.append("")
+
+    upower_fields = (
+        ('vendor', 'vendor', '{}'), ('model', 'model', '{}'),
+        ('serial', 'serial', '{}'), ('state', 'state', '{}'),
+        ('energy', 'energy_current', '{} Wh'),
+        ('energy-full', 'energy_full', '{} Wh'),
+        ('energy-full-design', 'energy_full_design', '{} Wh'),
+        ('energy-rate', 'energy_rate', '{} W'),
+        ('voltage', 'voltage', '{} V'),
+        ('charge-cycles', 'charge_cycles', '{}'),
+        ('time to empty', 'time_to_empty', '{}'),
+        ('time to full', 'time_to_full', '{}'),
+        ('percentage', 'percentage', '{}%'),
+        ('capacity', 'capacity', '{}%'),
+    )
+    for label, name, template in upower_fields:
+        value = getattr(snapshot, name)
+        if value is not None:
+            lines.append(f"    {label + ':':<24}{template.format(value)}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command line entry point: ``read`` or ``publish [interval]``."""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "read"
+    path = os.environ.get('A14_SHARED_STATUS', DEFAULT_PATH)
+
+    if command == "read":
+        reader = SharedStatusReader(path)
+        snapshot = reader.read_fresh()
+        if snapshot is None:
+            print("No fresh shared status snapshot available", file=sys.stderr)
+            return 1
+        print(format_status(snapshot))
+        return 0
+
+    if command == "publish":
+        from src.core.battery_manager import BatteryManager
+        from src.core.cli_interface import CliInterface
+
+        interval = float(argv[1]) if len(argv) > 1 else 30.0
+        writer = SharedStatusWriter(path, interval=interval)
+        manager = BatteryManager(CliInterface(use_shared_status=False),
+                                 status_writer=writer)
+        result = manager.initialize()
+        if not result.success:
+            print(result.error_message, file=sys.stderr)
+            return 1
+        try:
+            while True:
+                time.sleep(interval)
+                result = manager.refresh_status()
+                if not result.success:
+                    print(result.error_message, file=sys.stderr)
+        except KeyboardInterrupt:
+            return 0
+        finally:
+            writer.close()
+
+    print(f"Unknown command: {command}", file=sys.stderr)
+    return 64
+
+
+if __name__ == "__main__":
+    sys.exit(main())
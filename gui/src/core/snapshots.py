@@ -0,0 +1,294 @@
+"""Immutable snapshot types and a columnar buffer for battery state history.
+
+The snapshot tuples are read-only copies of the manager's mutable
+dataclasses (replay output, hand-off to other threads). They are only
+about 12% smaller than the dataclasses; the real saving comes from
+SnapshotHistory, which is meant for callers that keep many samples in
+memory. The application itself keeps its history in the on-disk sample
+log and does not use SnapshotHistory.
+"""
+
+import math
+import time
+from array import array
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Mapping, NamedTuple, Optional
+
+
+class BatteryStatusSnapshot(NamedTuple):
+    """Immutable, tuple-backed counterpart of BatteryStatus."""
+    device: str
+    end_threshold: int
+    start_threshold: Optional[int] = None
+    backup_count: int = 0
+
+    @classmethod
+    def from_status(cls, status: Any) -> 'BatteryStatusSnapshot':
+        """Create snapshot from a BatteryStatus (or any object with its fields)."""
+        return cls(
+            device=status.device,
+            end_threshold=status.end_threshold,
+            start_threshold=status.start_threshold,
+            backup_count=status.backup_count
+        )
+
+    def __str__(self) -> str:
+        """String representation of battery status snapshot."""
+        return f"BatteryStatus(device={self.device}, end_threshold={self.end_threshold}%)"
+
+
+class BatteryInfoSnapshot(NamedTuple):
+    """Immutable, tuple-backed counterpart of BatteryInfo.
+
+    Field names and order match BatteryInfo so the snapshot can be used
+    anywhere BatteryInfo is read without being modified.
+    """
+
+    # Basic threshold info
+    device: str
+    end_threshold: int
+    start_threshold: Optional[int] = None
+    backup_count: int = 0
+
+    # Hardware info
+    vendor: Optional[str] = None
+    model: Optional[str] = None
+    serial: Optional[str] = None
+
+    # Power status
+    state: Optional[str] = None
+    percentage: Optional[int] = None
+    energy_current: Optional[float] = None  # Wh
+    energy_full: Optional[float] = None  # Wh
+    energy_full_design: Optional[float] = None  # Wh
+    energy_rate: Optional[float] = None  # W
+    voltage: Optional[float] = None  # V
+    capacity: Optional[float] = None  # %
+    charge_cycles: Optional[int] = None
+
+    # Time estimates
+    time_to_empty: Optional[str] = None
+    time_to_full: Optional[str] = None
+    time_to_limit: Optional[float] = None  # s
+    time_to_empty_estimate: Optional[float] = None  # s
+
+    @classmethod
+    def from_info(cls, info: Any) -> 'BatteryInfoSnapshot':
+        """Create snapshot from a BatteryInfo (or any object with its fields).
+
+        Args:
+            info: Source battery information
+
+        Returns:
+            Immutable snapshot with the same field values
+        """
+        return cls(*(getattr(info, name) for name in cls._fields))
+
+    @property
+    def health_percentage(self) -> Optional[float]:
+        """Calculate battery health percentage.
+
+        Returns:
+            Health percentage based on energy_full vs energy_full_design
+        """
+        if self.energy_full and self.energy_full_design:
+            return (self.energy_full / self.energy_full_design) * 100
+        return None
+
+    def __str__(self) -> str:
+        """String representation of battery info snapshot."""
+        return f"BatteryInfo(device={self.device}, threshold={self.end_threshold}%, state={self.state})"
+
+
+class BatteryEventSnapshot(NamedTuple):
+    """Immutable, tuple-backed counterpart of BatteryEvent.
+
+    ``data`` is a read-only view of a private copy of the event data, so
+    neither the snapshot nor later changes to the source event can alter it.
+    """
+    event_type: str
+    data: Mapping[str, Any]
+    timestamp: float
+
+    @classmethod
+    def create(cls, event_type: str, data: Mapping[str, Any],
+               timestamp: Optional[float] = None) -> 'BatteryEventSnapshot':
+        """Create event snapshot, stamping it with the current time if needed."""
+        return cls(event_type, MappingProxyType(dict(data)),
+                   time.time() if timestamp is None else timestamp)
+
+    @classmethod
+    def from_event(cls, event: Any) -> 'BatteryEventSnapshot':
+        """Create snapshot from a BatteryEvent."""
+        return cls.create(event.event_type, event.data, event.timestamp)
+
+    def __str__(self) -> str:
+        """String representation of event snapshot."""
+        return f"BatteryEvent(type={self.event_type}, data={dict(self.data)})"
+
+
+class SnapshotHistory:
+    """Fixed-capacity, column-oriented ring buffer of battery snapshots.
+
+    Numeric fields are stored in typed ``array`` columns (NaN or -1 mark
+    missing values) and string fields are interned into a small lookup
+    table, so each stored snapshot costs about 110 bytes of columns instead
+    of a full object (about 330 bytes with its attribute dictionary).
+    """
+
+    # Column typecodes: 'd' = float64, 'i' = int32, 'H' = uint16 string index
+    TIMESTAMP_TYPE = 'd'
+    INT_FIELDS = ('end_threshold', 'start_threshold', 'backup_count',
+                  'percentage', 'charge_cycles')
+    FLOAT_FIELDS = ('energy_current', 'energy_full', 'energy_full_design',
+                    'energy_rate', 'voltage', 'capacity',
+                    'time_to_limit', 'time_to_empty_estimate')
+    STRING_FIELDS = ('device', 'vendor', 'model', 'serial', 'state',
+                     'time_to_empty', 'time_to_full')
+
+    MISSING_INT = -1
+
+    def __init__(self, capacity: int = 8640):
+        """Initialize history buffer.
+
+        Args:
+            capacity: Maximum number of snapshots kept (oldest are overwritten)
+
+        Raises:
+            ValueError: If capacity is not positive
+        """
+        if capacity <= 0:
+            raise ValueError("Capacity must be positive")
+
+        self.capacity = capacity
+        self._size = 0
+        self._head = 0  # Next write position
+
+        self._timestamps = array(self.TIMESTAMP_TYPE, bytes(8 * capacity))
+        self._ints = {name: array('i', [self.MISSING_INT]) * capacity
+                      for name in self.INT_FIELDS}
+        self._floats = {name: array('d', [math.nan]) * capacity
+                        for name in self.FLOAT_FIELDS}
+        self._strings = {name: array('H', bytes(2 * capacity))
+                         for name in self.STRING_FIELDS}
+
+        # Index 0 is reserved for None
+        self._string_table: List[Optional[str]] = [None]
+        self._string_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """Number of stored snapshots."""
+        return self._size
+
+    def append(self, info: Any, timestamp: Optional[float] = None) -> None:
+        """Store a snapshot of the given battery information.
+
+        Args:
+            info: BatteryInfo or BatteryInfoSnapshot to store
+            timestamp: Sample time (defaults to now)
+        """
+        pos = self._head
+        self._timestamps[pos] = time.time() if timestamp is None else timestamp
+
+        for name in self.INT_FIELDS:
+            value = getattr(info, name)
+            self._ints[name][pos] = self.MISSING_INT if value is None else value
+
+        for name in self.FLOAT_FIELDS:
+            value = getattr(info, name)
+            self._floats[name][pos] = math.nan if value is None else value
+
+        for name in self.STRING_FIELDS:
+            self._strings[name][pos] = self._intern(getattr(info, name))
+
+        self._head = (pos + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def get(self, index: int) -> BatteryInfoSnapshot:
+        """Return snapshot by age order (0 = oldest, -1 = newest).
+
+        Raises:
+            IndexError: If index is out of range
+        """
+        return self._build(self._position(index))
+
+    def timestamp(self, index: int) -> float:
+        """Return sample time of snapshot by age order."""
+        return self._timestamps[self._position(index)]
+
+    def latest(self) -> Optional[BatteryInfoSnapshot]:
+        """Return newest snapshot or None if empty."""
+        return self.get(-1) if self._size else None
+
+    def __iter__(self) -> Iterator[BatteryInfoSnapshot]:
+        """Iterate over snapshots from oldest to newest."""
+        for index in range(self._size):
+            yield self.get(index)
+
+    def column(self, name: str) -> array:
+        """Return a field column in age order (for bulk numeric analysis).
+
+        Args:
+            name: Numeric field name or 'timestamp'
+
+        Returns:
+            New array with values ordered from oldest to newest
+
+        Raises:
+            KeyError: If name is not a numeric column
+        """
+        if name == 'timestamp':
+            source = self._timestamps
+        elif name in self._ints:
+            source = self._ints[name]
+        elif name in self._floats:
+            source = self._floats[name]
+        else:
+            raise KeyError(f"Unknown numeric column: {name}")
+
+        if self._size < self.capacity:
+            return source[:self._size]
+        return source[self._head:] + source[:self._head]
+
+    def clear(self) -> None:
+        """Drop all stored snapshots (string table is kept)."""
+        self._size = 0
+        self._head = 0
+
+    def _position(self, index: int) -> int:
+        """Translate age-ordered index into buffer position."""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("Snapshot index out of range")
+        start = (self._head - self._size) % self.capacity
+        return (start + index) % self.capacity
+
+    def _intern(self, value: Optional[str]) -> int:
+        """Return string table index for value (0 for None)."""
+        if value is None:
+            return 0
+        index = self._string_index.get(value)
+        if index is None:
+            if len(self._string_table) > 0xFFFF:
+                raise OverflowError("Too many distinct string values in history")
+            index = len(self._string_table)
+            self._string_table.append(value)
+            self._string_index[value] = index
+        return index
+
+    def _build(self, pos: int) -> BatteryInfoSnapshot:
+        """Rebuild snapshot stored at buffer position."""
+        values: Dict[str, Any] = {}
+        for name in self.INT_FIELDS:
+            value = self._ints[name][pos]
+            values[name] = None if value == self.MISSING_INT else value
+        for name in self.FLOAT_FIELDS:
+            value = self._floats[name][pos]
+            values[name] = None if math.isnan(value) else value
+        for name in self.STRING_FIELDS:
+            values[name] = self._string_table[self._strings[name][pos]]
+        # end_threshold and backup_count are always present
+        if values['backup_count'] is None:
+            values['backup_count'] = 0
+        return BatteryInfoSnapshot(**values)
@@ -3,6 +3,7 @@
 import re
 from dataclasses import dataclass
 from typing import Optional
+from src.core.snapshots import BatteryStatusSnapshot
 
 
 @dataclass
@@ -13,6 +14,10 @@ class BatteryStatus:
     start_threshold: Optional[int] = None
     backup_count: int = 0
     
+    def to_snapshot(self) -> BatteryStatusSnapshot:
+        """Create immutable, compact snapshot of this status."""
+        return BatteryStatusSnapshot.from_status(self)
+    
     def __str__(self) -> str:
         """String representation of battery status."""
         return f"BatteryStatus(device={self.device}, end_threshold={self.end_threshold}%)"
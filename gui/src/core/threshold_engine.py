@@ -0,0 +1,497 @@
+"""Python-native charge threshold engine working directly on sysfs.
+
+Replaces the shell round trip of 'a14-charge-keeper set' for callers that
+already have the required privileges: no-op writes are skipped, the value
+is verified by reading it back immediately and then polling with a short
+bounded backoff (instead of a fixed 0.5 s sleep), and a failed write is
+rolled back in-process.
+
+The CLI runs this module once per write, so it imports as little as
+possible (no CLI interface, no thread pool until several batteries are
+written at once).
+"""
+
+import fcntl
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from src.core.backup_journal import BackupJournal, JOURNAL_NAME
+from src.core.cli_result import CliResult
+
+
+SYSFS_ROOT = "/sys/class/power_supply"
+BACKUP_DIR = "/var/lib/a14-charge-keeper"
+LOCK_FILE = "/var/lock/a14-charge-keeper.lock"
+CLI_NAME = "a14-charge-keeper"
+LOCK_BUSY_EXIT_CODE = 4  # As the CLI: another writer holds the lock
+
+END_THRESHOLD_FILE = "charge_control_end_threshold"
+START_THRESHOLD_FILE = "charge_control_start_threshold"
+
+MIN_THRESHOLD = 20
+MAX_THRESHOLD = 100
+
+
+class LockBusyError(BlockingIOError):
+    """The lock shared with the CLI stayed busy for the whole lock timeout."""
+
+
+class ThresholdWrite(NamedTuple):
+    """Outcome of a successful threshold write."""
+    device: str
+    previous: int
+    value: int
+    changed: bool
+    elapsed: float  # seconds
+
+    def __str__(self) -> str:
+        """String representation of write outcome."""
+        if not self.changed:
+            return f"{self.device}: {self.value}% (unchanged)"
+        return f"{self.device}: {self.previous}% -> {self.value}% ({self.elapsed * 1000:.1f} ms)"
+
+
+class ThresholdEngine:
+    """Reads, writes and verifies charge thresholds for one battery."""
+
+    # Verification polling: first delay, growth factor and per-poll cap
+    POLL_INITIAL = 0.002
+    POLL_FACTOR = 2.0
+    POLL_MAX = 0.05
+
+    # Lock polling while another writer holds it: first delay and cap
+    LOCK_POLL_INITIAL = 0.01
+    LOCK_POLL_MAX = 0.2
+
+    def __init__(self, battery: str = "BAT0", sysfs_root: str = SYSFS_ROOT,
+                 backup_dir: Optional[str] = BACKUP_DIR,
+                 lock_file: Optional[str] = LOCK_FILE,
+                 verify_timeout: float = 1.0,
+                 lock_timeout: float = 5.0,
+                 conflict_check: Optional[Callable[[], List[str]]] = None,
+                 sleep: Callable[[float], None] = time.sleep,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initialize threshold engine.
+
+        Args:
+            battery: power_supply device name (e.g. BAT0)
+            sysfs_root: power_supply class directory (a fake tree for testing)
+            backup_dir: Directory for previous-value backups (None disables)
+            lock_file: Lock shared with the CLI (None disables locking)
+            verify_timeout: Maximum seconds to wait for the value to settle
+            lock_timeout: Maximum seconds to wait for the lock; a write that
+                gets no lock fails with exit code 4, like the CLI
+            conflict_check: Returns the conflicting tools that are active
+                (capability_probe.check_conflicts); their warnings are printed
+                before each write, as the CLI does. None skips the check
+                (e.g. when the CLI has already done it)
+            sleep: Sleep function (injectable for testing)
+            clock: Monotonic clock (injectable for testing)
+        """
+        self.battery = battery
+        self.sysfs_root = sysfs_root
+        self.backup_dir = backup_dir
+        self.lock_file = lock_file
+        self.verify_timeout = verify_timeout
+        self.lock_timeout = lock_timeout
+        self.conflict_check = conflict_check
+        self._sleep = sleep
+        self._clock = clock
+        # Journal writes happen under this engine's lock (or the calling CLI's)
+        self.journal = (BackupJournal(os.path.join(backup_dir, JOURNAL_NAME), lock_file=None)
+                        if backup_dir else None)
+        self._legacy_migrated = False
+
+    @property
+    def end_file(self) -> str:
+        """Path of the end threshold attribute."""
+        return os.path.join(self.sysfs_root, self.battery, END_THRESHOLD_FILE)
+
+    @property
+    def start_file(self) -> str:
+        """Path of the (optional) start threshold attribute."""
+        return os.path.join(self.sysfs_root, self.battery, START_THRESHOLD_FILE)
+
+    def is_supported(self) -> bool:
+        """Check whether the battery exposes an end threshold."""
+        return os.path.exists(self.end_file)
+
+    def is_writable(self) -> bool:
+        """Check whether this process may write the end threshold."""
+        return os.access(self.end_file, os.W_OK)
+
+    def read_threshold(self) -> int:
+        """Read the current end threshold.
+
+        Raises:
+            OSError: If the attribute cannot be read
+            ValueError: If the attribute does not contain a number
+        """
+        return self._read_int(self.end_file)
+
+    def read_start_threshold(self) -> Optional[int]:
+        """Read the start threshold, or None if the model has none."""
+        try:
+            return self._read_int(self.start_file)
+        except (OSError, ValueError):
+            return None
+
+    def set_threshold(self, value: int) -> CliResult:
+        """Set end threshold with no-op skip, verification and rollback.
+
+        Args:
+            value: Threshold percentage (20-100)
+
+        Returns:
+            CliResult with ThresholdWrite data on success
+        """
+        if not isinstance(value, int) or not MIN_THRESHOLD <= value <= MAX_THRESHOLD:
+            return CliResult.error(f"Threshold must be between {MIN_THRESHOLD} and {MAX_THRESHOLD}")
+
+        unusable = self.check_usable()
+        if unusable is not None:
+            return unusable
+        self.warn_conflicts()
+
+        started = self._clock()
+        try:
+            with self._locked():
+                return self._set_locked(value, started)
+        except LockBusyError as e:
+            return CliResult.error(str(e), exit_code=LOCK_BUSY_EXIT_CODE)
+        except OSError as e:
+            return CliResult.error(f"임계값 설정 실패: {e}", exit_code=5)
+
+    def check_usable(self) -> Optional[CliResult]:
+        """Check support and permissions as the CLI does before a write.
+
+        Returns:
+            Error result (exit code 2), or None if the threshold can be written
+        """
+        if not self.is_supported():
+            return CliResult.error(f"배터리 충전 제어가 지원되지 않습니다: {self.end_file}", exit_code=2)
+        if not os.access(self.end_file, os.R_OK):
+            return CliResult.error(f"배터리 파일 읽기 권한이 없습니다: {self.end_file}", exit_code=2)
+        if not self.is_writable():
+            return CliResult.error(f"배터리 파일 쓰기 권한이 없습니다: {self.end_file}", exit_code=2)
+        return None
+
+    def warn_conflicts(self) -> None:
+        """Print the CLI's warnings for active tools that also set thresholds."""
+        if self.conflict_check is None:
+            return
+        try:
+            conflicts = self.conflict_check()
+        except OSError:
+            return
+        if 'tlp' in conflicts:
+            print("Warning: TLP가 실행 중입니다. 배터리 설정이 충돌할 수 있습니다.", file=sys.stderr)
+        if 'asusctl' in conflicts:
+            print("Warning: asusctl이 설치되어 있습니다. 설정이 충돌할 수 있습니다.", file=sys.stderr)
+
+    def clear_threshold(self) -> CliResult:
+        """Reset end threshold to 100%."""
+        return self.set_threshold(MAX_THRESHOLD)
+
+    def verify(self, expected: int) -> bool:
+        """Check that the end threshold settles at the expected value.
+
+        The value is read back immediately; if it differs, it is polled with
+        exponential backoff until it matches or verify_timeout expires.
+
+        Args:
+            expected: Expected threshold value
+
+        Returns:
+            True if the attribute reports the expected value
+        """
+        deadline = self._clock() + self.verify_timeout
+        delay = self.POLL_INITIAL
+        while True:
+            try:
+                if self.read_threshold() == expected:
+                    return True
+            except (OSError, ValueError):
+                pass
+
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return False
+            self._sleep(min(delay, remaining))
+            delay = min(delay * self.POLL_FACTOR, self.POLL_MAX)
+
+    def _set_locked(self, value: int, started: float) -> CliResult:
+        """Perform the write while holding the lock."""
+        try:
+            previous = self.read_threshold()
+        except (OSError, ValueError) as e:
+            return CliResult.error(f"임계값 읽기 실패: {e}", exit_code=5)
+
+        if previous == value:
+            return CliResult.success(ThresholdWrite(self.battery, previous, value, False,
+                                                    self._clock() - started))
+
+        self._backup(previous)
+        self._write(value)
+
+        if not self.verify(value):
+            # Roll back to the value read before the write
+            try:
+                self._write(previous)
+                rolled_back = self.verify(previous)
+            except OSError:
+                rolled_back = False
+            if rolled_back:
+                return CliResult.error(f"sysfs 값 불일치: 설정 {value}% (롤백 완료: {previous}%)", exit_code=5)
+            return CliResult.error(f"sysfs 값 불일치: 설정 {value}% (롤백 실패! 수동 복구 필요)", exit_code=5)
+
+        return CliResult.success(ThresholdWrite(self.battery, previous, value, True,
+                                                self._clock() - started))
+
+    def _write(self, value: int) -> None:
+        """Write threshold with a single write call."""
+        fd = os.open(self.end_file, os.O_WRONLY)
+        try:
+            os.write(fd, f"{value}\n".encode())
+        finally:
+            os.close(fd)
+
+    def _backup(self, previous: int) -> None:
+        """Record previous value in the backup journal (best effort)."""
+        if not self.journal:
+            return
+        try:
+            self._migrate_legacy()
+            self.journal.append(self.battery, previous)
+        except OSError as e:
+            print(f"Warning: Could not back up threshold: {e}")
+
+    def _migrate_legacy(self) -> None:
+        """Import legacy per-set backup files once.
+
+        Raises:
+            OSError: If the journal cannot be written
+        """
+        if self.journal and not self._legacy_migrated:
+            self.journal.migrate_legacy_files(device=self.battery)
+            self._legacy_migrated = True
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        """Hold the lock shared with the CLI, waiting at most lock_timeout.
+
+        Raises:
+            LockBusyError: If another writer held the lock the whole time
+            OSError: If the lock file cannot be opened
+        """
+        if not self.lock_file:
+            yield
+            return
+        try:
+            fd = os.open(self.lock_file, os.O_WRONLY | os.O_CREAT, 0o644)
+        except IsADirectoryError:
+            # Lock directory of an older CLI version: only stale once its
+            # holder is gone
+            if legacy_lock_holder_running():
+                raise LockBusyError(f"이전 버전의 인스턴스가 실행 중입니다 (잠금 디렉토리: {self.lock_file})")
+            os.rmdir(self.lock_file)
+            fd = os.open(self.lock_file, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            deadline = self._clock() + self.lock_timeout
+            delay = self.LOCK_POLL_INITIAL
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        raise LockBusyError(
+                            f"다른 인스턴스가 {self.lock_timeout:g}초 이상 실행 중입니다. 잠시 후 다시 시도하세요.")
+                    self._sleep(min(delay, remaining))
+                    delay = min(delay * 2, self.LOCK_POLL_MAX)
+            yield
+        finally:
+            os.close(fd)
+
+    def lock_busy(self) -> bool:
+        """Whether a writer (the CLI or an engine) holds the shared lock right now."""
+        if not self.lock_file:
+            return False
+        try:
+            fd = os.open(self.lock_file, os.O_RDONLY)
+        except OSError:
+            return False  # No lock file: nobody has written yet
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _read_int(path: str) -> int:
+        """Read an integer sysfs attribute."""
+        with open(path, 'rb') as f:
+            return int(f.read().strip())
+
+
+def legacy_lock_holder_running(proc_root: str = "/proc") -> bool:
+    """Whether an older CLI version (mkdir-style lock directory) is running.
+
+    Looks for a bash process running the CLI script, as the CLI's own check
+    does. The lock directory has no owner record, so a running instance is
+    taken to hold it.
+    """
+    try:
+        pids = [entry for entry in os.listdir(proc_root) if entry.isdigit()]
+    except OSError:
+        return False
+    for pid in pids:
+        try:
+            with open(os.path.join(proc_root, pid, "cmdline"), 'rb') as f:
+                args = f.read().split(b"\0")
+        except OSError:
+            continue
+        if (len(args) >= 2 and os.path.basename(args[0]) == b"bash"
+                and os.path.basename(args[1]) == CLI_NAME.encode()):
+            return True
+    return False
+
+
+def set_thresholds(engines: List[ThresholdEngine], value: int) -> CliResult:
+    """Set the same end threshold on several batteries with per-device rollback.
+
+    The shared lock is taken once and the devices are written and verified
+    concurrently, so the total time is that of the slowest device rather
+    than the sum. If any device fails, devices that were already changed
+    are restored to the value they had before.
+
+    Args:
+        engines: One engine per battery (the first one's lock file is used)
+        value: Threshold percentage (20-100)
+
+    Returns:
+        CliResult with a list of ThresholdWrite on success
+    """
+    if not engines:
+        return CliResult.error("No batteries selected")
+    if not isinstance(value, int) or not MIN_THRESHOLD <= value <= MAX_THRESHOLD:
+        return CliResult.error(f"Threshold must be between {MIN_THRESHOLD} and {MAX_THRESHOLD}")
+    unsupported = [engine.battery for engine in engines if not engine.is_supported()]
+    if unsupported:
+        return CliResult.error(f"배터리 충전 제어가 지원되지 않습니다: {', '.join(unsupported)}",
+                               exit_code=2)
+    for engine in engines:
+        unusable = engine.check_usable()
+        if unusable is not None:
+            return unusable
+    engines[0].warn_conflicts()
+
+    # Imported here: single-battery writes (the CLI's case) need no thread pool
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        with engines[0]._locked():
+            # Legacy migration touches shared files: do it before fanning out
+            for engine in engines:
+                try:
+                    engine._migrate_legacy()
+                except OSError as e:
+                    print(f"Warning: Could not migrate legacy backups: {e}")
+                    engine._legacy_migrated = True
+
+            with ThreadPoolExecutor(max_workers=len(engines)) as pool:
+                results = list(pool.map(lambda engine: engine._set_locked(value, engine._clock()),
+                                        engines))
+
+            failures = [f"{engine.battery}: {result.error_message}"
+                        for engine, result in zip(engines, results) if not result.success]
+            if not failures:
+                return CliResult.success([result.data for result in results])
+
+            restored, stuck = [], []
+            for engine, result in zip(engines, results):
+                if not result.success or not result.data.changed:
+                    continue
+                try:
+                    engine._write(result.data.previous)
+                    ok = engine.verify(result.data.previous)
+                except OSError:
+                    ok = False
+                (restored if ok else stuck).append(engine.battery)
+    except LockBusyError as e:
+        return CliResult.error(str(e), exit_code=LOCK_BUSY_EXIT_CODE)
+    except OSError as e:
+        return CliResult.error(f"임계값 설정 실패: {e}", exit_code=5)
+
+    message = "; ".join(failures)
+    if restored:
+        message += f" (롤백 완료: {', '.join(restored)})"
+    if stuck:
+        message += f" (롤백 실패! 수동 복구 필요: {', '.join(stuck)})"
+    return CliResult.error(message, exit_code=5)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Thin CLI wrapper: ``set N``, ``clear``, ``verify N`` or ``get``.
+
+    Exit codes follow a14-charge-keeper: 2 unsupported, 3 invalid input,
+    4 lock busy, 5 write failed. BAT_NAME selects the battery and
+    LOCK_TIMEOUT the lock wait; A14_LOCK_HELD=1 skips locking and the
+    conflict check when the calling shell script has done both already.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else ""
+
+    called_by_cli = os.environ.get('A14_LOCK_HELD') == '1'
+    conflict_check = None
+    if not called_by_cli and command in ("set", "clear"):
+        from src.core.capability_probe import check_conflicts
+        conflict_check = check_conflicts
+    try:
+        lock_timeout = float(os.environ.get('LOCK_TIMEOUT', '10'))
+    except ValueError:
+        lock_timeout = 10.0
+    engine = ThresholdEngine(battery=os.environ.get('BAT_NAME', 'BAT0'),
+                             lock_file=None if called_by_cli else LOCK_FILE,
+                             lock_timeout=lock_timeout, conflict_check=conflict_check)
+
+    if command == "get":
+        try:
+            print(engine.read_threshold())
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"임계값 읽기 실패: {e}", file=sys.stderr)
+            return 2
+
+    if command == "clear":
+        result = engine.clear_threshold()
+    elif command in ("set", "verify"):
+        if len(argv) < 2 or not argv[1].isdigit():
+            print("숫자 값(20-100)이 필요합니다", file=sys.stderr)
+            return 3
+        value = int(argv[1])
+        if not MIN_THRESHOLD <= value <= MAX_THRESHOLD:
+            print("20~100 사이의 값만 허용됩니다", file=sys.stderr)
+            return 3
+        if command == "verify":
+            return 0 if engine.verify(value) else 1
+        result = engine.set_threshold(value)
+    else:
+        print(f"알 수 없는 명령: {command}", file=sys.stderr)
+        return 64
+
+    if not result.success:
+        print(result.error_message, file=sys.stderr)
+        return result.exit_code or 1
+    print(result.data)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,324 @@
+"""Threshold what-if simulator over recorded usage.
+
+Replays a recorded charge trace (the sample log, including imported UPower
+history) against many (end, start) threshold candidates at once and
+estimates, per candidate, the runtime that would have been lost, the time
+spent at high charge and the cycle depth. The result is a ranked table.
+
+The recorded trace is resampled to a fixed step and split into plug/unplug
+segments. Within a segment every candidate moves in one direction only:
+
+* on battery, charge falls by the recorded drain (clamped at 0);
+* on AC, a candidate at or below its start threshold charges up to its end
+  threshold (at the recorded rate, or the typical one where the recording
+  was held at its own limit); above the start threshold it stays put.
+
+So each segment has a closed form, evaluated for all steps and candidates
+with one NumPy expression; the simulation loops over segments only. Since
+every trajectory is monotonic within a segment, its reversals can only
+fall on segment boundaries, and cycle counting looks at those rows alone
+(a few hundred points instead of every step). Rainflow itself still runs
+once per candidate: the reversal sequences differ in length between
+candidates, so it does not vectorize across them, but on boundary rows the
+81 calls take under 10 ms for a 90-day trace. NumPy is required (see wear_analytics).
+
+    python3 -m src.core.threshold_simulator [BATTERY] [--days N] [--top N]
+"""
+
+import argparse
+import sys
+import time
+from typing import Any, Iterable, List, NamedTuple, Optional, Sequence
+
+from src.core.sample_log import AC_STATES, BATTERY_STATES, SampleLog
+from src.core.wear_analytics import MIN_CYCLE_RANGE, _require_numpy, is_available, rainflow
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+
+DEFAULT_STEP = 300  # seconds
+# Longer intervals without samples are treated as missing data
+DEFAULT_MAX_GAP = 86400
+# Charge rate assumed where the recording never charged (percent per hour)
+DEFAULT_CHARGE_RATE = 40.0
+# Charge level counted as empty (the system would have suspended or shut down)
+RESERVE_PERCENT = 5
+HIGH_SOC_LEVEL = 90
+
+
+class Candidate(NamedTuple):
+    """Threshold setting to evaluate."""
+
+    end_threshold: int
+    start_threshold: int
+
+
+class CandidateResult(NamedTuple):
+    """Simulated outcome of one candidate."""
+
+    end_threshold: int
+    start_threshold: int
+    runtime_lost_hours: float  # extra hours below the reserve compared with 100%
+    mean_charge: float  # time-weighted mean charge (%)
+    high_soc_fraction: float  # share of time at or above HIGH_SOC_LEVEL
+    equivalent_full_cycles: float
+    mean_cycle_depth: Optional[float]  # percentage points
+    unplug_charge: Optional[float]  # mean charge when the charger was disconnected
+
+
+def candidate_grid(ends: Iterable[int] = range(60, 101, 5),
+                   start_gaps: Iterable[int] = (0, 2, 5, 10, 15, 20, 25, 30, 40)) -> List[Candidate]:
+    """Build the default candidate grid (81 settings).
+
+    Args:
+        ends: End thresholds
+        start_gaps: Start threshold distances below the end threshold (0
+            means charging resumes as soon as the charge drops below the end)
+
+    Returns:
+        Candidates with a start threshold of at least 20%
+    """
+    start_gaps = list(start_gaps)
+    return [Candidate(end, end - gap) for end in ends for gap in start_gaps if end - gap >= 20]
+
+
+class UsageTrace:
+    """Recorded usage resampled to fixed steps.
+
+    Attributes:
+        step: Step length in seconds
+        on_ac: Charger connected during each step
+        drain: Charge consumed on battery per step (percentage points)
+        gain: Charge gained per step when charging is allowed
+        weight: Seconds of valid data per step (0 for missing data)
+        initial_charge: Charge at the first step
+    """
+
+    def __init__(self, timestamps: Any, percentage: Any, states: Sequence[str],
+                 step: int = DEFAULT_STEP, max_gap: float = DEFAULT_MAX_GAP):
+        """Resample a recorded trace.
+
+        Args:
+            timestamps: Charge sample times (epoch seconds)
+            percentage: Charge per sample
+            states: upower state per sample
+            step: Resampling step in seconds
+            max_gap: Longer intervals between samples count as missing data
+
+        Raises:
+            RuntimeError: If NumPy is not installed
+            ValueError: With fewer than two samples
+        """
+        _require_numpy()
+        times = np.asarray(timestamps, dtype=np.float64)
+        charge = np.asarray(percentage, dtype=np.float64)
+        if times.size < 2:
+            raise ValueError("At least two charge samples are needed")
+        order = np.argsort(times, kind='stable')
+        times, charge = times[order], charge[order]
+        # 1 on AC, 0 on battery, -1 unknown (carried forward from the last known state)
+        codes = np.array([1 if s in AC_STATES else 0 if s in BATTERY_STATES else -1
+                          for s in states], dtype=np.int8)[order]
+        known = np.maximum.accumulate(np.where(codes >= 0, np.arange(codes.size), 0))
+        ac = codes[known] == 1
+
+        self.step = step
+        grid = np.arange(times[0], times[-1], step, dtype=np.float64)
+        if grid.size < 2:
+            raise ValueError("Recorded trace is shorter than one step")
+        level = np.interp(grid, times, charge)
+        delta = np.diff(level)
+        sample = np.searchsorted(times, grid[:-1], side='right') - 1
+        interval = times[np.minimum(sample + 1, times.size - 1)] - times[sample]
+        valid = interval <= max_gap
+
+        self.start_time = float(grid[0])
+        self.on_ac = ac[sample]
+        self.weight = np.where(valid, float(step), 0.0)
+        self.drain = np.where(valid & ~self.on_ac, np.maximum(-delta, 0.0), 0.0)
+        recorded_charging = valid & self.on_ac & (delta > 0)
+        typical = (np.median(delta[recorded_charging]) if recorded_charging.any()
+                   else DEFAULT_CHARGE_RATE * step / 3600)
+        # Where the recording was held at its own limit, charge at the typical rate
+        self.gain = np.where(valid & self.on_ac, np.where(delta > 0, delta, typical), 0.0)
+        self.initial_charge = float(level[0])
+
+    def __len__(self) -> int:
+        """Number of steps."""
+        return int(self.on_ac.size)
+
+    @property
+    def days(self) -> float:
+        """Length of the trace in days."""
+        return len(self) * self.step / 86400
+
+    @classmethod
+    def from_sample_log(cls, sample_log: Any, device: str, since: Optional[int] = None,
+                        step: int = DEFAULT_STEP) -> 'UsageTrace':
+        """Build from a SampleLog's charge samples.
+
+        Raises:
+            ValueError: With fewer than two charge samples
+        """
+        timestamps, percentage, states = [], [], []
+        for sample in sample_log.iter_samples(device, "charge", since):
+            timestamps.append(sample.timestamp)
+            percentage.append(sample.value)
+            states.append(sample.state)
+        return cls(timestamps, percentage, states, step)
+
+    def segments(self) -> List[tuple]:
+        """(first step, end step, on AC) for each plug/unplug segment."""
+        changes = np.flatnonzero(self.on_ac[1:] != self.on_ac[:-1]) + 1
+        bounds = np.concatenate(([0], changes, [len(self)]))
+        return [(int(a), int(b), bool(self.on_ac[a])) for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def simulate(trace: UsageTrace, candidates: Sequence[Candidate]) -> Any:
+    """Charge trajectories of all candidates.
+
+    Args:
+        trace: Recorded usage
+        candidates: Settings to simulate
+
+    Returns:
+        float32 array of shape (steps + 1, candidates): charge at each step boundary
+    """
+    _require_numpy()
+    ends = np.array([c.end_threshold for c in candidates], dtype=np.float32)
+    starts = np.array([c.start_threshold for c in candidates], dtype=np.float32)
+    trajectory = np.empty((len(trace) + 1, len(candidates)), dtype=np.float32)
+    charge = np.minimum(np.float32(trace.initial_charge), ends)
+    trajectory[0] = charge
+
+    for first, end, on_ac in trace.segments():
+        if on_ac:
+            gained = np.cumsum(trace.gain[first:end], dtype=np.float32)[:, None]
+            segment = np.where(charge <= starts, np.minimum(charge + gained, ends), charge)
+        else:
+            drained = np.cumsum(trace.drain[first:end], dtype=np.float32)[:, None]
+            segment = np.maximum(charge - drained, 0)
+        trajectory[first + 1:end + 1] = segment
+        charge = segment[-1]
+    return trajectory
+
+
+def evaluate(trace: UsageTrace, candidates: Sequence[Candidate],
+             reserve: float = RESERVE_PERCENT, high_level: float = HIGH_SOC_LEVEL) -> List[CandidateResult]:
+    """Simulate candidates and compute their figures.
+
+    Args:
+        trace: Recorded usage
+        candidates: Settings to evaluate
+        reserve: Charge counted as empty
+        high_level: Charge counted as high
+
+    Returns:
+        CandidateResult per candidate, in candidate order
+    """
+    # The 100% baseline is simulated alongside to measure lost runtime
+    columns = list(candidates) + [Candidate(100, 100)]
+    trajectory = simulate(trace, columns)
+    weight = trace.weight
+    total = weight.sum() or 1.0
+    level = trajectory[:-1]
+
+    mean_charge = weight @ level / total
+    high = weight @ (level >= high_level) / total
+    on_battery = np.where(trace.on_ac, 0.0, weight)
+    empty_hours = on_battery @ (trajectory[1:] <= reserve) / 3600
+    lost = empty_hours[:-1] - empty_hours[-1]
+    segments = trace.segments()
+    unplugs = [first for first, _, on_ac in segments if not on_ac]
+    unplug_charge = trajectory[unplugs].mean(axis=0) if unplugs else None
+    # Trajectories are monotonic within a segment: reversals lie on boundaries
+    boundaries = trajectory[[0] + [end for _, end, _ in segments]]
+
+    results = []
+    for index, candidate in enumerate(candidates):
+        ranges, counts = rainflow(boundaries[:, index])
+        significant = ranges >= MIN_CYCLE_RANGE
+        ranges, counts = ranges[significant], counts[significant]
+        results.append(CandidateResult(
+            end_threshold=candidate.end_threshold,
+            start_threshold=candidate.start_threshold,
+            runtime_lost_hours=float(max(lost[index], 0.0)),
+            mean_charge=float(mean_charge[index]),
+            high_soc_fraction=float(high[index]),
+            equivalent_full_cycles=float(np.dot(ranges, counts) / 100),
+            mean_cycle_depth=float(np.average(ranges, weights=counts)) if counts.size else None,
+            unplug_charge=None if unplug_charge is None else float(unplug_charge[index]),
+        ))
+    return results
+
+
+def rank(results: Iterable[CandidateResult], max_runtime_lost: float = 0.0) -> List[CandidateResult]:
+    """Order candidates from most to least recommended.
+
+    Candidates within the runtime-loss budget come first, ordered by mean
+    charge (lower means less calendar aging), then by cycle throughput;
+    the rest follow ordered by runtime lost.
+
+    Args:
+        results: Evaluated candidates
+        max_runtime_lost: Acceptable runtime lost over the trace (hours)
+    """
+    def key(result: CandidateResult):
+        if result.runtime_lost_hours <= max_runtime_lost:
+            return (0, result.mean_charge, result.equivalent_full_cycles)
+        return (1, result.runtime_lost_hours, result.mean_charge)
+    return sorted(results, key=key)
+
+
+def format_table(results: Sequence[CandidateResult], limit: Optional[int] = None) -> str:
+    """Render ranked results as a text table."""
+    lines = [f"{'#':>3} {'End':>4} {'Start':>5} {'Lost h':>7} {'Mean %':>7} "
+             f"{'>=' + str(HIGH_SOC_LEVEL) + '%':>6} {'EFC':>7} {'Depth':>6} {'Unplug':>7}"]
+    for position, r in enumerate(results[:limit] if limit else results, 1):
+        depth = f"{r.mean_cycle_depth:6.1f}" if r.mean_cycle_depth is not None else f"{'-':>6}"
+        unplug = f"{r.unplug_charge:7.1f}" if r.unplug_charge is not None else f"{'-':>7}"
+        lines.append(f"{position:>3} {r.end_threshold:>4} {r.start_threshold:>5} "
+                     f"{r.runtime_lost_hours:7.2f} {r.mean_charge:7.1f} "
+                     f"{r.high_soc_fraction * 100:5.1f}% {r.equivalent_full_cycles:7.1f} "
+                     f"{depth} {unplug}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Rank threshold candidates against a battery's recorded usage."""
+    parser = argparse.ArgumentParser(prog="python3 -m src.core.threshold_simulator",
+                                     description=__doc__.split("\n\n")[0])
+    parser.add_argument("battery", nargs="?", default="BAT0")
+    parser.add_argument("--days", type=float, default=90, help="Recorded days to replay")
+    parser.add_argument("--step", type=int, default=DEFAULT_STEP, help="Resampling step (seconds)")
+    parser.add_argument("--top", type=int, default=20, help="Rows to show (0 for all)")
+    parser.add_argument("--max-runtime-lost", type=float, default=0.0,
+                        help="Acceptable runtime lost over the period (hours)")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if not is_available():
+        print("The threshold simulator requires numpy", file=sys.stderr)
+        return 1
+    since = int(time.time() - args.days * 86400)
+    try:
+        trace = UsageTrace.from_sample_log(SampleLog(), args.battery, since, args.step)
+    except ValueError as e:
+        print(f"Cannot simulate {args.battery}: {e}", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    candidates = candidate_grid()
+    results = rank(evaluate(trace, candidates), args.max_runtime_lost)
+    elapsed = time.perf_counter() - started
+
+    print(format_table(results, args.top or None))
+    print(f"{len(candidates)} candidates x {trace.days:.1f} days "
+          f"({len(trace)} steps) in {elapsed * 1000:.0f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
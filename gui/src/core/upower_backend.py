@@ -0,0 +1,397 @@
+"""UPower D-Bus backend.
+
+Replaces ``upower -e`` / ``upower -i`` subprocesses and their text
+scraping: all org.freedesktop.UPower.Device properties of a battery are
+fetched with one Properties.GetAll call, and PropertiesChanged signals
+deliver incremental updates (only the properties that changed).
+
+Uses jeepney (pure Python D-Bus) when installed; without it, or without
+a reachable UPower, callers fall back to the CLI. For testing, set
+A14_UPOWER_BUS=session and run the stand-in service:
+
+    python3 -m src.core.upower_backend fake-service
+"""
+
+import os
+import sys
+import threading
+import time
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.core.snapshots import BatteryInfoSnapshot
+
+# Optional dependency, imported on first use so that processes that never
+# reach D-Bus (CLI fallback, tools) do not load it
+JEEPNEY_INSTALLED = find_spec("jeepney") is not None
+
+
+UPOWER_SERVICE = "org.freedesktop.UPower"
+UPOWER_PATH = "/org/freedesktop/UPower"
+DEVICE_INTERFACE = "org.freedesktop.UPower.Device"
+DEVICES_PATH = "/org/freedesktop/UPower/devices"
+CALL_TIMEOUT = 2.0
+# Seconds to skip D-Bus after UPower was unreachable (callers use the CLI meanwhile)
+RETRY_INTERVAL = 60.0
+
+# UPower device state enum, named as 'upower -i' prints it
+STATE_NAMES = {
+    0: None,
+    1: "charging",
+    2: "discharging",
+    3: "empty",
+    4: "fully-charged",
+    5: "pending-charge",
+    6: "pending-discharge",
+}
+
+
+def format_duration(seconds: int) -> Optional[str]:
+    """Format a UPower time estimate like 'upower -i' does (None if unknown)."""
+    if not seconds or seconds <= 0:
+        return None
+    if seconds < 60:
+        return f"{seconds:.0f} seconds"
+    if seconds < 3600:
+        return f"{seconds / 60:.1f} minutes"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} hours"
+    return f"{seconds / 86400:.1f} days"
+
+
+# UPower property -> (BatteryInfo field, converter)
+PROPERTY_FIELDS: Dict[str, Tuple[str, Callable[[Any], Any]]] = {
+    'Vendor': ('vendor', lambda v: v or None),
+    'Model': ('model', lambda v: v or None),
+    'Serial': ('serial', lambda v: v or None),
+    'State': ('state', STATE_NAMES.get),
+    'Percentage': ('percentage', lambda v: int(round(v))),
+    'Energy': ('energy_current', float),
+    'EnergyFull': ('energy_full', float),
+    'EnergyFullDesign': ('energy_full_design', float),
+    'EnergyRate': ('energy_rate', float),
+    'Voltage': ('voltage', float),
+    'Capacity': ('capacity', float),
+    'ChargeCycles': ('charge_cycles', lambda v: v if v >= 0 else None),
+    'TimeToEmpty': ('time_to_empty', format_duration),
+    'TimeToFull': ('time_to_full', format_duration),
+}
+
+
+def fields_from_properties(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert UPower properties to BatteryInfo field values.
+
+    Args:
+        properties: Property name to value (D-Bus variants already unwrapped)
+
+    Returns:
+        Field values for the properties present
+    """
+    fields = {}
+    for name, value in properties.items():
+        mapping = PROPERTY_FIELDS.get(name)
+        if mapping is not None:
+            field, convert = mapping
+            fields[field] = convert(value)
+    return fields
+
+
+def _unwrap(variants: Dict[str, Tuple[str, Any]]) -> Dict[str, Any]:
+    """Drop the signatures of an a{sv} dictionary."""
+    return {name: value for name, (_, value) in variants.items()}
+
+
+class UPowerBackend:
+    """Reads battery properties from UPower over D-Bus."""
+
+    def __init__(self, bus: Optional[str] = None):
+        """Initialize backend (connects lazily).
+
+        Args:
+            bus: 'SYSTEM' or 'SESSION' (default: A14_UPOWER_BUS or SYSTEM)
+        """
+        self.bus = (bus or os.environ.get('A14_UPOWER_BUS', 'SYSTEM')).upper()
+        self._connection = None
+        self._lock = threading.Lock()
+        self._unavailable_until = 0.0
+        self.call_count = 0
+
+    @staticmethod
+    def is_supported() -> bool:
+        """Whether the D-Bus library is installed."""
+        return JEEPNEY_INSTALLED
+
+    @staticmethod
+    def device_path(name: str) -> str:
+        """UPower object path of a power_supply battery."""
+        return f"{DEVICES_PATH}/battery_{name}"
+
+    @staticmethod
+    def device_name(path: str) -> Optional[str]:
+        """power_supply name of a UPower battery object path (None for others)."""
+        prefix = f"{DEVICES_PATH}/battery_"
+        return path[len(prefix):] if path.startswith(prefix) else None
+
+    def get_properties(self, name: str) -> Optional[Dict[str, Any]]:
+        """Fetch all device properties with one GetAll call.
+
+        Args:
+            name: power_supply battery name (e.g. BAT0)
+
+        Returns:
+            Property dictionary, or None if UPower is unreachable or does not
+            know the battery
+        """
+        if not self.is_supported() or time.monotonic() < self._unavailable_until:
+            return None
+        from jeepney import DBusAddress, MessageType, Properties
+        from jeepney.io.blocking import open_dbus_connection
+
+        address = DBusAddress(self.device_path(name), bus_name=UPOWER_SERVICE,
+                              interface=DEVICE_INTERFACE)
+        with self._lock:
+            try:
+                if self._connection is None:
+                    self._connection = open_dbus_connection(bus=self.bus)
+                reply = self._connection.send_and_get_reply(Properties(address).get_all(),
+                                                            timeout=CALL_TIMEOUT)
+            except (OSError, TimeoutError, ValueError, KeyError) as e:
+                print(f"UPower D-Bus call failed, using the CLI for {RETRY_INTERVAL:g}s: {e}")
+                self._close_locked()
+                self._unavailable_until = time.monotonic() + RETRY_INTERVAL
+                return None
+            self.call_count += 1
+        if reply.header.message_type == MessageType.error:
+            return None
+        return _unwrap(reply.body[0])
+
+    def read_snapshot(self, name: str, end_threshold: int, start_threshold: Optional[int] = None,
+                      backup_count: int = 0) -> Optional[BatteryInfoSnapshot]:
+        """Build a full battery snapshot from UPower plus threshold values.
+
+        Args:
+            name: power_supply battery name
+            end_threshold: Current end threshold (read from sysfs)
+            start_threshold: Current start threshold, if any
+            backup_count: Backup journal records
+
+        Returns:
+            BatteryInfoSnapshot, or None if UPower could not be read
+        """
+        properties = self.get_properties(name)
+        if properties is None:
+            return None
+        return BatteryInfoSnapshot(device=name, end_threshold=end_threshold,
+                                   start_threshold=start_threshold, backup_count=backup_count,
+                                   **fields_from_properties(properties))
+
+    def subscribe(self, on_changed: Callable[[str, Dict[str, Any]], None]) -> 'UPowerSubscription':
+        """Deliver PropertiesChanged deltas of all UPower batteries.
+
+        Args:
+            on_changed: callback(battery name, changed BatteryInfo fields),
+                called on the subscription's thread
+
+        Returns:
+            Started subscription (stop() it when done)
+        """
+        subscription = UPowerSubscription(self.bus, on_changed)
+        subscription.start()
+        return subscription
+
+    def close(self) -> None:
+        """Close the D-Bus connection."""
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        """Close the connection (lock held)."""
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except OSError:
+                pass
+            self._connection = None
+
+
+class UPowerSubscription:
+    """Listens for UPower device PropertiesChanged signals on a daemon thread."""
+
+    def __init__(self, bus: str, on_changed: Callable[[str, Dict[str, Any]], None]):
+        """Initialize subscription.
+
+        Args:
+            bus: 'SYSTEM' or 'SESSION'
+            on_changed: callback(battery name, changed BatteryInfo fields)
+        """
+        self.bus = bus
+        self.on_changed = on_changed
+        self.signal_count = 0
+        self._running = False
+        self._ready = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, timeout: float = CALL_TIMEOUT) -> bool:
+        """Start listening.
+
+        Returns:
+            True once the match rule is installed
+        """
+        if not JEEPNEY_INSTALLED:
+            return False
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="UPowerSubscription", daemon=True)
+        self._thread.start()
+        return self._ready.wait(timeout)
+
+    def stop(self) -> None:
+        """Stop listening (the thread exits within a second)."""
+        self._running = False
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the listener thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        """Thread loop: receive matching signals and forward the deltas."""
+        from jeepney import MatchRule, message_bus
+        from jeepney.io.blocking import Proxy, open_dbus_connection
+
+        rule = MatchRule(type='signal', interface='org.freedesktop.DBus.Properties',
+                         member='PropertiesChanged', path_namespace=DEVICES_PATH)
+        try:
+            connection = open_dbus_connection(bus=self.bus)
+        except OSError as e:
+            print(f"UPower subscription unavailable: {e}")
+            self._ready.set()
+            return
+
+        try:
+            Proxy(message_bus, connection).AddMatch(rule)
+            with connection.filter(rule) as queue:
+                self._ready.set()
+                while self._running:
+                    try:
+                        message = connection.recv_until_filtered(queue, timeout=1.0)
+                    except TimeoutError:
+                        continue
+                    self._handle(message)
+        except OSError as e:
+            print(f"UPower subscription ended: {e}")
+        finally:
+            self._ready.set()
+            connection.close()
+
+    def _handle(self, message) -> None:
+        """Forward one PropertiesChanged signal."""
+        from jeepney import HeaderFields
+
+        interface, changed, _invalidated = message.body
+        name = UPowerBackend.device_name(message.header.fields.get(HeaderFields.path, ""))
+        if interface != DEVICE_INTERFACE or name is None:
+            return
+        fields = fields_from_properties(_unwrap(changed))
+        if not fields:
+            return
+        self.signal_count += 1
+        try:
+            self.on_changed(name, fields)
+        except Exception as e:
+            print(f"Error in UPower callback: {e}")
+
+
+def run_fake_service(batteries=("BAT0",), interval: float = 1.0) -> int:
+    """Session-bus UPower stand-in for testing.
+
+    Serves EnumerateDevices and Properties.Get/GetAll for the given
+    batteries and, every ``interval`` seconds, lowers the percentage of
+    each by one and emits PropertiesChanged with just the changed values.
+    """
+    from jeepney import (DBusAddress, HeaderFields, MessageType, message_bus, new_error,
+                         new_method_return, new_signal)
+    from jeepney.io.blocking import Proxy, open_dbus_connection
+
+    connection = open_dbus_connection(bus='SESSION')
+    Proxy(message_bus, connection).RequestName(UPOWER_SERVICE)
+    devices = {
+        UPowerBackend.device_path(name): {
+            'NativePath': ('s', name), 'Vendor': ('s', 'ASUSTeK'), 'Model': ('s', 'A32-K55'),
+            'Serial': ('s', '1234'), 'Type': ('u', 2), 'State': ('u', 2),
+            'Percentage': ('d', 80.0), 'Energy': ('d', 56.0), 'EnergyFull': ('d', 70.1),
+            'EnergyFullDesign': ('d', 73.0), 'EnergyRate': ('d', 9.8), 'Voltage': ('d', 15.9),
+            'Capacity': ('d', 96.03), 'ChargeCycles': ('i', -1), 'TimeToEmpty': ('x', 20520),
+            'TimeToFull': ('x', 0),
+        }
+        for name in batteries
+    }
+    print(f"Fake UPower on the session bus: {', '.join(batteries)}", flush=True)
+
+    next_tick = time.monotonic() + interval
+    while True:
+        try:
+            message = connection.receive(timeout=max(0.0, next_tick - time.monotonic()))
+        except TimeoutError:
+            message = None
+
+        if message is not None and message.header.message_type == MessageType.method_call:
+            fields = message.header.fields
+            path, member = fields.get(HeaderFields.path), fields.get(HeaderFields.member)
+            if member == 'EnumerateDevices':
+                reply = new_method_return(message, 'ao', (list(devices),))
+            elif member == 'GetAll' and path in devices:
+                reply = new_method_return(message, 'a{sv}', (devices[path],))
+            elif member == 'Get' and path in devices and message.body[1] in devices[path]:
+                reply = new_method_return(message, 'v', (devices[path][message.body[1]],))
+            else:
+                reply = new_error(message, 'org.freedesktop.DBus.Error.UnknownMethod')
+            connection.send(reply)
+
+        if time.monotonic() >= next_tick:
+            next_tick += interval
+            for path, properties in devices.items():
+                percentage = max(0.0, properties['Percentage'][1] - 1)
+                properties['Percentage'] = ('d', percentage)
+                properties['Energy'] = ('d', round(70.1 * percentage / 100, 2))
+                changed = {key: properties[key] for key in ('Percentage', 'Energy')}
+                signal = new_signal(DBusAddress(path, interface='org.freedesktop.DBus.Properties'),
+                                    'PropertiesChanged', 'sa{sv}as',
+                                    (DEVICE_INTERFACE, changed, []))
+                connection.send(signal)
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Command line entry point: ``read [BAT]``, ``watch`` or ``fake-service [BAT...]``."""
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "read"
+    if not UPowerBackend.is_supported():
+        print("jeepney is not installed (pip install jeepney)", file=sys.stderr)
+        return 1
+
+    if command == "read":
+        properties = UPowerBackend().get_properties(argv[1] if len(argv) > 1 else "BAT0")
+        if properties is None:
+            return 1
+        for name, value in sorted(properties.items()):
+            print(f"{name}: {value}")
+        return 0
+
+    if command == "watch":
+        UPowerBackend().subscribe(lambda name, fields: print(name, fields, flush=True))
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            return 0
+
+    if command == "fake-service":
+        try:
+            return run_fake_service(tuple(argv[1:]) or ("BAT0",))
+        except KeyboardInterrupt:
+            return 0
+
+    print(f"Unknown command: {command}", file=sys.stderr)
+    return 64
+
+
+if __name__ == "__main__":
+    sys.exit(main())
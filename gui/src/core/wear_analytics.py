@@ -0,0 +1,425 @@
+"""Battery wear analytics: rainflow cycle counting, capacity fade, time at high charge.
+
+``BatteryInfo.health_percentage`` is a single instantaneous ratio and
+``charge_cycles`` is often missing, so wear is estimated from recorded
+samples instead:
+
+* rainflow cycle counting (four-point method) over the charge level gives
+  equivalent full cycles and a depth-of-discharge histogram;
+* a linear fit over daily mean ``energy_full`` gives the capacity-fade trend;
+* time spent at or above high charge levels (the main calendar-aging factor
+  a charge limit controls).
+
+Samples are recorded into typed ``array`` columns (no NumPy needed to
+record); the analysis views them as NumPy arrays without copying and is
+fully vectorized. NumPy is optional: without it, recording works and
+``analyze()`` raises RuntimeError.
+
+    python3 -m src.core.wear_analytics [BATTERY]
+"""
+
+import json
+import math
+import sys
+import time
+from array import array
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+
+# Depth-of-discharge histogram bin edges (percentage points)
+DOD_BINS = tuple(range(0, 101, 10))
+# Cycles shallower than this (percentage points) are reading flicker, not
+# cycling; rainflow extracts them without changing the larger cycles, so
+# dropping them afterwards equals a hysteresis filter before counting
+MIN_CYCLE_RANGE = 2.0
+# Charge levels reported by time_at_high_soc()
+HIGH_SOC_LEVELS = (80, 90, 95, 100)
+# Gaps between samples longer than this (seconds) are not counted as time
+# at a charge level (suspend, power off, missing data)
+MAX_SAMPLE_GAP = 900
+# Give up on vectorized rainflow passes when one removes fewer reversals
+# than this fraction; the rest is counted sequentially
+MIN_PASS_REMOVAL = 0.01
+
+
+class FadeTrend(NamedTuple):
+    """Linear capacity-fade fit over daily mean full-charge energy."""
+
+    slope: float  # Wh per day
+    fitted_energy_full: float  # Wh, fit value at the last sample
+    fade_percent_per_year: float  # of design energy (of the fitted start without it)
+    days_to_80_percent: Optional[float]  # until 80% of design energy, if fading
+
+
+class WearReport(NamedTuple):
+    """Wear figures computed from recorded samples."""
+
+    sample_count: int
+    span_days: float
+    equivalent_full_cycles: float
+    cycles_per_day: Optional[float]
+    dod_histogram: Tuple[float, ...]  # cycle count per DOD_BINS interval
+    fade: Optional[FadeTrend]
+    high_soc_fraction: Dict[int, float]  # level -> fraction of observed time at or above it
+    observed_seconds: float
+
+
+def is_available() -> bool:
+    """Whether NumPy is installed (required by the analysis, not by recording)."""
+    return np is not None
+
+
+class WearSamples:
+    """Growable, NumPy-friendly columns of timestamp, charge and full energy.
+
+    Columns are typed ``array`` objects; rows without a value carry NaN.
+    ``arrays()`` exposes them as NumPy arrays sharing the same memory.
+    """
+
+    def __init__(self):
+        """Initialize empty columns."""
+        self._timestamps = array('d')
+        self._percentage = array('f')
+        self._energy_full = array('f')
+
+    def __len__(self) -> int:
+        """Number of recorded rows."""
+        return len(self._timestamps)
+
+    def append(self, timestamp: float, percentage: Optional[float] = None,
+               energy_full: Optional[float] = None) -> None:
+        """Record one row.
+
+        Args:
+            timestamp: Sample time (epoch seconds)
+            percentage: Charge in percent
+            energy_full: Full-charge energy in Wh
+        """
+        self._timestamps.append(timestamp)
+        self._percentage.append(math.nan if percentage is None else percentage)
+        self._energy_full.append(math.nan if energy_full is None else energy_full)
+
+    def record(self, info: Any, timestamp: Optional[float] = None) -> None:
+        """Record a BatteryInfo (or snapshot).
+
+        Args:
+            info: Battery information with percentage and energy_full
+            timestamp: Sample time (defaults to now)
+        """
+        self.append(time.time() if timestamp is None else timestamp,
+                    info.percentage, info.energy_full)
+
+    @classmethod
+    def from_arrays(cls, timestamps: Iterable[float], percentage: Iterable[float],
+                    energy_full: Iterable[float]) -> 'WearSamples':
+        """Build from equally long columns (NumPy arrays are copied in bulk).
+
+        Args:
+            timestamps: Sample times (epoch seconds)
+            percentage: Charge per sample (NaN where missing)
+            energy_full: Full-charge energy per sample (NaN where missing)
+
+        Raises:
+            ValueError: If the columns differ in length
+        """
+        samples = cls()
+        for column, values in ((samples._timestamps, timestamps),
+                               (samples._percentage, percentage),
+                               (samples._energy_full, energy_full)):
+            if np is not None and isinstance(values, np.ndarray):
+                column.frombytes(values.astype(column.typecode).tobytes())
+            else:
+                column.extend(values)
+        if not len(samples._timestamps) == len(samples._percentage) == len(samples._energy_full):
+            raise ValueError("Sample columns differ in length")
+        return samples
+
+    @classmethod
+    def from_history(cls, history: Any) -> 'WearSamples':
+        """Build from a SnapshotHistory's columns.
+
+        Args:
+            history: SnapshotHistory holding the samples
+        """
+        samples = cls()
+        samples._timestamps = history.column('timestamp')
+        samples._percentage = array('f', (math.nan if value < 0 else value
+                                          for value in history.column('percentage')))
+        samples._energy_full = array('f', history.column('energy_full'))
+        return samples
+
+    @classmethod
+    def from_sample_log(cls, sample_log: Any, device: str,
+                        since: Optional[int] = None) -> 'WearSamples':
+        """Build from a SampleLog's charge and energy_full samples.
+
+        Args:
+            sample_log: SampleLog to read
+            device: Battery name
+            since: Only samples at or after this epoch time
+        """
+        samples = cls()
+        for sample in sample_log.iter_samples(device, since=since):
+            if sample.kind == "charge":
+                samples.append(sample.timestamp, percentage=sample.value)
+            elif sample.kind == "energy_full":
+                samples.append(sample.timestamp, energy_full=sample.value)
+        return samples
+
+    def arrays(self) -> Tuple[Any, Any, Any]:
+        """Return (timestamps, percentage, energy_full) as NumPy arrays in time order.
+
+        The arrays share memory with the columns unless rows had to be sorted.
+
+        Raises:
+            RuntimeError: If NumPy is not installed
+        """
+        _require_numpy()
+        timestamps = np.frombuffer(self._timestamps, dtype=np.float64)
+        percentage = np.frombuffer(self._percentage, dtype=np.float32)
+        energy_full = np.frombuffer(self._energy_full, dtype=np.float32)
+        if timestamps.size > 1 and np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            return timestamps[order], percentage[order], energy_full[order]
+        return timestamps, percentage, energy_full
+
+
+def _require_numpy() -> None:
+    """Raise RuntimeError when NumPy is missing."""
+    if np is None:
+        raise RuntimeError("Wear analytics requires numpy (pip install numpy)")
+
+
+def turning_points(series: Any) -> Any:
+    """Reduce a series to its reversals (NaN and plateaus removed).
+
+    Args:
+        series: 1-D sequence of values
+
+    Returns:
+        NumPy array of the first value, every local extremum and the last value
+    """
+    _require_numpy()
+    values = np.asarray(series, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    if values.size < 2:
+        return values
+    values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    if values.size < 3:
+        return values
+    slope = np.sign(np.diff(values))
+    turns = np.flatnonzero(slope[1:] != slope[:-1]) + 1
+    return values[np.concatenate(([0], turns, [values.size - 1]))]
+
+
+def rainflow(series: Any) -> Tuple[Any, Any]:
+    """Count cycles with the four-point rainflow method.
+
+    A reversal pair (B, C) inside A-B-C-D closes a full cycle when
+    |B - C| <= |A - B| and |B - C| <= |C - D|. Every pass removes all
+    closed pairs at once (alternate ones where candidates overlap); what
+    remains is the residue, counted as half cycles as in ASTM E1049.
+
+    Args:
+        series: 1-D sequence (e.g. charge percentage)
+
+    Returns:
+        (ranges, counts): cycle ranges and their counts (1.0 or 0.5)
+    """
+    points = turning_points(series)
+    full = []
+    while points.size >= 4:
+        swings = np.abs(np.diff(points))
+        inner = swings[1:-1]
+        closed = (inner <= swings[:-2]) & (inner <= swings[2:])
+        if not closed.any():
+            break
+        # Within a run of consecutive candidates the pairs overlap: keep every other
+        index = np.arange(closed.size)
+        run_start = np.maximum.accumulate(np.where(
+            closed & ~np.concatenate(([False], closed[:-1])), index, 0))
+        selected = np.flatnonzero(closed & ((index - run_start) % 2 == 0))
+        full.append(inner[selected])
+        keep = np.ones(points.size, dtype=bool)
+        keep[selected + 1] = False
+        keep[selected + 2] = False
+        points = points[keep]
+        if selected.size < MIN_PASS_REMOVAL * points.size:
+            # Deeply nested remainder: one sequential pass beats many vector passes
+            ranges, points = _rainflow_sequential(points)
+            full.append(ranges)
+            break
+
+    residue = np.abs(np.diff(points))
+    full_ranges = np.concatenate(full) if full else np.empty(0)
+    ranges = np.concatenate((full_ranges, residue))
+    counts = np.concatenate((np.ones(full_ranges.size), np.full(residue.size, 0.5)))
+    return ranges, counts
+
+
+def _rainflow_sequential(points: Any) -> Tuple[Any, Any]:
+    """Four-point rainflow with a stack.
+
+    Returns:
+        (full cycle ranges, residue reversals)
+    """
+    stack = []
+    full = []
+    for value in points.tolist():
+        stack.append(value)
+        while len(stack) >= 4:
+            swing = abs(stack[-3] - stack[-2])
+            if swing <= abs(stack[-4] - stack[-3]) and swing <= abs(stack[-2] - stack[-1]):
+                full.append(swing)
+                del stack[-3:-1]
+            else:
+                break
+    return np.asarray(full, dtype=np.float64), np.asarray(stack, dtype=np.float64)
+
+
+def equivalent_full_cycles(ranges: Any, counts: Any) -> float:
+    """Cycle depth summed over all cycles, in full (100-point) cycles."""
+    _require_numpy()
+    return float(np.dot(ranges, counts) / 100.0)
+
+
+def dod_histogram(ranges: Any, counts: Any, bins: Iterable[int] = DOD_BINS) -> Tuple[float, ...]:
+    """Cycle counts per depth-of-discharge interval."""
+    _require_numpy()
+    histogram, _ = np.histogram(ranges, bins=list(bins), weights=counts)
+    return tuple(float(value) for value in histogram)
+
+
+def capacity_fade(timestamps: Any, energy_full: Any,
+                  energy_full_design: Optional[float] = None) -> Optional[FadeTrend]:
+    """Fit a linear trend over daily mean full-charge energy.
+
+    Args:
+        timestamps: Sample times (epoch seconds, sorted)
+        energy_full: Full-charge energy per sample (NaN where missing)
+        energy_full_design: Design energy in Wh (fade is relative to it)
+
+    Returns:
+        FadeTrend, or None with fewer than two days of energy samples
+    """
+    _require_numpy()
+    valid = ~np.isnan(energy_full)
+    times = np.asarray(timestamps)[valid]
+    energy = np.asarray(energy_full, dtype=np.float64)[valid]
+    if times.size == 0:
+        return None
+    days = (times // 86400).astype(np.int64)
+    # Times are sorted, so each day is one contiguous run
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(days)) + 1))
+    if starts.size < 2:
+        return None
+    unique_days = days[starts]
+    per_day = np.diff(np.append(starts, days.size))
+    daily_mean = np.add.reduceat(energy, starts) / per_day
+    slope, intercept = np.polyfit(unique_days.astype(np.float64), daily_mean, 1)
+
+    last_day = float(times[-1]) / 86400
+    fitted = slope * last_day + intercept
+    reference = energy_full_design or (slope * unique_days[0] + intercept)
+    days_to_80 = None
+    if energy_full_design and slope < 0:
+        days_to_80 = max(0.0, (0.8 * energy_full_design - fitted) / slope)
+    return FadeTrend(float(slope), float(fitted), float(-slope * 365 / reference * 100),
+                     None if days_to_80 is None else float(days_to_80))
+
+
+def time_at_high_soc(timestamps: Any, percentage: Any, levels: Iterable[int] = HIGH_SOC_LEVELS,
+                     max_gap: float = MAX_SAMPLE_GAP) -> Tuple[Dict[int, float], float]:
+    """Seconds spent at or above each charge level.
+
+    Each interval between consecutive charge samples is attributed to the
+    earlier sample's level; intervals longer than ``max_gap`` are skipped.
+
+    Args:
+        timestamps: Sample times (epoch seconds, sorted)
+        percentage: Charge per sample (NaN where missing)
+        levels: Charge levels to report
+        max_gap: Longest interval counted (seconds)
+
+    Returns:
+        ({level: seconds}, observed seconds)
+    """
+    _require_numpy()
+    valid = ~np.isnan(percentage)
+    times = np.asarray(timestamps)[valid]
+    charge = np.asarray(percentage)[valid]
+    if times.size < 2:
+        return {level: 0.0 for level in levels}, 0.0
+    intervals = np.diff(times)
+    intervals[intervals > max_gap] = 0.0
+    start_charge = charge[:-1]
+    return ({level: float(intervals[start_charge >= level].sum()) for level in levels},
+            float(intervals.sum()))
+
+
+def analyze(samples: WearSamples, energy_full_design: Optional[float] = None) -> WearReport:
+    """Compute all wear figures.
+
+    Args:
+        samples: Recorded samples
+        energy_full_design: Design energy in Wh (for the fade figures)
+
+    Returns:
+        WearReport
+
+    Raises:
+        RuntimeError: If NumPy is not installed
+    """
+    timestamps, percentage, energy_full = samples.arrays()
+    span_days = float(timestamps[-1] - timestamps[0]) / 86400 if timestamps.size > 1 else 0.0
+
+    ranges, counts = rainflow(percentage)
+    significant = ranges >= MIN_CYCLE_RANGE
+    ranges, counts = ranges[significant], counts[significant]
+    cycles = equivalent_full_cycles(ranges, counts)
+    high_soc, observed = time_at_high_soc(timestamps, percentage)
+    return WearReport(
+        sample_count=int(timestamps.size),
+        span_days=span_days,
+        equivalent_full_cycles=cycles,
+        cycles_per_day=cycles / span_days if span_days >= 1 else None,
+        dod_histogram=dod_histogram(ranges, counts),
+        fade=capacity_fade(timestamps, energy_full, energy_full_design),
+        high_soc_fraction={level: seconds / observed if observed else 0.0
+                           for level, seconds in high_soc.items()},
+        observed_seconds=observed,
+    )
+
+
+def main(argv: Optional[list] = None) -> int:
+    """Print a wear report for a battery's sample log."""
+    from src.core.sample_log import SampleLog
+
+    argv = sys.argv[1:] if argv is None else argv
+    device = argv[0] if argv else 'BAT0'
+    if not is_available():
+        print("Wear analytics requires numpy", file=sys.stderr)
+        return 1
+
+    samples = WearSamples.from_sample_log(SampleLog(), device)
+    if len(samples) < 2:
+        print(f"Not enough samples recorded for {device}", file=sys.stderr)
+        return 1
+    started = time.perf_counter()
+    report = analyze(samples)
+    elapsed = time.perf_counter() - started
+
+    result = report._asdict()
+    result['fade'] = report.fade._asdict() if report.fade else None
+    print(json.dumps(result, indent=2))
+    print(f"Analyzed {len(samples)} samples in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
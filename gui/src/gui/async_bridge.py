@@ -0,0 +1,120 @@
+"""Bridge running an asyncio event loop alongside the Qt event loop."""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional, Set
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class AsyncBridge(QObject):
+    """Runs coroutines on a background asyncio loop and reports back in Qt.
+
+    Completion callbacks are delivered through a queued signal, so they run
+    on the Qt main thread and may touch widgets.
+    """
+
+    # callback, result (CliResult or exception)
+    _finished = pyqtSignal(object, object)
+
+    # Seconds cancelled tasks get to run their cleanup before the loop stops
+    SHUTDOWN_GRACE = 0.5
+
+    def __init__(self, parent=None):
+        """Initialize and start the background event loop.
+
+        Args:
+            parent: Parent QObject
+        """
+        super().__init__(parent)
+        self._loop = asyncio.new_event_loop()
+        self._futures: Set[Future] = set()
+        self._lock = threading.Lock()
+        self._finished.connect(self._deliver)
+        self._thread = threading.Thread(target=self._run_loop, name="AsyncBridge", daemon=True)
+        self._thread.start()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The background event loop."""
+        return self._loop
+
+    def submit(self, coroutine: Coroutine, callback: Optional[Callable[[Any], None]] = None) -> Future:
+        """Schedule a coroutine on the background loop.
+
+        Args:
+            coroutine: Coroutine to run
+            callback: Called on the Qt thread with the result (or the
+                exception raised); not called if the task is cancelled
+
+        Returns:
+            concurrent.futures.Future of the coroutine (cancel() cancels the task)
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(lambda done: self._on_done(done, callback))
+        return future
+
+    def call_soon(self, func: Callable[[], None]) -> None:
+        """Run a call on the Qt thread (safe from any thread).
+
+        Args:
+            func: Callable taking no arguments
+        """
+        self._finished.emit(lambda _result: func(), None)
+
+    def pending_count(self) -> int:
+        """Number of coroutines still running."""
+        with self._lock:
+            return len(self._futures)
+
+    def shutdown(self) -> None:
+        """Cancel all running coroutines and stop the loop without waiting.
+
+        Cancelled CLI calls kill their process groups from the loop thread;
+        the caller does not wait for them.
+        """
+        with self._lock:
+            self._futures.clear()
+        if self._loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_and_stop(), self._loop)
+        except RuntimeError:
+            pass  # loop already closed
+
+    async def _cancel_and_stop(self) -> None:
+        """Cancel every task, give them a moment to kill their children, stop."""
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.wait(tasks, timeout=self.SHUTDOWN_GRACE)
+        self._loop.stop()
+
+    def _on_done(self, future: Future, callback: Optional[Callable[[Any], None]]) -> None:
+        """Forward a finished future to the Qt thread."""
+        with self._lock:
+            self._futures.discard(future)
+        if future.cancelled() or callback is None:
+            return
+        error = future.exception()
+        self._finished.emit(callback, error if error is not None else future.result())
+
+    def _deliver(self, callback: Callable[[Any], None], result: Any) -> None:
+        """Invoke a completion callback on the Qt thread."""
+        try:
+            callback(result)
+        except Exception as e:
+            print(f"Error in async callback: {e}")
+
+    def _run_loop(self) -> None:
+        """Thread target: run the event loop until shutdown."""
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
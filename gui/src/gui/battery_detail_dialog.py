@@ -1,18 +1,27 @@
 """Battery detail information dialog."""
 
+import time
+
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QFrame, 
-    QGridLayout, QPushButton, QGraphicsDropShadowEffect, QTableWidget, QTableWidgetItem
+    QGridLayout, QPushButton, QGraphicsDropShadowEffect, QTableWidget, QTableWidgetItem,
+    QTabWidget, QWidget
 )
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont, QColor, QPainter, QIcon, QPixmap
 
 from src.core.battery_manager import BatteryManager, BatteryInfo
+from src.core import memory_stats
+from src.core.energy_ledger import format_duration
 
 
 class BatteryDetailDialog(QDialog):
     """Dialog showing detailed battery information."""
     
+    ENERGY_COLUMNS = ["Day", "In", "Out", "Charging", "On Battery"]
+    # Days listed in the Energy tab, followed by 7 and 30 day totals
+    ENERGY_DAYS = 14
+    
     def __init__(self, battery_manager: BatteryManager, parent=None):
         """Initialize battery detail dialog.
         
@@ -138,6 +147,20 @@ class BatteryDetailDialog(QDialog):
                     padding: 8px;
                     font-weight: bold;
                 }
+                QTabWidget::pane {
+                    border: none;
+                }
+                QTabBar::tab {
+                    background-color: #e9ecef;
+                    color: #212529;
+                    border-radius: 6px;
+                    padding: 6px 16px;
+                    margin-right: 4px;
+                }
+                QTabBar::tab:selected {
+                    background-color: #007aff;
+                    color: #ffffff;
+                }
             """)
         else:
             # Dark theme
@@ -200,6 +223,20 @@ class BatteryDetailDialog(QDialog):
                     padding: 8px;
                     font-weight: bold;
                 }
+                QTabWidget::pane {
+                    border: none;
+                }
+                QTabBar::tab {
+                    background-color: #2c2c2e;
+                    color: #ffffff;
+                    border-radius: 6px;
+                    padding: 6px 16px;
+                    margin-right: 4px;
+                }
+                QTabBar::tab:selected {
+                    background-color: #007aff;
+                    color: #ffffff;
+                }
             """)
         
         # Force complete style refresh - multiple methods to ensure it works
@@ -244,7 +281,6 @@ class BatteryDetailDialog(QDialog):
         # Use QTableWidget with sectioned layout
         self.info_table = QTableWidget()
         self.info_table.setColumnCount(2)
-        self.info_table.setRowCount(18)  # More rows for section headers
         self.info_table.setHorizontalHeaderLabels(["Property", "Value"])
         
         # Define sections with headers and data
@@ -271,12 +307,28 @@ class BatteryDetailDialog(QDialog):
             ("Charge Limit", "end_threshold", "data"),
             ("", None, "spacer"),
             
+            # History Section (sample log, bootstrapped from UPower history)
+            ("HISTORY", None, "header"),
+            ("Recorded Since", "history_since", "data"),
+            ("Samples", "history_samples", "data"),
+            ("Avg Discharge (7 Days)", "history_discharge", "data"),
+            ("Charge Range (7 Days)", "history_range", "data"),
+            ("", None, "spacer"),
+            
+            # Diagnostics Section (this process)
+            ("DIAGNOSTICS", None, "header"),
+            ("Memory (RSS)", "memory_rss", "data"),
+            ("Python Heap", "memory_heap", "data"),
+            ("", None, "spacer"),
+            
             # Hardware Section
             ("HARDWARE INFORMATION", None, "header"),
             ("Manufacturer", "manufacturer", "data"),
             ("Model", "model", "data")
         ]
         
+        self.info_table.setRowCount(len(self.table_sections))
+        
         # Populate table with sectioned data
         for row, (label, key, row_type) in enumerate(self.table_sections):
             if row_type == "header":
@@ -346,7 +398,11 @@ class BatteryDetailDialog(QDialog):
         # Remove focus outline
         self.info_table.setFocusPolicy(Qt.NoFocus)
         
-        main_layout.addWidget(self.info_table)
+        # Details and energy ledger tabs
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.info_table, "Details")
+        self.tabs.addTab(self._create_energy_tab(), "Energy")
+        main_layout.addWidget(self.tabs)
         
         # Button layout
         button_layout = QHBoxLayout()
@@ -366,6 +422,31 @@ class BatteryDetailDialog(QDialog):
         
         self.setLayout(main_layout)
     
+    def _create_energy_tab(self) -> QWidget:
+        """Create the Energy tab: daily totals from the energy ledger and the last AC session."""
+        tab = QWidget()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 8, 0, 0)
+        layout.setSpacing(8)
+        
+        self.energy_table = QTableWidget()
+        self.energy_table.setColumnCount(len(self.ENERGY_COLUMNS))
+        self.energy_table.setHorizontalHeaderLabels(self.ENERGY_COLUMNS)
+        for column, width in enumerate((110, 90, 90, 110, 110)):
+            self.energy_table.setColumnWidth(column, width)
+        self.energy_table.verticalHeader().setVisible(False)
+        self.energy_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.energy_table.setSelectionMode(QTableWidget.NoSelection)
+        self.energy_table.setFocusPolicy(Qt.NoFocus)
+        layout.addWidget(self.energy_table)
+        
+        self.session_label = QLabel("Last AC session: No data")
+        self.session_label.setWordWrap(True)
+        layout.addWidget(self.session_label)
+        
+        tab.setLayout(layout)
+        return tab
+    
     def _create_section_header(self, title: str) -> QLabel:
         """Create a styled section header."""
         header = QLabel(title)
@@ -526,6 +607,8 @@ class BatteryDetailDialog(QDialog):
             "model": str(battery_info.model) if battery_info.model else "Unknown"
         }
         
+        self._update_battery_rows()
+        
         # Update table items using new sectioned structure
         for row, (label, key, row_type) in enumerate(self.table_sections):
             if row_type == "data" and key and key in data_values:
@@ -545,7 +628,128 @@ class BatteryDetailDialog(QDialog):
                         value_item.setForeground(QColor("#007aff"))  # Blue for charging
                     else:
                         value_item.setForeground(QColor("#d1d1d6"))  # Light gray for data
+        
+        self.update_history()
+        self.update_energy()
+        self.update_diagnostics()
     
+    def update_energy(self):
+        """Update the Energy tab from the primary battery's energy ledger rollups."""
+        device = self.battery_manager.primary_battery
+        ledger = self.battery_manager.energy_ledgers.get(device) if device else None
+        if ledger is None:
+            return
+        
+        rows = [(row.day, row) for row in ledger.daily(self.ENERGY_DAYS)]
+        rows += [("7 days", ledger.totals(7)), ("30 days", ledger.totals(30))]
+        self.energy_table.setRowCount(len(rows))
+        for row, (label, totals) in enumerate(rows):
+            texts = (label, f"{totals.energy_in:.1f}Wh", f"{totals.energy_out:.1f}Wh",
+                     format_duration(totals.charging_seconds),
+                     format_duration(totals.discharging_seconds))
+            for column, text in enumerate(texts):
+                item = self.energy_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    item.setFlags(Qt.ItemIsEnabled)
+                    self.energy_table.setItem(row, column, item)
+                item.setText(text)
+                item.setFont(QFont("SF Pro", 10, QFont.Bold if label.endswith("days") else QFont.Normal))
+            self.energy_table.setRowHeight(row, 28)
+        
+        sessions = ledger.sessions(1)
+        if sessions:
+            session = sessions[0]
+            start = time.strftime("%m-%d %H:%M", time.localtime(session.start))
+            end = time.strftime("%H:%M", time.localtime(session.end)) if session.end else "now"
+            levels = (f", {session.start_percentage}% - {session.end_percentage}%"
+                      if session.start_percentage is not None and session.end_percentage is not None else "")
+            self.session_label.setText(f"Last AC session: {start} - {end}, "
+                                       f"+{session.energy_in:.1f}Wh{levels}")
+    
+    def update_diagnostics(self):
+        """Update the DIAGNOSTICS rows with this process's memory figures."""
+        stats = memory_stats.collect()
+        diagnostic_values = {
+            "memory_rss": stats.rss_text(),
+            "memory_heap": stats.heap_text()
+        }
+        
+        for row, (label, key, row_type) in enumerate(self.table_sections):
+            if row_type == "data" and key in diagnostic_values:
+                value_item = self.info_table.item(row, 1)
+                if value_item:
+                    value_item.setText(diagnostic_values[key])
+                    value_item.setForeground(QColor("#d1d1d6"))
+    
+    def update_history(self):
+        """Update the HISTORY rows from the primary battery's sample log."""
+        sample_log = self.battery_manager.sample_log
+        device = self.battery_manager.primary_battery
+        if sample_log is None or device is None:
+            return
+        
+        summary = sample_log.summary(device)
+        history_values = {
+            "history_since": time.strftime("%Y-%m-%d", time.localtime(summary.first_timestamp))
+            if summary.first_timestamp else "No data",
+            "history_samples": f"{summary.sample_count:,}",
+            "history_discharge": f"{summary.discharge_rate:.1f}W"
+            if summary.discharge_rate is not None else "Unknown",
+            "history_range": f"{summary.charge_min:.0f}% - {summary.charge_max:.0f}%"
+            if summary.charge_min is not None else "Unknown"
+        }
+        
+        for row, (label, key, row_type) in enumerate(self.table_sections):
+            if row_type == "data" and key in history_values:
+                value_item = self.info_table.item(row, 1)
+                if value_item:
+                    value_item.setText(history_values[key])
+                    value_item.setForeground(QColor("#d1d1d6"))
+    
+    
+    def _update_battery_rows(self):
+        """Append a BATTERIES section with one row per battery when there are several."""
+        batteries = self.battery_manager.batteries
+        base_rows = len(self.table_sections)
+        if len(batteries) < 2:
+            if self.info_table.rowCount() > base_rows:
+                self.info_table.setRowCount(base_rows)
+            return
+        
+        self.info_table.setRowCount(base_rows + 2 + len(batteries))
+        
+        spacer_row = base_rows
+        header_row = base_rows + 1
+        if self.info_table.item(header_row, 0) is None or self.info_table.item(header_row, 0).text() != "BATTERIES":
+            for column in range(2):
+                spacer_item = QTableWidgetItem("")
+                spacer_item.setFlags(Qt.ItemIsEnabled)
+                spacer_item.setBackground(QColor("#1c1c1e"))
+                self.info_table.setItem(spacer_row, column, spacer_item)
+                header_item = QTableWidgetItem("BATTERIES" if column == 0 else "")
+                header_item.setFlags(Qt.ItemIsEnabled)
+                header_item.setFont(QFont("SF Pro", 11, QFont.Bold))
+                header_item.setForeground(QColor("#007aff"))
+                header_item.setBackground(QColor("#2c2c2e"))
+                self.info_table.setItem(header_row, column, header_item)
+            self.info_table.setRowHeight(spacer_row, 12)
+            self.info_table.setRowHeight(header_row, 35)
+        
+        for offset, (name, info) in enumerate(batteries.items()):
+            row = header_row + 1 + offset
+            percent = f"{info.percentage}%" if info.percentage is not None else "Unknown"
+            state = self._translate_state_english(info.state) if info.state else "Unknown"
+            for column, text in enumerate((name, f"{percent} · {state} · Limit {info.end_threshold}%")):
+                item = self.info_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    item.setFlags(Qt.ItemIsEnabled)
+                    item.setFont(QFont("SF Pro", 10))
+                    item.setForeground(QColor("#ffffff" if column == 0 else "#d1d1d6"))
+                    self.info_table.setItem(row, column, item)
+                item.setText(text)
+            self.info_table.setRowHeight(row, 32)
     
     @staticmethod
     def _translate_state_english(state: str) -> str:
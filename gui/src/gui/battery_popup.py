@@ -16,6 +16,11 @@ class BatteryPopup(QWidget):
     # Signals
     closed = pyqtSignal()
     
+    # Popup size; each additional battery adds one row
+    POPUP_WIDTH = 260
+    POPUP_HEIGHT = 145
+    BATTERY_ROW_HEIGHT = 18
+    
     def __init__(self, battery_manager: BatteryManager, parent=None):
         """Initialize battery popup.
         
@@ -29,6 +34,7 @@ class BatteryPopup(QWidget):
         self.min_threshold = 20
         self.max_threshold = 100
         self.current_threshold = 100
+        self.extra_battery_labels = {}  # device name -> QLabel
         
         # Initialize with current battery info if available
         if battery_manager.current_info:
@@ -65,7 +71,7 @@ class BatteryPopup(QWidget):
         QApplication.instance().installEventFilter(self)
         
         # Set compact size - slightly wider for better proportions
-        self.setFixedSize(260, 145)
+        self.setFixedSize(self.POPUP_WIDTH, self.POPUP_HEIGHT)
         
         # Don't apply default theme here - will be set by SystemTrayApp
         # self.apply_theme('dark')  # Will be set by parent
@@ -263,6 +269,11 @@ class BatteryPopup(QWidget):
         
         main_layout.addLayout(status_layout)
         
+        # Additional batteries (one compact row each, filled on update)
+        self.extra_battery_layout = QVBoxLayout()
+        self.extra_battery_layout.setSpacing(2)
+        main_layout.addLayout(self.extra_battery_layout)
+        
         # Bottom section: Charge limit
         limit_layout = QVBoxLayout()
         limit_layout.setSpacing(6)
@@ -478,6 +489,41 @@ class BatteryPopup(QWidget):
         if battery_info.end_threshold != self.threshold_slider.value():
             self.threshold_slider.setValue(battery_info.end_threshold)
             self.threshold_label.setText(f"{battery_info.end_threshold}%")
+        
+        self._update_extra_batteries()
+    
+    def _update_extra_batteries(self):
+        """Show one row per additional battery (dual-battery laptops, docks)."""
+        primary = self.battery_manager.primary_battery
+        extras = {name: info for name, info in self.battery_manager.batteries.items()
+                  if name != primary}
+        
+        # Drop rows of batteries that disappeared
+        for name in list(self.extra_battery_labels):
+            if name not in extras:
+                label = self.extra_battery_labels.pop(name)
+                self.extra_battery_layout.removeWidget(label)
+                label.deleteLater()
+        
+        for name, info in extras.items():
+            label = self.extra_battery_labels.get(name)
+            if label is None:
+                label = QLabel()
+                label.setObjectName("battery_state_label")
+                font = QFont()
+                font.setPointSize(9)
+                label.setFont(font)
+                self.extra_battery_layout.addWidget(label)
+                self.extra_battery_labels[name] = label
+            percent = f"{info.percentage}%" if info.percentage is not None else "?%"
+            state = self._translate_state_english(info.state) if info.state else "Unknown"
+            label.setText(f"{name}  {percent} · {state} · Limit {info.end_threshold}%")
+        
+        height = self.POPUP_HEIGHT + self.BATTERY_ROW_HEIGHT * len(extras)
+        if height != self.height():
+            self.setFixedSize(self.POPUP_WIDTH, height)
+            if self.isVisible():
+                self._create_rounded_mask()
     
     def _update_progress_bar_color(self, battery_info: BatteryInfo):
         """Update progress bar color based on battery state and level."""
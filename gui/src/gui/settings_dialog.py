@@ -202,6 +202,10 @@ class SettingsDialog(QDialog):
         general_layout.addWidget(refresh_label, 3, 0)
         general_layout.addWidget(self.refresh_interval_spinbox, 3, 1)
         
+        # Memory saver checkbox
+        self.memory_saver_checkbox = QCheckBox("Release hidden windows when idle (memory saver)")
+        general_layout.addWidget(self.memory_saver_checkbox, 4, 0, 1, 2)
+        
         general_group.setLayout(general_layout)
         main_layout.addWidget(general_group)
         
@@ -249,6 +253,7 @@ class SettingsDialog(QDialog):
         theme = self.config_manager.get('theme', 'dark')
         refresh_interval = self.config_manager.get('refresh_interval', 30)
         show_notifications = self.config_manager.get('show_notifications', True)
+        memory_saver = self.config_manager.get('memory_saver', False)
         
         # Update UI elements
         self.auto_start_checkbox.setChecked(auto_start)
@@ -256,6 +261,7 @@ class SettingsDialog(QDialog):
         self.theme_combo.setCurrentText(theme.title())
         self.refresh_interval_spinbox.setValue(refresh_interval)
         self.notifications_checkbox.setChecked(show_notifications)
+        self.memory_saver_checkbox.setChecked(memory_saver)
     
     def save_settings(self):
         """Save settings from UI to config manager."""
@@ -265,6 +271,7 @@ class SettingsDialog(QDialog):
         theme = self.theme_combo.currentText().lower()
         refresh_interval = self.refresh_interval_spinbox.value()
         show_notifications = self.notifications_checkbox.isChecked()
+        memory_saver = self.memory_saver_checkbox.isChecked()
         
         # Validate threshold
         if not 20 <= default_threshold <= 100:
@@ -276,6 +283,7 @@ class SettingsDialog(QDialog):
         self.config_manager.set('theme', theme)
         self.config_manager.set('refresh_interval', refresh_interval)
         self.config_manager.set('show_notifications', show_notifications)
+        self.config_manager.set('memory_saver', memory_saver)
         
         # Persist to file
         self.config_manager.save()
@@ -313,6 +321,7 @@ class SettingsDialog(QDialog):
         theme = self.theme_combo.currentText().lower()
         refresh_interval = self.refresh_interval_spinbox.value()
         show_notifications = self.notifications_checkbox.isChecked()
+        memory_saver = self.memory_saver_checkbox.isChecked()
         
         # Validate threshold
         if not 20 <= default_threshold <= 100:
@@ -324,6 +333,7 @@ class SettingsDialog(QDialog):
         self.config_manager.set('theme', theme)
         self.config_manager.set('refresh_interval', refresh_interval)
         self.config_manager.set('show_notifications', show_notifications)
+        self.config_manager.set('memory_saver', memory_saver)
         
         # Persist to file
         self.config_manager.save()
@@ -0,0 +1,174 @@
+"""logind suspend/resume watcher.
+
+Listens for org.freedesktop.login1.Manager.PrepareForSleep on the system
+bus and holds a logind "delay" sleep inhibitor, so the suspend waits (up
+to logind's InhibitDelayMaxSec) until the suspending handlers have run.
+The inhibitor is released right after them and taken again on resume.
+For testing without suspending the machine, set
+A14_LOGIND_BUS=session and run the stand-in, which claims the logind name
+on the session bus and emits the signal:
+
+    python3 -m src.gui.sleep_watcher cycle [seconds]
+"""
+
+import os
+import sys
+from typing import Optional
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from PyQt5.QtDBus import QDBus, QDBusConnection, QDBusMessage, QDBusUnixFileDescriptor
+
+
+LOGIND_SERVICE = "org.freedesktop.login1"
+LOGIND_PATH = "/org/freedesktop/login1"
+LOGIND_INTERFACE = "org.freedesktop.login1.Manager"
+
+INHIBIT_WHO = "A14 Charge Keeper"
+INHIBIT_WHY = "Pause battery refreshes before suspend"
+INHIBIT_TIMEOUT_MS = 2000
+
+
+def logind_bus() -> QDBusConnection:
+    """Bus carrying logind signals (session bus when A14_LOGIND_BUS=session)."""
+    if os.environ.get('A14_LOGIND_BUS') == 'session':
+        return QDBusConnection.sessionBus()
+    return QDBusConnection.systemBus()
+
+
+class SleepWatcher(QObject):
+    """Emits suspending/resumed when logind prepares for sleep or wakes up."""
+
+    # Signals
+    suspending = pyqtSignal()
+    resumed = pyqtSignal()
+
+    def __init__(self, parent=None):
+        """Initialize sleep watcher.
+
+        Args:
+            parent: Parent QObject
+        """
+        super().__init__(parent)
+        self.is_connected = False
+        self._inhibitor: Optional[int] = None  # Delay inhibitor file descriptor
+
+    @property
+    def inhibited(self) -> bool:
+        """Whether the delay inhibitor is held."""
+        return self._inhibitor is not None
+
+    def start(self) -> bool:
+        """Subscribe to PrepareForSleep.
+
+        Returns:
+            True if subscribed; False without a reachable bus (the caller
+            then relies on its refresh timer alone)
+        """
+        bus = logind_bus()
+        if not bus.isConnected():
+            print("Sleep watcher unavailable: D-Bus not connected")
+            return False
+        self.is_connected = bus.connect(LOGIND_SERVICE, LOGIND_PATH, LOGIND_INTERFACE,
+                                        "PrepareForSleep", "b", self._on_prepare_for_sleep)
+        if not self.is_connected:
+            print(f"Sleep watcher unavailable: {bus.lastError().message()}")
+            return False
+        self._take_inhibitor()
+        return True
+
+    def stop(self):
+        """Unsubscribe from PrepareForSleep and release the inhibitor."""
+        self._release_inhibitor()
+        if self.is_connected:
+            logind_bus().disconnect(LOGIND_SERVICE, LOGIND_PATH, LOGIND_INTERFACE,
+                                    "PrepareForSleep", "b", self._on_prepare_for_sleep)
+            self.is_connected = False
+
+    @pyqtSlot(bool)
+    def _on_prepare_for_sleep(self, sleeping: bool):
+        """Translate the logind signal.
+
+        Receivers in this thread have run when emit() returns, so the
+        inhibitor is released only after the suspending handlers.
+        """
+        if sleeping:
+            self.suspending.emit()
+            self._release_inhibitor()
+        else:
+            self._take_inhibitor()
+            self.resumed.emit()
+
+    def _take_inhibitor(self):
+        """Take the delay inhibitor unless it is already held."""
+        if self._inhibitor is None:
+            self._inhibitor = self._inhibit()
+
+    def _release_inhibitor(self):
+        """Close the inhibitor descriptor, letting a pending suspend proceed."""
+        if self._inhibitor is not None:
+            os.close(self._inhibitor)
+            self._inhibitor = None
+
+    def _inhibit(self) -> Optional[int]:
+        """Ask logind for a delay sleep inhibitor.
+
+        Returns:
+            File descriptor holding the inhibitor, or None if logind refused
+            (suspend then simply does not wait for us)
+        """
+        message = QDBusMessage.createMethodCall(LOGIND_SERVICE, LOGIND_PATH, LOGIND_INTERFACE, "Inhibit")
+        message.setArguments(["sleep", INHIBIT_WHO, INHIBIT_WHY, "delay"])
+        reply = logind_bus().call(message, QDBus.Block, INHIBIT_TIMEOUT_MS)
+        arguments = reply.arguments() if reply.type() == QDBusMessage.ReplyMessage else []
+        descriptor = arguments[0] if arguments else None
+        if not isinstance(descriptor, QDBusUnixFileDescriptor) or not descriptor.isValid():
+            print(f"Sleep inhibitor unavailable: {reply.errorMessage() or 'no descriptor'}")
+            return None
+        # Own copy: the reply's descriptor closes when the reply is dropped
+        return os.dup(descriptor.fileDescriptor())
+
+
+def emit_prepare_for_sleep(bus: QDBusConnection, sleeping: bool) -> bool:
+    """Emit PrepareForSleep as logind would (stand-in for testing)."""
+    message = QDBusMessage.createSignal(LOGIND_PATH, LOGIND_INTERFACE, "PrepareForSleep")
+    message.setArguments([sleeping])
+    return bus.send(message)
+
+
+def main(argv=None) -> int:
+    """Session-bus logind stand-in: ``sleep``, ``resume`` or ``cycle [seconds]``."""
+    import time
+    from PyQt5.QtCore import QCoreApplication
+
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "cycle"
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    bus = QDBusConnection.sessionBus()
+    if not bus.isConnected():
+        print("Session bus not available", file=sys.stderr)
+        return 1
+    if not bus.registerService(LOGIND_SERVICE):
+        print(f"Cannot own {LOGIND_SERVICE} on the session bus", file=sys.stderr)
+        return 1
+
+    if command in ("sleep", "cycle"):
+        emit_prepare_for_sleep(bus, True)
+        print("PrepareForSleep(true)")
+    if command == "cycle":
+        app.processEvents()
+        time.sleep(float(argv[1]) if len(argv) > 1 else 2.0)
+    if command in ("resume", "cycle"):
+        emit_prepare_for_sleep(bus, False)
+        print("PrepareForSleep(false)")
+    if command not in ("sleep", "resume", "cycle"):
+        print(f"Unknown command: {command}", file=sys.stderr)
+        return 64
+
+    app.processEvents()
+    bus.unregisterService(LOGIND_SERVICE)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,14 @@
 """System tray application for battery management."""
 
 import sys
+import time
 from typing import Optional
 from PyQt5.QtWidgets import (
     QApplication, QSystemTrayIcon, QMenu, QAction, 
     QWidget, QVBoxLayout, QLabel, QSlider, QPushButton
 )
-from PyQt5.QtCore import QTimer, pyqtSignal, QThread
-from PyQt5.QtGui import QIcon, QPixmap, QPainter, QBrush, QPen, QColor
+from PyQt5.QtCore import QTimer, pyqtSignal, QThread, QSocketNotifier, QEvent
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QBrush, QPen, QColor, QPixmapCache
 
 from src.core.battery_manager import BatteryManager, BatteryInfo
 from src.gui.simple_battery_menu import SimpleBatteryMenu
@@ -15,8 +16,14 @@ from src.gui.battery_popup import BatteryPopup
 from src.gui.simple_context_menu import SimpleContextMenu
 from src.gui.battery_detail_dialog import BatteryDetailDialog
 from src.gui.settings_dialog import SettingsDialog
+from src.core import memory_stats
 from src.core.cli_interface import CliResult
 from src.core.config_manager import ConfigManager
+from src.core.async_battery_manager import AsyncBatteryManager
+from src.core.sample_log import SampleLog
+from src.core.shared_status import SharedStatusWriter
+from src.gui.async_bridge import AsyncBridge
+from src.gui.sleep_watcher import SleepWatcher
 
 
 class TrayIcon(QSystemTrayIcon):
@@ -172,8 +179,38 @@ class TrayIcon(QSystemTrayIcon):
         if battery_info.end_threshold != 100:
             tooltip_parts.append(f"제한: {battery_info.end_threshold}%")
         
+        estimate = self._estimate_text(battery_info)
+        if estimate:
+            tooltip_parts.append(estimate)
+        
         return " | ".join(tooltip_parts)
     
+    @staticmethod
+    def _estimate_text(battery_info: BatteryInfo) -> Optional[str]:
+        """Learned time to the charge limit (charging) or to empty (discharging).
+        
+        Args:
+            battery_info: Current battery information
+            
+        Returns:
+            Tooltip text, or None without an estimate
+        """
+        if battery_info.time_to_limit and battery_info.state == "charging":
+            target = "완충" if battery_info.end_threshold == 100 else f"{battery_info.end_threshold}%"
+            return f"{target}까지 {TrayIcon._format_duration(battery_info.time_to_limit)}"
+        if battery_info.time_to_empty_estimate:
+            return f"남은 시간 {TrayIcon._format_duration(battery_info.time_to_empty_estimate)}"
+        return None
+    
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        """Format seconds as Korean hours and minutes."""
+        minutes = max(1, int(round(seconds / 60)))
+        hours, minutes = divmod(minutes, 60)
+        if hours:
+            return f"{hours}시간 {minutes}분" if minutes else f"{hours}시간"
+        return f"{minutes}분"
+    
     @staticmethod
     def _translate_battery_state(state: str) -> str:
         """Translate battery state to Korean.
@@ -202,6 +239,12 @@ class TrayIcon(QSystemTrayIcon):
 class SystemTrayApp:
     """Main system tray application for battery management."""
     
+    # Windows memory saver mode destroys while hidden and idle (attribute
+    # names; settings first, it may be a child of the detail dialog)
+    RELEASABLE_WINDOWS = ('settings_dialog', 'detail_dialog', 'battery_popup', 'context_menu')
+    # Seconds between idle checks in memory saver mode
+    MEMORY_CHECK_INTERVAL = 30
+    
     def __init__(self, battery_manager: Optional[BatteryManager] = None, 
                  refresh_interval: int = 30000):
         """Initialize system tray application.
@@ -211,6 +254,18 @@ class SystemTrayApp:
             refresh_interval: Auto-refresh interval in milliseconds
         """
         self.battery_manager = battery_manager or BatteryManager()
+        
+        # Sample log for the detail dialog's history, bootstrapped from UPower
+        if self.battery_manager.sample_log is None:
+            self.battery_manager.sample_log = SampleLog()
+        
+        # Non-blocking refreshes: CLI runs on a background asyncio loop
+        self.async_manager = AsyncBatteryManager(self.battery_manager)
+        self.async_bridge = AsyncBridge()
+        self._refresh_future = None
+        # UPower deltas and uevent drift checks are applied on the Qt thread
+        self.battery_manager.dispatcher = self.async_bridge.call_soon
+        
         self.config_manager = ConfigManager()
         self.config_manager.load()
         
@@ -220,6 +275,41 @@ class SystemTrayApp:
         # Create tray icon
         self.tray_icon = TrayIcon()
         
+        # Popup (left-click) and context menu (right-click); memory saver
+        # mode may release them, they are rebuilt when next needed
+        self.battery_popup = None
+        self.context_menu = None
+        self._window_used = {}  # Attribute name -> time.monotonic() last shown
+        self._ensure_context_menu()
+        self._ensure_popup()
+        
+        # Create detail dialog for additional info
+        self.detail_dialog = None
+        
+        # Create settings dialog
+        self.settings_dialog = None
+        
+        # Connect tray activation to show popup
+        self.tray_icon.activated.connect(self._on_tray_activated)
+        
+        # Setup refresh timer (will be started in start() method)
+        self.refresh_timer = None
+        self.memory_timer = None
+        
+        # Shared status writer owned by the tray (see _start_publishing)
+        self._status_writer = None
+        
+        # Pause on suspend, refresh at once on resume
+        self.sleep_watcher = SleepWatcher()
+        self.sleep_watcher.suspending.connect(self._on_suspending)
+        self.sleep_watcher.resumed.connect(self._on_resumed)
+    
+    
+    def _ensure_context_menu(self) -> SimpleContextMenu:
+        """Get the context menu, creating it if needed."""
+        if self.context_menu is not None:
+            return self.context_menu
+        
         # Setup simple context menu for right-click
         self.context_menu = SimpleContextMenu(self.battery_manager)
         self.context_menu.settings_requested.connect(self._show_settings)
@@ -233,6 +323,13 @@ class SystemTrayApp:
         
         # Don't set context menu - we'll handle clicks manually
         # self.tray_icon.setContextMenu(self.context_menu)
+        self._window_used['context_menu'] = time.monotonic()
+        return self.context_menu
+    
+    def _ensure_popup(self) -> BatteryPopup:
+        """Get the battery popup, creating it if needed."""
+        if self.battery_popup is not None:
+            return self.battery_popup
         
         # Create popup for left-click
         self.battery_popup = BatteryPopup(self.battery_manager)
@@ -248,19 +345,8 @@ class SystemTrayApp:
         self.battery_popup.style().unpolish(self.battery_popup)
         self.battery_popup.style().polish(self.battery_popup)
         self.battery_popup.update()
-        
-        # Create detail dialog for additional info
-        self.detail_dialog = None
-        
-        # Create settings dialog
-        self.settings_dialog = None
-        
-        # Connect tray activation to show popup
-        self.tray_icon.activated.connect(self._on_tray_activated)
-        
-        # Setup refresh timer (will be started in start() method)
-        self.refresh_timer = None
-    
+        self._window_used['battery_popup'] = time.monotonic()
+        return self.battery_popup
     
     def start(self) -> CliResult:
         """Start the system tray application.
@@ -268,12 +354,18 @@ class SystemTrayApp:
         Returns:
             CliResult indicating success or failure
         """
+        # Become the shared status producer before the first read
+        self._start_publishing()
+        
         # Initialize battery manager
         result = self.battery_manager.initialize()
         
         if not result.success:
             return result
         
+        # Emulate the configured start threshold on end-only firmware
+        self._apply_start_threshold()
+        
         # Show tray icon
         self.tray_icon.show()
         
@@ -295,6 +387,13 @@ class SystemTrayApp:
         # Initial status update
         self.refresh_battery_status()
         
+        self.sleep_watcher.start()
+        
+        # Import UPower's history in the background (resumes where it stopped)
+        self.async_bridge.submit(self.async_manager.import_history(), self._on_history_imported)
+        
+        self._apply_memory_saver()
+        
         # Debug: Check config manager state
         print(f"Config manager loaded theme: {self.config_manager.get('theme', 'NOT_FOUND')}")
         
@@ -305,18 +404,55 @@ class SystemTrayApp:
         # Stop timer
         if self.refresh_timer:
             self.refresh_timer.stop()
+        if self.memory_timer:
+            self.memory_timer.stop()
+        self.sleep_watcher.stop()
+        
+        writer = self.battery_manager.status_writer
+        if writer is not None and writer is self._status_writer:
+            self.battery_manager.status_writer = None
+            writer.close()
+        self._status_writer = None
         
         # Hide tray icon
         self.tray_icon.hide()
     
     def refresh_battery_status(self):
-        """Refresh battery status and update tray icon."""
+        """Start a non-blocking refresh; the tray updates when it completes."""
         if not self.battery_manager.is_initialized:
             return
         
-        result = self.battery_manager.refresh_status()
+        # Skip if the previous refresh is still running
+        if self._refresh_future is not None and not self._refresh_future.done():
+            return
+        
+        self.battery_manager.rediscover_if_needed()
+        started = time.monotonic()
+        self._refresh_future = self.async_bridge.submit(
+            self.async_manager.read_batteries(),
+            lambda results: self._on_refresh_results(results, started))
+    
+    def _on_refresh_results(self, results, started: float):
+        """Apply refresh results on the Qt thread and update the tray.
         
-        if result.success and self.battery_manager.current_info:
+        Args:
+            results: CliResult per battery, or the exception raised
+            started: time.monotonic() when the refresh was submitted
+        """
+        if isinstance(results, BaseException):
+            print(f"Battery refresh failed: {results}")
+            return
+        
+        result = self.battery_manager.apply_refresh_results(results, started)
+        if not result.success:
+            print(result.error_message)
+        
+        if result.success:
+            self._update_tray()
+    
+    def _update_tray(self):
+        """Update tray icon, tooltip and visible popup from the manager's state."""
+        if self.battery_manager.current_info:
             # Update tray icon appearance
             self.tray_icon.update_battery_icon(self.battery_manager.current_info)
             
@@ -329,14 +465,69 @@ class SystemTrayApp:
                 tooltip += f" ({state})"
             if battery_info.end_threshold != 100:
                 tooltip += f" | 제한: {battery_info.end_threshold}%"
+            estimate = TrayIcon._estimate_text(battery_info)
+            if estimate:
+                tooltip += f" | {estimate}"
             self.tray_icon.setToolTip(tooltip)
             
             # Update popup if it's visible
-            if self.battery_popup.isVisible():
-                self.battery_popup.refresh_battery_info()
+            if self.battery_popup is not None and self.battery_popup.isVisible():
+                self.battery_popup.update_battery_info(battery_info)
+    
+    def _on_suspending(self):
+        """Pause refreshes and the idle window check before suspend.
+        
+        In-flight reads would return stale data, and the idle check would
+        count the time asleep as idle time.
+        """
+        if self.refresh_timer:
+            self.refresh_timer.stop()
+        if self.memory_timer:
+            self.memory_timer.stop()
+        if self._refresh_future is not None:
+            self._refresh_future.cancel()
+            self._refresh_future = None
+        self.battery_manager.prepare_for_sleep(True)
+    
+    def _on_resumed(self):
+        """Refresh at once after resume and restore lost thresholds."""
+        self.battery_manager.prepare_for_sleep(False)
+        if not self.battery_manager.is_initialized:
+            return
+        
+        # Prioritized refresh: sysfs values first, without waiting for upower
+        if self.battery_manager.quick_refresh().success:
+            self._update_tray()
+        
+        # Restore lost thresholds, then a full refresh (replaces any stale one)
+        lost = self.battery_manager.verify_thresholds()
+        if self._refresh_future is not None:
+            self._refresh_future.cancel()
+        started = time.monotonic()
+        self._refresh_future = self.async_bridge.submit(
+            self.async_manager.restore_and_read(lost),
+            lambda results: self._on_refresh_results(results, started))
+        
+        self._restart_timer()
+        self._apply_memory_saver()
+    
+    def _on_history_imported(self, imported):
+        """Report the history import and update a visible detail dialog.
+        
+        Args:
+            imported: Number of samples imported, or the exception raised
+        """
+        if isinstance(imported, BaseException):
+            print(f"UPower history import failed: {imported}")
+            return
+        if imported:
+            print(f"Imported {imported} samples from UPower history")
+            if self.detail_dialog is not None and self.detail_dialog.isVisible():
+                self.detail_dialog.update_history()
     
     def _show_status(self):
         """Show battery detail dialog."""
+        self._window_used['detail_dialog'] = time.monotonic()
         if self.detail_dialog is None:
             self.detail_dialog = BatteryDetailDialog(self.battery_manager)
             # Apply current theme to detail dialog
@@ -357,6 +548,7 @@ class SystemTrayApp:
     
     def _show_settings(self):
         """Show settings dialog."""
+        self._window_used['settings_dialog'] = time.monotonic()
         if self.settings_dialog is None:
             # Create dialog with main window as parent if available
             parent = None
@@ -386,9 +578,15 @@ class SystemTrayApp:
             # Apply new battery threshold
             self._apply_battery_threshold()
             
+            # Start, move or stop the start threshold emulation
+            self._apply_start_threshold()
+            
             # Apply theme changes to all components
             self._apply_theme_changes()
             
+            # Start or stop releasing idle windows
+            self._apply_memory_saver()
+            
         except Exception as e:
             print(f"Error updating settings: {e}")
     
@@ -398,10 +596,32 @@ class SystemTrayApp:
             new_interval = self.config_manager.get('refresh_interval', 30) * 1000
             if new_interval != self.refresh_interval:
                 self.refresh_interval = new_interval
+                if self._status_writer is not None:
+                    self._status_writer.interval = new_interval / 1000
                 self._restart_timer()
         except Exception as e:
             print(f"Error updating refresh interval: {e}")
     
+    def _start_publishing(self):
+        """Publish every refresh to the shared status file for other local readers.
+        
+        Only with shared status enabled and when no other producer (a
+        headless monitor) owns the file. The tray then stops reading the
+        file, which would only hand back its own snapshots.
+        """
+        cli = self.battery_manager.cli_interface
+        reader = getattr(cli, 'status_reader', None)
+        if self.battery_manager.status_writer is not None or reader is None:
+            return
+        try:
+            writer = SharedStatusWriter(reader.path, interval=self.refresh_interval / 1000)
+        except OSError as e:
+            print(f"Not publishing shared status: {e}")
+            return
+        self._status_writer = self.battery_manager.status_writer = writer
+        reader.close()
+        cli.status_reader = None
+    
     def _restart_timer(self):
         """Restart the refresh timer in main thread context."""
         try:
@@ -441,6 +661,35 @@ class SystemTrayApp:
         except Exception as e:
             print(f"Error applying battery threshold: {e}")
     
+    def _apply_start_threshold(self):
+        """Apply the software start threshold from settings.
+        
+        Batteries whose firmware has a start threshold of its own are left
+        alone. The end threshold is each battery's current target; a running
+        emulation keeps its end (set_threshold() already moves it).
+        """
+        try:
+            start = self.config_manager.get('software_start_threshold')
+            manager = self.battery_manager
+            if start is None:
+                if manager.start_thresholds:
+                    print("Disabling software start threshold")
+                    manager.disable_start_threshold()
+                return
+            
+            for name, info in list(manager.batteries.items()):
+                controller = manager.start_thresholds.get(name)
+                if info.start_threshold is not None or (controller is not None and controller.start == start):
+                    continue
+                end = controller.end if controller is not None else None
+                result = manager.enable_start_threshold(start, end, batteries=[name])
+                if result.success:
+                    print(f"Software start threshold {start}% enabled on {name}")
+                else:
+                    print(f"Failed to enable software start threshold: {result.error_message}")
+        except Exception as e:
+            print(f"Error applying software start threshold: {e}")
+    
     def _apply_theme_changes(self):
         """Apply theme changes to all GUI components."""
         try:
@@ -471,6 +720,129 @@ class SystemTrayApp:
             import traceback
             traceback.print_exc()
     
+    def _apply_memory_saver(self):
+        """Start or stop the idle window check per the memory_saver setting."""
+        if not self.config_manager.get('memory_saver', False):
+            if self.memory_timer:
+                self.memory_timer.stop()
+            return
+        if self.memory_timer is None:
+            self.memory_timer = QTimer()
+            self.memory_timer.timeout.connect(self.release_idle_windows)
+        if not self.memory_timer.isActive():
+            self.memory_timer.start(self.MEMORY_CHECK_INTERVAL * 1000)
+    
+    def release_idle_windows(self, force: bool = False) -> list:
+        """Destroy hidden windows unused for memory_saver_idle seconds and trim memory.
+        
+        The windows are rebuilt (with the current theme) when next shown.
+        
+        Args:
+            force: Release every hidden window regardless of idle time
+        
+        Returns:
+            Attribute names of the released windows
+        """
+        idle = self.config_manager.get('memory_saver_idle', 120)
+        now = time.monotonic()
+        released = []
+        for name in self.RELEASABLE_WINDOWS:
+            window = getattr(self, name)
+            if window is None or window.isVisible():
+                continue
+            if not force and now - self._window_used.get(name, now) < idle:
+                continue
+            # A remaining window parented to this one would go with it
+            if any(getattr(self, other) is not None and getattr(self, other).parent() is window
+                   for other in self.RELEASABLE_WINDOWS if other != name):
+                continue
+            window.deleteLater()
+            setattr(self, name, None)
+            released.append(name)
+        
+        if released:
+            # Delete now rather than on the next event loop pass, so the trim sees it
+            QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+            if self.battery_manager.sample_log is not None:
+                self.battery_manager.sample_log.trim_cache()
+            QPixmapCache.clear()
+            freed = memory_stats.trim()
+            stats = memory_stats.collect()
+            print(f"Memory saver released {', '.join(released)}"
+                  + (f" ({memory_stats.format_kb(freed)} returned)" if freed is not None else "")
+                  + f"; RSS {stats.rss_text()}")
+        return released
+    
+    def attach_instance(self, instance) -> None:
+        """Serve intents forwarded by later launches of the GUI.
+        
+        Args:
+            instance: Primary SingleInstance (its socket is watched on the Qt thread)
+        """
+        self.instance = instance
+        # Listening socket plus connections still sending (fd -> notifier)
+        self._instance_notifiers = {}
+        self._watch_instance_sockets()
+    
+    def _watch_instance_sockets(self):
+        """Keep one read notifier per socket the instance wants watched."""
+        watched = set(self.instance.watched_filenos())
+        for fd in list(self._instance_notifiers):
+            if fd not in watched:
+                notifier = self._instance_notifiers.pop(fd)
+                notifier.setEnabled(False)
+                notifier.deleteLater()
+        for fd in watched:
+            if fd not in self._instance_notifiers:
+                notifier = QSocketNotifier(fd, QSocketNotifier.Read)
+                notifier.activated.connect(self._on_instance_requests)
+                self._instance_notifiers[fd] = notifier
+    
+    def _on_instance_requests(self, _socket=None):
+        """Handle intents sent by launches that found this instance running."""
+        intents = self.instance.read_requests()
+        self._watch_instance_sockets()
+        for intent in intents:
+            # A plain second launch brings up the popup
+            self.handle_intent(intent if intent.get("action") else {"action": "popup"})
+    
+    def handle_intent(self, intent: dict) -> None:
+        """Carry out a command line intent (popup, details or set N).
+        
+        Args:
+            intent: {"action": ..., "value": ...} as built by parse_intent
+        """
+        action = intent.get("action")
+        print(f"Handling launch request: {action}")
+        if action == "popup":
+            self._show_popup()
+        elif action == "details":
+            self._show_status()
+        elif action == "set":
+            threshold = intent.get("value")
+            self.async_bridge.submit(self.async_manager.set_threshold(threshold),
+                                     lambda outcome: self._on_threshold_set(threshold, outcome))
+    
+    def _on_threshold_set(self, threshold: int, outcome) -> None:
+        """Apply the status read after a threshold set on request (Qt thread).
+        
+        Args:
+            threshold: Threshold that was requested
+            outcome: WriteOutcome, or the exception raised
+        """
+        if isinstance(outcome, BaseException):
+            print(f"Failed to set battery threshold to {threshold}%: {outcome}")
+            return
+        result = self.async_manager.apply_outcome(outcome)
+        if not outcome.result.success:
+            print(f"Failed to set battery threshold to {threshold}%: {result.error_message}")
+            return
+        print(f"Battery threshold set to {threshold}%")
+        if result.success:
+            self._update_tray()
+        else:
+            print(result.error_message)
+    
     def _on_tray_activated(self, reason):
         """Handle tray icon activation."""
         if reason == QSystemTrayIcon.Trigger or reason == QSystemTrayIcon.DoubleClick:  # Left click or double click
@@ -480,16 +852,22 @@ class SystemTrayApp:
     
     def _show_popup(self):
         """Show battery popup near cursor."""
-        # Refresh popup data
-        self.battery_popup.refresh_battery_info()
+        popup = self._ensure_popup()
+        self._window_used['battery_popup'] = time.monotonic()
+        
+        # Show cached data immediately; the refresh updates the popup when done
+        if self.battery_manager.current_info:
+            popup.update_battery_info(self.battery_manager.current_info)
         
         # Show popup near cursor
-        self.battery_popup.show_near_cursor()
+        popup.show_near_cursor()
+        self.refresh_battery_status()
     
     def _show_context_menu(self):
         """Show context menu at cursor position."""
         from PyQt5.QtGui import QCursor
-        self.context_menu.popup(QCursor.pos())
+        self._window_used['context_menu'] = time.monotonic()
+        self._ensure_context_menu().popup(QCursor.pos())
     
     def _on_popup_closed(self):
         """Handle popup closed."""
@@ -513,6 +891,17 @@ class SystemTrayApp:
             # Stop the tray app
             self.stop()
             
+            # Cancel in-flight CLI runs (kills stuck upower children) without waiting
+            self.async_bridge.shutdown()
+            self.async_manager.kill_children()
+            self.battery_manager.command_queue.shutdown(wait=False)
+            
+            # Keep what the estimators learned and the energy ledgers since their last save
+            for estimator in self.battery_manager.estimators.values():
+                estimator.save()
+            for ledger in self.battery_manager.energy_ledgers.values():
+                ledger.save()
+            
             # Process pending events before quitting
             app = QApplication.instance()
             if app:
@@ -525,8 +914,13 @@ class SystemTrayApp:
                 QApplication.instance().quit()
 
 
-def main():
-    """Main entry point for the system tray application."""
+def main(instance=None, intent=None):
+    """Main entry point for the system tray application.
+    
+    Args:
+        instance: Primary SingleInstance whose forwarded requests to serve
+        intent: This launch's own command line intent (see parse_intent)
+    """
     # Use existing QApplication instance to prevent QBasicTimer issues
     app = QApplication.instance()
     if app is None:
@@ -546,6 +940,11 @@ def main():
         print(f"Failed to start application: {result.error_message}")
         return 1
     
+    if instance is not None:
+        tray_app.attach_instance(instance)
+    if intent and intent.get("action"):
+        tray_app.handle_intent(intent)
+    
     # Run application using existing instance
     return app.exec_()
 
@@ -0,0 +1,255 @@
+"""Single-instance enforcement for the tray GUI, with hand-off over a unix socket.
+
+The first launch takes an exclusive lock on ``gui.lock`` in the runtime
+directory and listens on ``gui.sock`` next to it. A later launch fails to
+take the lock, sends its command line intent (show the popup, open the
+details, set a threshold) to the running instance as one JSON line, waits
+for the acknowledgement and exits. The lock (not the socket file) decides
+which process is the primary one, so a socket left behind by a crashed
+instance is simply replaced, and two simultaneous launches cannot both win.
+
+Nothing here imports Qt: main.py checks for a running instance before
+loading PyQt5, so a forwarded launch costs little more than the Python
+interpreter start. The primary instance watches ``watched_filenos()``
+(e.g. with QSocketNotifiers) and calls ``read_requests()`` when one is
+readable; reads never block, so a launch that connects but is slow to send
+cannot stall the caller's thread.
+
+The directory must belong to the user and be private (mode 0700, not a
+symlink); in a shared /tmp another user could otherwise prepare it.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import socket
+import stat
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+ACTIONS = ("popup", "details", "set")
+
+
+def default_directory() -> str:
+    """Per-user runtime directory for the lock and socket."""
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        return os.path.join(runtime, "a14-charge-keeper")
+    return f"/tmp/a14-charge-keeper-{os.getuid()}"
+
+
+def check_private_directory(path: str) -> None:
+    """Make sure a directory is a real directory owned by us with mode 0700.
+
+    Raises:
+        PermissionError: If it is a symlink, not a directory, owned by
+            another user or accessible to others
+    """
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} is not a directory")
+    if info.st_uid != os.getuid():
+        raise PermissionError(f"{path} belongs to uid {info.st_uid}")
+    if stat.S_IMODE(info.st_mode) != 0o700:
+        raise PermissionError(f"{path} has mode {stat.S_IMODE(info.st_mode):o}, expected 700")
+
+
+def parse_intent(argv: List[str]) -> Dict[str, Any]:
+    """Parse the GUI's command line intent.
+
+    Unknown arguments (Qt's own, like -platform) are ignored.
+
+    Args:
+        argv: Arguments without the program name
+
+    Returns:
+        {"action": None | "popup" | "details" | "set", "value": threshold or None}
+
+    Raises:
+        SystemExit: On an invalid threshold (argparse reports it)
+    """
+    parser = argparse.ArgumentParser(prog="a14-charge-keeper-gui")
+    actions = parser.add_mutually_exclusive_group()
+    actions.add_argument('--popup', action='store_true', help="show the battery popup")
+    actions.add_argument('--details', action='store_true', help="open the battery details")
+    actions.add_argument('--set', type=int, metavar='N', help="set the charge threshold (20-100)")
+    args, _ = parser.parse_known_args(argv)
+    if args.set is not None and not 20 <= args.set <= 100:
+        parser.error("threshold must be between 20 and 100")
+    if args.set is not None:
+        return {"action": "set", "value": args.set}
+    if args.details:
+        return {"action": "details", "value": None}
+    return {"action": "popup" if args.popup else None, "value": None}
+
+
+class SingleInstance:
+    """Primary-instance lock plus the request socket."""
+
+    # Seconds a forwarded launch waits for the running instance
+    CONNECT_TIMEOUT = 2.0
+    # Seconds a connection may take to deliver its request line, and its
+    # maximum length
+    READ_TIMEOUT = 2.0
+    MAX_REQUEST = 4096
+
+    def __init__(self, directory: Optional[str] = None):
+        """Initialize (nothing is locked or bound until acquire()).
+
+        Args:
+            directory: Location of the lock and socket (runtime directory if None)
+        """
+        self.directory = directory or default_directory()
+        self.lock_path = os.path.join(self.directory, "gui.lock")
+        self.socket_path = os.path.join(self.directory, "gui.sock")
+        self._lock_fd: Optional[int] = None
+        self._server: Optional[socket.socket] = None
+        # Accepted connections still sending: fd -> (socket, data so far, accept time)
+        self._clients: Dict[int, Tuple[socket.socket, bytearray, float]] = {}
+
+    def acquire(self) -> bool:
+        """Become the primary instance if no other one is running.
+
+        Returns:
+            True if this process is now the primary instance
+
+        Raises:
+            OSError: If the runtime directory or socket cannot be set up,
+                or the directory is not private to this user
+        """
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        check_private_directory(self.directory)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT | os.O_CLOEXEC | os.O_NOFOLLOW, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+
+        try:
+            os.unlink(self.socket_path)  # Left by an instance that did not exit cleanly
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM | socket.SOCK_CLOEXEC)
+        server.bind(self.socket_path)
+        server.listen(4)
+        server.setblocking(False)
+        self._server = server
+        return True
+
+    def forward(self, intent: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Send an intent to the primary instance.
+
+        The primary instance may hold the lock but not listen yet (it is
+        starting up); connecting is retried until CONNECT_TIMEOUT.
+
+        Args:
+            intent: Parsed intent (action None asks for the popup)
+
+        Returns:
+            The instance's reply, or None if it could not be reached
+        """
+        deadline = time.monotonic() + self.CONNECT_TIMEOUT
+        message = (json.dumps(intent) + "\n").encode('utf-8')
+        while True:
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                    client.settimeout(max(deadline - time.monotonic(), 0.01))
+                    client.connect(self.socket_path)
+                    client.sendall(message)
+                    reply = client.makefile('rb').readline()
+                return json.loads(reply) if reply else None
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() >= deadline:
+                    return None
+                time.sleep(0.02)
+            except (OSError, ValueError):
+                return None
+
+    def fileno(self) -> int:
+        """Listening socket to watch for readability (primary instance only)."""
+        if self._server is None:
+            raise RuntimeError("Not the primary instance")
+        return self._server.fileno()
+
+    def watched_filenos(self) -> List[int]:
+        """Listening socket plus connections whose request is incomplete.
+
+        The set changes with every read_requests() call; watch all of them.
+        """
+        return [self.fileno()] + list(self._clients)
+
+    def read_requests(self) -> List[Dict[str, Any]]:
+        """Accept pending launches and return the intents that arrived complete.
+
+        Never blocks: connections whose request line is incomplete are kept
+        for the next call (their sockets become readable when more data or
+        the client's close arrives) and dropped after READ_TIMEOUT. Every
+        finished connection is acknowledged.
+
+        Returns:
+            Intents of the launches answered by this call
+        """
+        self._accept()
+        requests = []
+        now = time.monotonic()
+        for fd, (client, buffer, accepted) in list(self._clients.items()):
+            try:
+                while b"\n" not in buffer:
+                    chunk = client.recv(self.MAX_REQUEST)
+                    if not chunk:
+                        raise ValueError("connection closed before the request was complete")
+                    buffer += chunk
+                    if len(buffer) > self.MAX_REQUEST:
+                        raise ValueError("request too long")
+                intent = json.loads(buffer.split(b"\n", 1)[0])
+                if not isinstance(intent, dict) or intent.get("action") not in ACTIONS + (None,):
+                    raise ValueError("unknown request")
+            except (BlockingIOError, InterruptedError):
+                if now - accepted > self.READ_TIMEOUT:
+                    self._finish(fd, {"ok": False, "error": "timed out"})
+                continue
+            except (OSError, ValueError) as e:
+                self._finish(fd, {"ok": False, "error": str(e)})
+                continue
+            self._finish(fd, {"ok": True, "pid": os.getpid()})
+            requests.append(intent)
+        return requests
+
+    def _accept(self) -> None:
+        """Accept every waiting connection as a non-blocking client."""
+        while self._server is not None:
+            try:
+                client, _ = self._server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            client.setblocking(False)
+            self._clients[client.fileno()] = (client, bytearray(), time.monotonic())
+
+    def _finish(self, fd: int, reply: Dict[str, Any]) -> None:
+        """Send the one-line reply to a client and close it."""
+        client = self._clients.pop(fd)[0]
+        with client:
+            try:
+                client.send((json.dumps(reply) + "\n").encode('utf-8'))
+            except OSError:
+                pass
+
+    def close(self) -> None:
+        """Stop listening and release the lock."""
+        for client, _, _ in self._clients.values():
+            client.close()
+        self._clients.clear()
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
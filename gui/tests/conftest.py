@@ -0,0 +1,6 @@
+"""Shared pytest setup: make the ``src`` package importable from gui/."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
@@ -0,0 +1,111 @@
+"""Tests for the asyncio write path: serialization, deadlines and drift targets."""
+
+import asyncio
+import os
+import threading
+
+from src.core.async_battery_manager import AsyncBatteryManager
+from src.core.battery_manager import BatteryManager
+from src.core.cli_interface import CliInterface
+
+
+FAKE_CLI = """#!/bin/sh
+case "$1" in
+set)
+    echo "start $2" >> {log}
+    if [ "$2" = 55 ]; then
+        sleep 30 &
+        echo $! > {child}
+        wait
+    fi
+    sleep 0.1
+    echo "end $2" >> {log}
+    ;;
+*)
+    exit 1
+    ;;
+esac
+"""
+
+
+class NoEngine:
+    """Engine stand-in for a battery whose sysfs is not writable."""
+
+    journal = None
+
+    def __init__(self, battery: str):
+        self.battery = battery
+
+    def is_writable(self) -> bool:
+        return False
+
+    def read_threshold(self) -> int:
+        raise OSError("not readable")
+
+    def lock_busy(self) -> bool:
+        return False
+
+
+class ScriptCli(CliInterface):
+    """CliInterface running a fake CLI script, without probing hardware."""
+
+    def __init__(self, script: str):
+        self.CLI_COMMAND = script
+        self.default_battery = "BAT0"
+        self.use_threshold_engine = False
+        self.threshold_engine = None
+        self.status_reader = None
+        self.upower = None
+        self.capability_probe = None
+        self.persist_state = None
+        self.spawn_count = 0
+        self.shared_status_hits = 0
+        self._counter_lock = threading.Lock()
+        self._snapshot_floor = None
+
+    def engine_for(self, battery: str) -> NoEngine:
+        return NoEngine(battery)
+
+
+def make_manager(tmp_path) -> AsyncBatteryManager:
+    script = tmp_path / "a14-charge-keeper"
+    script.write_text(FAKE_CLI.format(log=tmp_path / "log", child=tmp_path / "child"))
+    script.chmod(0o755)
+    manager = BatteryManager(ScriptCli(str(script)))
+    manager.primary_battery = "BAT0"
+    manager.battery_names = ["BAT0"]
+    manager.is_initialized = True
+    return AsyncBatteryManager(manager)
+
+
+def test_writes_are_serialized(tmp_path):
+    async_manager = make_manager(tmp_path)
+
+    async def both():
+        return await asyncio.gather(async_manager.set_threshold(70),
+                                    async_manager.set_threshold(75))
+
+    outcomes = asyncio.run(both())
+    assert all(outcome.result.success for outcome in outcomes)
+    assert (tmp_path / "log").read_text().split("\n")[:4] == [
+        "start 70", "end 70", "start 75", "end 75"]
+    assert async_manager.manager.drift.targets() == {"BAT0": 75}
+    assert async_manager.manager.drift.writes_in_flight == 0
+
+
+def test_timeout_kills_the_process_group_and_restores_the_target(tmp_path):
+    async_manager = make_manager(tmp_path)
+    asyncio.run(async_manager.set_threshold(70))
+
+    outcome = asyncio.run(async_manager.set_threshold(55, timeout=1.0))
+    assert not outcome.result.success
+    assert async_manager.cli.running_processes == 0
+    child = int((tmp_path / "child").read_text())
+    try:
+        os.waitpid(child, os.WNOHANG)
+    except ChildProcessError:
+        pass  # Not our child: reaped by init once killed
+    assert not os.path.exists(f"/proc/{child}") or \
+        open(f"/proc/{child}/stat").read().split()[2] == "Z"
+    assert async_manager.manager.drift.targets() == {"BAT0": 70}
+    assert async_manager.manager.drift.writes_in_flight == 0
@@ -0,0 +1,83 @@
+"""Tests for the fixed-record backup journal and its parity with the CLI."""
+
+import fcntl
+import os
+import subprocess
+
+import pytest
+
+from src.core.backup_journal import RECORD_SIZE, BackupJournal
+
+CLI = os.path.join(os.path.dirname(__file__), "..", "..", "cli", "a14-charge-keeper")
+
+LEGACY_FILES = {
+    "threshold_backup_100": "80\n",
+    "threshold_backup_200": "garbage\n",
+    "threshold_backup_300": "",
+    "threshold_backup_400": " 75 \nextra\n",
+    "threshold_backup_500": "+60\n",
+}
+
+
+def run_cli_function(backup_dir, *commands: str) -> None:
+    """Run CLI shell functions (the script without its main dispatch)."""
+    script = f'source <(sed "/^# 메인 로직/,\\$d" "{CLI}"); ' + "; ".join(commands)
+    env = dict(os.environ, BAT_NAME="BAT0", JOURNAL_MAX_RECORDS="2")
+    subprocess.run(["bash", "-c", f'set -euo pipefail; {script}'], check=True, env=env,
+                   cwd=backup_dir)
+
+
+def fill(journal: BackupJournal, count: int) -> None:
+    for i in range(count):
+        journal.append("BAT0", 60 + i, timestamp=i)
+
+
+def test_compaction_keeps_newest_records_and_leaves_no_temp_file(tmp_path):
+    journal = BackupJournal(str(tmp_path / "journal"), max_records=3,
+                            lock_file=str(tmp_path / "lock"))
+    fill(journal, 6)  # The sixth append reaches twice the limit
+    assert [record.value for record in journal.records()] == [63, 64, 65]
+    assert sorted(os.listdir(tmp_path)) == ["journal", "lock"]
+
+
+def test_compaction_is_skipped_while_the_cli_lock_is_held(tmp_path):
+    lock = tmp_path / "lock"
+    journal = BackupJournal(str(tmp_path / "journal"), max_records=3, lock_file=str(lock))
+    with open(lock, "w") as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        fill(journal, 6)
+        assert journal.count() == 6  # Skipped while the CLI holds the lock
+    assert journal.compact() == 3
+    assert journal.last_value() == 65
+
+
+def test_legacy_migration_matches_the_cli(tmp_path):
+    outcomes = []
+    for side in ("python", "bash"):
+        directory = tmp_path / side
+        directory.mkdir()
+        for name, content in LEGACY_FILES.items():
+            (directory / name).write_text(content)
+        if side == "python":
+            BackupJournal(str(directory / "threshold_journal"), lock_file=None).migrate_legacy_files()
+        else:
+            run_cli_function(directory, f'BACKUP_DIR="{directory}"',
+                             'JOURNAL_FILE="$BACKUP_DIR/threshold_journal"', "migrate_legacy_backups")
+        outcomes.append((sorted(os.listdir(directory)),
+                         (directory / "threshold_journal").read_bytes()))
+
+    assert outcomes[0] == outcomes[1]
+    remaining, journal = outcomes[0]
+    assert remaining == ["threshold_journal"]
+    assert len(journal) == 2 * RECORD_SIZE  # Only "80" and " 75 " are imported
+
+
+@pytest.mark.parametrize("count", [3, 4])
+def test_cli_compaction_uses_a_private_temp_file(tmp_path, count):
+    journal = BackupJournal(str(tmp_path / "threshold_journal"), lock_file=None)
+    fill(journal, count)
+    (tmp_path / "threshold_journal.tmp").write_text("another writer's file")
+    run_cli_function(tmp_path, f'JOURNAL_FILE="{tmp_path}/threshold_journal"', "compact_journal")
+    assert journal.count() == (2 if count >= 4 else count)
+    assert (tmp_path / "threshold_journal.tmp").read_text() == "another writer's file"
+    assert sorted(os.listdir(tmp_path)) == ["threshold_journal", "threshold_journal.tmp"]
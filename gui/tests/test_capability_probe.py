@@ -0,0 +1,154 @@
+"""Tests for the capability cache and the live conflict check."""
+
+import os
+import subprocess
+
+import pytest
+
+from src.core import capability_probe
+from src.core.capability_probe import (
+    DMI_PRODUCT_FILE, OSRELEASE_FILE, CONFLICT_TTL, CapabilityProbe, check_conflicts, fnv1a_32)
+
+CLI = os.path.join(os.path.dirname(__file__), "..", "..", "cli", "a14-charge-keeper")
+
+
+def make_device(root, name: str, device_type: str, *attributes: str) -> None:
+    """Create a power_supply device (type and uevent) with empty attributes."""
+    directory = os.path.join(root, name)
+    os.makedirs(directory)
+    with open(os.path.join(directory, "type"), 'w') as f:
+        f.write(f"{device_type}\n")
+    with open(os.path.join(directory, "uevent"), 'w') as f:
+        f.write(f"POWER_SUPPLY_NAME={name}\nPOWER_SUPPLY_TYPE={device_type}\n")
+    for attribute in attributes:
+        open(os.path.join(directory, attribute), 'w').close()
+
+
+def make_probe(tmp_path) -> CapabilityProbe:
+    """Probe on a fake tree: BAT0 (end only), BAT1 (end and start) and AC."""
+    root = str(tmp_path / "sys")
+    make_device(root, "AC", "Mains")
+    make_device(root, "BAT0", "Battery", "charge_control_end_threshold")
+    make_device(root, "BAT1", "Battery", "charge_control_end_threshold",
+                "charge_control_start_threshold")
+    (tmp_path / "osrelease").write_text("6.8.0\n")
+    (tmp_path / "product").write_text("TUF A14\n")
+    return CapabilityProbe(sysfs_root=root, cache_file=str(tmp_path / "cache" / "capabilities"),
+                           dmi_product_file=str(tmp_path / "product"),
+                           osrelease_file=str(tmp_path / "osrelease"))
+
+
+def test_fnv1a_32():
+    assert fnv1a_32("") == 0x811c9dc5
+    assert fnv1a_32("a") == 0xe40c292c
+
+
+def test_probe_and_cache(tmp_path):
+    probe = make_probe(tmp_path)
+    record = probe.get()
+    assert record.key == f"6.8.0|TUF A14|{fnv1a_32('AC:Mains,BAT0:Battery,BAT1:Battery'):08x}"
+    assert record.batteries == ["BAT0", "BAT1"]
+    assert record.end_supported == ["BAT0", "BAT1"]
+    assert record.start_supported == ["BAT1"]
+    assert record.default_battery() == "BAT0"
+
+    # A second probe object reuses the cache while the key matches
+    reader = CapabilityProbe(sysfs_root=probe.sysfs_root, cache_file=probe.cache_file,
+                             dmi_product_file=probe.dmi_product_file,
+                             osrelease_file=probe.osrelease_file)
+    reader.probe = None  # Must not be called
+    cached = reader.get()
+    assert (cached.key, cached.batteries, cached.start_supported) == \
+        (record.key, record.batteries, record.start_supported)
+
+
+def test_cache_holds_no_conflict_state(tmp_path):
+    probe = make_probe(tmp_path)
+    probe.get()
+    with open(probe.cache_file) as f:
+        keys = {line.partition('=')[0] for line in f}
+    assert keys == {"KEY", "BATTERIES", "END_SUPPORTED", "START_SUPPORTED", "PROBED_AT"}
+
+
+def test_old_cache_with_conflict_lines_still_loads(tmp_path):
+    probe = make_probe(tmp_path)
+    key = probe.compute_key()
+    os.makedirs(os.path.dirname(probe.cache_file))
+    with open(probe.cache_file, 'w') as f:
+        f.write(f"KEY={key}\nBATTERIES=BAT0\nEND_SUPPORTED=BAT0\nSTART_SUPPORTED=\n"
+                "TLP_ACTIVE=1\nASUSCTL=0\nAUTO_CPUFREQ=0\nPROBED_AT=0\n")
+    assert probe.get().end_supported == ["BAT0"]
+
+
+def test_layout_change_probes_again(tmp_path):
+    probe = make_probe(tmp_path)
+    first = probe.get()
+    make_device(probe.sysfs_root, "BAT2", "Battery", "charge_control_end_threshold")
+    probe.scanner.invalidate()
+    second = probe.get()
+    assert second.key != first.key
+    assert second.batteries == ["BAT0", "BAT1", "BAT2"]
+
+
+def fake_tools(monkeypatch, active: dict) -> list:
+    """Replace systemctl and PATH lookups; returns the list of systemctl calls."""
+    calls = []
+
+    def service_active(name):
+        calls.append(name)
+        return active[name]
+
+    monkeypatch.setattr(CapabilityProbe, "_service_active", staticmethod(service_active))
+    monkeypatch.setattr(capability_probe.shutil, "which",
+                        lambda name: "/usr/bin/asusctl" if name == "asusctl" else None)
+    return calls
+
+
+def test_conflict_check_is_reused_within_ttl(tmp_path, monkeypatch):
+    if os.geteuid() != 0:
+        pytest.skip("the conflict cache is written by root only")
+    active = {"tlp": False}
+    calls = fake_tools(monkeypatch, active)
+    cache = str(tmp_path / "conflicts")
+    assert check_conflicts(cache, now=1000) == ["asusctl"]
+    active["tlp"] = True  # TLP started after the check
+    assert check_conflicts(cache, now=1030) == ["asusctl"]  # Cached: no spawn
+    assert len(calls) == 1
+    assert check_conflicts(cache, now=1000 + CONFLICT_TTL) == ["tlp", "asusctl"]
+    assert len(calls) == 2
+    assert check_conflicts(cache, max_age=0, now=1061) == ["tlp", "asusctl"]
+    assert len(calls) == 3
+
+
+def test_conflict_cache_written_by_cli_is_read(tmp_path, monkeypatch):
+    calls = fake_tools(monkeypatch, {"tlp": False})
+    cache = tmp_path / "conflicts"
+    cache.write_text("CHECKED_AT=1000\nTLP_ACTIVE=1\nASUSCTL=0\nAUTO_CPUFREQ=1\n")
+    assert check_conflicts(str(cache), now=1010) == ["tlp", "auto-cpufreq"]
+    assert calls == []
+    # From the future (clock moved back): checked again
+    assert check_conflicts(str(cache), now=900) == ["asusctl"]
+
+
+def test_cli_computes_the_same_key(tmp_path):
+    root = str(tmp_path / "sys")
+    make_device(root, "AC", "Mains")
+    make_device(root, "BAT0", "Battery", "charge_control_end_threshold")
+    make_device(root, "hidpp_battery_0", "Battery")
+    with open(os.path.join(root, "hidpp_battery_0", "uevent"), 'a') as f:
+        f.write("POWER_SUPPLY_SCOPE=Device")  # Last line without a newline
+    # The type attribute disagrees with uevent: both sides must read uevent
+    with open(os.path.join(root, "BAT0", "type"), 'w') as f:
+        f.write("Unknown\n")
+    os.makedirs(os.path.join(root, "ucsi-source-psy-1"))  # No uevent: skipped
+
+    probe = CapabilityProbe(sysfs_root=root, cache_file=str(tmp_path / "capabilities"),
+                            dmi_product_file=DMI_PRODUCT_FILE, osrelease_file=OSRELEASE_FILE)
+    script = (f'source <(sed "/^# 메인 로직/,\\$d" "{CLI}"); BAT_DIR="{root}"; '
+              'capability_key; probe_capabilities; echo "$CAP_KEY"; echo "$CAP_BATTERIES"')
+    output = subprocess.run(["bash", "-c", f"set -euo pipefail; {script}"], check=True,
+                            capture_output=True, text=True,
+                            env=dict(os.environ, CAPABILITY_CACHE=str(tmp_path / "cli-cache"))).stdout
+    key, batteries = output.splitlines()
+    assert key == probe.compute_key()
+    assert batteries.split() == probe.probe().batteries == ["BAT0", "hidpp_battery_0"]
@@ -0,0 +1,88 @@
+"""Tests for the learned time-to-limit and time-to-empty estimates."""
+
+import json
+import math
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.charge_estimator import BAND_COUNT, ChargeEstimator
+
+ENERGY_FULL = 50.0  # Wh
+
+
+def reading(percentage: float, rate_percent_per_hour: float, state: str = "charging",
+            end_threshold: int = 80):
+    """Battery reading with the rate given in percent of full energy per hour."""
+    return SimpleNamespace(percentage=percentage, state=state, end_threshold=end_threshold,
+                           energy_rate=rate_percent_per_hour * ENERGY_FULL / 100,
+                           energy_full=ENERGY_FULL,
+                           energy_current=percentage * ENERGY_FULL / 100)
+
+
+def learn_taper(estimator: ChargeEstimator) -> None:
+    """One charge from 20% to 90%: 40%/h up to 70%, then tapering to 10%/h."""
+    for step, level in enumerate(range(20, 90)):
+        estimator.update(reading(level + 0.5, 40 if level < 70 else 10), now=step * 60.0)
+
+
+@pytest.fixture
+def estimator(tmp_path):
+    return ChargeEstimator("BAT0", curve_file=str(tmp_path / "curve.json"))
+
+
+def test_unlearned_curve_uses_the_current_rate(estimator):
+    info = reading(60, 40)
+    estimator.update(info, now=0)
+    assert estimator.time_to_limit(info) == pytest.approx(1800)  # 20 points at 40%/h
+
+
+def test_learned_taper_lengthens_the_time_to_limit(estimator):
+    learn_taper(estimator)
+    estimator.update(reading(60, 40, state="discharging"), now=0)  # New charge
+    info = reading(60, 40)
+    estimator.update(info, now=1)
+    # 10 points at 40%/h, then 10 at 10%/h
+    assert estimator.time_to_limit(info) == pytest.approx(0.25 * 3600 + 1.0 * 3600)
+
+    # A slower charger scales the learned curve; the reading itself also
+    # pulls its own band (60-62%) towards 20%/h
+    estimator.update(reading(60, 20, state="discharging"), now=2)
+    slow = reading(60, 20)
+    estimator.update(slow, now=3)
+    scale = 20 / estimator.curve.rates[30]
+    assert scale < 1
+    hours = 2 / 20 + 8 / (40 * scale) + 10 / (10 * scale)
+    assert estimator.time_to_limit(slow) == pytest.approx(hours * 3600)
+
+
+def test_time_to_limit_outside_charging(estimator):
+    estimator.update(reading(80, 40), now=0)
+    assert estimator.time_to_limit(reading(80, 40)) == 0
+    assert estimator.time_to_limit(reading(85, 40)) == 0
+    discharging = reading(60, 20, state="discharging")
+    estimator.update(discharging, now=1)
+    assert estimator.time_to_limit(discharging) is None
+
+
+def test_time_to_empty_follows_the_smoothed_rate(estimator):
+    estimator.update(reading(50, 20, state="discharging"), now=0)  # 10 W
+    info = reading(50, 40, state="discharging")  # Load jumps to 20 W
+    estimator.update(info, now=ChargeEstimator.SMOOTHING)
+    smoothed = 10 + (1 - math.exp(-1)) * 10
+    assert estimator.smoothed_rate == pytest.approx(smoothed)
+    assert estimator.time_to_empty(info) == pytest.approx(25 / smoothed * 3600)
+    assert estimator.time_to_empty(reading(50, 40)) is None
+
+
+def test_learned_curve_survives_a_restart(estimator, tmp_path):
+    learn_taper(estimator)
+    estimator.save()
+    restored = ChargeEstimator("BAT0", curve_file=estimator.curve_file)
+    assert restored.curve.rates == estimator.curve.rates
+    assert restored.curve.counts[35] > 0
+
+    # A curve saved with another band layout is discarded
+    with open(estimator.curve_file, 'w') as f:
+        json.dump({"band_width": 5, "rates": [10.0] * 20, "counts": [1] * 20}, f)
+    assert ChargeEstimator("BAT0", curve_file=estimator.curve_file).curve.rates == [None] * BAND_COUNT
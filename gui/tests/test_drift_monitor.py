@@ -0,0 +1,126 @@
+"""Tests for drift detection, its rate limit and the manager's re-apply path."""
+
+import queue
+
+from src.core.battery_manager import BatteryManager
+from src.core.drift_monitor import DriftMonitor
+from src.core.replay import ReplayCliInterface, TraceRecord, VirtualClock
+
+
+class FakeClock:
+    """Monotonic clock advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def actions(records) -> list:
+    return [record.action for record in records]
+
+
+def test_matching_reading_creates_no_record():
+    monitor = DriftMonitor()
+    assert monitor.check({"BAT0": 80}, {"BAT0": 80}, None) == []
+    assert monitor.check({"BAT0": None}, {"BAT0": 80}, None) == []
+
+
+def test_rate_limit():
+    clock = FakeClock()
+    monitor = DriftMonitor(clock=clock)
+    assert actions(monitor.check({"BAT0": 100}, {"BAT0": 80}, None)) == ["queued"]
+    clock.now += DriftMonitor.MIN_INTERVAL - 1
+    assert actions(monitor.check({"BAT0": 100}, {"BAT0": 80}, None)) == ["rate_limited"]
+
+    for _ in range(DriftMonitor.MAX_PER_HOUR - 1):
+        clock.now += DriftMonitor.MIN_INTERVAL
+        assert actions(monitor.check({"BAT0": 100}, {"BAT0": 80}, None)) == ["queued"]
+    clock.now += DriftMonitor.MIN_INTERVAL
+    assert actions(monitor.check({"BAT0": 100}, {"BAT0": 80}, None)) == ["rate_limited"]
+
+    clock.now += 3600  # The hour's budget is back
+    assert actions(monitor.check({"BAT0": 100}, {"BAT0": 80}, None)) == ["queued"]
+    assert len(monitor.log) == DriftMonitor.MAX_PER_HOUR + 3
+
+
+def test_new_target_resets_the_budget():
+    clock = FakeClock()
+    monitor = DriftMonitor(clock=clock)
+    monitor.check({"BAT0": 100}, {"BAT0": 80}, None)
+    monitor.record_target(75, ["BAT0"])
+    assert actions(monitor.check({"BAT0": 100}, {"BAT0": 75}, None)) == ["queued"]
+
+
+def test_skipped_while_a_write_is_in_flight():
+    monitor = DriftMonitor()
+    monitor.write_started()
+    assert monitor.check({"BAT0": 100}, {"BAT0": 80}, None) == []
+    monitor.write_finished(None)
+    assert actions(monitor.check({"BAT0": 100}, {"BAT0": 80}, None)) == ["queued"]
+
+
+def test_skipped_while_the_cli_lock_is_held():
+    monitor = DriftMonitor()
+    assert monitor.check({"BAT0": 100}, {"BAT0": 80}, None, lock_busy=True) == []
+    assert not monitor.log
+
+
+def test_external_journal_change_is_adopted():
+    monitor = DriftMonitor()
+    previous = monitor.begin_write(80, ["BAT0"])
+    monitor.end_write(80, previous, (80, ["BAT0"]), (1, "BAT0 100"))
+    # Another writer (the CLI) appended to the journal since our write
+    records = monitor.check({"BAT0": 60}, monitor.targets(), (2, "BAT0 80"))
+    assert actions(records) == ["adopted"]
+    assert monitor.targets() == {"BAT0": 60}
+    # The journal is unchanged since: drift from now on is corrected
+    assert actions(monitor.check({"BAT0": 100}, monitor.targets(), (2, "BAT0 80"))) == ["queued"]
+
+
+def test_failed_write_restores_previous_target():
+    monitor = DriftMonitor()
+    monitor.record_target(80, ["BAT0"])
+    previous = monitor.begin_write(60, ["BAT0", "BAT1"])
+    assert monitor.targets() == {"BAT0": 60, "BAT1": 60}
+    monitor.end_write(60, previous, None, None)
+    assert monitor.targets() == {"BAT0": 80}
+    assert monitor.writes_in_flight == 0
+
+
+def sysfs_record(timestamp: float, end_threshold: int) -> TraceRecord:
+    return TraceRecord(timestamp, "BAT0", "sysfs", {
+        "end_threshold": end_threshold,
+        "uevent": {"POWER_SUPPLY_STATUS": "Discharging", "POWER_SUPPLY_CAPACITY": "70"},
+    })
+
+
+def test_manager_reapplies_after_external_drift():
+    clock = VirtualClock(0.0, speed=0)
+    # The firmware resets the threshold to 100% at t=60
+    interface = ReplayCliInterface([sysfs_record(0, 80), sysfs_record(60, 100)], clock)
+    calls = queue.SimpleQueue()
+    with clock.installed():
+        manager = BatteryManager(interface)
+        manager.dispatcher = calls.put
+        try:
+            assert manager.initialize().success
+            assert manager.set_threshold(75).success
+            assert manager.batteries["BAT0"].end_threshold == 75
+
+            clock.sleep(60)
+            manager.refresh_status()
+            assert actions(manager.drift_log) == ["queued"]
+            assert manager.drift_log[-1].observed == 100
+            assert manager.wait_for_writes(timeout=5)
+            assert interface.writes[-1][1:] == ("BAT0", 75)
+
+            # The completion is applied only on the owning thread
+            assert manager.batteries["BAT0"].end_threshold == 100
+            assert manager.check_drift({"BAT0": 100}) == []  # Write not settled yet
+            calls.get_nowait()()
+            assert manager.batteries["BAT0"].end_threshold == 75
+            assert manager.drift.writes_in_flight == 0
+        finally:
+            manager.command_queue.shutdown(wait=True)
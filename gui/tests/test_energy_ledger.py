@@ -0,0 +1,92 @@
+"""Tests for the energy ledger's midnight split, gap bridging and AC sessions."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.core.energy_ledger import DayTotals, EnergyLedger
+
+
+@pytest.fixture(autouse=True)
+def local_time(monkeypatch):
+    """Fixed local zone (UTC+9, no DST) so midnight is 15:00 UTC."""
+    monkeypatch.setenv("TZ", "KST-9")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return EnergyLedger("BAT0", directory=str(tmp_path))
+
+
+def at(day: int, hour: int, minute: int = 0) -> float:
+    """Epoch of a local time in March 2026."""
+    return time.mktime((2026, 3, day, hour, minute, 0, 0, 0, -1))
+
+
+def reading(state: str, rate: float, energy: float, percentage: int = 50):
+    return SimpleNamespace(state=state, energy_rate=rate, energy_current=energy, percentage=percentage)
+
+
+def day_map(ledger: EnergyLedger) -> dict:
+    return {row.day: row for row in ledger.daily(days=3, now=at(3, 12))}
+
+
+def test_interval_is_split_at_local_midnight(ledger):
+    ledger.update(reading("discharging", 10, 30), now=at(1, 23, 55))
+    ledger.update(reading("discharging", 20, 28.5), now=at(2, 0, 5))
+    days = day_map(ledger)
+    # The rate is 15 W at midnight: (10 + 15) / 2 W and (15 + 20) / 2 W for 5 minutes each
+    assert days["2026-03-01"].energy_out == pytest.approx(12.5 / 12)
+    assert days["2026-03-02"].energy_out == pytest.approx(17.5 / 12)
+    assert days["2026-03-01"].discharging_seconds == days["2026-03-02"].discharging_seconds == 300
+    assert ledger.totals().energy_in == 0
+
+
+def test_gap_is_bridged_from_the_energy_change(ledger):
+    ledger.update(reading("discharging", 10, 30), now=at(2, 10))
+    ledger.update(reading("discharging", 10, 29.5), now=at(2, 10, 3))
+    ledger.update(reading("discharging", 12, 20), now=at(2, 13))  # Suspended meanwhile
+    totals = day_map(ledger)["2026-03-02"]
+    assert totals.bridged_out == pytest.approx(9.5)
+    assert totals.energy_out == pytest.approx(0.5 + 9.5)
+    assert totals.observed_seconds == 180  # The gap is not counted as observed
+    assert totals.net == pytest.approx(-10)
+
+
+def test_bridged_gap_is_booked_on_the_day_it_ends(ledger):
+    ledger.update(reading("charging", 20, 20), now=at(1, 22))
+    ledger.update(reading("charging", 20, 45), now=at(2, 8))
+    days = day_map(ledger)
+    assert "2026-03-01" not in days
+    assert days["2026-03-02"] == DayTotals("2026-03-02", energy_in=25, bridged_in=25)
+
+
+def test_ac_session_ends_at_the_last_reading_on_ac_after_a_gap(ledger):
+    ledger.update(reading("discharging", 10, 30, 60), now=at(2, 9))
+    ledger.update(reading("charging", 30, 30, 60), now=at(2, 9, 5))
+    ledger.update(reading("charging", 30, 32.5, 65), now=at(2, 9, 10))
+    ledger.update(reading("fully-charged", 0, 40, 80), now=at(2, 9, 20))
+    ledger.update(reading("discharging", 10, 38, 76), now=at(2, 12))  # Unplugged at some point
+    (session,) = ledger.sessions()
+    assert session.start == int(at(2, 9, 5))
+    assert session.end == int(at(2, 9, 20))
+    assert (session.start_percentage, session.end_percentage) == (60, 80)
+    # 5 minutes at 30 W, then 30 W falling to 0 over 10 minutes
+    assert session.energy_in == pytest.approx(2.5 + 2.5)
+
+
+def test_totals_and_pending_interval_survive_a_restart(ledger, tmp_path):
+    ledger.update(reading("discharging", 12, 30), now=at(2, 10))
+    ledger.update(reading("discharging", 12, 29), now=at(2, 10, 5))
+    ledger.save()
+
+    restored = EnergyLedger("BAT0", directory=str(tmp_path))
+    assert restored.totals() == ledger.totals()
+    restored.update(reading("discharging", 12, 28), now=at(2, 10, 10))
+    assert restored.totals().energy_out == pytest.approx(2.0)
+    assert restored.totals().bridged_out == 0
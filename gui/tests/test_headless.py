@@ -0,0 +1,157 @@
+"""Tests for the headless monitor: serialized sinks, sink formats and the run loop."""
+
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.core.battery_manager import BatteryManager
+from src.core.cli_interface import CliInterface
+from src.core.headless import HeadlessMonitor, JournalSink, SocketSink, StdoutSink, _with_default_command
+
+GUI_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+FAKE_CLI = """#!/bin/sh
+case "$1" in
+status) printf 'Device : BAT0\\n충전 종료: 80%%\\n' ;;
+*) exit 1 ;;
+esac
+"""
+
+
+class OverlapSink:
+    """Sink that yields inside emit() and notes any concurrent call."""
+
+    def __init__(self):
+        self.active = 0
+        self.overlaps = 0
+        self.records = []
+
+    def emit(self, record):
+        self.active += 1
+        if self.active > 1:
+            self.overlaps += 1
+        time.sleep(0.0005)
+        self.records.append(record)
+        self.active -= 1
+
+    def close(self):
+        pass
+
+
+class BrokenSink:
+    def emit(self, record):
+        raise OSError("disk full")
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    script = tmp_path / "bin" / "a14-charge-keeper"
+    script.parent.mkdir()
+    script.write_text(FAKE_CLI)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ.get('PATH', '')}")
+    for name in ("XDG_CONFIG_HOME", "XDG_DATA_HOME", "XDG_CACHE_HOME", "XDG_RUNTIME_DIR"):
+        monkeypatch.setenv(name, str(tmp_path))
+    monkeypatch.setenv("BAT_NAME", "BAT0")
+    return tmp_path
+
+
+def make_monitor(sinks, interval: float = 30.0) -> HeadlessMonitor:
+    cli = CliInterface(use_shared_status=False, use_threshold_engine=False, use_upower_dbus=False)
+    return HeadlessMonitor(BatteryManager(cli), sinks, interval=interval)
+
+
+def test_emits_from_several_threads_are_serialized(env):
+    sink = OverlapSink()
+    monitor = make_monitor([BrokenSink(), sink])
+    threads = [threading.Thread(target=lambda n=n: [monitor.emit({'event': 'test', 'n': n * 10 + i})
+                                                   for i in range(10)])
+               for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sink.overlaps == 0
+    assert sorted(record['n'] for record in sink.records) == list(range(40))
+    monitor.manager.command_queue.shutdown(wait=False)
+
+
+def test_run_emits_samples_until_stopped(env):
+    stream = io.StringIO()
+    monitor = make_monitor([StdoutSink(stream)], interval=0.01)
+    exit_codes = []
+    thread = threading.Thread(target=lambda: exit_codes.append(monitor.run()))
+    thread.start()
+    deadline = time.monotonic() + 10
+    while stream.getvalue().count("\n") < 2:
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+    monitor.stop()
+    thread.join(timeout=10)
+    monitor.close()
+
+    assert exit_codes == [0]
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert records[0]['event'] == 'sample'
+    assert records[0]['batteries']['BAT0']['end_threshold'] == 80
+    assert monitor.stats.samples >= 2
+
+
+def test_journal_sink_sends_one_entry_per_record(tmp_path):
+    path = str(tmp_path / "journal")
+    journal = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    journal.bind(path)
+    sink = JournalSink(path)
+    sink.emit({'event': 'error', 'time': 1.0, 'message': "line one\nline two"})
+    fields = journal.recv(4096).decode('utf-8').splitlines()
+    sink.close()
+    journal.close()
+
+    assert "MESSAGE=error message=line one line two" in fields
+    assert "PRIORITY=4" in fields
+    assert "A14_EVENT=error" in fields
+    assert "A14_MESSAGE=line one line two" in fields
+
+
+def test_socket_sink_drops_closed_clients(tmp_path):
+    sink = SocketSink(str(tmp_path / "monitor.sock"))
+    first, second = (socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) for _ in range(2))
+    first.connect(sink.path)
+    second.connect(sink.path)
+    sink.emit({'event': 'sample', 'n': 1})
+    assert json.loads(first.makefile().readline()) == {'event': 'sample', 'n': 1}
+
+    second.close()
+    for n in range(2, 5):  # A write to the closed peer fails within a few records
+        sink.emit({'event': 'sample', 'n': n})
+    assert len(sink._clients) == 1
+    sink.close()
+    first.close()
+    assert not os.path.exists(sink.path)
+
+
+@pytest.mark.parametrize("argv, expected", [
+    (['--interval', '5'], ['run', '--interval', '5']),
+    (['--stats-file', 'x', '--sink', 'journal'], ['--stats-file', 'x', 'run', '--sink', 'journal']),
+    (['--stats-file=x', 'stats'], ['--stats-file=x', 'stats']),
+    (['--help'], ['--help']),
+])
+def test_run_is_the_default_command(argv, expected):
+    assert _with_default_command(argv, {'run', 'stats'}) == expected
+
+
+def test_headless_import_does_not_load_qt():
+    code = ("import sys, src.core.headless; "
+            "sys.exit(any(name.startswith('PyQt5') for name in sys.modules))")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=GUI_DIR,
+                   env=dict(os.environ, PYTHONPATH=GUI_DIR))
@@ -0,0 +1,91 @@
+"""Tests for the start threshold emulation state machine."""
+
+import pytest
+
+from src.core.hysteresis import CHARGING, HOLDING, HysteresisController
+
+
+def controller(**kwargs) -> HysteresisController:
+    """A 60-80% controller without a write budget unless one is given."""
+    kwargs.setdefault('min_interval', 0)
+    kwargs.setdefault('max_writes_per_hour', 1000)
+    return HysteresisController(60, 80, **kwargs)
+
+
+@pytest.mark.parametrize("start,end", [(19, 80), (80, 80), (90, 80), (60, 101)])
+def test_rejects_invalid_bounds(start, end):
+    with pytest.raises(ValueError):
+        HysteresisController(start, end)
+
+
+def test_first_reading_at_or_below_start_charges():
+    c = controller()
+    assert c.observe(60, 80, 0) is None  # Already at the end threshold
+    assert c.state == CHARGING
+
+
+def test_first_reading_between_bounds_holds():
+    c = controller()
+    assert c.observe(70, 80, 0) == 60
+    assert c.state == HOLDING
+
+
+def test_first_reading_while_charging_runs_to_end():
+    c = controller()
+    assert c.observe(70, 80, 0, charging=True) is None
+    assert c.state == CHARGING
+
+
+def test_full_cycle():
+    c = controller()
+    assert c.observe(50, 60, 0) == 80     # Below start: charge to the end
+    assert c.observe(79, 80, 10) is None  # Still charging
+    assert c.state == CHARGING
+    assert c.observe(80, 80, 20) == 60    # End reached: hold at start
+    assert c.state == HOLDING
+    assert c.observe(65, 60, 30) is None  # Discharging towards start
+    assert c.observe(60, 60, 40) == 80    # Start reached: charge again
+    assert c.state == CHARGING
+    assert c.writes == 3
+
+
+def test_no_write_when_threshold_already_matches():
+    c = controller()
+    c.observe(70, 80, 0)
+    assert c.observe(70, 60, 1) is None
+    assert c.writes == 1
+
+
+def test_unknown_percentage_is_ignored():
+    c = controller()
+    assert c.observe(None, 80, 0) is None
+    assert c.state is None
+
+
+def test_min_interval_defers_and_retries():
+    c = controller(min_interval=60)
+    assert c.observe(50, 60, 0) == 80
+    assert c.observe(80, 80, 30) is None  # Hold decided, write postponed
+    assert c.state == HOLDING
+    assert c.deferred == 1
+    assert c.observe(80, 80, 60) == 60    # Same decision on the next reading
+
+
+def test_hourly_budget():
+    c = controller(max_writes_per_hour=2)
+    assert c.observe(50, 60, 0) == 80
+    assert c.observe(80, 80, 100) == 60
+    assert c.observe(60, 60, 200) is None  # Third write within the hour
+    assert c.deferred == 1
+    assert c.observe(60, 60, 3600) == 80   # First write has left the window
+
+
+def test_retarget_moves_end():
+    c = controller()
+    c.observe(70, 80, 0, charging=True)
+    c.retarget(90)
+    assert c.target == 90
+    assert c.observe(85, 90, 1) is None
+    assert c.state == CHARGING
+    with pytest.raises(ValueError):
+        c.retarget(60)
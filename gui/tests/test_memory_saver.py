@@ -0,0 +1,115 @@
+"""Tests for memory saver mode: releasing idle hidden windows and rebuilding them."""
+
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5 import sip  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+FAKE_CLI = """#!/bin/sh
+case "$1" in
+status) printf 'Device : BAT0\\n충전 종료: 80%%\\n' ;;
+*) exit 1 ;;
+esac
+"""
+
+
+@pytest.fixture
+def app():
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+@pytest.fixture
+def tray(app, tmp_path, monkeypatch):
+    from src.core.battery_manager import BatteryManager
+    from src.core.cli_interface import CliInterface
+    from src.gui.system_tray import SystemTrayApp
+
+    script = tmp_path / "bin" / "a14-charge-keeper"
+    script.parent.mkdir()
+    script.write_text(FAKE_CLI)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ.get('PATH', '')}")
+    for name in ("XDG_CONFIG_HOME", "XDG_DATA_HOME", "XDG_CACHE_HOME", "XDG_RUNTIME_DIR"):
+        monkeypatch.setenv(name, str(tmp_path))
+    monkeypatch.setenv("BAT_NAME", "BAT0")
+
+    manager = BatteryManager(CliInterface(use_shared_status=False, use_threshold_engine=False,
+                                          use_upower_dbus=False))
+    tray = SystemTrayApp(manager)
+    tray.config_manager.set('memory_saver_idle', 60)
+    assert tray.start().success
+    yield tray
+    tray.stop()
+    tray.async_bridge.shutdown()
+    manager.command_queue.shutdown(wait=False)
+
+
+def idle_for(tray, seconds: float, *names: str) -> None:
+    for name in names:
+        tray._window_used[name] = time.monotonic() - seconds
+
+
+def test_only_hidden_windows_idle_long_enough_are_released(app, tray):
+    popup, menu = tray.battery_popup, tray.context_menu
+    idle_for(tray, 30, 'battery_popup')
+    idle_for(tray, 90, 'context_menu')
+    assert tray.release_idle_windows() == ['context_menu']
+    assert sip.isdeleted(menu) and tray.context_menu is None
+    assert tray.battery_popup is popup
+
+    popup.show()
+    idle_for(tray, 90, 'battery_popup')
+    assert tray.release_idle_windows() == []  # Visible
+    popup.hide()
+    assert tray.release_idle_windows(force=True) == ['battery_popup']
+    assert sip.isdeleted(popup)
+
+
+def test_released_windows_are_rebuilt_with_the_current_theme(app, tray):
+    tray.config_manager.set('theme', 'light')
+    tray.release_idle_windows(force=True)
+    assert tray.battery_popup is None
+
+    tray._show_popup()
+    popup = tray.battery_popup
+    assert popup is not None and popup.isVisible()
+    assert popup._current_theme == 'light'
+    assert tray._window_used['battery_popup'] > time.monotonic() - 5
+    popup.hide()
+
+    tray._show_status()
+    assert tray.detail_dialog.isVisible()
+    tray.detail_dialog.hide()
+    assert set(tray.release_idle_windows(force=True)) == {'battery_popup', 'detail_dialog'}
+
+
+def test_parent_of_a_remaining_window_is_kept(app, tray):
+    from src.gui.settings_dialog import SettingsDialog
+
+    tray._show_status()
+    detail = tray.detail_dialog
+    tray.settings_dialog = SettingsDialog(tray.config_manager, detail)
+    tray.settings_dialog.show()
+    detail.hide()
+    assert 'detail_dialog' not in tray.release_idle_windows(force=True)
+    assert not sip.isdeleted(tray.settings_dialog)
+
+    tray.settings_dialog.hide()
+    assert tray.release_idle_windows(force=True) == ['settings_dialog', 'detail_dialog']
+    assert sip.isdeleted(detail)
+
+
+def test_memory_saver_setting_starts_and_stops_the_check(app, tray):
+    assert tray.memory_timer is None or not tray.memory_timer.isActive()
+    tray.config_manager.set('memory_saver', True)
+    tray._apply_memory_saver()
+    assert tray.memory_timer.isActive()
+    tray.config_manager.set('memory_saver', False)
+    tray._apply_memory_saver()
+    assert not tray.memory_timer.isActive()
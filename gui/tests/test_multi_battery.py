@@ -0,0 +1,104 @@
+"""Tests for multi-battery selection and rollback through BatteryManager and CliInterface."""
+
+import os
+
+import pytest
+
+from src.core.battery_manager import BatteryManager
+from src.core.capability_probe import CapabilityRecord
+from src.core.cli_interface import CliInterface
+from src.core.command_queue import CommandQueue
+from src.core.threshold_engine import ThresholdEngine
+
+# Reads and writes $SYS/$BAT_NAME; 'set' fails for $FAIL_BATTERY
+FAKE_CLI = """#!/bin/sh
+file="$SYS/$BAT_NAME/charge_control_end_threshold"
+case "$1" in
+status) printf 'Device : %s\\n충전 종료: %s%%\\n' "$BAT_NAME" "$(cat "$file")" ;;
+set)
+  echo "set $BAT_NAME $2" >> "$SYS/calls"
+  [ "$BAT_NAME" = "$FAIL_BATTERY" ] && { echo "write failed" >&2; exit 5; }
+  echo "$2" > "$file" ;;
+*) exit 1 ;;
+esac
+"""
+
+THRESHOLDS = {"BAT0": 80, "BAT1": 85, "BAT2": 90}
+
+
+@pytest.fixture
+def sysfs(tmp_path, monkeypatch):
+    sys_root = tmp_path / "sys"
+    for name, value in THRESHOLDS.items():
+        (sys_root / name).mkdir(parents=True)
+        (sys_root / name / "charge_control_end_threshold").write_text(f"{value}\n")
+    script = tmp_path / "bin" / "a14-charge-keeper"
+    script.parent.mkdir()
+    script.write_text(FAKE_CLI)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ.get('PATH', '')}")
+    monkeypatch.setenv("SYS", str(sys_root))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("BAT_NAME", "BAT0")
+    return sys_root
+
+
+@pytest.fixture
+def manager(sysfs, monkeypatch):
+    cli = CliInterface(use_shared_status=False, use_threshold_engine=False, use_upower_dbus=False)
+    for name in THRESHOLDS:
+        cli._engines[name] = ThresholdEngine(name, sysfs_root=str(sysfs), backup_dir=None,
+                                             lock_file=None, verify_timeout=0)
+    # The secondary batteries are listed first: the primary still comes first
+    record = CapabilityRecord("key", list(THRESHOLDS), ["BAT2", "BAT1", "BAT0"])
+    monkeypatch.setattr(cli, "get_capabilities", lambda refresh=False: record)
+    manager = BatteryManager(cli)
+    assert manager.initialize().success
+    yield manager
+    manager.command_queue.shutdown(wait=False)
+
+
+def thresholds(sysfs) -> dict:
+    return {name: int((sysfs / name / "charge_control_end_threshold").read_text())
+            for name in THRESHOLDS}
+
+
+def test_discovery_reads_every_battery_with_the_primary_first(manager):
+    assert manager.battery_names == ["BAT0", "BAT2", "BAT1"]
+    assert manager.current_info is manager.batteries["BAT0"]
+    assert {name: info.end_threshold for name, info in manager.batteries.items()} == THRESHOLDS
+
+
+def test_selection_limits_the_write(manager, sysfs):
+    manager.cli_interface.use_threshold_engine = True
+    assert manager.set_threshold(70, ["BAT0", "BAT1"]).success
+    assert thresholds(sysfs) == {"BAT0": 70, "BAT1": 70, "BAT2": 90}
+    assert manager.batteries["BAT1"].end_threshold == 70
+    assert manager.batteries["BAT2"].end_threshold == 90
+    assert manager.selection(["BAT0"]) is None  # Primary alone keeps the single-battery path
+
+
+def test_engine_failure_rolls_back_the_other_batteries(manager, sysfs):
+    manager.cli_interface.use_threshold_engine = True
+    manager.cli_interface._engines["BAT2"]._write = lambda value: None  # Firmware ignores writes
+    result = manager.set_threshold(70)
+    assert not result.success
+    assert "BAT2" in result.error_message and "롤백 완료" in result.error_message
+    assert thresholds(sysfs) == THRESHOLDS
+
+
+def test_cli_fallback_undoes_earlier_batteries(manager, sysfs, monkeypatch):
+    monkeypatch.setenv("FAIL_BATTERY", "BAT1")
+    result = manager.set_threshold(70, ["BAT0", "BAT2", "BAT1"])
+    assert not result.success
+    assert "BAT1" in result.error_message and "롤백: BAT0, BAT2" in result.error_message
+    assert thresholds(sysfs) == THRESHOLDS
+    assert (sysfs / "calls").read_text().splitlines() == [
+        "set BAT0 70", "set BAT2 70", "set BAT1 70", "set BAT2 90", "set BAT0 80"]
+
+
+def test_queue_coalesces_only_covering_selections():
+    assert CommandQueue._covers(("BAT0", "BAT1"), ("BAT1",))
+    assert not CommandQueue._covers(("BAT1",), ("BAT0", "BAT1"))
+    assert not CommandQueue._covers(("BAT0", "BAT1"), None)
+    assert CommandQueue._covers(None, None)
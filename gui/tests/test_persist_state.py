@@ -0,0 +1,126 @@
+"""Tests for the persisted threshold state file, shared by the CLI's static unit and the GUI."""
+
+import os
+import subprocess
+
+import pytest
+
+from src.core.cli_interface import CliInterface
+from src.core.persist_state import PersistState
+from src.core.threshold_engine import ThresholdEngine
+
+CLI = os.path.join(os.path.dirname(__file__), "..", "..", "cli", "a14-charge-keeper")
+
+# Lock and hardware checks are not under test; systemctl calls are only recorded
+STUBS = """
+acquire_lock() { :; }
+check_hardware_conflicts() { :; }
+safe_set_threshold() { echo "$1" > "$END_FILE"; }
+logger() { :; }
+systemctl() { echo "$*" >> "$ROOT/systemctl.log"; }
+"""
+
+
+@pytest.fixture
+def root(tmp_path):
+    battery = tmp_path / "sys" / "BAT0"
+    battery.mkdir(parents=True)
+    (battery / "charge_control_end_threshold").write_text("100\n")
+    (tmp_path / "hooks").mkdir()
+    return tmp_path
+
+
+def paths(root) -> dict:
+    return {
+        "STATE_DIR": root / "etc",
+        "STATE_FILE": root / "etc" / "persist.conf",
+        "SERVICE_FILE": root / "a14-charge-keeper.service",
+        "SLEEP_HOOK": root / "hooks" / "a14-charge-keeper",
+        "BACKUP_DIR": root / "backup",
+        "BAT_DIR": root / "sys",
+        "END_FILE": root / "sys" / "BAT0" / "charge_control_end_threshold",
+    }
+
+
+def run_cli(root, *commands: str) -> subprocess.CompletedProcess:
+    """Run CLI shell functions against files under root."""
+    settings = "; ".join(f'{name}="{path}"' for name, path in paths(root).items())
+    script = (f'source <(sed "/^# 메인 로직/,\\$d" "{CLI}"); {settings}; ROOT="{root}"\n{STUBS}\n'
+              + "; ".join(commands))
+    return subprocess.run(["bash", "-c", f'set -euo pipefail; {script}'], check=True,
+                          cwd=root, env=dict(os.environ, BAT_NAME="BAT0"),
+                          capture_output=True, text=True)
+
+
+def state(root) -> PersistState:
+    files = paths(root)
+    return PersistState(str(files["STATE_FILE"]), str(files["SERVICE_FILE"]), str(files["SLEEP_HOOK"]))
+
+
+def systemctl_calls(root) -> list:
+    log = root / "systemctl.log"
+    return log.read_text().splitlines() if log.exists() else []
+
+
+def test_units_are_installed_once_and_later_values_only_replace_the_state(root):
+    run_cli(root, "install_persist 80")
+    assert state(root).units_installed()
+    assert state(root).read() == ("BAT0", 80)
+    assert (paths(root)["END_FILE"]).read_text().strip() == "80"
+    installed = systemctl_calls(root)
+    assert "daemon-reload" in installed
+
+    unit = paths(root)["SERVICE_FILE"].read_text()
+    run_cli(root, "install_persist 70")
+    assert state(root).read() == ("BAT0", 70)
+    assert paths(root)["SERVICE_FILE"].read_text() == unit  # No value in the unit
+    assert systemctl_calls(root) == installed  # No daemon-reload for a new value
+
+
+def test_cli_applies_the_state_the_gui_writes(root):
+    run_cli(root, "install_persist 80")
+    state(root).write("BAT0", 65)
+    run_cli(root, "apply_persisted")
+    assert paths(root)["END_FILE"].read_text().strip() == "65"
+
+
+def test_clear_keeps_the_static_units_but_drops_the_state(root):
+    run_cli(root, "install_persist 80")
+    run_cli(root, "clear_limit")
+    assert state(root).read() is None
+    assert state(root).units_installed()
+    assert paths(root)["END_FILE"].read_text().strip() == "100"
+    # With no state file the boot service and sleep hook do nothing
+    run_cli(root, "apply_persisted")
+    assert paths(root)["END_FILE"].read_text().strip() == "100"
+
+
+def test_clear_removes_a_unit_from_an_older_version(root):
+    paths(root)["SERVICE_FILE"].write_text("[Service]\nExecStart=/bin/sh -c 'echo 80 > x'\n")
+    run_cli(root, "clear_limit")
+    assert not paths(root)["SERVICE_FILE"].exists()
+
+
+def test_uninstall_removes_units_state_and_backups(root):
+    run_cli(root, "install_persist 80")
+    paths(root)["BACKUP_DIR"].mkdir()
+    run_cli(root, "uninstall_all")
+    files = paths(root)
+    for name in ("STATE_DIR", "SERVICE_FILE", "SLEEP_HOOK", "BACKUP_DIR"):
+        assert not files[name].exists(), name
+    assert f"disable {files['SERVICE_FILE'].name}" in systemctl_calls(root)
+
+
+def test_gui_persists_without_the_cli_once_the_units_are_installed(root, monkeypatch):
+    run_cli(root, "install_persist 80")
+    monkeypatch.setenv("PATH", str(root / "empty"))  # No CLI to fall back to
+    monkeypatch.setenv("XDG_CACHE_HOME", str(root))
+    cli = CliInterface(use_shared_status=False, use_upower_dbus=False)
+    cli.persist_state = state(root)
+    cli.threshold_engine = ThresholdEngine("BAT0", sysfs_root=str(root / "sys"), backup_dir=None,
+                                           lock_file=None, verify_timeout=0)
+
+    assert cli.persist_threshold(60).success
+    assert state(root).read() == ("BAT0", 60)
+    assert paths(root)["END_FILE"].read_text().strip() == "60"
+    assert cli.spawn_count == 0
@@ -0,0 +1,87 @@
+"""Tests for trace replay into BatteryManager on the virtual clock."""
+
+import json
+
+import pytest
+
+from src.core.replay import TraceRecord, VirtualClock, load_trace, replay
+
+START = 1792288800.0
+STEP = 30.0
+
+# Report fields measured with the real clock
+TIMING_FIELDS = ("wall_seconds", "refresh_us", "refresh_p95_us", "parse_us", "dispatch_us")
+
+
+def uevent(status: str, capacity: int, power_w: float) -> dict:
+    return {
+        "POWER_SUPPLY_STATUS": status,
+        "POWER_SUPPLY_CAPACITY": str(capacity),
+        "POWER_SUPPLY_ENERGY_NOW": str(capacity * 700000),
+        "POWER_SUPPLY_ENERGY_FULL": "70000000",
+        "POWER_SUPPLY_ENERGY_FULL_DESIGN": "73000000",
+        "POWER_SUPPLY_POWER_NOW": str(int(power_w * 1e6)),
+    }
+
+
+def two_hour_trace() -> list:
+    """Discharging at 8 W; the firmware resets the threshold to 100% after an hour."""
+    records = []
+    for step in range(241):
+        recorded = 80 if step < 120 else 100
+        capacity = 80 - step // 10
+        records.append(TraceRecord(START + step * STEP, "BAT0", "sysfs",
+                                   {"end_threshold": recorded, "start_threshold": None,
+                                    "uevent": uevent("Discharging", capacity, 8.0)}))
+    return records
+
+
+def behaviour(report) -> dict:
+    return {field: value for field, value in report._asdict().items() if field not in TIMING_FIELDS}
+
+
+@pytest.fixture(scope="module")
+def report():
+    return replay(two_hour_trace(), speed=0, target=75)
+
+
+def test_replay_applies_the_target_and_restores_it_after_drift(report):
+    assert report.virtual_seconds == 240 * STEP
+    assert report.refreshes == 241  # initialize plus one per interval
+    assert report.refresh_failures == 0
+    assert report.drift_records == 1
+    assert report.writes == 2  # The target, then the re-apply after the reset
+    assert report.final["end_threshold"] == 75
+    assert report.final["percentage"] == 56
+    assert report.events == {"threshold_changed": 2, "threshold_drift": 1}
+    assert report.final["time_to_empty_estimate"] == pytest.approx(39.2 / 8 * 3600)
+
+
+def test_replay_is_deterministic(report):
+    assert behaviour(replay(two_hour_trace(), speed=0, target=75)) == behaviour(report)
+
+
+def test_without_a_target_the_recorded_values_are_followed():
+    report = replay(two_hour_trace(), speed=0)
+    assert report.writes == 0 and report.drift_records == 0
+    assert report.final["end_threshold"] == 100
+
+
+def test_trace_file_round_trip(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    with open(path, "w") as f:
+        for record in reversed(two_hour_trace()[:3]):
+            f.write(json.dumps({"t": record.timestamp, "battery": record.battery,
+                                "kind": record.kind, **record.data}) + "\n")
+        f.write("not json\n")
+        f.write(json.dumps({"t": START, "battery": "BAT0", "kind": "unknown"}) + "\n")
+    records = load_trace(str(path))
+    assert [record.timestamp for record in records] == [START, START + STEP, START + 2 * STEP]
+    assert records[0].data["end_threshold"] == 80
+
+
+def test_virtual_clock_advances_only_on_sleep():
+    clock = VirtualClock(START, speed=0)
+    clock.sleep(90)
+    clock.sleep(-5)
+    assert (clock.time(), clock.monotonic()) == (START + 90, 90)
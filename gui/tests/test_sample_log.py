@@ -0,0 +1,98 @@
+"""Tests for the UPower history importer's resumable offsets."""
+
+import os
+
+import pytest
+
+from src.core.sample_log import SampleLog, UPowerHistoryImporter, upower_history_id
+
+HISTORY_ID = "5B10W51867-52-1234"
+
+
+def history_line(timestamp: int, value: float = 50.0, state: str = "discharging") -> str:
+    return f"{timestamp}\t{value:.3f}\t{state}\n"
+
+
+@pytest.fixture
+def history(tmp_path):
+    directory = tmp_path / "upower"
+    directory.mkdir()
+    path = directory / f"history-charge-{HISTORY_ID}.dat"
+    path.write_text("".join(history_line(1000 + i, 90 - i) for i in range(5)))
+    return path
+
+
+def importer(tmp_path) -> UPowerHistoryImporter:
+    """New importer each time: its offsets come from the state file alone."""
+    return UPowerHistoryImporter(SampleLog(str(tmp_path / "samples")), str(tmp_path / "upower"))
+
+
+def device_for_id(history_id: str):
+    return "BAT0" if history_id == HISTORY_ID else None
+
+
+def timestamps(tmp_path) -> list:
+    return [s.timestamp for s in SampleLog(str(tmp_path / "samples")).iter_samples("BAT0")]
+
+
+def test_import_resumes_at_the_saved_offset(tmp_path, history):
+    assert importer(tmp_path).import_all(device_for_id, max_lines=3) == 3
+    assert importer(tmp_path).import_all(device_for_id) == 2
+    assert importer(tmp_path).import_all(device_for_id) == 0
+    assert timestamps(tmp_path) == [1000, 1001, 1002, 1003, 1004]
+
+
+def test_partial_last_line_waits_for_its_newline(tmp_path, history):
+    with open(history, 'a') as f:
+        f.write("1005\t85.0")  # UPower is still writing
+    assert importer(tmp_path).import_all(device_for_id) == 5
+    with open(history, 'a') as f:
+        f.write("00\tdischarging\n")
+    assert importer(tmp_path).import_all(device_for_id) == 1
+    assert timestamps(tmp_path)[-1] == 1005
+
+
+@pytest.mark.parametrize("rewrite", ["replaced", "shortened"])
+def test_rewritten_file_is_rescanned_without_duplicates(tmp_path, history, rewrite):
+    assert importer(tmp_path).import_all(device_for_id) == 5
+    lines = "".join(history_line(1003 + i) for i in range(3))  # Two old, one new
+    if rewrite == "replaced":
+        new = history.with_suffix(".new")
+        new.write_text(lines)
+        os.replace(new, history)
+    else:
+        history.write_text(lines)
+    assert importer(tmp_path).import_all(device_for_id) == 1
+    assert timestamps(tmp_path) == [1000, 1001, 1002, 1003, 1004, 1005]
+
+
+def test_interrupted_import_continues_after_the_last_written_batch(tmp_path, history, monkeypatch):
+    monkeypatch.setattr(UPowerHistoryImporter, "BATCH_LINES", 2)
+    first = importer(tmp_path)
+    append = first.sample_log.append
+    calls = []
+
+    def append_then_fail(device, samples):
+        calls.append(len(samples))
+        if len(calls) > 1:
+            raise OSError("disk full")
+        return append(device, samples)
+
+    first.sample_log.append = append_then_fail
+    assert first.import_all(device_for_id) == 0  # The error is reported, not raised
+    assert timestamps(tmp_path) == [1000, 1001]
+
+    assert importer(tmp_path).import_all(device_for_id) == 3
+    assert timestamps(tmp_path) == [1000, 1001, 1002, 1003, 1004]
+
+
+def test_other_devices_are_skipped(tmp_path, history):
+    (history.parent / "history-charge-mouse.dat").write_text(history_line(1000))
+    (history.parent / f"history-time-full-{HISTORY_ID}.dat").write_text(history_line(1000))
+    assert importer(tmp_path).import_all(device_for_id) == 5
+    assert sorted(os.listdir(tmp_path / "samples")) == ["BAT0.tsv", "upower-import.json"]
+
+
+def test_history_id_matches_upower():
+    assert upower_history_id("5B10W51867", 52.9, "1234") == HISTORY_ID  # Whole Wh, as UPower
+    assert upower_history_id("Model X/2", None, "") == "Model_X_2"
@@ -0,0 +1,175 @@
+"""Tests for the shared status seqlock, its staleness checks and the CLI fallback."""
+
+import os
+import time
+
+import pytest
+
+from src.core import shared_status
+from src.core.cli_interface import CliInterface
+from src.core.shared_status import SEQ, SEQ_OFFSET, SharedStatusReader, SharedStatusWriter
+from src.core.snapshots import BatteryInfoSnapshot
+from src.core.threshold_engine import ThresholdEngine
+
+FAKE_CLI = """#!/bin/sh
+case "$1" in
+status) printf 'Device : BAT0\\n충전 종료: 75%%\\n' ;;
+*) exit 1 ;;
+esac
+"""
+
+
+def snapshot(end_threshold: int = 80) -> BatteryInfoSnapshot:
+    return BatteryInfoSnapshot(device="BAT0", end_threshold=end_threshold, percentage=64,
+                               state="discharging")
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = SharedStatusWriter(str(tmp_path / "status"), interval=30)
+    yield writer
+    writer.close()
+
+
+def test_torn_read_is_retried_with_backoff(writer):
+    writer.publish(snapshot())
+    # The producer is mid-update: odd sequence number
+    SEQ.pack_into(writer._map, SEQ_OFFSET, writer._seq + 1)
+    delays = []
+
+    def finish_update_on_third_sleep(delay):
+        delays.append(delay)
+        if len(delays) == 3:
+            SEQ.pack_into(writer._map, SEQ_OFFSET, writer._seq + 2)
+
+    reader = SharedStatusReader(writer.path, sleep=finish_update_on_third_sleep)
+    result = reader.read()
+    assert result is not None and result[0].end_threshold == 80
+    assert delays == [0.00005, 0.0001, 0.0002]
+
+
+def test_stuck_producer_gives_up_within_the_bound(writer):
+    writer.publish(snapshot())
+    SEQ.pack_into(writer._map, SEQ_OFFSET, writer._seq + 1)
+    delays = []
+    reader = SharedStatusReader(writer.path, sleep=delays.append)
+    assert reader.read() is None
+    assert len(delays) == SharedStatusReader.MAX_RETRIES - 1
+    assert max(delays) == SharedStatusReader.RETRY_DELAY_MAX
+    assert sum(delays) < 0.015
+
+
+def test_fresh_reads_do_not_stat(writer, monkeypatch):
+    writer.publish(snapshot())
+    reader = SharedStatusReader(writer.path)
+    assert reader.read_fresh() is not None
+
+    def no_stat(path):
+        raise AssertionError("stat() on a fresh read")
+    monkeypatch.setattr(shared_status.os, "stat", no_stat)
+    for _ in range(3):
+        assert reader.read_fresh().end_threshold == 80
+
+
+def test_replaced_file_is_remapped_once_stale(tmp_path):
+    path = str(tmp_path / "status")
+    first = SharedStatusWriter(path)
+    first.publish(snapshot(80), timestamp=time.time() - 600)
+    reader = SharedStatusReader(path)
+    assert reader.read_fresh() is None
+    first.close()
+
+    # A new producer after the old one died and its file was removed
+    os.unlink(path)
+    second = SharedStatusWriter(path)
+    second.publish(snapshot(70))
+    assert reader.read_fresh().end_threshold == 70
+    second.close()
+
+
+def test_second_producer_is_refused(writer):
+    with pytest.raises(BlockingIOError):
+        SharedStatusWriter(writer.path)
+
+
+@pytest.fixture
+def cli(tmp_path, monkeypatch):
+    script = tmp_path / "bin" / "a14-charge-keeper"
+    script.parent.mkdir()
+    script.write_text(FAKE_CLI)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ.get('PATH', '')}")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("BAT_NAME", "BAT0")
+    battery = tmp_path / "sys" / "BAT0"
+    battery.mkdir(parents=True)
+    (battery / "charge_control_end_threshold").write_text("80\n")
+
+    cli = CliInterface(shared_status_path=str(tmp_path / "status"), use_upower_dbus=False)
+    cli.threshold_engine = cli._engines["BAT0"] = ThresholdEngine(
+        "BAT0", sysfs_root=str(tmp_path / "sys"), backup_dir=None, lock_file=None,
+        verify_timeout=0)
+    return cli
+
+
+def test_stale_snapshot_falls_back_to_the_cli(cli, tmp_path):
+    writer = SharedStatusWriter(str(tmp_path / "status"), interval=30)
+    writer.publish(snapshot(80))
+    assert cli.get_status().data.end_threshold == 80
+    assert cli.spawn_count == 0
+
+    writer.publish(snapshot(80), timestamp=time.time() - 600)  # The producer stopped
+    assert cli.get_status().data.end_threshold == 75
+    assert cli.spawn_count == 1
+    writer.close()
+
+
+def test_only_successful_writes_skip_older_snapshots(cli, tmp_path):
+    writer = SharedStatusWriter(str(tmp_path / "status"), interval=30)
+    writer.publish(snapshot(80))
+
+    assert not cli.set_threshold(5).success
+    assert cli.get_status().data.end_threshold == 80  # Snapshot still valid
+    assert cli.spawn_count == 0
+
+    assert cli.set_threshold(70).success
+    assert cli.get_status().data.end_threshold == 75  # Snapshot predates the write
+    assert cli.spawn_count == 1
+    writer.close()
+
+
+def test_tray_publishes_each_refresh(tmp_path, monkeypatch):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    import sys
+    from PyQt5.QtWidgets import QApplication
+    from src.core.battery_manager import BatteryManager
+    from src.gui.system_tray import SystemTrayApp
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    script = tmp_path / "bin" / "a14-charge-keeper"
+    script.parent.mkdir()
+    script.write_text(FAKE_CLI)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ.get('PATH', '')}")
+    for name in ("XDG_CONFIG_HOME", "XDG_DATA_HOME", "XDG_CACHE_HOME", "XDG_RUNTIME_DIR"):
+        monkeypatch.setenv(name, str(tmp_path))
+    monkeypatch.setenv("BAT_NAME", "BAT0")
+
+    path = str(tmp_path / "status")
+    cli = CliInterface(shared_status_path=path, use_threshold_engine=False, use_upower_dbus=False)
+    manager = BatteryManager(cli)
+    tray = SystemTrayApp(manager)
+    try:
+        assert tray.start().success
+        assert cli.status_reader is None and manager.status_writer is not None
+        deadline = time.monotonic() + 10
+        while manager.refresh_count == 0:
+            assert time.monotonic() < deadline, "timed out"
+            app.processEvents()
+            time.sleep(0.001)
+        assert SharedStatusReader(path).read_fresh().end_threshold == 75
+    finally:
+        tray.stop()
+        tray.async_bridge.shutdown()
+        manager.command_queue.shutdown(wait=False)
+    assert manager.status_writer is None
@@ -0,0 +1,94 @@
+"""Tests for the single-instance lock, its directory check and request hand-off."""
+
+import json
+import os
+import socket
+import threading
+import time
+
+import pytest
+
+from src.utils.single_instance import SingleInstance, parse_intent
+
+
+@pytest.fixture
+def instance(tmp_path):
+    primary = SingleInstance(str(tmp_path / "run"))
+    assert primary.acquire()
+    yield primary
+    primary.close()
+
+
+def connect(instance: SingleInstance) -> socket.socket:
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(2)
+    client.connect(instance.socket_path)
+    return client
+
+
+def test_second_instance_is_not_primary(tmp_path, instance):
+    assert not SingleInstance(instance.directory).acquire()
+
+
+@pytest.mark.parametrize("mode", [0o755, 0o711])
+def test_directory_accessible_to_others_is_refused(tmp_path, mode):
+    directory = tmp_path / "run"
+    directory.mkdir()
+    directory.chmod(mode)
+    with pytest.raises(PermissionError):
+        SingleInstance(str(directory)).acquire()
+
+
+def test_symlinked_directory_is_refused(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir(mode=0o700)
+    os.symlink(target, tmp_path / "run")
+    with pytest.raises(PermissionError):
+        SingleInstance(str(tmp_path / "run")).acquire()
+    assert not os.listdir(target)
+
+
+def test_forwarded_intent_is_acknowledged(instance):
+    replies = []
+    sender = threading.Thread(target=lambda: replies.append(
+        SingleInstance(instance.directory).forward(parse_intent(["--set", "70"]))))
+    sender.start()
+    intents = []
+    deadline = time.monotonic() + 2
+    while not intents and time.monotonic() < deadline:
+        intents = instance.read_requests()
+        time.sleep(0.01)
+    sender.join()
+    assert intents == [{"action": "set", "value": 70}]
+    assert replies[0]["ok"] and replies[0]["pid"] == os.getpid()
+
+
+def test_partial_request_does_not_block(instance):
+    with connect(instance) as client:
+        client.sendall(b'{"action": "pop')
+        started = time.monotonic()
+        assert instance.read_requests() == []
+        assert time.monotonic() - started < 0.1
+        assert len(instance.watched_filenos()) == 2  # Still waiting for the rest
+
+        client.sendall(b'up", "value": null}\n')
+        time.sleep(0.05)
+        assert instance.read_requests() == [{"action": "popup", "value": None}]
+        assert json.loads(client.makefile('rb').readline())["ok"]
+    assert instance.watched_filenos() == [instance.fileno()]
+
+
+def test_invalid_and_abandoned_requests_are_answered(instance):
+    with connect(instance) as bad:
+        bad.sendall(b'{"action": "format"}\n')
+        time.sleep(0.05)
+        assert instance.read_requests() == []
+        assert json.loads(bad.makefile('rb').readline()) == {"ok": False, "error": "unknown request"}
+
+    silent = connect(instance)
+    instance.READ_TIMEOUT = -1
+    time.sleep(0.01)
+    assert instance.read_requests() == []
+    assert b"timed out" in silent.makefile('rb').readline()
+    silent.close()
+    assert instance.watched_filenos() == [instance.fileno()]
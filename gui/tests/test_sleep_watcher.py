@@ -0,0 +1,139 @@
+"""Tests for the suspend/resume path: inhibitor, paused timers and restored thresholds."""
+
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEventLoop  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from src.core.threshold_engine import ThresholdEngine  # noqa: E402
+from src.gui.sleep_watcher import SleepWatcher  # noqa: E402
+
+FAKE_CLI = """#!/bin/sh
+case "$1" in
+status) printf 'Device : BAT0\\n충전 종료: %s%%\\n' "$(cat {threshold})" ;;
+set) echo "$2" > {threshold} ;;
+*) exit 1 ;;
+esac
+"""
+
+
+class FakeInhibitor:
+    """Stands in for logind's Inhibit: a pipe whose read end is the inhibitor."""
+
+    def __init__(self):
+        self.taken = 0
+        self.write_ends = []
+
+    def __call__(self) -> int:
+        self.taken += 1
+        read_end, write_end = os.pipe()
+        self.write_ends.append(write_end)
+        return read_end
+
+    def released(self, index: int) -> bool:
+        """Whether the index-th inhibitor's descriptor was closed."""
+        try:
+            os.write(self.write_ends[index], b"x")
+            return False
+        except BrokenPipeError:
+            return True
+
+
+@pytest.fixture
+def app():
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+def test_inhibitor_is_released_after_the_suspending_handlers(app, monkeypatch):
+    inhibitor = FakeInhibitor()
+    watcher = SleepWatcher()
+    monkeypatch.setattr(watcher, "_inhibit", inhibitor)
+    watcher._take_inhibitor()
+
+    seen = []
+    watcher.suspending.connect(lambda: seen.append(("suspending", watcher.inhibited)))
+    watcher.resumed.connect(lambda: seen.append(("resumed", watcher.inhibited)))
+
+    watcher._on_prepare_for_sleep(True)
+    assert inhibitor.released(0) and not watcher.inhibited
+    watcher._on_prepare_for_sleep(False)
+    assert seen == [("suspending", True), ("resumed", True)]
+    assert inhibitor.taken == 2
+
+    watcher.stop()
+    assert inhibitor.released(1)
+
+
+@pytest.fixture
+def tray(app, tmp_path, monkeypatch):
+    from src.core.battery_manager import BatteryManager
+    from src.core.cli_interface import CliInterface
+    from src.gui.system_tray import SystemTrayApp
+
+    # A fake CLI whose "sysfs" threshold is a plain file
+    battery = tmp_path / "sys" / "BAT0"
+    battery.mkdir(parents=True)
+    threshold = battery / "charge_control_end_threshold"
+    threshold.write_text("80\n")
+    script = tmp_path / "bin" / "a14-charge-keeper"
+    script.parent.mkdir()
+    script.write_text(FAKE_CLI.format(threshold=threshold))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}:{os.environ.get('PATH', '')}")
+    for name in ("XDG_CONFIG_HOME", "XDG_DATA_HOME", "XDG_CACHE_HOME", "XDG_RUNTIME_DIR"):
+        monkeypatch.setenv(name, str(tmp_path))
+    monkeypatch.setenv("BAT_NAME", "BAT0")
+
+    cli = CliInterface(use_shared_status=False, use_threshold_engine=False, use_upower_dbus=False)
+    cli._engines["BAT0"] = ThresholdEngine("BAT0", sysfs_root=str(tmp_path / "sys"),
+                                           backup_dir=None, lock_file=None)
+    manager = BatteryManager(cli)
+    tray = SystemTrayApp(manager)
+    tray.config_manager.set('memory_saver', True)
+    assert tray.start().success
+    wait_until(app, lambda: manager.refresh_count > 0)
+    tray.threshold = threshold
+    yield tray
+    tray.stop()
+    tray.async_bridge.shutdown()
+    manager.command_queue.shutdown(wait=False)
+
+
+def wait_until(app, condition, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents(QEventLoop.AllEvents, 5)
+        time.sleep(0.001)
+
+
+def test_suspend_pauses_the_tray_and_resume_restores_a_lost_threshold(app, tray, monkeypatch):
+    manager = tray.battery_manager
+    inhibitor = FakeInhibitor()
+    monkeypatch.setattr(tray.sleep_watcher, "_inhibit", inhibitor)
+    tray.sleep_watcher._take_inhibitor()
+    assert manager.batteries["BAT0"].end_threshold == 80
+    assert tray.refresh_timer.isActive() and tray.memory_timer.isActive()
+
+    tray.sleep_watcher._on_prepare_for_sleep(True)
+    assert manager.suspended
+    assert not tray.refresh_timer.isActive()
+    assert not tray.memory_timer.isActive()
+    assert inhibitor.released(0)
+
+    # The firmware forgot the threshold while asleep
+    tray.threshold.write_text("100\n")
+    refreshes = manager.refresh_count
+    tray.sleep_watcher._on_prepare_for_sleep(False)
+    assert not manager.suspended and tray.sleep_watcher.inhibited
+    assert tray.refresh_timer.isActive() and tray.memory_timer.isActive()
+
+    wait_until(app, lambda: manager.refresh_count > refreshes)
+    assert tray.threshold.read_text().strip() == "80"
+    assert manager.batteries["BAT0"].end_threshold == 80
@@ -0,0 +1,53 @@
+"""Tests for the snapshot types and the columnar history buffer."""
+
+import pytest
+
+from src.core.snapshots import BatteryEventSnapshot, BatteryInfoSnapshot, SnapshotHistory
+
+
+def make_snapshot(i: int, **fields) -> BatteryInfoSnapshot:
+    """A populated snapshot whose values depend on i."""
+    values = dict(device="BAT0", end_threshold=80, backup_count=3, vendor="ASUSTeK",
+                  state="discharging", percentage=50 + i, energy_current=30.0 + i,
+                  energy_full=70.1, voltage=15.8, charge_cycles=120, time_to_empty="3.1 hours",
+                  time_to_limit=1800.0 + i, time_to_empty_estimate=11000.0 + i)
+    values.update(fields)
+    return BatteryInfoSnapshot(**values)
+
+
+def test_history_stores_every_field():
+    columns = (SnapshotHistory.INT_FIELDS + SnapshotHistory.FLOAT_FIELDS
+               + SnapshotHistory.STRING_FIELDS)
+    assert sorted(columns) == sorted(BatteryInfoSnapshot._fields)
+
+
+def test_round_trip():
+    history = SnapshotHistory(capacity=4)
+    stored = [make_snapshot(0), make_snapshot(1, time_to_limit=None, state=None, percentage=None)]
+    for i, snapshot in enumerate(stored):
+        history.append(snapshot, timestamp=float(i))
+    assert list(history) == stored
+    assert history.timestamp(-1) == 1.0
+
+
+def test_ring_buffer_overwrites_oldest():
+    history = SnapshotHistory(capacity=3)
+    for i in range(5):
+        history.append(make_snapshot(i), timestamp=float(i))
+    assert len(history) == 3
+    assert history.get(0).percentage == 52
+    assert list(history.column('timestamp')) == [2.0, 3.0, 4.0]
+    assert list(history.column('time_to_limit')) == [1802.0, 1803.0, 1804.0]
+    with pytest.raises(IndexError):
+        history.get(3)
+    with pytest.raises(KeyError):
+        history.column('state')
+
+
+def test_event_snapshot_data_is_read_only():
+    data = {"old": 80, "new": 75}
+    snapshot = BatteryEventSnapshot.create("threshold_changed", data, timestamp=1.0)
+    data["new"] = 60
+    assert snapshot.data == {"old": 80, "new": 75}
+    with pytest.raises(TypeError):
+        snapshot.data["new"] = 60
@@ -0,0 +1,251 @@
+"""Tests for the sysfs threshold engine against a fake power_supply tree."""
+
+import fcntl
+import os
+
+import pytest
+
+from src.core.threshold_engine import ThresholdEngine, set_thresholds
+
+
+class FakeClock:
+    """Monotonic clock advanced only by sleep(); records the delays."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+        self.on_sleep = None
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+        if self.on_sleep:
+            self.on_sleep(len(self.sleeps))
+
+
+def make_battery(root, name: str, value: int) -> None:
+    """Create a battery directory with an end threshold attribute."""
+    os.makedirs(os.path.join(root, name))
+    with open(os.path.join(root, name, "charge_control_end_threshold"), 'w') as f:
+        f.write(f"{value}\n")
+
+
+def make_engine(tmp_path, name: str = "BAT0", clock: FakeClock = None) -> ThresholdEngine:
+    """Engine on the fake tree with its own backup directory and lock file."""
+    clock = clock or FakeClock()
+    return ThresholdEngine(battery=name, sysfs_root=str(tmp_path / "sys"),
+                           backup_dir=str(tmp_path / "backup"), lock_file=str(tmp_path / "lock"),
+                           sleep=clock.sleep, clock=clock)
+
+
+def reject_writes(engine: ThresholdEngine, except_value: int) -> list:
+    """Make the attribute ignore every write except except_value (firmware refusal).
+
+    Returns:
+        The values the engine tried to write
+    """
+    attempts = []
+    write = engine._write
+
+    def fake_write(value):
+        attempts.append(value)
+        if value == except_value:
+            write(value)
+
+    engine._write = fake_write
+    return attempts
+
+
+@pytest.fixture
+def sysfs(tmp_path):
+    """Fake power_supply root with BAT0 at 80%."""
+    root = tmp_path / "sys"
+    make_battery(str(root), "BAT0", 80)
+    (tmp_path / "backup").mkdir()
+    return root
+
+
+def test_set_changes_and_backs_up(tmp_path, sysfs):
+    engine = make_engine(tmp_path)
+    result = engine.set_threshold(60)
+    assert result.success
+    assert (result.data.previous, result.data.value, result.data.changed) == (80, 60, True)
+    assert engine.read_threshold() == 60
+    assert engine.journal.last_value("BAT0") == 80
+
+
+def test_noop_skips_write_and_backup(tmp_path, sysfs):
+    engine = make_engine(tmp_path)
+    attempts = reject_writes(engine, except_value=-1)
+    result = engine.set_threshold(80)
+    assert result.success
+    assert not result.data.changed
+    assert attempts == []
+    assert engine.journal.count() == 0
+
+
+@pytest.mark.parametrize("value", [19, 101, "80"])
+def test_rejects_out_of_range(tmp_path, sysfs, value):
+    result = make_engine(tmp_path).set_threshold(value)
+    assert not result.success
+
+
+def test_unsupported_battery(tmp_path, sysfs):
+    result = make_engine(tmp_path, name="BAT9").set_threshold(60)
+    assert not result.success
+    assert result.exit_code == 2
+
+
+def test_verify_polls_with_bounded_backoff(tmp_path, sysfs):
+    clock = FakeClock()
+    engine = make_engine(tmp_path, clock=clock)
+    reject_writes(engine, except_value=-1)
+    path = engine.end_file
+
+    def settle(polls):
+        if polls == 4:  # The driver applies the value late
+            with open(path, 'w') as f:
+                f.write("60\n")
+
+    clock.on_sleep = settle
+    result = engine.set_threshold(60)
+    assert result.success
+    assert clock.sleeps == [0.002, 0.004, 0.008, 0.016]
+
+
+def test_verify_timeout_rolls_back(tmp_path, sysfs):
+    clock = FakeClock()
+    engine = make_engine(tmp_path, clock=clock)
+    attempts = reject_writes(engine, except_value=80)
+    result = engine.set_threshold(60)
+    assert not result.success
+    assert result.exit_code == 5
+    assert "롤백 완료: 80%" in result.error_message
+    assert attempts == [60, 80]
+    assert engine.read_threshold() == 80
+    # Polling stopped at the timeout, with delays capped
+    assert sum(clock.sleeps) == pytest.approx(engine.verify_timeout)
+    assert max(clock.sleeps) == engine.POLL_MAX
+
+
+def test_failed_rollback_is_reported(tmp_path, sysfs):
+    engine = make_engine(tmp_path)
+    attempts = []
+
+    def fake_write(value):
+        attempts.append(value)
+        if len(attempts) > 1:
+            raise OSError("Input/output error")
+
+    engine._write = fake_write
+    result = engine.set_threshold(60)
+    assert not result.success
+    assert "롤백 실패" in result.error_message
+    assert attempts == [60, 80]
+
+
+def test_multi_battery_rolls_back_changed_devices(tmp_path, sysfs):
+    make_battery(str(sysfs), "BAT1", 90)
+    make_battery(str(sysfs), "BAT2", 60)
+    engines = [make_engine(tmp_path, name) for name in ("BAT0", "BAT1", "BAT2")]
+    attempts = reject_writes(engines[1], except_value=90)
+
+    result = set_thresholds(engines, 60)
+    assert not result.success
+    assert result.error_message.startswith("BAT1:")
+    assert "롤백 완료: BAT0" in result.error_message
+    assert "BAT2" not in result.error_message  # Unchanged: nothing to restore
+    assert [engine.read_threshold() for engine in engines] == [80, 90, 60]
+    assert attempts == [60, 90]
+
+
+def test_multi_battery_success(tmp_path, sysfs):
+    make_battery(str(sysfs), "BAT1", 90)
+    engines = [make_engine(tmp_path, name) for name in ("BAT0", "BAT1")]
+    result = set_thresholds(engines, 70)
+    assert result.success
+    assert [write.previous for write in result.data] == [80, 90]
+    assert [engine.read_threshold() for engine in engines] == [70, 70]
+
+
+def test_lock_busy(tmp_path, sysfs):
+    engine = make_engine(tmp_path)
+    assert not engine.lock_busy()
+    fd = os.open(engine.lock_file, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        assert engine.lock_busy()
+    finally:
+        os.close(fd)
+    assert not engine.lock_busy()
+
+
+def test_busy_lock_times_out_with_exit_code_4(tmp_path, sysfs):
+    clock = FakeClock()
+    engine = make_engine(tmp_path, clock=clock)
+    engine.lock_timeout = 1.0
+    fd = os.open(engine.lock_file, os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        result = engine.set_threshold(60)
+    finally:
+        os.close(fd)
+    assert not result.success
+    assert result.exit_code == 4
+    assert engine.read_threshold() == 80
+    assert clock.now == pytest.approx(1.0)
+    assert max(clock.sleeps) <= ThresholdEngine.LOCK_POLL_MAX
+
+
+def test_lock_released_while_waiting(tmp_path, sysfs):
+    clock = FakeClock()
+    engine = make_engine(tmp_path, clock=clock)
+    fd = os.open(engine.lock_file, os.O_WRONLY | os.O_CREAT, 0o644)
+    fcntl.flock(fd, fcntl.LOCK_EX)
+    clock.on_sleep = lambda polls: polls == 3 and os.close(fd)
+    assert engine.set_threshold(60).success
+    assert len(clock.sleeps) == 3
+
+
+def test_legacy_lock_directory_of_a_running_cli_is_kept(tmp_path, sysfs, monkeypatch):
+    engine = make_engine(tmp_path)
+    os.mkdir(engine.lock_file)
+    monkeypatch.setattr("src.core.threshold_engine.legacy_lock_holder_running", lambda: True)
+    result = engine.set_threshold(60)
+    assert result.exit_code == 4
+    assert os.path.isdir(engine.lock_file)
+
+    monkeypatch.setattr("src.core.threshold_engine.legacy_lock_holder_running", lambda: False)
+    assert engine.set_threshold(60).success
+    assert os.path.isfile(engine.lock_file)
+
+
+def test_legacy_lock_holder_detection(tmp_path):
+    proc = tmp_path / "proc"
+    for pid, args in (("10", [b"/usr/bin/python3", b"a14-charge-keeper"]),
+                      ("11", [b"bash", b"/usr/local/bin/other"])):
+        (proc / pid).mkdir(parents=True)
+        (proc / pid / "cmdline").write_bytes(b"\0".join(args) + b"\0")
+    from src.core.threshold_engine import legacy_lock_holder_running
+    assert not legacy_lock_holder_running(str(proc))
+    (proc / "12").mkdir()
+    (proc / "12" / "cmdline").write_bytes(b"/bin/bash\0/usr/local/bin/a14-charge-keeper\0set\0060\0")
+    assert legacy_lock_holder_running(str(proc))
+
+
+def test_conflict_warnings(tmp_path, sysfs, capsys):
+    engine = make_engine(tmp_path)
+    engine.conflict_check = lambda: ['tlp', 'auto-cpufreq']
+    assert engine.set_threshold(60).success
+    err = capsys.readouterr().err
+    assert "TLP" in err and "asusctl" not in err
+
+
+def test_unsupported_battery_in_a_set(tmp_path, sysfs):
+    engines = [make_engine(tmp_path, "BAT0"), make_engine(tmp_path, "BAT9")]
+    result = set_thresholds(engines, 60)
+    assert result.exit_code == 2
+    assert engines[0].read_threshold() == 80
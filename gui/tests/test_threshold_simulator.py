@@ -0,0 +1,72 @@
+"""Tests for the threshold what-if simulator on a small synthetic trace."""
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.core import threshold_simulator  # noqa: E402
+from src.core.threshold_simulator import Candidate, UsageTrace, evaluate, rank  # noqa: E402
+from src.core.wear_analytics import rainflow  # noqa: E402
+
+CANDIDATES = [Candidate(100, 100), Candidate(80, 80), Candidate(80, 60), Candidate(50, 50)]
+
+
+def office_days(days: int, drain_per_hour: float) -> UsageTrace:
+    """Full on AC overnight, on battery 09-18h, recharged by 20h."""
+    times, percentage, states = [], [], []
+    for day in range(days):
+        start = day * 86400
+        times += [start, start + 9 * 3600, start + 18 * 3600, start + 20 * 3600]
+        percentage += [100, 100, 100 - 9 * drain_per_hour, 100]
+        states += ["fully-charged", "discharging", "charging", "fully-charged"]
+    times.append(days * 86400)
+    percentage.append(100)
+    states.append("fully-charged")
+    return UsageTrace(times, percentage, states)
+
+
+def by_setting(results) -> dict:
+    return {(r.end_threshold, r.start_threshold): r for r in results}
+
+
+def test_wear_counts_every_recharge():
+    results = by_setting(evaluate(office_days(4, 5), CANDIDATES))
+    # Four 45-point discharges and recharges are 1.8 full cycles at any end threshold
+    for result in results.values():
+        assert result.equivalent_full_cycles == pytest.approx(1.8, abs=1e-3)
+        assert result.mean_cycle_depth == pytest.approx(45, abs=1e-3)
+    assert results[(100, 100)].high_soc_fraction > 0.5
+    assert results[(80, 80)].high_soc_fraction == 0
+    assert results[(80, 80)].mean_charge == pytest.approx(results[(100, 100)].mean_charge - 20, abs=0.1)
+
+
+def test_start_threshold_defers_charging():
+    results = by_setting(evaluate(office_days(4, 1), CANDIDATES))
+    assert results[(80, 80)].mean_cycle_depth == pytest.approx(9)
+    # 80 -> 71 -> 62 -> 53, recharged to 80 only once below 60, then 80 -> 71
+    assert results[(80, 60)].mean_cycle_depth == pytest.approx(21)
+    assert results[(80, 60)].equivalent_full_cycles == pytest.approx((27 + 9 / 2) / 100)
+    assert results[(80, 60)].mean_charge < results[(80, 80)].mean_charge
+
+
+def test_runtime_loss_and_ranking():
+    results = evaluate(office_days(4, 5), CANDIDATES)
+    lost = by_setting(results)
+    assert lost[(50, 50)].runtime_lost_hours > 0  # Reaches the reserve before 18h
+    assert all(lost[key].runtime_lost_hours == 0 for key in [(100, 100), (80, 80), (80, 60)])
+
+    ranked = [(r.end_threshold, r.start_threshold) for r in rank(results)]
+    assert ranked[2:] == [(100, 100), (50, 50)]  # Lowest charge within budget first
+    allowed = [(r.end_threshold, r.start_threshold)
+               for r in rank(results, max_runtime_lost=lost[(50, 50)].runtime_lost_hours)]
+    assert allowed[0] == (50, 50)
+
+
+def test_boundary_rows_give_the_full_series_cycles():
+    trace = office_days(4, 1)
+    trajectory = threshold_simulator.simulate(trace, CANDIDATES)
+    boundaries = trajectory[[0] + [end for _, end, _ in trace.segments()]]
+    for index in range(len(CANDIDATES)):
+        full_ranges, full_counts = rainflow(trajectory[:, index])
+        ranges, counts = rainflow(boundaries[:, index])
+        assert sorted(zip(ranges, counts)) == pytest.approx(sorted(zip(full_ranges, full_counts)))
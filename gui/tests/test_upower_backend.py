@@ -0,0 +1,136 @@
+"""Tests for the UPower D-Bus backend.
+
+The D-Bus tests start a private session bus and the module's own UPower
+stand-in (``fake-service``) on it; they are skipped without jeepney or
+dbus-daemon.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from src.core.upower_backend import (JEEPNEY_INSTALLED, UPowerBackend, fields_from_properties,
+                                     format_duration)
+
+GUI_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+@pytest.mark.parametrize("seconds,text", [
+    (0, None), (-5, None), (45, "45 seconds"), (90, "1.5 minutes"),
+    (20520, "5.7 hours"), (172800, "2.0 days"),
+])
+def test_format_duration(seconds, text):
+    assert format_duration(seconds) == text
+
+
+def test_fields_from_properties():
+    fields = fields_from_properties({
+        'State': 2, 'Percentage': 79.6, 'ChargeCycles': -1, 'Vendor': '',
+        'TimeToEmpty': 3600, 'Unknown': 1,
+    })
+    assert fields == {'state': 'discharging', 'percentage': 80, 'charge_cycles': None,
+                      'vendor': None, 'time_to_empty': '1.0 hours'}
+
+
+def test_device_paths():
+    path = UPowerBackend.device_path("BAT1")
+    assert path == "/org/freedesktop/UPower/devices/battery_BAT1"
+    assert UPowerBackend.device_name(path) == "BAT1"
+    assert UPowerBackend.device_name("/org/freedesktop/UPower/devices/line_power_AC") is None
+
+
+@pytest.fixture(scope="module")
+def fake_upower():
+    """Private session bus running the UPower stand-in for BAT0 and BAT1."""
+    if not JEEPNEY_INSTALLED:
+        pytest.skip("jeepney is not installed")
+    if shutil.which("dbus-daemon") is None:
+        pytest.skip("dbus-daemon is not installed")
+
+    bus = subprocess.Popen(["dbus-daemon", "--session", "--nofork", "--print-address"],
+                           stdout=subprocess.PIPE, text=True)
+    address = bus.stdout.readline().strip()
+    env = dict(os.environ, DBUS_SESSION_BUS_ADDRESS=address, PYTHONPATH=GUI_DIR)
+    service = subprocess.Popen([sys.executable, "-m", "src.core.upower_backend",
+                                "fake-service", "BAT0", "BAT1"],
+                               cwd=GUI_DIR, env=env, stdout=subprocess.DEVNULL)
+    previous = os.environ.get('DBUS_SESSION_BUS_ADDRESS')
+    os.environ['DBUS_SESSION_BUS_ADDRESS'] = address
+    try:
+        deadline = time.monotonic() + 10
+        while UPowerBackend('SESSION').get_properties("BAT0") is None:
+            if time.monotonic() > deadline or service.poll() is not None:
+                pytest.fail("fake UPower service did not come up")
+            time.sleep(0.1)
+        yield address
+    finally:
+        service.terminate()
+        service.wait()
+        bus.terminate()
+        bus.wait()
+        if previous is None:
+            del os.environ['DBUS_SESSION_BUS_ADDRESS']
+        else:
+            os.environ['DBUS_SESSION_BUS_ADDRESS'] = previous
+
+
+def test_get_properties(fake_upower):
+    backend = UPowerBackend('SESSION')
+    properties = backend.get_properties("BAT1")
+    assert properties['NativePath'] == "BAT1"
+    assert properties['EnergyFull'] == 70.1
+    assert backend.call_count == 1
+    backend.close()
+
+
+def test_unknown_battery(fake_upower):
+    backend = UPowerBackend('SESSION')
+    assert backend.get_properties("BAT7") is None
+    backend.close()
+
+
+def test_read_snapshot(fake_upower):
+    backend = UPowerBackend('SESSION')
+    snapshot = backend.read_snapshot("BAT0", 80, start_threshold=None, backup_count=3)
+    assert snapshot.device == "BAT0"
+    assert snapshot.end_threshold == 80
+    assert snapshot.backup_count == 3
+    assert snapshot.state == "discharging"
+    assert snapshot.time_to_empty == "5.7 hours"
+    assert snapshot.charge_cycles is None
+    backend.close()
+
+
+def test_subscription_delivers_deltas(fake_upower):
+    received = []
+    done = threading.Event()
+
+    def on_changed(name, fields):
+        received.append((name, fields))
+        if {name for name, _ in received} == {"BAT0", "BAT1"}:
+            done.set()
+
+    subscription = UPowerBackend('SESSION').subscribe(on_changed)
+    try:
+        assert done.wait(5), "no PropertiesChanged signals within 5 s"
+    finally:
+        subscription.stop()
+    name, fields = received[0]
+    # Only the changed properties arrive, already converted
+    assert set(fields) == {'percentage', 'energy_current'}
+    assert isinstance(fields['percentage'], int)
+    assert subscription.signal_count >= 2
+
+
+def test_unreachable_bus_backs_off(monkeypatch):
+    if not JEEPNEY_INSTALLED:
+        pytest.skip("jeepney is not installed")
+    monkeypatch.setenv('DBUS_SESSION_BUS_ADDRESS', "unix:path=/nonexistent/a14-test-bus")
+    backend = UPowerBackend('SESSION')
+    assert backend.get_properties("BAT0") is None
+    assert backend._unavailable_until > time.monotonic()